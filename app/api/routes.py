@@ -1,11 +1,29 @@
-from fastapi import APIRouter, UploadFile, File, Form, HTTPException
-from typing import List, Optional, Dict, Any
+from fastapi import APIRouter, UploadFile, File, Form, Header, HTTPException, Query, Request
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
+from typing import List, Optional, Dict, Any, AsyncIterator, Awaitable, Callable
+from contextlib import asynccontextmanager
 from pydantic import BaseModel
 from app.services.report_generator import ReportGenerator
 from app.data.indexing import DataIndexer
 from app.data.data_fetcher import FinancialDataFetcher
+from app.core.profiling import load_profile, token_matches
+from app.core.admission import AdmissionController, AdmissionRejected
+from app.services.llm_dispatcher import LLMRateLimitError
+from app.services.compaction import CompactionService
+from app.services.cache_warmer import CacheWarmer
+from app.services.report_renderer import MEDIA_TYPES
+from app.utils.deadline import deadline, DeadlineExceeded
+from app.utils.page_cache import PageCache, decode_cursor
+from app.utils.http_cache import etag_matches, accepts_encoding
+from app.core.config import settings
 from datetime import datetime
+import asyncio
+import json
+import logging
+import math
 import os
+import shutil
+import tempfile
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -16,6 +34,21 @@ router = APIRouter()
 report_generator = ReportGenerator()
 data_indexer = DataIndexer()
 financial_data_fetcher = FinancialDataFetcher()
+compaction_service = CompactionService(data_indexer.retrieval_service, financial_data_fetcher.timeseries_store)
+cache_warmer = CacheWarmer(report_generator, data_indexer, financial_data_fetcher)
+# Result sets of paginated fetches, served page by page from a cursor
+fetch_pages = PageCache(
+    "fetch_pages",
+    ttl=settings.FETCH_PAGE_CACHE_TTL_SECONDS,
+    max_results=settings.FETCH_PAGE_CACHE_MAX_RESULTS,
+    max_items=settings.FETCH_PAGE_CACHE_MAX_DOCUMENTS
+)
+report_admission = AdmissionController(
+    "report",
+    max_concurrent=settings.REPORT_MAX_CONCURRENT,
+    max_queue=settings.REPORT_MAX_QUEUE,
+    queue_timeout=settings.REPORT_QUEUE_TIMEOUT_SECONDS
+)
 
 # Request models
 class ReportRequest(BaseModel):
@@ -24,6 +57,11 @@ class ReportRequest(BaseModel):
     structured: bool = True
     sections: Optional[List[str]] = None
     top_k: Optional[int] = None
+    # Time budget in milliseconds; sections still running when it expires are returned as cancelled
+    deadline_ms: Optional[int] = None
+
+class BatchReportRequest(BaseModel):
+    jobs: List[ReportRequest]
 
 class IndexTextRequest(BaseModel):
     text: str
@@ -37,17 +75,124 @@ class IndexTextRequest(BaseModel):
 async def generate_report(request: ReportRequest):
     """Generate a comprehensive research report based on a query"""
     try:
-        report = await report_generator.generate_report(
-            query=request.query,
-            report_type=request.report_type,
-            structured=request.structured,
-            sections=request.sections,
-            top_k=request.top_k
-        )
+        # The budget starts before admission, so time spent queued is charged to it
+        with deadline(request.deadline_ms / 1000.0 if request.deadline_ms else None):
+            async with report_admission.admit():
+                report = await report_generator.generate_report(
+                    query=request.query,
+                    report_type=request.report_type,
+                    structured=request.structured,
+                    sections=request.sections,
+                    top_k=request.top_k,
+                    deadline_ms=request.deadline_ms
+                )
         return report
+    except AdmissionRejected as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    except DeadlineExceeded as e:
+        raise HTTPException(status_code=504, detail=f"Error generating report: {str(e)}")
+    except LLMRateLimitError as e:
+        raise HTTPException(
+            status_code=429,
+            detail=f"Error generating report: {str(e)}",
+            headers={"Retry-After": str(max(1, math.ceil(e.retry_after)))}
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error generating report: {str(e)}")
 
+@router.get("/reports/{report_id}", response_model=Dict[str, Any])
+async def get_report(report_id: str, version: Optional[int] = None):
+    """A stored structured report (the latest version by default)"""
+    report = await report_generator.get_report(report_id, version)
+    if report is None:
+        raise HTTPException(status_code=404, detail=f"Report {report_id} not found")
+    return report
+
+@router.get("/reports/{report_id}/rendered")
+async def get_rendered_report(request: Request, report_id: str, version: Optional[int] = None,
+                              format: str = Query("html", pattern="^(html|json)$")):
+    """
+    A stored report rendered as a static HTML page or JSON document
+    
+    Served from the content-addressed artifact store with a strong ETag (the
+    SHA-256 of the rendering): a matching If-None-Match gets 304 Not Modified,
+    and clients accepting gzip get the precompressed copy. A pinned version
+    never changes and is cacheable for a year; the latest must be revalidated.
+    """
+    artifact = await report_generator.rendered_report(report_id, format, version)
+    if artifact is None:
+        raise HTTPException(status_code=404, detail=f"Report {report_id} not found")
+    compressed = accepts_encoding(request.headers.get("accept-encoding"), "gzip")
+    etag = f'"{artifact["digest"]}-gzip"' if compressed else f'"{artifact["digest"]}"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": "public, max-age=31536000, immutable" if version is not None else "no-cache",
+        "Vary": "Accept-Encoding",
+        "X-Report-Version": str(artifact["version"]),
+    }
+    if etag_matches(request.headers.get("if-none-match"), artifact["digest"], f'{artifact["digest"]}-gzip'):
+        return Response(status_code=304, headers=headers)
+    content = await asyncio.to_thread(report_generator.artifact_store.read, artifact["digest"], compressed)
+    if content is None:
+        raise HTTPException(status_code=404, detail=f"Rendering of report {report_id} not found")
+    if compressed:
+        headers["Content-Encoding"] = "gzip"
+    return Response(content, media_type=MEDIA_TYPES[format], headers=headers)
+
+@router.post("/reports/{report_id}/refresh", response_model=Dict[str, Any])
+async def refresh_report(report_id: str, deadline_ms: Optional[int] = None):
+    """Regenerate only the sections of a stored report whose supporting data changed"""
+    try:
+        with deadline(deadline_ms / 1000.0 if deadline_ms else None):
+            async with report_admission.admit():
+                return await report_generator.refresh_report(report_id, deadline_ms)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Report {report_id} not found")
+    except AdmissionRejected as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    except DeadlineExceeded as e:
+        raise HTTPException(status_code=504, detail=f"Error refreshing report: {str(e)}")
+    except LLMRateLimitError as e:
+        raise HTTPException(
+            status_code=429,
+            detail=f"Error refreshing report: {str(e)}",
+            headers={"Retry-After": str(max(1, math.ceil(e.retry_after)))}
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error refreshing report: {str(e)}")
+
+@router.get("/reports/{report_id}/diff", response_model=Dict[str, Any])
+async def diff_report(report_id: str, from_version: Optional[int] = None, to_version: Optional[int] = None):
+    """Section-by-section changes between two versions of a report (default: latest vs the one before)"""
+    try:
+        return await report_generator.diff_report(report_id, from_version, to_version)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Report {report_id} has no such versions")
+
+@router.post("/generate-reports")
+async def generate_reports(request: BatchReportRequest):
+    """
+    Generate many reports in one call
+    
+    Results are streamed as newline-delimited JSON in completion order; each line
+    carries the job's index in the request.
+    """
+    if not request.jobs:
+        raise HTTPException(status_code=400, detail="At least one job is required")
+    if len(request.jobs) > settings.BATCH_MAX_JOBS:
+        raise HTTPException(status_code=400, detail=f"At most {settings.BATCH_MAX_JOBS} jobs are allowed per batch")
+    
+    async def stream():
+        try:
+            async for result in report_generator.generate_reports([job.model_dump() for job in request.jobs]):
+                yield json.dumps(result) + "\n"
+        except Exception as e:
+            # Headers are already sent, so report the failure as the last line
+            logging.error(f"Error generating batch reports: {str(e)}")
+            yield json.dumps({"status": "error", "error": f"Error generating reports: {str(e)}"}) + "\n"
+    
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
 # Document indexing endpoints
 @router.post("/index-text", response_model=Dict[str, str])
 async def index_text(request: IndexTextRequest):
@@ -64,6 +209,20 @@ async def index_text(request: IndexTextRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error indexing document: {str(e)}")
 
+@asynccontextmanager
+async def _saved_upload(file: UploadFile, suffix: str) -> AsyncIterator[str]:
+    """Save an upload to a private temporary file (never named after the client's filename) and remove it afterwards"""
+    def save() -> str:
+        with tempfile.NamedTemporaryFile("wb", suffix=suffix, delete=False) as f:
+            shutil.copyfileobj(file.file, f)
+            return f.name
+
+    file_path = await asyncio.to_thread(save)
+    try:
+        yield file_path
+    finally:
+        os.unlink(file_path)
+
 @router.post("/index-csv", response_model=Dict[str, Any])
 async def index_csv(
     file: UploadFile = File(...),
@@ -75,18 +234,15 @@ async def index_csv(
     """Index documents from a CSV file"""
     try:
         # Save uploaded file temporarily
-        file_path = f"/tmp/{file.filename}"
-        with open(file_path, "wb") as f:
-            f.write(await file.read())
-        
-        # Index documents
-        doc_ids = await data_indexer.index_csv_file(
-            file_path=file_path,
-            text_column=text_column,
-            source_column=source_column,
-            date_column=date_column,
-            doc_type=doc_type
-        )
+        async with _saved_upload(file, ".csv") as file_path:
+            # Index documents
+            doc_ids = await data_indexer.index_csv_file(
+                file_path=file_path,
+                text_column=text_column,
+                source_column=source_column,
+                date_column=date_column,
+                doc_type=doc_type
+            )
         
         return {
             "status": "success", 
@@ -107,18 +263,15 @@ async def index_json(
     """Index documents from a JSON file"""
     try:
         # Save uploaded file temporarily
-        file_path = f"/tmp/{file.filename}"
-        with open(file_path, "wb") as f:
-            f.write(await file.read())
-        
-        # Index documents
-        doc_ids = await data_indexer.index_json_file(
-            file_path=file_path,
-            text_field=text_field,
-            source_field=source_field,
-            date_field=date_field,
-            doc_type=doc_type
-        )
+        async with _saved_upload(file, ".json") as file_path:
+            # Index documents
+            doc_ids = await data_indexer.index_json_file(
+                file_path=file_path,
+                text_field=text_field,
+                source_field=source_field,
+                date_field=date_field,
+                doc_type=doc_type
+            )
         
         return {
             "status": "success", 
@@ -131,13 +284,39 @@ async def index_json(
 # Financial data endpoints
 @router.post("/fetch-and-index-data", response_model=Dict[str, Any])
 async def fetch_and_index_financial_data(
-    symbols: List[str],
-    query: Optional[str] = None
+    symbols: Optional[List[str]] = None,
+    query: Optional[str] = None,
+    deadline_ms: Optional[int] = None,
+    news_pages: Optional[int] = Query(None, ge=1, le=settings.NEWS_MAX_PAGES),
+    page_size: Optional[int] = Query(None, ge=1, le=settings.FETCH_MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    format: str = Query("json", pattern="^(json|ndjson)$")
 ):
-    """Fetch financial data and index it for retrieval"""
+    """
+    Fetch financial data and index it for retrieval
+    
+    With page_size, the response holds one page of documents and a next_cursor
+    for the rest (pass it back as cursor, without symbols). With format=ndjson,
+    documents are streamed one per line as they are fetched and indexed in
+    batches, followed by a summary line.
+    """
+    if cursor:
+        return _next_page(cursor, page_size)
+    if not symbols:
+        raise HTTPException(status_code=400, detail="At least one symbol is required")
+    
+    if format == "ndjson":
+        async def documents():
+            # Sources that miss the deadline are skipped
+            with deadline(deadline_ms / 1000.0 if deadline_ms else None):
+                async for doc in financial_data_fetcher.iter_comprehensive_data(symbols, query, news_pages):
+                    yield doc
+        return _stream_documents(documents(), index_as="financial_data")
+    
     try:
-        # Fetch comprehensive data
-        documents = await financial_data_fetcher.fetch_comprehensive_data(symbols, query)
+        # Fetch comprehensive data; sources that miss the deadline are skipped
+        with deadline(deadline_ms / 1000.0 if deadline_ms else None):
+            documents = await financial_data_fetcher.fetch_comprehensive_data(symbols, query, news_pages)
         
         # Add debug logging
         logging.info(f"Fetched {len(documents)} documents")
@@ -145,55 +324,112 @@ async def fetch_and_index_financial_data(
             count = len([d for d in documents if d["metadata"].get("type") == doc_type])
             logging.info(f"Document type {doc_type}: {count}")
         
-        # Index all documents
-        indexed_docs = []
-        for doc in documents:
-            doc_id = await data_indexer.index_text_document(
-                text=doc["text"],
-                source=doc["metadata"].get("source", "Unknown"),
-                doc_type=doc["metadata"].get("type", "financial_data"),
-                date=doc["metadata"].get("date") or doc["metadata"].get("published_at"),
-                metadata=doc["metadata"]
-            )
-            indexed_docs.append(doc_id)
+        # Index all documents in one pipelined batch
+        indexed_docs = await data_indexer.index_documents(documents, "financial_data")
             
-        return {
+        result = {
             "status": "success",
             "indexed_documents": len(indexed_docs),
             "document_types": {
                 "indian_stock_data": len([d for d in documents if d["metadata"].get("type") == "indian_stock_data"]),
                 "news": len([d for d in documents if d["metadata"].get("type") == "news"]),
                 "sentiment_news": len([d for d in documents if d["metadata"].get("type") == "sentiment_news"])
-            },
-            "data": documents  # Add this line to include the actual data in the response
+            }
         }
+        if page_size:
+            return _first_page(documents, page_size, result)
+        result["data"] = documents  # Add this line to include the actual data in the response
+        return result
     except Exception as e:
         logging.error(f"Error in fetch_and_index_financial_data: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error fetching financial data: {str(e)}")
 
 # Helper function to index data
-async def index_data_helper(documents, doc_type="financial_data"):
+async def index_data_helper(documents, doc_type="financial_data", page_size: Optional[int] = None):
     """Helper function to index data and return results"""
     if not documents:
         return {"status": "success", "data": documents, "indexed": False}
         
-    indexed_docs = []
-    for doc in documents:
-        doc_id = await data_indexer.index_text_document(
-            text=doc["text"],
-            source=doc["metadata"].get("source", "Unknown"),
-            doc_type=doc["metadata"].get("type", doc_type),
-            date=doc["metadata"].get("date") or doc["metadata"].get("published_at"),
-            metadata=doc["metadata"]
-        )
-        indexed_docs.append(doc_id)
+    indexed_docs = await data_indexer.index_documents(documents, doc_type)
     
-    return {
+    result = {
         "status": "success", 
-        "data": documents,
         "indexed": True,
         "indexed_documents": len(indexed_docs)
     }
+    if page_size:
+        return _first_page(documents, page_size, result)
+    return {**result, "data": documents}
+
+# Pagination and streaming of fetched documents
+def _first_page(documents: List[Dict[str, Any]], page_size: int, extra: Dict[str, Any]) -> Dict[str, Any]:
+    """First page of a fetch; the remaining pages stay cached behind next_cursor"""
+    result_id = fetch_pages.put(documents, extra) if len(documents) > page_size else None
+    return {**extra, **fetch_pages.page(documents, 0, page_size, result_id)}
+
+def _next_page(cursor: str, page_size: Optional[int]) -> Dict[str, Any]:
+    try:
+        result_id, offset = decode_cursor(cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    cached = fetch_pages.get(result_id)
+    if cached is None:
+        raise HTTPException(status_code=410, detail="Cursor has expired; repeat the original request")
+    documents, extra = cached
+    return {**extra, **fetch_pages.page(documents, offset, page_size or settings.FETCH_DEFAULT_PAGE_SIZE, result_id)}
+
+def _stream_documents(documents: AsyncIterator[Dict[str, Any]], index_as: Optional[str] = None) -> StreamingResponse:
+    """
+    Stream documents as newline-delimited JSON while they are produced
+    
+    When index_as is given, documents are also indexed in batches of
+    STREAM_INDEX_BATCH_SIZE as they stream. The last line is a summary with
+    per-type and indexed counts, or an error if the fetch or indexing failed
+    midway (documents sent after the last completed batch are then not indexed).
+    """
+    async def stream():
+        counts: Dict[str, int] = {}
+        indexed = 0
+        pending: List[Dict[str, Any]] = []
+        
+        async def index_pending():
+            nonlocal indexed
+            if pending:
+                indexed += len(await data_indexer.index_documents(pending, index_as))
+                pending.clear()
+        
+        try:
+            async for doc in documents:
+                doc_type = doc["metadata"].get("type", index_as)
+                counts[doc_type] = counts.get(doc_type, 0) + 1
+                yield json.dumps(doc, default=str) + "\n"
+                if index_as is not None:
+                    pending.append(doc)
+                    if len(pending) >= settings.STREAM_INDEX_BATCH_SIZE:
+                        await index_pending()
+            await index_pending()
+            yield json.dumps({
+                "status": "success",
+                "documents": sum(counts.values()),
+                "indexed_documents": indexed,
+                "document_types": counts
+            }) + "\n"
+        except Exception as e:
+            # Headers are already sent, so report the failure as the last line
+            logging.error(f"Error streaming documents: {str(e)}")
+            yield json.dumps({"status": "error", "error": f"Error fetching documents: {str(e)}"}) + "\n"
+    
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+async def _iterate(fetch: Callable[[], Awaitable[List[Dict[str, Any]]]]) -> AsyncIterator[Dict[str, Any]]:
+    """Documents of a source that answers in one upstream response"""
+    for doc in await fetch():
+        yield doc
+
+def _unindexed(documents: List[Dict[str, Any]], page_size: Optional[int]) -> Dict[str, Any]:
+    if page_size:
+        return _first_page(documents, page_size, {"status": "success", "indexed": False})
+    return {"status": "success", "data": documents, "indexed": False}
 
 # Indian Stock API endpoints
 @router.get("/fetch-indian-stock", response_model=Dict[str, Any])
@@ -237,30 +473,60 @@ async def get_stock_forecasts(
 
 # Legacy financial data endpoints
 @router.get("/fetch-news", response_model=Dict[str, Any])
-async def get_financial_news(query: Optional[str] = None, symbols: Optional[str] = None, index_data: bool = False):
-    """Fetch financial news articles with option to index"""
+async def get_financial_news(
+    query: Optional[str] = None,
+    symbols: Optional[str] = None,
+    index_data: bool = False,
+    pages: Optional[int] = Query(None, ge=1, le=settings.NEWS_MAX_PAGES),
+    page_size: Optional[int] = Query(None, ge=1, le=settings.FETCH_MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    format: str = Query("json", pattern="^(json|ndjson)$")
+):
+    """Fetch financial news articles with option to index (paginated with page_size, or streamed with format=ndjson)"""
+    if cursor:
+        return _next_page(cursor, page_size)
+    symbol_list = symbols.split(",") if symbols else None
+    if format == "ndjson":
+        return _stream_documents(
+            financial_data_fetcher.iter_financial_news(query, symbol_list, pages),
+            index_as="news" if index_data else None
+        )
     try:
-        symbol_list = symbols.split(",") if symbols else None
-        news_data = await financial_data_fetcher.fetch_financial_news(query, symbol_list)
+        news_data = await financial_data_fetcher.fetch_financial_news(query, symbol_list, pages)
         
         if index_data and news_data:
-            return await index_data_helper(news_data, "news")
+            return await index_data_helper(news_data, "news", page_size)
         
-        return {"status": "success", "data": news_data, "indexed": False}
+        return _unindexed(news_data, page_size)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching news: {str(e)}")
 
 @router.get("/fetch-sentiment-news", response_model=Dict[str, Any])
-async def get_sentiment_news(symbols: str, index_data: bool = False):
-    """Fetch financial news with sentiment analysis with option to index"""
+async def get_sentiment_news(
+    symbols: Optional[str] = None,
+    index_data: bool = False,
+    page_size: Optional[int] = Query(None, ge=1, le=settings.FETCH_MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    format: str = Query("json", pattern="^(json|ndjson)$")
+):
+    """Fetch financial news with sentiment analysis with option to index (paginated or streamed)"""
+    if cursor:
+        return _next_page(cursor, page_size)
+    if not symbols:
+        raise HTTPException(status_code=400, detail="symbols is required")
+    symbol_list = symbols.split(",")
+    if format == "ndjson":
+        return _stream_documents(
+            _iterate(lambda: financial_data_fetcher.fetch_news_with_sentiment(symbol_list)),
+            index_as="sentiment_news" if index_data else None
+        )
     try:
-        symbol_list = symbols.split(",")
         sentiment_data = await financial_data_fetcher.fetch_news_with_sentiment(symbol_list)
         
         if index_data and sentiment_data:
-            return await index_data_helper(sentiment_data, "sentiment_news")
+            return await index_data_helper(sentiment_data, "sentiment_news", page_size)
         
-        return {"status": "success", "data": sentiment_data, "indexed": False}
+        return _unindexed(sentiment_data, page_size)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching sentiment news: {str(e)}")
     
@@ -271,16 +537,205 @@ async def get_indian_stock_news(
     stock_id: Optional[str] = None,
     category: Optional[str] = None,
     limit: int = 10,
-    index_data: bool = False
+    index_data: bool = False,
+    page_size: Optional[int] = Query(None, ge=1, le=settings.FETCH_MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    format: str = Query("json", pattern="^(json|ndjson)$")
 ):
-    """Fetch news from Indian Stock API with option to index"""
+    """Fetch news from Indian Stock API with option to index (paginated with page_size, or streamed with format=ndjson)"""
+    if cursor:
+        return _next_page(cursor, page_size)
+    if format == "ndjson":
+        return _stream_documents(
+            _iterate(lambda: financial_data_fetcher.fetch_indian_stock_news(stock_id, category, limit)),
+            index_as="indian_stock_news" if index_data else None
+        )
     try:
         news_data = await financial_data_fetcher.fetch_indian_stock_news(stock_id, category, limit)
         
         if index_data and news_data:
-            return await index_data_helper(news_data, "indian_stock_news")
+            return await index_data_helper(news_data, "indian_stock_news", page_size)
         
-        return {"status": "success", "data": news_data, "indexed": False}
+        return _unindexed(news_data, page_size)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching Indian stock news: {str(e)}")
-    
\ No newline at end of file
+    
+
+# Time series endpoints
+def _series_payload(periods, values) -> Dict[str, List[Any]]:
+    return {"periods": [str(p) for p in periods], "values": values.tolist()}
+
+@router.get("/timeseries/{stock_id}", response_model=Dict[str, Any])
+async def get_timeseries(
+    stock_id: str,
+    measure: Optional[str] = None,
+    prefix: str = "",
+    start: Optional[str] = None,
+    end: Optional[str] = None
+):
+    """Read locally stored series for a company (one measure, or all measures with a prefix)"""
+    store = financial_data_fetcher.timeseries_store
+    
+    def read() -> Dict[str, Dict[str, List[Any]]]:
+        stock_key = financial_data_fetcher.symbol_master.stock_key(stock_id)
+        if measure:
+            return {measure: _series_payload(*store.get_series(stock_key, measure, start, end))}
+        return {
+            name: _series_payload(periods, values)
+            for name, (periods, values) in store.get_company(stock_key, start, end, prefix).items()
+        }
+    
+    try:
+        # Series are read from memory-mapped files, off the event loop
+        series = await asyncio.to_thread(read)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not any(s["periods"] for s in series.values()):
+        raise HTTPException(status_code=404, detail=f"No stored series for {stock_id}")
+    return {"stock_id": stock_id, "series": series}
+
+@router.get("/timeseries", response_model=Dict[str, Any])
+async def get_timeseries_panel(
+    stock_ids: str,
+    measure: str,
+    start: Optional[str] = None,
+    end: Optional[str] = None
+):
+    """Align one measure across several companies (stock_ids is comma-separated)"""
+    ids = [s.strip() for s in stock_ids.split(",") if s.strip()]
+    if len(ids) > settings.TIMESERIES_PANEL_MAX_STOCKS:
+        raise HTTPException(
+            status_code=400, detail=f"At most {settings.TIMESERIES_PANEL_MAX_STOCKS} stock IDs are allowed per panel"
+        )
+    
+    def read():
+        keys = [financial_data_fetcher.symbol_master.stock_key(stock_id) for stock_id in ids]
+        return financial_data_fetcher.timeseries_store.get_panel(keys, measure, start, end)
+    
+    try:
+        periods, matrix = await asyncio.to_thread(read)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {
+        "measure": measure,
+        "periods": [str(p) for p in periods],
+        "values": {
+            stock_id: [None if v != v else v for v in row]
+            for stock_id, row in zip(ids, matrix.tolist())
+        }
+    }
+
+# Sentiment endpoints
+@router.get("/sentiment/{entity}", response_model=Dict[str, Any])
+async def get_entity_sentiment(
+    entity: str,
+    window: int = Query(7, ge=1, le=365),
+    start: Optional[str] = None,
+    end: Optional[str] = None
+):
+    """Rolling sentiment summary and daily aggregates for one entity (symbol or company name)"""
+    store = financial_data_fetcher.sentiment_store
+    try:
+        # Read the daily aggregates first so bad dates are rejected even for unknown entities
+        daily = store.daily(entity, start, end)
+        summary = store.summarize([entity], window=window, as_of=end)
+        if not summary:
+            raise HTTPException(status_code=404, detail=f"No sentiment data for {entity}")
+        symbol, row = next(iter(summary.items()))
+        return {"entity": symbol, "summary": row, "daily": daily}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/sentiment", response_model=Dict[str, Any])
+async def get_sentiment_summary(
+    entities: Optional[str] = None,
+    window: int = Query(7, ge=1, le=365),
+    as_of: Optional[str] = None
+):
+    """Rolling sentiment for several entities (comma-separated; defaults to the most covered ones)"""
+    store = financial_data_fetcher.sentiment_store
+    names = [e.strip() for e in entities.split(",") if e.strip()] if entities else store.top_entities()
+    try:
+        return {"window_days": window, "entities": store.summarize(names, window=window, as_of=as_of)}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+# Symbol endpoints
+@router.get("/symbols/search", response_model=Dict[str, Any])
+async def search_symbols(q: str, limit: int = Query(10, ge=1, le=50)):
+    """Autocomplete companies by partial name, alias or exchange code"""
+    return {"query": q, "results": financial_data_fetcher.symbol_master.search(q, limit)}
+
+@router.get("/symbols/resolve", response_model=Dict[str, Any])
+async def resolve_symbol(q: str):
+    """The company a name or code refers to, as it will be sent to the stock API"""
+    entry = financial_data_fetcher.symbol_master.resolve(q)
+    if entry is None:
+        raise HTTPException(status_code=404, detail=f"Unknown symbol {q}")
+    return entry
+
+@router.post("/symbols/import", response_model=Dict[str, Any])
+async def import_symbols(file: UploadFile = File(...)):
+    """Merge companies from a CSV file (name, query, stock_id, nse, bse, isin, ticker_id, aliases)"""
+    try:
+        symbol_master = financial_data_fetcher.symbol_master
+        async with _saved_upload(file, ".csv") as file_path:
+            rows = await asyncio.to_thread(symbol_master.import_csv, file_path)
+        return {"status": "success", "imported_rows": rows, "total_symbols": len(symbol_master)}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error importing symbols: {str(e)}")
+
+# Maintenance endpoints
+@router.post("/compact", response_model=Dict[str, Any])
+async def compact(dry_run: bool = False, vacuum: bool = False, adopt_legacy: bool = False):
+    """
+    Apply retention policies now and report what was (or, with dry_run, would be) removed
+    
+    adopt_legacy first copies vectors indexed before the document store existed into it, so
+    the policies reach them too (needed once per index).
+    """
+    if compaction_service.running:
+        raise HTTPException(status_code=409, detail="Compaction is already running")
+    try:
+        return await compaction_service.run(dry_run=dry_run, vacuum=vacuum, adopt_legacy=adopt_legacy)
+    except Exception as e:
+        logging.error(f"Error in compaction: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error during compaction: {str(e)}")
+
+@router.get("/compact", response_model=Dict[str, Any])
+async def get_last_compaction():
+    """Report of the last completed compaction"""
+    if compaction_service.last_report is None:
+        raise HTTPException(status_code=404, detail="No compaction has run yet")
+    return compaction_service.last_report
+
+@router.post("/warm", response_model=Dict[str, Any])
+async def warm(symbols: Optional[List[str]] = Query(None), budget_seconds: Optional[float] = Query(None, gt=0)):
+    """Warm caches now for the given symbols (default: watchlist plus most-requested symbols)"""
+    if cache_warmer.running:
+        raise HTTPException(status_code=409, detail="Cache warming is already running")
+    try:
+        return await cache_warmer.run(symbols=symbols, budget_seconds=budget_seconds)
+    except Exception as e:
+        logging.error(f"Error in cache warming: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error warming caches: {str(e)}")
+
+@router.get("/warm", response_model=Dict[str, Any])
+async def get_last_warm():
+    """Report of the last cache warming run"""
+    if cache_warmer.last_report is None:
+        raise HTTPException(status_code=404, detail="No cache warming has run yet")
+    return cache_warmer.last_report
+
+# Profiling endpoints
+@router.get("/profiles/{profile_id}")
+async def get_profile(profile_id: str, format: str = "json", x_profile_token: Optional[str] = Header(None)):
+    """Fetch a stored request profile (summary as JSON, or collapsed stacks with format=folded); needs X-Profile-Token"""
+    if not token_matches(x_profile_token):
+        raise HTTPException(status_code=403, detail="A valid X-Profile-Token header is required")
+    content = load_profile(profile_id, format)
+    if content is None:
+        raise HTTPException(status_code=404, detail=f"Profile {profile_id} not found")
+    if format == "folded":
+        return PlainTextResponse(content)
+    return json.loads(content)
\ No newline at end of file
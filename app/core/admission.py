@@ -0,0 +1,120 @@
+import asyncio
+import math
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Optional
+from app.core.metrics import ADMISSION_IN_FLIGHT, ADMISSION_QUEUE_DEPTH, ADMISSION_QUEUE_WAIT, ADMISSION_REJECTIONS
+from app.utils.deadline import remaining
+
+# Weight of the newest observation in the service time average
+EWMA_ALPHA = 0.2
+
+
+class AdmissionRejected(Exception):
+    """The request was shed; retry_after is the suggested wait in seconds"""
+
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(f"Server is busy ({reason}), retry after {retry_after}s")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """
+    Bounded concurrency with a bounded FIFO wait queue
+
+    Up to max_concurrent requests run at once and up to max_queue wait for a
+    slot. A request is rejected immediately when the queue is full, when it
+    would wait longer than its deadline, or after waiting queue_timeout seconds.
+    The Retry-After hint is derived from an exponentially weighted average of
+    observed service times.
+    """
+
+    def __init__(self, name: str, max_concurrent: int, max_queue: int, queue_timeout: float):
+        self.name = name
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_queue = max(0, max_queue)
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self.service_time: Optional[float] = None
+        self._waiters: deque = deque()
+
+    def _update_gauges(self):
+        ADMISSION_IN_FLIGHT.set(self.active, pool=self.name)
+        ADMISSION_QUEUE_DEPTH.set(len(self._waiters), pool=self.name)
+
+    def expected_wait(self, position: Optional[int] = None) -> float:
+        """Estimated seconds until a request queued at `position` (default: the back) gets a slot"""
+        if self.service_time is None:
+            return 0.0
+        position = len(self._waiters) if position is None else position
+        return self.service_time * (position + 1) / self.max_concurrent
+
+    def retry_after(self) -> int:
+        return max(1, math.ceil(self.expected_wait()))
+
+    def _reject(self, reason: str):
+        ADMISSION_REJECTIONS.inc(pool=self.name, reason=reason)
+        raise AdmissionRejected(reason, self.retry_after())
+
+    def _release(self, started: Optional[float] = None):
+        if started is not None:
+            elapsed = time.perf_counter() - started
+            self.service_time = elapsed if self.service_time is None else \
+                EWMA_ALPHA * elapsed + (1 - EWMA_ALPHA) * self.service_time
+        self.active -= 1
+        while self._waiters and self.active < self.max_concurrent:
+            future = self._waiters.popleft()
+            if not future.done():
+                self.active += 1
+                future.set_result(None)
+        self._update_gauges()
+
+    @asynccontextmanager
+    async def admit(self, deadline: Optional[float] = None):
+        """
+        Hold a slot for the enclosed block
+
+        Args:
+            deadline: The request's remaining time budget in seconds (defaults to
+                what is left of the current deadline, if any)
+
+        Raises:
+            AdmissionRejected: The request was shed
+        """
+        if deadline is None:
+            deadline = remaining()
+        queued_at = time.perf_counter()
+        if self.active < self.max_concurrent and not self._waiters:
+            self.active += 1
+        else:
+            if len(self._waiters) >= self.max_queue:
+                self._reject("queue_full")
+            if deadline is not None and self.expected_wait() >= deadline:
+                self._reject("deadline")
+            future = asyncio.get_running_loop().create_future()
+            self._waiters.append(future)
+            self._update_gauges()
+            try:
+                wait = self.queue_timeout if deadline is None else max(0.0, min(self.queue_timeout, deadline))
+                await asyncio.wait_for(asyncio.shield(future), wait)
+            except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+                if future.done() and not future.cancelled():
+                    # The slot arrived together with the timeout or cancellation; pass it on
+                    self._release()
+                else:
+                    future.cancel()
+                    self._waiters.remove(future)
+                    self._update_gauges()
+                if isinstance(e, asyncio.CancelledError):
+                    raise
+                self._reject("deadline" if deadline is not None and deadline < self.queue_timeout else "queue_timeout")
+        ADMISSION_QUEUE_WAIT.observe(time.perf_counter() - queued_at, pool=self.name)
+        self._update_gauges()
+
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._release(started)
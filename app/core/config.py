@@ -25,7 +25,157 @@ class Settings:
     EMBEDDING_MODEL: str = os.getenv("EMBEDDING_MODEL")
     MAX_DOCUMENTS_RETRIEVED: int = int(os.getenv("MAX_DOCUMENTS_RETRIEVED"))
     
+    # Indexing
+    EMBEDDING_BATCH_SIZE: int = int(os.getenv("EMBEDDING_BATCH_SIZE", "64"))
+    UPSERT_BATCH_SIZE: int = int(os.getenv("UPSERT_BATCH_SIZE", "100"))
+    # Optional second retrieval stage: RERANK_CANDIDATES vector hits are rescored by a
+    # cross-encoder within RERANK_BUDGET_MS and only the best RERANK_TOP_K reach the prompt
+    RERANK_ENABLED: bool = os.getenv("RERANK_ENABLED", "false").lower() == "true"
+    RERANK_MODEL: str = os.getenv("RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+    RERANK_CANDIDATES: int = int(os.getenv("RERANK_CANDIDATES", "30"))
+    RERANK_TOP_K: int = int(os.getenv("RERANK_TOP_K", "5"))
+    RERANK_BATCH_SIZE: int = int(os.getenv("RERANK_BATCH_SIZE", "16"))
+    RERANK_BUDGET_MS: float = float(os.getenv("RERANK_BUDGET_MS", "150"))
+    RERANK_MAX_LENGTH: int = int(os.getenv("RERANK_MAX_LENGTH", "256"))
+    # Blocking vector index calls run on a bounded thread pool; upsert batches are pipelined
+    VECTOR_MAX_WORKERS: int = int(os.getenv("VECTOR_MAX_WORKERS", "8"))
+    VECTOR_UPSERT_CONCURRENCY: int = int(os.getenv("VECTOR_UPSERT_CONCURRENCY", "4"))
+    METADATA_MAX_VALUE_CHARS: int = int(os.getenv("METADATA_MAX_VALUE_CHARS", "1000"))
+    # Comma-separated list of extra metadata keys to keep for tabular uploads (empty keeps all columns)
+    METADATA_ALLOWED_KEYS = [key.strip() for key in os.getenv("METADATA_ALLOWED_KEYS", "").split(",") if key.strip()]
+    
+    # Local storage
+    TIMESERIES_DIR: str = os.getenv("TIMESERIES_DIR", "data/timeseries")
+    # Most companies one /timeseries panel request may align
+    TIMESERIES_PANEL_MAX_STOCKS: int = int(os.getenv("TIMESERIES_PANEL_MAX_STOCKS", "50"))
+    DOCUMENT_STORE_PATH: str = os.getenv("DOCUMENT_STORE_PATH", "data/documents.db")
+    SENTIMENT_STORE_PATH: str = os.getenv("SENTIMENT_STORE_PATH", "data/sentiment.npz")
+    # Sentiment older than this is not ingested; the journal is folded into the snapshot past this size
+    SENTIMENT_MAX_AGE_DAYS: int = int(os.getenv("SENTIMENT_MAX_AGE_DAYS", "730"))
+    SENTIMENT_JOURNAL_MAX_BYTES: int = int(os.getenv("SENTIMENT_JOURNAL_MAX_BYTES", str(8 * 1024 * 1024)))
+    # Structured reports are versioned so refreshes only regenerate sections whose support changed
+    REPORT_STORE_PATH: str = os.getenv("REPORT_STORE_PATH", "data/reports.db")
+    REPORT_STORE_MAX_VERSIONS: int = int(os.getenv("REPORT_STORE_MAX_VERSIONS", "10"))
+    # Whole reports are dropped beyond the most recently stored ones, and after a TTL (0 keeps them)
+    REPORT_STORE_MAX_REPORTS: int = int(os.getenv("REPORT_STORE_MAX_REPORTS", "10000"))
+    REPORT_STORE_TTL_SECONDS: int = int(os.getenv("REPORT_STORE_TTL_SECONDS", "0"))
+    REPORT_REFRESH_MIN_OVERLAP: float = float(os.getenv("REPORT_REFRESH_MIN_OVERLAP", "0.8"))
+    REPORT_SECTION_RETRIEVAL: bool = os.getenv("REPORT_SECTION_RETRIEVAL", "false").lower() == "true"
+    # Rendered HTML/JSON of each stored report version, content-addressed and served with ETags
+    REPORT_ARTIFACT_DIR: str = os.getenv("REPORT_ARTIFACT_DIR", "data/report_artifacts")
+    # Company names, aliases and exchange codes learned from the stock API, optionally seeded from a CSV
+    SYMBOL_MASTER_PATH: str = os.getenv("SYMBOL_MASTER_PATH", "data/symbols.json")
+    SYMBOL_MASTER_SEED_PATH: str = os.getenv("SYMBOL_MASTER_SEED_PATH", "")
+    SYMBOL_FAILURE_TTL_SECONDS: int = int(os.getenv("SYMBOL_FAILURE_TTL_SECONDS", "3600"))
+    SYMBOL_FUZZY_MIN_SIMILARITY: float = float(os.getenv("SYMBOL_FUZZY_MIN_SIMILARITY", "0.3"))
+    # Metadata fields kept in the vector index for filtering; everything else only lives in the document store
+    VECTOR_METADATA_KEYS = [key.strip() for key in os.getenv(
+        "VECTOR_METADATA_KEYS",
+        "source,type,date,published_at,stock_name,stock_id,measure_code,category,sentiment_polarity,sentiment_score,entities"
+    ).split(",") if key.strip()]
+    
+    # Retention, as comma-separated type=value pairs: days to keep each document
+    # type (by its own date, or index time when undated), and the metadata key
+    # ("+"-joined for several) under which only the newest document of a type is kept
+    RETENTION_DAYS = {
+        doc_type.strip(): int(days) for doc_type, days in (
+            item.split("=", 1) for item in os.getenv(
+                "RETENTION_DAYS", "news=30,sentiment_news=30,indian_stock_news=30"
+            ).split(",") if "=" in item
+        )
+    }
+    RETENTION_SUPERSEDE_KEYS = {
+        doc_type.strip(): [key.strip() for key in keys.split("+") if key.strip()] for doc_type, keys in (
+            item.split("=", 1) for item in os.getenv(
+                "RETENTION_SUPERSEDE_KEYS",
+                "indian_stock_data=stock_name,stock_forecast=stock_id+measure_code+period_type+data_type+age"
+            ).split(",") if "=" in item
+        )
+    }
+    # Background compaction deletes data, so the periodic job is opt-in (0 disables
+    # it; POST /compact, with dry_run to preview, still works)
+    COMPACTION_INTERVAL_SECONDS: float = float(os.getenv("COMPACTION_INTERVAL_SECONDS", "0"))
+    COMPACTION_BATCH_SIZE: int = int(os.getenv("COMPACTION_BATCH_SIZE", "1000"))
+
+    # Pre-market cache warming: before the scheduled local time on trading days,
+    # data for the watchlist and the most-requested symbols is fetched, the new
+    # part indexed, query embeddings cached and default reports generated, all
+    # within WARMER_BUDGET_SECONDS (POST /warm runs it on demand)
+    WARMER_ENABLED: bool = os.getenv("WARMER_ENABLED", "false").lower() == "true"
+    WARMER_WATCHLIST = [symbol.strip() for symbol in os.getenv("WARMER_WATCHLIST", "").split(",") if symbol.strip()]
+    WARMER_TOP_SYMBOLS: int = int(os.getenv("WARMER_TOP_SYMBOLS", "10"))
+    WARMER_SCHEDULE: str = os.getenv("WARMER_SCHEDULE", "08:30")
+    WARMER_TIMEZONE: str = os.getenv("WARMER_TIMEZONE", "Asia/Kolkata")
+    WARMER_WEEKDAYS_ONLY: bool = os.getenv("WARMER_WEEKDAYS_ONLY", "true").lower() == "true"
+    WARMER_BUDGET_SECONDS: float = float(os.getenv("WARMER_BUDGET_SECONDS", "900"))
+    WARMER_CONCURRENCY: int = int(os.getenv("WARMER_CONCURRENCY", "2"))
+    WARMER_MAX_REPORTS: int = int(os.getenv("WARMER_MAX_REPORTS", "10"))
+    # "{symbol}" is replaced by each warmed symbol
+    WARMER_REPORT_QUERY: str = os.getenv("WARMER_REPORT_QUERY", "{symbol} stock outlook and key risks")
+    # Decayed per-symbol request counts that pick the most-requested symbols
+    ACCESS_STATS_PATH: str = os.getenv("ACCESS_STATS_PATH", "data/access_stats.json")
+    ACCESS_STATS_HALF_LIFE_DAYS: float = float(os.getenv("ACCESS_STATS_HALF_LIFE_DAYS", "7"))
+    # Query embeddings kept in memory (0 disables the cache)
+    EMBEDDING_CACHE_SIZE: int = int(os.getenv("EMBEDDING_CACHE_SIZE", "1024"))
+    # Serve a stored, complete structured report with the same parameters if it is
+    # younger than this (0 always generates; the warmer only pre-generates reports when set)
+    REPORT_CACHE_TTL_SECONDS: float = float(os.getenv("REPORT_CACHE_TTL_SECONDS", "0"))
+
+    # Observability
+    OTEL_TRACING_ENABLED: bool = os.getenv("OTEL_TRACING_ENABLED", "false").lower() == "true"
+    
+    # On-demand request profiling (X-Profile: 1 header or ?profile=1, with X-Profile-Token; needs PROFILING_TOKEN)
+    PROFILING_ENABLED: bool = os.getenv("PROFILING_ENABLED", "false").lower() == "true"
+    PROFILING_TOKEN: str = os.getenv("PROFILING_TOKEN", "")
+    PROFILING_INTERVAL_MS: float = float(os.getenv("PROFILING_INTERVAL_MS", "5"))
+    PROFILING_MAX_CONCURRENT: int = int(os.getenv("PROFILING_MAX_CONCURRENT", "1"))
+    PROFILING_DIR: str = os.getenv("PROFILING_DIR", "/tmp/vittsaar_profiles")
+    
+    # Traffic recording for load replay (python -m benchmarks.replay); bodies and
+    # query values under sensitive-looking keys are redacted
+    TRAFFIC_RECORD_ENABLED: bool = os.getenv("TRAFFIC_RECORD_ENABLED", "false").lower() == "true"
+    TRAFFIC_RECORD_PATH: str = os.getenv("TRAFFIC_RECORD_PATH", "data/traffic.jsonl")
+    TRAFFIC_RECORD_SAMPLE_RATE: float = float(os.getenv("TRAFFIC_RECORD_SAMPLE_RATE", "1.0"))
+    TRAFFIC_RECORD_MAX_BODY_BYTES: int = int(os.getenv("TRAFFIC_RECORD_MAX_BODY_BYTES", "65536"))
+    
+    # LLM dispatcher shared by all report generation (0 tokens per minute disables the rate limit)
+    LLM_MAX_CONCURRENCY: int = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+    LLM_MIN_CONCURRENCY: int = int(os.getenv("LLM_MIN_CONCURRENCY", "1"))
+    LLM_TOKENS_PER_MINUTE: int = int(os.getenv("LLM_TOKENS_PER_MINUTE", "0"))
+    # Calls slower than this shrink the concurrency limit (0 disables latency feedback)
+    LLM_TARGET_LATENCY_SECONDS: float = float(os.getenv("LLM_TARGET_LATENCY_SECONDS", "30"))
+    LLM_MAX_RETRIES: int = int(os.getenv("LLM_MAX_RETRIES", "3"))
+    LLM_RETRY_BASE_DELAY: float = float(os.getenv("LLM_RETRY_BASE_DELAY", "1.0"))
+    
+    # Admission control for /generate-report: requests beyond the concurrency
+    # limit wait in a bounded queue and are rejected with 429 when it is full
+    REPORT_MAX_CONCURRENT: int = int(os.getenv("REPORT_MAX_CONCURRENT", "16"))
+    REPORT_MAX_QUEUE: int = int(os.getenv("REPORT_MAX_QUEUE", "32"))
+    REPORT_QUEUE_TIMEOUT_SECONDS: float = float(os.getenv("REPORT_QUEUE_TIMEOUT_SECONDS", "10"))
+    
+    # NewsAPI paging: pages after the first are fetched concurrently under a shared rate limit,
+    # then news from all providers is de-duplicated by canonical URL and by
+    # MinHash similarity of title and description
+    NEWS_PAGES: int = int(os.getenv("NEWS_PAGES", "1"))
+    NEWS_MAX_PAGES: int = int(os.getenv("NEWS_MAX_PAGES", "10"))
+    NEWS_PAGE_SIZE: int = int(os.getenv("NEWS_PAGE_SIZE", "50"))
+    NEWS_REQUESTS_PER_SECOND: float = float(os.getenv("NEWS_REQUESTS_PER_SECOND", "2"))
+    NEWS_REQUESTS_BURST: int = int(os.getenv("NEWS_REQUESTS_BURST", "4"))
+    NEWS_DEDUP_THRESHOLD: float = float(os.getenv("NEWS_DEDUP_THRESHOLD", "0.8"))
+    # Also pull the Indian Stock API /news feed into /fetch-and-index-data
+    NEWS_INCLUDE_INDIAN_FEED: bool = os.getenv("NEWS_INCLUDE_INDIAN_FEED", "false").lower() == "true"
+    
+    # Paginated fetch endpoints: result sets stay cached for cursor reads
+    FETCH_DEFAULT_PAGE_SIZE: int = int(os.getenv("FETCH_DEFAULT_PAGE_SIZE", "50"))
+    FETCH_MAX_PAGE_SIZE: int = int(os.getenv("FETCH_MAX_PAGE_SIZE", "500"))
+    FETCH_PAGE_CACHE_TTL_SECONDS: float = float(os.getenv("FETCH_PAGE_CACHE_TTL_SECONDS", "600"))
+    FETCH_PAGE_CACHE_MAX_RESULTS: int = int(os.getenv("FETCH_PAGE_CACHE_MAX_RESULTS", "32"))
+    FETCH_PAGE_CACHE_MAX_DOCUMENTS: int = int(os.getenv("FETCH_PAGE_CACHE_MAX_DOCUMENTS", "10000"))
+    # Streamed (format=ndjson) fetches with indexing index this many documents per batch
+    STREAM_INDEX_BATCH_SIZE: int = int(os.getenv("STREAM_INDEX_BATCH_SIZE", "50"))
+    
     # Report Generation
+    BATCH_MAX_JOBS: int = int(os.getenv("BATCH_MAX_JOBS", "100"))
     DEFAULT_REPORT_SECTIONS = [
         "Executive Summary",
         "Market Overview",
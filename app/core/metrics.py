@@ -0,0 +1,350 @@
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+from app.core.config import settings
+from app.core.profiling import record_stage
+
+try:
+    from opentelemetry import trace as otel_trace
+except ImportError:  # OpenTelemetry is optional
+    otel_trace = None
+
+# Request ID of the request currently being handled (set by the HTTP middleware)
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def new_request_id() -> str:
+    return uuid.uuid4().hex
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    type_name = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        lines.extend(self._samples())
+        return lines
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """Monotonically increasing value"""
+
+    type_name = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(v)}" for key, v in items]
+
+
+class Gauge(_Metric):
+    """Value that can go up and down"""
+
+    type_name = "gauge"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(v)}" for key, v in items]
+
+
+class Histogram(_Metric):
+    """Distribution of observed values in cumulative buckets"""
+
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        # key -> (bucket counts, sum, count)
+        self._values: Dict[Tuple[str, ...], List] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][i] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+
+    def count(self, **labels) -> int:
+        state = self._values.get(self._key(labels))
+        return state[2] if state else 0
+
+    def sum(self, **labels) -> float:
+        state = self._values.get(self._key(labels))
+        return state[1] if state else 0.0
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = [(key, list(state[0]), state[1], state[2]) for key, state in self._values.items()]
+        lines = []
+        for key, bucket_counts, total, count in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, bucket_counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Process-wide collection of metrics rendered in the Prometheus text format"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, cls, name: str, documentation: str, labelnames, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, documentation, tuple(labelnames), **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Metric {name} is already registered as {metric.type_name}")
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames=()) -> Counter:
+        return self._register(Counter, name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames=()) -> Gauge:
+        return self._register(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name: str, documentation: str, labelnames=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+# Shared metrics
+STAGE_DURATION = registry.histogram(
+    "vittsaar_stage_duration_seconds", "Duration of pipeline stages", ["stage"]
+)
+STAGE_IN_FLIGHT = registry.gauge(
+    "vittsaar_stage_in_flight", "Pipeline stages currently executing", ["stage"]
+)
+STAGE_ERRORS = registry.counter(
+    "vittsaar_stage_errors_total", "Pipeline stages that raised an exception", ["stage"]
+)
+HTTP_REQUEST_DURATION = registry.histogram(
+    "vittsaar_http_request_duration_seconds", "HTTP request latency", ["method", "route", "status"]
+)
+HTTP_REQUESTS_IN_FLIGHT = registry.gauge(
+    "vittsaar_http_requests_in_flight", "HTTP requests currently being served", []
+)
+LLM_TOKENS = registry.counter(
+    "vittsaar_llm_tokens_total", "Tokens consumed by LLM calls", ["kind"]
+)
+DOCUMENTS_RETRIEVED = registry.counter(
+    "vittsaar_documents_retrieved_total", "Documents returned by vector retrieval", []
+)
+CACHE_REQUESTS = registry.counter(
+    "vittsaar_cache_requests_total", "Cache lookups by cache and result (hit or miss)", ["cache", "result"]
+)
+UPSTREAM_RESPONSES = registry.counter(
+    "vittsaar_upstream_responses_total", "Upstream API responses by service and status code", ["service", "status"]
+)
+SINGLEFLIGHT_CALLS = registry.counter(
+    "vittsaar_singleflight_calls_total",
+    "Coalesced calls by group; result is leader (executed) or collapsed (shared an in-flight call)",
+    ["group", "result"]
+)
+
+REPORT_SECTIONS = registry.counter(
+    "vittsaar_report_sections_total", "Structured report sections by outcome (completed, reused from the previous version, or cancelled)", ["status"]
+)
+LLM_QUEUE_DEPTH = registry.gauge(
+    "vittsaar_llm_queue_depth", "LLM calls waiting for a dispatcher slot", ["priority"]
+)
+LLM_QUEUE_WAIT = registry.histogram(
+    "vittsaar_llm_queue_wait_seconds", "Time LLM calls spent waiting for a dispatcher slot and rate budget", ["priority"]
+)
+LLM_IN_FLIGHT = registry.gauge(
+    "vittsaar_llm_in_flight", "LLM calls currently executing", []
+)
+LLM_CONCURRENCY_LIMIT = registry.gauge(
+    "vittsaar_llm_concurrency_limit", "Current adaptive LLM concurrency limit", []
+)
+LLM_RETRIES = registry.counter(
+    "vittsaar_llm_retries_total", "LLM calls retried by reason (rate_limited or unavailable)", ["reason"]
+)
+
+ADMISSION_IN_FLIGHT = registry.gauge(
+    "vittsaar_admission_in_flight", "Admitted requests currently running", ["pool"]
+)
+ADMISSION_QUEUE_DEPTH = registry.gauge(
+    "vittsaar_admission_queue_depth", "Requests waiting for admission", ["pool"]
+)
+ADMISSION_QUEUE_WAIT = registry.histogram(
+    "vittsaar_admission_queue_wait_seconds", "Time admitted requests waited for a slot", ["pool"]
+)
+ADMISSION_REJECTIONS = registry.counter(
+    "vittsaar_admission_rejections_total",
+    "Requests shed by admission control; reason is queue_full, queue_timeout or deadline",
+    ["pool", "reason"]
+)
+
+NEWS_DUPLICATES = registry.counter(
+    "vittsaar_news_duplicates_total",
+    "News articles dropped as duplicates before indexing; reason is url or fingerprint",
+    ["reason"]
+)
+SYMBOL_RESOLUTIONS = registry.counter(
+    "vittsaar_symbol_resolutions_total",
+    "Stock names and IDs checked against the symbol master; result is resolved, unresolved or rejected",
+    ["kind", "result"]
+)
+RERANK_CANDIDATES = registry.counter(
+    "vittsaar_rerank_candidates_total", "Query-document pairs submitted to the cross-encoder reranker", []
+)
+RERANK_BUDGET_EXHAUSTED = registry.counter(
+    "vittsaar_rerank_budget_exhausted_total", "Rerank calls that stopped scoring because the latency budget ran out", []
+)
+RERANK_PROMPT_TOKENS = registry.counter(
+    "vittsaar_rerank_prompt_tokens_total",
+    "Estimated prompt tokens of retrieved documents without (before) and with (after) reranking",
+    ["stage"]
+)
+WARMER_STEPS = registry.counter(
+    "vittsaar_warmer_steps_total",
+    "Cache warmer steps by outcome (completed, timed_out, failed or skipped)",
+    ["step", "result"]
+)
+COMPACTION_DOCUMENTS_REMOVED = registry.counter(
+    "vittsaar_compaction_documents_removed_total",
+    "Documents and their vectors removed by compaction; reason is expired or superseded",
+    ["type", "reason"]
+)
+COMPACTION_RECLAIMED_BYTES = registry.counter(
+    "vittsaar_compaction_reclaimed_bytes_total",
+    "Bytes reclaimed by compaction by store (documents, vectors or timeseries; vectors are estimated)",
+    ["store"]
+)
+
+
+def _tracer():
+    if otel_trace is None or not settings.OTEL_TRACING_ENABLED:
+        return None
+    return otel_trace.get_tracer("vittsaar")
+
+
+@contextmanager
+def span(stage: str, **attributes):
+    """
+    Time a pipeline stage
+
+    Records the stage duration histogram, the in-flight gauge and errors, and
+    emits an OpenTelemetry span tagged with the request ID when tracing is enabled.
+
+    Args:
+        stage: Stage name, e.g. "retrieval.vector_query"
+        attributes: Extra span attributes (not used as metric labels)
+    """
+    tracer = _tracer()
+    otel_span = None
+    if tracer is not None:
+        otel_attributes = {"request.id": request_id_var.get() or "", **{k: str(v) for k, v in attributes.items()}}
+        otel_span = tracer.start_as_current_span(stage, attributes=otel_attributes)
+        otel_span.__enter__()
+
+    STAGE_IN_FLIGHT.inc(stage=stage)
+    start = time.perf_counter()
+    try:
+        yield
+    except BaseException as e:
+        STAGE_ERRORS.inc(stage=stage)
+        if otel_span is not None:
+            otel_span.__exit__(type(e), e, e.__traceback__)
+            otel_span = None
+        raise
+    finally:
+        duration = time.perf_counter() - start
+        STAGE_DURATION.observe(duration, stage=stage)
+        STAGE_IN_FLIGHT.dec(stage=stage)
+        record_stage(stage, duration)
+        if otel_span is not None:
+            otel_span.__exit__(None, None, None)
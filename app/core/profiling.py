@@ -0,0 +1,217 @@
+import asyncio
+import hmac
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import uuid
+import weakref
+from collections import Counter
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs
+from app.core.config import settings
+
+# Profile of the request currently being handled, if profiling was requested
+current_profile: ContextVar[Optional["RequestProfile"]] = ContextVar("current_profile", default=None)
+
+_TRUTHY = {"1", "true", "yes", "on"}
+
+
+def record_stage(stage: str, duration: float):
+    """Add a finished stage to the active profile (called by metrics.span)"""
+    profile = current_profile.get()
+    if profile is not None:
+        profile.stages.append((stage, duration))
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    filename = code.co_filename
+    # Keep paths short: relative to the repo for our code, module file name otherwise
+    root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    if filename.startswith(root):
+        filename = os.path.relpath(filename, root)
+    else:
+        filename = os.path.basename(filename)
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})"
+
+
+class RequestProfile:
+    """Samples the event loop thread while it is running one request's tasks"""
+
+    def __init__(self, method: str, path: str, interval: float):
+        self.id = uuid.uuid4().hex
+        self.method = method
+        self.path = path
+        self.interval = interval
+        self.tasks = weakref.WeakSet()
+        self.stages: List[Tuple[str, float]] = []
+        self.samples: Counter = Counter()
+        self.total_samples = 0
+        self.started_at = time.time()
+        self.duration = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self, loop: asyncio.AbstractEventLoop):
+        self._loop = loop
+        self._thread_id = threading.get_ident()
+        self._start = time.perf_counter()
+        self._thread = threading.Thread(target=self._sample_loop, name=f"profiler-{self.id[:8]}", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self.duration = time.perf_counter() - self._start
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _sample_loop(self):
+        while not self._stop.wait(self.interval):
+            self.total_samples += 1
+            task = asyncio.current_task(self._loop)
+            if task is None or task not in self.tasks:
+                continue
+            frame = sys._current_frames().get(self._thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+            if stack:
+                self.samples[";".join(reversed(stack))] += 1
+
+    def folded(self) -> str:
+        """Collapsed stacks, one "frame;frame;frame count" line per stack (flamegraph.pl / speedscope)"""
+        return "\n".join(f"{stack} {count}" for stack, count in self.samples.most_common()) + "\n"
+
+    def summary(self) -> Dict:
+        breakdown: Dict[str, Dict[str, float]] = {}
+        for stage, duration in self.stages:
+            entry = breakdown.setdefault(stage, {"count": 0, "total_seconds": 0.0})
+            entry["count"] += 1
+            entry["total_seconds"] += duration
+        return {
+            "profile_id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "started_at": self.started_at,
+            "duration_seconds": round(self.duration, 6),
+            "interval_seconds": self.interval,
+            "samples": sum(self.samples.values()),
+            "loop_samples": self.total_samples,
+            # Stages can be nested, so their totals may add up to more than the request duration
+            "stages": {
+                stage: {"count": entry["count"], "total_seconds": round(entry["total_seconds"], 6)}
+                for stage, entry in sorted(breakdown.items(), key=lambda item: -item[1]["total_seconds"])
+            },
+        }
+
+    def save(self, directory: str):
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, f"{self.id}.folded"), "w") as f:
+            f.write(self.folded())
+        with open(os.path.join(directory, f"{self.id}.json"), "w") as f:
+            json.dump(self.summary(), f, indent=2)
+
+
+def load_profile(profile_id: str, fmt: str = "json") -> Optional[str]:
+    """Read a stored profile; returns None if it does not exist"""
+    if not profile_id.isalnum():
+        return None
+    extension = "folded" if fmt == "folded" else "json"
+    path = os.path.join(settings.PROFILING_DIR, f"{profile_id}.{extension}")
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return f.read()
+
+
+def token_matches(token: Optional[str]) -> bool:
+    """Whether a client-supplied token is the configured PROFILING_TOKEN (never true without one)"""
+    return bool(settings.PROFILING_TOKEN and token) and hmac.compare_digest(token, settings.PROFILING_TOKEN)
+
+
+def _install_task_factory(loop: asyncio.AbstractEventLoop):
+    """Attribute tasks spawned while handling a profiled request to its profile"""
+    previous = loop.get_task_factory()
+    if getattr(previous, "_tracks_profiles", False):
+        return
+
+    def factory(loop, coro, **kwargs):
+        if previous is not None:
+            task = previous(loop, coro, **kwargs)
+        else:
+            task = asyncio.Task(coro, loop=loop, **kwargs)
+        context = kwargs.get("context")
+        profile = context.get(current_profile) if context is not None else current_profile.get()
+        if profile is not None:
+            profile.tasks.add(task)
+        return task
+
+    factory._tracks_profiles = True
+    loop.set_task_factory(factory)
+
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware that profiles a single request on demand
+
+    A request is profiled when PROFILING_ENABLED is set and it carries an
+    "X-Profile: 1" header or a "profile=1" query parameter plus an
+    X-Profile-Token header matching PROFILING_TOKEN; without a configured
+    token nothing is profiled. The response gets an X-Profile-Id header; the
+    collapsed stacks and per-stage breakdown are stored under PROFILING_DIR
+    and served by /profiles/{profile_id}.
+
+    Only the event loop thread is sampled. Work the request hands to executor
+    threads (embedding, reranking, store reads and writes) shows up in the
+    stage breakdown as the duration of its span, but not in the stacks.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._active = 0
+        if settings.PROFILING_ENABLED and not settings.PROFILING_TOKEN:
+            logging.warning("PROFILING_ENABLED is set without PROFILING_TOKEN; no request will be profiled")
+
+    def _requested(self, scope) -> bool:
+        headers = dict(scope.get("headers") or [])
+        flag = headers.get(b"x-profile", b"").decode("latin-1").lower() in _TRUTHY
+        if not flag and b"profile" in scope.get("query_string", b""):
+            values = parse_qs(scope["query_string"].decode("latin-1")).get("profile", [])
+            flag = any(value.lower() in _TRUTHY for value in values)
+        return flag and token_matches(headers.get(b"x-profile-token", b"").decode("latin-1"))
+
+    async def __call__(self, scope, receive, send):
+        if (scope["type"] != "http" or not settings.PROFILING_ENABLED
+                or self._active >= settings.PROFILING_MAX_CONCURRENT or not self._requested(scope)):
+            await self.app(scope, receive, send)
+            return
+
+        loop = asyncio.get_running_loop()
+        _install_task_factory(loop)
+        profile = RequestProfile(scope["method"], scope["path"], settings.PROFILING_INTERVAL_MS / 1000.0)
+        profile.tasks.add(asyncio.current_task())
+        token = current_profile.set(profile)
+
+        async def send_with_header(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [(b"x-profile-id", profile.id.encode())]
+            await send(message)
+
+        self._active += 1
+        profile.start(loop)
+        try:
+            await self.app(scope, receive, send_with_header)
+        finally:
+            profile.stop()
+            self._active -= 1
+            current_profile.reset(token)
+            try:
+                profile.save(settings.PROFILING_DIR)
+                logging.info(f"Stored profile {profile.id} for {profile.method} {profile.path}")
+            except OSError as e:
+                logging.error(f"Error storing profile {profile.id}: {str(e)}")
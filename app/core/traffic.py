@@ -0,0 +1,201 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import re
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl
+from app.core.config import settings
+
+# Paths that are never recorded (scrapes and docs would drown out real traffic)
+EXCLUDED_PATHS = ("/metrics", "/docs", "/redoc", "/openapi.json")
+
+# Query parameters and JSON fields whose values are replaced before writing
+_SENSITIVE = re.compile(r"key|token|secret|password|passwd|auth|credential|cookie|session", re.IGNORECASE)
+REDACTED = "[redacted]"
+
+# Entries waiting for the writer thread; beyond this many, new entries are dropped
+QUEUE_SIZE = 10000
+
+
+def redact(value: Any) -> Any:
+    """Replace the values of sensitive-looking keys in a decoded JSON value"""
+    if isinstance(value, dict):
+        return {k: REDACTED if _SENSITIVE.search(str(k)) else redact(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [redact(item) for item in value]
+    return value
+
+
+class TrafficRecorder:
+    """
+    Appends one JSON line per recorded request
+
+    Each line holds the wall-clock start time, method, path, redacted query
+    parameters, the redacted JSON body (other bodies are reduced to their size
+    and content type), the response status and size, and the duration. Headers,
+    client addresses and uploaded file contents are never written.
+
+    record() only queues an entry; a writer thread redacts, serializes and
+    appends queued entries in batches with one flush per batch. Entries that
+    arrive while QUEUE_SIZE are already waiting are dropped (and counted)
+    rather than slowing requests down.
+    """
+
+    def __init__(self, path: Optional[str] = None, sample_rate: Optional[float] = None,
+                 max_body_bytes: Optional[int] = None):
+        self.path = path or settings.TRAFFIC_RECORD_PATH
+        self.sample_rate = settings.TRAFFIC_RECORD_SAMPLE_RATE if sample_rate is None else sample_rate
+        self.max_body_bytes = max_body_bytes or settings.TRAFFIC_RECORD_MAX_BODY_BYTES
+        self.dropped = 0
+        self._queue: "queue.Queue[Optional[Tuple[Dict[str, Any], str, bytes, int]]]" = queue.Queue(QUEUE_SIZE)
+        self._lock = threading.Lock()
+        self._file = None
+        self._writer: Optional[threading.Thread] = None
+
+    def sampled(self) -> bool:
+        return self.sample_rate >= 1 or random.random() < self.sample_rate
+
+    def body_fields(self, content_type: str, body: bytes, size: int) -> Dict[str, Any]:
+        if size and content_type.startswith("application/json") and size <= self.max_body_bytes:
+            try:
+                return {"body": redact(json.loads(body))}
+            except ValueError:
+                pass
+        return {"body_bytes": size, "content_type": content_type} if size else {}
+
+    def record(self, entry: Dict[str, Any], content_type: str = "", body: bytes = b"", size: int = 0):
+        """Queue an entry, with the request body it is recorded with, for the writer thread"""
+        with self._lock:
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write_loop, name="traffic-recorder", daemon=True)
+                self._writer.start()
+                atexit.register(self.close)
+        try:
+            self._queue.put_nowait((entry, content_type, body, size))
+        except queue.Full:
+            self.dropped += 1
+
+    def write(self, entries: List[Dict[str, Any]]):
+        """Append entries to the file with a single flush (called by the writer thread)"""
+        lines = "".join(json.dumps(entry, default=str, separators=(",", ":")) + "\n" for entry in entries)
+        if self._file is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._file = open(self.path, "a", encoding="utf-8")
+        self._file.write(lines)
+        self._file.flush()
+
+    def _write_loop(self):
+        while True:
+            batch = [self._queue.get()]
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            entries = [
+                {**entry, **self.body_fields(content_type, body, size)}
+                for entry, content_type, body, size in (item for item in batch if item is not None)
+            ]
+            try:
+                if entries:
+                    self.write(entries)
+            except OSError as e:
+                logging.error(f"Error recording traffic to {self.path}: {str(e)}")
+            for _ in batch:
+                self._queue.task_done()
+            if None in batch:
+                return
+
+    def flush(self):
+        """Wait until every queued entry is written"""
+        if self._writer is not None:
+            self._queue.join()
+
+    def close(self):
+        """Write the queued entries and stop the writer thread"""
+        with self._lock:
+            writer, self._writer = self._writer, None
+        if writer is None:
+            return
+        self._queue.put(None)
+        writer.join()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class TrafficRecordingMiddleware:
+    """
+    ASGI middleware that records sanitized API requests with their timing
+
+    Enabled with TRAFFIC_RECORD_ENABLED; lines go to TRAFFIC_RECORD_PATH and
+    can be replayed with `python -m benchmarks.replay`.
+    """
+
+    def __init__(self, app, recorder: Optional[TrafficRecorder] = None):
+        self.app = app
+        self.recorder = recorder
+
+    async def __call__(self, scope, receive, send):
+        if (scope["type"] != "http" or not settings.TRAFFIC_RECORD_ENABLED
+                or scope["path"].startswith(EXCLUDED_PATHS)):
+            await self.app(scope, receive, send)
+            return
+        if self.recorder is None:
+            self.recorder = TrafficRecorder()
+        if not self.recorder.sampled():
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        content_type = headers.get(b"content-type", b"").decode("latin-1").lower()
+        chunks: List[bytes] = []
+        received = 0
+        status = 500
+        response_bytes = 0
+
+        async def receive_and_keep():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                body = message.get("body", b"")
+                if received + len(body) <= self.recorder.max_body_bytes:
+                    chunks.append(body)
+                received += len(body)
+            return message
+
+        async def send_and_measure(message):
+            nonlocal status, response_bytes
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                response_bytes += len(message.get("body", b""))
+            await send(message)
+
+        started_at = time.time()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive_and_keep, send_and_measure)
+        finally:
+            query = [
+                (name, REDACTED if _SENSITIVE.search(name) else value)
+                for name, value in parse_qsl(scope.get("query_string", b"").decode("latin-1"), keep_blank_values=True)
+            ]
+            entry = {
+                "t": round(started_at, 6),
+                "method": scope["method"],
+                "path": scope["path"],
+                "query": query,
+                "status": status,
+                "duration_ms": round((time.perf_counter() - start) * 1000.0, 3),
+                "response_bytes": response_bytes,
+            }
+            # The body is decoded and redacted by the writer thread, off the event loop
+            self.recorder.record(entry, content_type, b"".join(chunks), received)
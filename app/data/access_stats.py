@@ -0,0 +1,101 @@
+import json
+import logging
+import os
+import threading
+import time
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+from app.core.config import settings
+
+# Whether lookups made from the current task count as demand (the cache warmer turns it off)
+access_recording: ContextVar[bool] = ContextVar("access_recording", default=True)
+
+# Counts are due to be written to disk this often; save() writes immediately
+_SAVE_INTERVAL_SECONDS = 60.0
+# Symbols whose decayed count falls below this are forgotten when the counts are saved
+_MIN_COUNT = 0.01
+
+
+class AccessStats:
+    """
+    Exponentially decayed request counts per stock symbol
+
+    Each request adds one to its symbol's count, and counts halve every
+    ACCESS_STATS_HALF_LIFE_DAYS, so the top symbols follow what users asked
+    for recently rather than ever; symbols not asked for in a long while are
+    dropped. Counts are persisted to a JSON file by save(), which callers on
+    the event loop run in a worker thread once save_due().
+    """
+
+    def __init__(self, path: Optional[str] = None, half_life_days: Optional[float] = None):
+        self.path = path or settings.ACCESS_STATS_PATH
+        self.half_life = (half_life_days or settings.ACCESS_STATS_HALF_LIFE_DAYS) * 86400.0
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        # symbol -> (count, time the count was last updated)
+        self._counts: Dict[str, Tuple[float, float]] = {}
+        self._saved_at = time.monotonic()
+        self._unsaved = False
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                self._counts = {symbol: (count, updated) for symbol, (count, updated) in json.load(f)["symbols"].items()}
+        except Exception as e:
+            logging.error(f"Error loading access stats {self.path}: {str(e)}")
+
+    def _decayed(self, count: float, updated: float, now: float) -> float:
+        return count * 0.5 ** (max(0.0, now - updated) / self.half_life)
+
+    def record(self, symbol: str):
+        """Count one request for symbol (unless recording is turned off for the current task)"""
+        if not symbol or not access_recording.get():
+            return
+        now = time.time()
+        with self._lock:
+            count, updated = self._counts.get(symbol, (0.0, now))
+            self._counts[symbol] = (self._decayed(count, updated, now) + 1.0, now)
+            self._unsaved = True
+
+    def save_due(self) -> bool:
+        """Whether counts recorded since the last save are due to be written"""
+        return self._unsaved and time.monotonic() - self._saved_at >= _SAVE_INTERVAL_SECONDS
+
+    def top(self, n: int) -> List[Tuple[str, float]]:
+        """The n most-requested symbols with their decayed counts, highest first"""
+        now = time.time()
+        with self._lock:
+            scores = [(symbol, self._decayed(count, updated, now)) for symbol, (count, updated) in self._counts.items()]
+        scores.sort(key=lambda item: (-item[1], item[0]))
+        return [(symbol, round(score, 3)) for symbol, score in scores[:max(0, n)]]
+
+    def save(self):
+        """Forget negligible counts and write the rest to disk (a blocking file write)"""
+        with self._save_lock:
+            now = time.time()
+            with self._lock:
+                if not self._unsaved:
+                    return
+                self._counts = {
+                    symbol: (count, updated) for symbol, (count, updated) in self._counts.items()
+                    if self._decayed(count, updated, now) >= _MIN_COUNT
+                }
+                counts = dict(self._counts)
+                self._unsaved = False
+                self._saved_at = time.monotonic()
+            # Written outside the lock, so recording never waits for the disk
+            try:
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                tmp_path = f"{self.path}.tmp"
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump({"symbols": counts}, f)
+                os.replace(tmp_path, self.path)
+            except Exception as e:
+                logging.error(f"Error saving access stats {self.path}: {str(e)}")
+                with self._lock:
+                    self._unsaved = True
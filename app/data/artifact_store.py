@@ -0,0 +1,174 @@
+import gzip
+import hashlib
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional
+from app.core.config import settings
+
+
+class ArtifactStore:
+    """
+    Content-addressed local store for rendered reports
+
+    Each artifact (e.g. the HTML or JSON rendering of one report version) is
+    written once under the SHA-256 of its bytes, next to a gzipped copy, so
+    its digest doubles as a strong ETag and a repeat view is a file read.
+    A small SQLite table maps (report ID, version, format) to digests; only
+    the newest `max_versions` versions of a report are kept, and files no
+    longer referenced are removed.
+    """
+
+    def __init__(self, root: Optional[str] = None, max_versions: Optional[int] = None):
+        self.root = root or settings.REPORT_ARTIFACT_DIR
+        self.max_versions = max_versions or settings.REPORT_STORE_MAX_VERSIONS
+        os.makedirs(os.path.join(self.root, "objects"), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(os.path.join(self.root, "refs.db"), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS artifacts (
+                report_id TEXT NOT NULL,
+                version INTEGER NOT NULL,
+                format TEXT NOT NULL,
+                digest TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                gzip_size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                PRIMARY KEY (report_id, version, format)
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS artifacts_digest ON artifacts (digest)")
+        self._conn.commit()
+
+    def object_path(self, digest: str, compressed: bool = False) -> str:
+        return os.path.join(self.root, "objects", digest[:2], digest[2:] + (".gz" if compressed else ""))
+
+    def _write(self, path: str, content: bytes):
+        """Write a file atomically, so readers never see a partial object"""
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(content)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    def put_object(self, content: bytes) -> Dict[str, Any]:
+        """
+        Store bytes under their digest (a no-op if they are already stored)
+
+        Returns:
+            {'digest', 'size', 'gzip_size'}
+        """
+        digest = hashlib.sha256(content).hexdigest()
+        path = self.object_path(digest)
+        if not os.path.exists(path):
+            # The gzipped copy goes first: an object that exists always has one
+            self._write(self.object_path(digest, compressed=True), gzip.compress(content, compresslevel=9, mtime=0))
+            self._write(path, content)
+        return {"digest": digest, "size": len(content), "gzip_size": os.path.getsize(self.object_path(digest, True))}
+
+    def has(self, digest: str) -> bool:
+        return os.path.exists(self.object_path(digest))
+
+    def read(self, digest: str, compressed: bool = False) -> Optional[bytes]:
+        try:
+            with open(self.object_path(digest, compressed), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def publish(self, report_id: str, version: int, artifacts: Dict[str, bytes]) -> Dict[str, str]:
+        """
+        Store the renderings of one report version
+
+        Args:
+            report_id: Report ID
+            version: Report version
+            artifacts: Bytes per format, e.g. {"html": ..., "json": ...}
+
+        Returns:
+            Digest per format
+        """
+        stored = {fmt: self.put_object(content) for fmt, content in artifacts.items()}
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO artifacts (report_id, version, format, digest, size, gzip_size, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(report_id, version, fmt, obj["digest"], obj["size"], obj["gzip_size"], now)
+                 for fmt, obj in stored.items()]
+            )
+            expired = [row[0] for row in self._conn.execute(
+                "SELECT DISTINCT digest FROM artifacts WHERE report_id = ? AND version <= ?",
+                (report_id, version - self.max_versions)
+            )]
+            self._conn.execute(
+                "DELETE FROM artifacts WHERE report_id = ? AND version <= ?", (report_id, version - self.max_versions)
+            )
+            orphaned = self._orphaned(expired)
+        self._unlink(orphaned)
+        return {fmt: obj["digest"] for fmt, obj in stored.items()}
+
+    def delete_reports(self, report_ids: List[str]) -> int:
+        """
+        Remove every rendering of the given reports (e.g. once they are pruned from the report store)
+
+        Returns:
+            Number of objects removed
+        """
+        if not report_ids:
+            return 0
+        with self._lock, self._conn:
+            expired = []
+            for report_id in report_ids:
+                expired += [row[0] for row in self._conn.execute(
+                    "SELECT DISTINCT digest FROM artifacts WHERE report_id = ?", (report_id,)
+                )]
+                self._conn.execute("DELETE FROM artifacts WHERE report_id = ?", (report_id,))
+            orphaned = self._orphaned(set(expired))
+        self._unlink(orphaned)
+        return len(orphaned)
+
+    def _orphaned(self, digests: Iterable[str]) -> List[str]:
+        """Digests no longer referenced by any artifact (call with the lock held)"""
+        return [digest for digest in digests if self._conn.execute(
+            "SELECT 1 FROM artifacts WHERE digest = ? LIMIT 1", (digest,)
+        ).fetchone() is None]
+
+    def _unlink(self, digests: List[str]):
+        for digest in digests:
+            for compressed in (False, True):
+                try:
+                    os.unlink(self.object_path(digest, compressed))
+                except FileNotFoundError:
+                    pass
+
+    def get(self, report_id: str, fmt: str, version: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """
+        The artifact of one report version (the latest rendered by default)
+
+        Returns:
+            {'report_id', 'version', 'format', 'digest', 'size', 'gzip_size', 'created_at'}, or None
+        """
+        query = ("SELECT report_id, version, format, digest, size, gzip_size, created_at FROM artifacts "
+                 "WHERE report_id = ? AND format = ?")
+        args: tuple = (report_id, fmt)
+        if version is None:
+            query += " ORDER BY version DESC LIMIT 1"
+        else:
+            query += " AND version = ?"
+            args += (version,)
+        with self._lock:
+            row = self._conn.execute(query, args).fetchone()
+        if row is None:
+            return None
+        keys = ("report_id", "version", "format", "digest", "size", "gzip_size", "created_at")
+        return dict(zip(keys, row))
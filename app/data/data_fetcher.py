@@ -1,11 +1,25 @@
 from app.services.data_service import IndianStockService, NewsAPIService, MarketauxService
 from app.core.config import settings
-from typing import Dict, List, Any, Optional
+from app.core.metrics import span, SYMBOL_RESOLUTIONS
+from app.utils.singleflight import SingleFlight, normalize_key_part
+from app.data.timeseries_store import TimeSeriesStore
+from app.data.sentiment_store import SentimentStore
+from app.data.dedup import NewsDeduplicator
+from app.data.symbol_master import SymbolMaster
+from app.data.access_stats import AccessStats
+from app.utils.rate_limit import TokenBucket
+from app.utils.deadline import within_deadline, DeadlineExceeded
+from typing import Dict, List, Any, Optional, AsyncIterator, Awaitable, Callable, Hashable, Iterator
+import asyncio
 import logging
+import math
 import uuid
 import os
 from datetime import datetime
 
+# Upstream statuses meaning the requested stock does not exist
+REJECTED_STATUSES = (400, 404, 422)
+
 class FinancialDataFetcher:
     """Class for fetching and processing financial data from various sources"""
     
@@ -13,38 +27,143 @@ class FinancialDataFetcher:
         self.indian_stock_service = IndianStockService()  # Remove the argument
         self.news_api_service = NewsAPIService(settings.NEWS_API_KEY)
         self.marketaux_service = MarketauxService(settings.MARKETAUX_API_KEY)
+        # Identical concurrent upstream requests share one download
+        self.upstream_calls = SingleFlight("upstream")
+        # Numeric series from stock payloads, kept locally for analytics
+        self.timeseries_store = TimeSeriesStore()
+        # Per-entity daily sentiment aggregates, updated as sentiment news arrives
+        self.sentiment_store = SentimentStore()
+        # Names and codes resolved locally before calling the stock API
+        self.symbol_master = SymbolMaster()
+        # Which stocks are requested most, for the pre-market cache warmer
+        self.access_stats = AccessStats()
+        # Shared by every NewsAPI page request
+        self.news_rate_limit = TokenBucket(settings.NEWS_REQUESTS_PER_SECOND, settings.NEWS_REQUESTS_BURST)
+    
+    async def _upstream(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Make a coalesced upstream call within the request deadline, returning an error payload if it runs out"""
+        try:
+            return await within_deadline(self.upstream_calls.do(key, fn), f"upstream call {key[0]}")
+        except DeadlineExceeded as e:
+            return {"error": str(e)}
+    
+    def _resolve_symbol(self, text: str, kind: str, field: str) -> Optional[str]:
+        """
+        Name or ID to send upstream for what the user typed, or None to skip the call
+        
+        Known companies are sent under the name or stock ID the API accepted
+        before; unknown text is sent as typed unless the API rejected it recently.
+        """
+        entry = self.symbol_master.resolve(text)
+        if entry and entry.get(field):
+            SYMBOL_RESOLUTIONS.inc(kind=kind, result="resolved")
+            return entry[field]
+        if self.symbol_master.recently_failed(text):
+            SYMBOL_RESOLUTIONS.inc(kind=kind, result="rejected")
+            logging.warning(f"Skipping {kind} lookup for {text}: rejected by the API recently")
+            return None
+        SYMBOL_RESOLUTIONS.inc(kind=kind, result="unresolved")
+        return text
+    
+    def _note_rejection(self, text: str, payload: Dict[str, Any]):
+        # Only "no such stock" style answers are remembered, never auth, quota or server errors
+        if payload.get("status") in REJECTED_STATUSES:
+            self.symbol_master.note_failure(text)
+    
+    def _ingest_series(self, method: str, text: str, *args) -> int:
+        """Store a payload's series under the company's canonical key (see SymbolMaster.stock_key)"""
+        try:
+            stock_key = self.symbol_master.stock_key(text)
+        except Exception as e:
+            logging.error(f"Error resolving series key for {text}: {str(e)}")
+            stock_key = text
+        return self.timeseries_store.safe_ingest(method, stock_key, *args)
+    
+    def _learn_symbol(self, method: str, *args):
+        # Symbol master failures must never fail a fetch
+        try:
+            getattr(self.symbol_master, method)(*args)
+        except Exception as e:
+            logging.error(f"Error updating symbol master ({method}): {str(e)}")
     
-    async def fetch_financial_news(self, query: Optional[str] = None, symbols: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    async def fetch_financial_news(self, query: Optional[str] = None, symbols: Optional[List[str]] = None,
+                                   pages: Optional[int] = None) -> List[Dict[str, Any]]:
         """
-        Fetch financial news articles
+        Fetch financial news articles (see iter_financial_news)
         
         Args:
             query: Optional search query
             symbols: Optional list of stock symbols
+            pages: Number of result pages to fetch (defaults to NEWS_PAGES)
             
         Returns:
             List of processed news documents
         """
+        return [doc async for doc in self.iter_financial_news(query, symbols, pages)]
+    
+    async def iter_financial_news(self, query: Optional[str] = None, symbols: Optional[List[str]] = None,
+                                  pages: Optional[int] = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Yield financial news articles page by page
+        
+        Page 1 is fetched first, unthrottled, and yielded as soon as it arrives;
+        the remaining pages (up to the number of results NewsAPI reports) are
+        fetched concurrently under the NewsAPI rate limit and yielded in page
+        order, and articles repeated across pages are dropped.
+        """
         # Prepare search query
         search_query = query
         if not search_query and symbols:
             search_query = " OR ".join(symbols)
-            
-        news_data = await self.news_api_service.get_financial_news(query=search_query, page_size=50)
+        pages = max(1, pages or settings.NEWS_PAGES)
+        page_size = settings.NEWS_PAGE_SIZE
+        
+        async def fetch_page(page: int) -> Dict[str, Any]:
+            async def call():
+                # Only the extra pages of a paged fetch are throttled, and only the
+                # coalesced leader takes a token: one upstream call costs one token
+                if page > 1:
+                    await self.news_rate_limit.acquire()
+                return await self.news_api_service.get_financial_news(query=search_query, page_size=page_size, page=page)
+            return await self._upstream(("newsapi", normalize_key_part(search_query), page_size, page), call)
+        
+        news_data = await fetch_page(1)
         
         if "error" in news_data:
             logging.error(f"Error fetching news: {news_data['error']}")
-            return []
-            
-        # Process and format the data for indexing
-        documents = []
-        for article in news_data.get("articles", []):
+            return
+        
+        last_page = min(pages, math.ceil((news_data.get("totalResults") or 0) / page_size))
+        deduplicator = NewsDeduplicator(settings.NEWS_DEDUP_THRESHOLD) if last_page > 1 else None
+        tasks = [asyncio.ensure_future(fetch_page(page)) for page in range(2, last_page + 1)]
+        try:
+            for doc in self._news_documents(news_data.get("articles", []), deduplicator):
+                yield doc
+            for page, task in enumerate(tasks, start=2):
+                with span("fetch.news_pages"):
+                    page_data = await task
+                if "error" in page_data:
+                    # Later pages can be refused (e.g. plan limits); keep what we have
+                    logging.warning(f"Error fetching news page {page}: {page_data['error']}")
+                    continue
+                for doc in self._news_documents(page_data.get("articles", []), deduplicator):
+                    yield doc
+        finally:
+            for task in tasks:
+                task.cancel()
+    
+    @staticmethod
+    def _news_documents(articles: List[Dict[str, Any]],
+                        deduplicator: Optional[NewsDeduplicator] = None) -> Iterator[Dict[str, Any]]:
+        """Format NewsAPI articles for indexing, skipping duplicates when a deduplicator is given"""
+        for article in articles:
             doc = {
                 "id": f"news_{uuid.uuid4()}",
                 "text": f"{article.get('title', '')}. {article.get('description', '')}. {article.get('content', '')}",
                 "metadata": {
                     "type": "news",
                     "title": article.get("title"),
+                    "description": article.get("description"),
                     "source": article.get("source", {}).get("name"),
                     "author": article.get("author"),
                     "published_at": article.get("publishedAt"),
@@ -52,9 +171,8 @@ class FinancialDataFetcher:
                     "image_url": article.get("urlToImage")
                 }
             }
-            documents.append(doc)
-            
-        return documents
+            if deduplicator is None or not deduplicator.is_duplicate_document(doc):
+                yield doc
         
     async def fetch_news_with_sentiment(self, symbols: List[str]) -> List[Dict[str, Any]]:
         """
@@ -66,11 +184,16 @@ class FinancialDataFetcher:
         Returns:
             List of processed sentiment news documents
         """
-        news_data = await self.marketaux_service.get_news_with_sentiment(symbols=symbols, limit=50)
+        news_data = await self._upstream(
+            ("marketaux", normalize_key_part(sorted(symbols or []))),
+            lambda: self.marketaux_service.get_news_with_sentiment(symbols=symbols, limit=50)
+        )
         
         if "error" in news_data:
             logging.error(f"Error fetching news with sentiment: {news_data['error']}")
             return []
+        
+        await asyncio.to_thread(self.sentiment_store.safe_ingest, news_data.get("data", []))
             
         # Process and format the data for indexing
         documents = []
@@ -89,6 +212,7 @@ class FinancialDataFetcher:
                 "metadata": {
                     "type": "sentiment_news",
                     "title": article.get("title"),
+                    "description": article.get("description"),
                     "source": article.get("source"),
                     "published_at": article.get("published_at"),
                     "url": article.get("url"),
@@ -112,19 +236,37 @@ class FinancialDataFetcher:
         Returns:
             List of processed stock data documents
         """
-        documents = []
+        documents = [doc async for doc in self.iter_indian_stock_data(stock_names)]
+        logging.info(f"Total Indian stock documents: {len(documents)}")
+        return documents
+    
+    async def iter_indian_stock_data(self, stock_names: List[str]) -> AsyncIterator[Dict[str, Any]]:
+        """Yield one processed stock data document per stock as soon as it has been fetched"""
         logging.info(f"Fetching Indian stock data for: {stock_names}")
         
-        for stock_name in stock_names:
+        for requested_name in stock_names:
             try:
+                stock_name = self._resolve_symbol(requested_name, "stock", "query")
+                if stock_name is None:
+                    continue
                 logging.info(f"Fetching data for stock: {stock_name}")
-                stock_data = await self.indian_stock_service.get_stock_data(stock_name)
+                stock_data = await self._upstream(
+                    ("indian_stock", normalize_key_part(stock_name)),
+                    lambda: self.indian_stock_service.get_stock_data(stock_name)
+                )
                 
                 if "error" in stock_data:
                     logging.error(f"Error fetching Indian stock data: {stock_data['error']}")
+                    self._note_rejection(requested_name, stock_data)
                     continue
                     
                 logging.info(f"Successfully fetched data for {stock_name}")
+                # Only names the API accepted count as demand for the cache warmer
+                self.access_stats.record(stock_name)
+                if self.access_stats.save_due():
+                    await asyncio.to_thread(self.access_stats.save)
+                await asyncio.to_thread(self._learn_symbol, "learn_stock", stock_name, stock_data)
+                await asyncio.to_thread(self._ingest_series, "ingest_stock_data", stock_name, stock_data)
                 
                 # Create text representation
                 company_name = stock_data.get("companyName", stock_name)
@@ -147,12 +289,10 @@ class FinancialDataFetcher:
                     },
                     "raw_data": stock_data
                 }
-                documents.append(doc)
             except Exception as e:
-                logging.error(f"Error processing stock data for {stock_name}: {str(e)}")
-                
-        logging.info(f"Total Indian stock documents: {len(documents)}")
-        return documents
+                logging.error(f"Error processing stock data for {requested_name}: {str(e)}")
+                continue
+            yield doc
     
     # Update the fetch_stock_forecasts method to include text field
     async def fetch_stock_forecasts(self, stock_ids: List[str], measure_code: str, period_type: str = "Annual", data_type: str = "Actuals", age: str = "Current") -> List[Dict[str, Any]]:
@@ -171,20 +311,36 @@ class FinancialDataFetcher:
         """
         documents = []
         
-        for stock_id in stock_ids:
+        for requested_id in stock_ids:
             try:
-                forecast_data = await self.indian_stock_service.get_stock_forecasts(
-                    stock_id=stock_id,
-                    measure_code=measure_code,
-                    period_type=period_type,
-                    data_type=data_type,
-                    age=age
+                stock_id = self._resolve_symbol(requested_id, "forecast", "stock_id")
+                if stock_id is None:
+                    continue
+                forecast_data = await self._upstream(
+                    ("stock_forecasts", normalize_key_part((stock_id, measure_code, period_type, data_type, age))),
+                    lambda: self.indian_stock_service.get_stock_forecasts(
+                        stock_id=stock_id,
+                        measure_code=measure_code,
+                        period_type=period_type,
+                        data_type=data_type,
+                        age=age
+                    )
                 )
                 
                 if "error" in forecast_data:
                     logging.error(f"Error fetching stock forecasts: {forecast_data['error']}")
+                    self._note_rejection(requested_id, forecast_data)
                     continue
                     
+                await asyncio.to_thread(self._learn_symbol, "learn_stock_id", requested_id, stock_id)
+                await asyncio.to_thread(
+                    self._ingest_series,
+                    "ingest_forecast_data",
+                    requested_id,
+                    f"forecast.{measure_code}.{period_type}.{data_type}.{age}",
+                    forecast_data
+                )
+                
                 # Create text representation
                 text = f"Forecast data for {stock_id} with measure {measure_code}, period type {period_type}, data type {data_type}, age {age}."
                 
@@ -206,17 +362,19 @@ class FinancialDataFetcher:
                 }
                 documents.append(doc)
             except Exception as e:
-                logging.error(f"Error processing forecast data for {stock_id}: {str(e)}")
+                logging.error(f"Error processing forecast data for {requested_id}: {str(e)}")
                 
         return documents
         
-    async def fetch_comprehensive_data(self, symbols: List[str], query: Optional[str] = None) -> List[Dict[str, Any]]:
+    async def fetch_comprehensive_data(self, symbols: List[str], query: Optional[str] = None,
+                                       news_pages: Optional[int] = None) -> List[Dict[str, Any]]:
         """
         Fetch comprehensive financial data from all sources
         
         Args:
             symbols: List of stock symbols
             query: Optional search query for news
+            news_pages: NewsAPI result pages to fetch (defaults to NEWS_PAGES)
             
         Returns:
             List of all processed documents
@@ -225,23 +383,53 @@ class FinancialDataFetcher:
         
         try:
             # Fetch data from all sources
-            news_data = await self.fetch_financial_news(query, symbols)
-            logging.info(f"Fetched {len(news_data)} news articles")
-            
-            sentiment_data = await self.fetch_news_with_sentiment(symbols)
-            logging.info(f"Fetched {len(sentiment_data)} sentiment news articles")
-            
-            indian_stock_data = await self.fetch_indian_stock_data(symbols)
-            logging.info(f"Fetched {len(indian_stock_data)} Indian stock data points")
-            
-            # Combine all data
-            all_documents = indian_stock_data + news_data + sentiment_data
+            with span("fetch.comprehensive"):
+                all_documents = [doc async for doc in self.iter_comprehensive_data(symbols, query, news_pages)]
             logging.info(f"Total documents fetched: {len(all_documents)}")
             
             return all_documents
         except Exception as e:
             logging.error(f"Error in fetch_comprehensive_data: {str(e)}")
             raise
+    
+    async def iter_comprehensive_data(self, symbols: List[str], query: Optional[str] = None,
+                                      news_pages: Optional[int] = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Yield documents from all sources as they are produced
+        
+        Stock data comes first, one company at a time, followed by news from
+        each provider, so callers can serialize or index each document without
+        holding the whole result. A story already yielded by one news provider
+        (same canonical URL or near-identical title and description) is skipped
+        when another provider returns it; sentiment news goes first because it
+        carries entity sentiment.
+        """
+        stock_count = 0
+        async for doc in self.iter_indian_stock_data(symbols):
+            stock_count += 1
+            yield doc
+        logging.info(f"Fetched {stock_count} Indian stock data points")
+        
+        async def each(fetch: Awaitable[List[Dict[str, Any]]]) -> AsyncIterator[Dict[str, Any]]:
+            for doc in await fetch:
+                yield doc
+        
+        deduplicator = NewsDeduplicator(settings.NEWS_DEDUP_THRESHOLD)
+        providers = [
+            ("sentiment news articles", lambda: each(self.fetch_news_with_sentiment(symbols))),
+            ("news articles", lambda: self.iter_financial_news(query, symbols, news_pages)),
+        ]
+        if settings.NEWS_INCLUDE_INDIAN_FEED:
+            providers.append(("Indian stock news articles", lambda: each(self.fetch_indian_stock_news())))
+        for label, documents in providers:
+            fetched = dropped = 0
+            async for doc in documents():
+                fetched += 1
+                if deduplicator.is_duplicate_document(doc):
+                    dropped += 1
+                    continue
+                yield doc
+            logging.info(f"Fetched {fetched} {label} ({dropped} duplicates dropped)")
 
     # Fix the indentation of this method to make it part of the FinancialDataFetcher class
     async def fetch_indian_stock_news(self, 
@@ -263,7 +451,10 @@ class FinancialDataFetcher:
         logging.info(f"Fetching Indian stock news for stock_id: {stock_id}, category: {category}")
         
         try:
-            news_data = await self.indian_stock_service.get_stock_news(stock_id, category, limit)
+            news_data = await self._upstream(
+                ("indian_stock_news", normalize_key_part((stock_id, category, limit))),
+                lambda: self.indian_stock_service.get_stock_news(stock_id, category, limit)
+            )
             
             if "error" in news_data:
                 logging.error(f"Error fetching Indian stock news: {news_data['error']}")
@@ -297,6 +488,7 @@ class FinancialDataFetcher:
                         "metadata": {
                             "type": "indian_stock_news",
                             "title": title,
+                            "summary": summary,
                             "source": source,
                             "published_at": published_at,
                             "url": url,
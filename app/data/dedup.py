@@ -0,0 +1,128 @@
+import hashlib
+import re
+import numpy as np
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+from app.core.metrics import NEWS_DUPLICATES
+
+# Query parameters that only track the referrer and never change the article
+TRACKING_PARAMS = ("utm_", "fbclid", "gclid", "mc_cid", "mc_eid", "ref", "ref_src", "cmpid", "ocid", "taid")
+
+# MinHash signature length and LSH banding (16 bands of 4 rows finds pairs
+# above ~0.5 Jaccard similarity as candidates with high probability)
+NUM_PERMUTATIONS = 64
+LSH_BANDS = 16
+_MERSENNE_PRIME = np.uint64(4294967311)
+_rng = np.random.default_rng(0x5EED)
+_PERM_A = _rng.integers(1, 2 ** 32, NUM_PERMUTATIONS, dtype=np.uint64)
+_PERM_B = _rng.integers(0, 2 ** 32, NUM_PERMUTATIONS, dtype=np.uint64)
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+def canonical_url(url: Optional[str]) -> Optional[str]:
+    """
+    Normalize an article URL so links to the same page compare equal
+
+    Lowercases the scheme and host, drops "www.", default ports, fragments,
+    tracking parameters and trailing slashes, and sorts the remaining query.
+    """
+    if not url:
+        return None
+    try:
+        parts = urlsplit(url.strip())
+    except ValueError:
+        return url.strip()
+    host = (parts.hostname or "").lower()
+    if host.startswith("www."):
+        host = host[4:]
+    if parts.port and parts.port not in (80, 443):
+        host = f"{host}:{parts.port}"
+    query = sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not key.lower().startswith(TRACKING_PARAMS)
+    )
+    path = parts.path.rstrip("/") or "/"
+    return urlunsplit(("https" if parts.scheme in ("http", "https") else parts.scheme, host, path, urlencode(query), ""))
+
+
+def shingles(text: str) -> Set[str]:
+    """Word unigrams and bigrams of a text"""
+    tokens = _TOKEN.findall(text.lower())
+    return set(tokens) | {f"{a} {b}" for a, b in zip(tokens, tokens[1:])}
+
+
+def minhash(text: str) -> Optional[np.ndarray]:
+    """
+    MinHash signature of a text's shingles
+
+    The fraction of equal positions in two signatures estimates the Jaccard
+    similarity of the shingle sets. Returns None for texts without words.
+    """
+    features = shingles(text)
+    if not features:
+        return None
+    hashes = np.frombuffer(
+        b"".join(hashlib.blake2b(f.encode("utf-8"), digest_size=4).digest() for f in features), dtype="<u4"
+    ).astype(np.uint64)
+    # Universal hashing (a*x + b) mod p stands in for one random permutation per column
+    return ((hashes[:, None] * _PERM_A + _PERM_B) % _MERSENNE_PRIME).min(axis=0)
+
+
+def fingerprint_text(doc: Dict[str, Any]) -> str:
+    """Title and description (or summary) of a news document, falling back to its text"""
+    metadata = doc.get("metadata") or {}
+    parts = [metadata.get(key) for key in ("title", "description", "summary") if metadata.get(key)]
+    return " ".join(str(part) for part in parts) if parts else (doc.get("text") or "")
+
+
+class NewsDeduplicator:
+    """
+    Drops articles already seen from another page or provider
+
+    An article is a duplicate when its canonical URL was seen before, or when
+    the estimated Jaccard similarity of its title and description shingles to
+    an article seen before reaches the threshold. Signatures are bucketed by
+    LSH band, so only articles sharing a band are compared.
+    """
+
+    def __init__(self, threshold: float = 0.8):
+        self.threshold = threshold
+        self.rows = NUM_PERMUTATIONS // LSH_BANDS
+        self._urls: Set[str] = set()
+        self._signatures: List[np.ndarray] = []
+        self._buckets: Dict[Tuple[int, bytes], List[int]] = {}
+
+    def _band_keys(self, signature: np.ndarray) -> List[Tuple[int, bytes]]:
+        return [(band, signature[band * self.rows:(band + 1) * self.rows].tobytes()) for band in range(LSH_BANDS)]
+
+    def is_duplicate(self, url: Optional[str], text: str) -> bool:
+        """Check an article and remember it if it is new"""
+        canonical = canonical_url(url)
+        if canonical and canonical in self._urls:
+            NEWS_DUPLICATES.inc(reason="url")
+            return True
+
+        signature = minhash(text)
+        keys = self._band_keys(signature) if signature is not None else []
+        candidates = {position for key in keys for position in self._buckets.get(key, ())}
+        for position in candidates:
+            if np.mean(self._signatures[position] == signature) >= self.threshold:
+                NEWS_DUPLICATES.inc(reason="fingerprint")
+                return True
+
+        if canonical:
+            self._urls.add(canonical)
+        if signature is not None:
+            position = len(self._signatures)
+            self._signatures.append(signature)
+            for key in keys:
+                self._buckets.setdefault(key, []).append(position)
+        return False
+
+    def is_duplicate_document(self, doc: Dict[str, Any]) -> bool:
+        return self.is_duplicate((doc.get("metadata") or {}).get("url"), fingerprint_text(doc))
+
+    def filter(self, documents: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Keep the first of every group of duplicate documents"""
+        return [doc for doc in documents if not self.is_duplicate_document(doc)]
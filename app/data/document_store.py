@@ -0,0 +1,225 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Union
+from app.core.config import settings
+from app.data.documents import DocumentBatch
+
+# SQLite limits the number of bound parameters per statement
+_MAX_PARAMS = 500
+
+# Day a document belongs to: its own ISO date when it has one, otherwise the day it was indexed
+_DOCUMENT_DAY = (
+    "CASE WHEN date GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]*' THEN substr(date, 1, 10) "
+    "ELSE date(indexed_at, 'unixepoch') END"
+)
+
+
+class DocumentStore:
+    """
+    Embedded SQLite store for document text and full metadata, keyed by document ID
+
+    The vector index only keeps the fields needed for filtering; retrieval
+    hydrates its hits from here in one bulk read. The type, source and date
+    columns double as a catalog of what has been indexed.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or settings.DOCUMENT_STORE_PATH
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS documents (
+                id TEXT PRIMARY KEY,
+                text TEXT NOT NULL,
+                metadata TEXT NOT NULL,
+                type TEXT,
+                source TEXT,
+                date TEXT,
+                indexed_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS documents_type_indexed_at ON documents (type, indexed_at)")
+        self._conn.commit()
+
+    def put_many(self, documents: Union[DocumentBatch, Iterable[Dict[str, Any]]]) -> int:
+        """
+        Insert or replace documents
+
+        Args:
+            documents: A DocumentBatch, or dictionaries with 'id', 'text' and 'metadata'
+
+        Returns:
+            Number of documents written
+        """
+        now = time.time()
+        batch = DocumentBatch.from_documents(documents)
+        rows = []
+        for doc_id, text, metadata in zip(batch.ids, batch.texts, batch.metadata):
+            rows.append((
+                doc_id,
+                text or "",
+                json.dumps(metadata, default=str),
+                metadata.get("type"),
+                metadata.get("source"),
+                metadata.get("date") or metadata.get("published_at"),
+                now
+            ))
+        if not rows:
+            return 0
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO documents (id, text, metadata, type, source, date, indexed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+        return len(rows)
+
+    def get_many(self, ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Read documents by ID
+
+        Returns:
+            Dictionary mapping each found ID to {'text', 'metadata'}; missing IDs are left out
+        """
+        found = {}
+        with self._lock:
+            for start in range(0, len(ids), _MAX_PARAMS):
+                chunk = ids[start:start + _MAX_PARAMS]
+                placeholders = ",".join("?" * len(chunk))
+                cursor = self._conn.execute(
+                    f"SELECT id, text, metadata FROM documents WHERE id IN ({placeholders})", chunk
+                )
+                for doc_id, text, metadata in cursor:
+                    found[doc_id] = {"text": text, "metadata": json.loads(metadata)}
+        return found
+
+    def delete_many(self, ids: List[str]) -> int:
+        """Delete documents by ID; returns the number removed"""
+        removed = 0
+        with self._lock, self._conn:
+            for start in range(0, len(ids), _MAX_PARAMS):
+                chunk = ids[start:start + _MAX_PARAMS]
+                placeholders = ",".join("?" * len(chunk))
+                removed += self._conn.execute(f"DELETE FROM documents WHERE id IN ({placeholders})", chunk).rowcount
+        return removed
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+
+    def existing_ids(self, ids: List[str]) -> set:
+        """Which of the given document IDs are stored"""
+        found = set()
+        with self._lock:
+            for start in range(0, len(ids), _MAX_PARAMS):
+                chunk = ids[start:start + _MAX_PARAMS]
+                placeholders = ",".join("?" * len(chunk))
+                cursor = self._conn.execute(f"SELECT id FROM documents WHERE id IN ({placeholders})", chunk)
+                found.update(row[0] for row in cursor)
+        return found
+
+    def existing_values(self, field: str, values: List[str], doc_type: Optional[str] = None,
+                        date: Optional[str] = None) -> set:
+        """
+        Which of the given metadata values are already stored
+
+        Args:
+            field: Metadata field, e.g. "url"
+            values: Values to look up
+            doc_type: Only consider documents of this type (optional)
+            date: Only consider documents of this date (optional)
+        """
+        found = set()
+        conditions = ""
+        extra: list = []
+        if doc_type is not None:
+            conditions += " AND type = ?"
+            extra.append(doc_type)
+        if date is not None:
+            conditions += " AND date = ?"
+            extra.append(date)
+        with self._lock:
+            for start in range(0, len(values), _MAX_PARAMS):
+                chunk = values[start:start + _MAX_PARAMS]
+                placeholders = ",".join("?" * len(chunk))
+                cursor = self._conn.execute(
+                    f"SELECT DISTINCT json_extract(metadata, ?) FROM documents "
+                    f"WHERE json_extract(metadata, ?) IN ({placeholders}){conditions}",
+                    (f"$.{field}", f"$.{field}", *chunk, *extra)
+                )
+                found.update(row[0] for row in cursor)
+        return found
+
+    # -- retention --------------------------------------------------------------
+    
+    def expired_ids(self, doc_type: str, before: str, limit: Optional[int] = None) -> List[str]:
+        """
+        IDs of documents of a type dated before a day
+        
+        Args:
+            doc_type: Document type
+            before: ISO day (YYYY-MM-DD); undated documents are aged by their index time
+            limit: Maximum number of IDs (None for all)
+        """
+        with self._lock:
+            cursor = self._conn.execute(
+                f"SELECT id FROM documents WHERE type = ? AND {_DOCUMENT_DAY} < ? ORDER BY indexed_at LIMIT ?",
+                (doc_type, before, -1 if limit is None else limit)
+            )
+            return [row[0] for row in cursor]
+    
+    def superseded_ids(self, doc_type: str, keys: List[str], limit: Optional[int] = None) -> List[str]:
+        """
+        IDs of documents of a type replaced by a newer one with the same key
+        
+        Documents missing any of the key fields have no key and are never superseded.
+        
+        Args:
+            doc_type: Document type
+            keys: Metadata fields that identify the subject, e.g. ["stock_name"]
+            limit: Maximum number of IDs (None for all)
+        """
+        partition = ", ".join("lower(json_extract(metadata, ?))" for _ in keys)
+        keyed = "".join(" AND json_extract(metadata, ?) IS NOT NULL" for _ in keys)
+        paths = [f"$.{key}" for key in keys]
+        with self._lock:
+            cursor = self._conn.execute(
+                f"SELECT id FROM ("
+                f"  SELECT id, ROW_NUMBER() OVER ("
+                f"    PARTITION BY {partition} ORDER BY indexed_at DESC, rowid DESC"
+                f"  ) AS newer FROM documents WHERE type = ?{keyed}"
+                f") WHERE newer > 1 LIMIT ?",
+                (*paths, doc_type, *paths, -1 if limit is None else limit)
+            )
+            return [row[0] for row in cursor]
+    
+    def payload_bytes(self, ids: List[str]) -> int:
+        """Bytes of text and metadata held for the given documents"""
+        total = 0
+        with self._lock:
+            for start in range(0, len(ids), _MAX_PARAMS):
+                chunk = ids[start:start + _MAX_PARAMS]
+                placeholders = ",".join("?" * len(chunk))
+                total += self._conn.execute(
+                    f"SELECT COALESCE(SUM(length(CAST(text AS BLOB)) + length(CAST(metadata AS BLOB))), 0) "
+                    f"FROM documents WHERE id IN ({placeholders})", chunk
+                ).fetchone()[0]
+        return total
+    
+    def file_size(self) -> int:
+        """Size of the database file and its write-ahead log on disk"""
+        return sum(os.path.getsize(path) for path in (self.path, f"{self.path}-wal") if os.path.exists(path))
+    
+    def vacuum(self):
+        """Return free pages to the filesystem (rewrites the whole file)"""
+        with self._lock:
+            self._conn.execute("VACUUM")
+            self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
@@ -0,0 +1,108 @@
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Union
+import numpy as np
+
+
+@dataclass
+class Document:
+    """A document to index: ID, text and metadata (the text is never repeated in the metadata)"""
+    __slots__ = ("id", "text", "metadata")
+    id: str
+    text: str
+    metadata: Dict[str, Any]
+
+    @classmethod
+    def from_dict(cls, doc: Dict[str, Any]) -> "Document":
+        metadata = doc.get("metadata") or {}
+        if "text" in metadata:
+            metadata = {key: value for key, value in metadata.items() if key != "text"}
+        return cls(doc["id"], doc.get("text") or "", metadata)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"id": self.id, "text": self.text, "metadata": self.metadata}
+
+
+@dataclass
+class RetrievedDocument:
+    """A retrieval hit, hydrated from the document store"""
+    __slots__ = ("id", "score", "text", "source", "date", "metadata", "rerank_score")
+    id: str
+    score: float
+    text: str
+    source: str
+    date: str
+    metadata: Dict[str, Any]
+    # Cross-encoder score, when the reranker scored this hit
+    rerank_score: Optional[float]
+
+    def to_dict(self) -> Dict[str, Any]:
+        doc = {
+            "id": self.id,
+            "score": self.score,
+            "text": self.text,
+            "source": self.source,
+            "date": self.date,
+            "metadata": self.metadata,
+        }
+        if self.rerank_score is not None:
+            doc["rerank_score"] = self.rerank_score
+        return doc
+
+
+class DocumentBatch:
+    """
+    Many documents as parallel columns instead of one object per document
+
+    IDs, texts and metadata are kept in three lists and embeddings, once
+    computed, in one contiguous float32 matrix (a row per document), so a
+    large ingest holds no per-document wrapper objects and no embedding as a
+    list of Python floats. Slices share the embedding matrix.
+    """
+
+    __slots__ = ("ids", "texts", "metadata", "embeddings")
+
+    def __init__(self, ids: List[str], texts: List[str], metadata: List[Dict[str, Any]],
+                 embeddings: Optional[np.ndarray] = None):
+        if not len(ids) == len(texts) == len(metadata):
+            raise ValueError(f"Columns differ in length: {len(ids)} ids, {len(texts)} texts, {len(metadata)} metadata")
+        if embeddings is not None and len(embeddings) != len(ids):
+            raise ValueError(f"{len(embeddings)} embeddings for {len(ids)} documents")
+        self.ids = ids
+        self.texts = texts
+        self.metadata = metadata
+        self.embeddings = embeddings
+
+    @classmethod
+    def from_documents(cls, documents: Iterable[Union[Dict[str, Any], Document]]) -> "DocumentBatch":
+        """Build a batch from document dicts or Document objects"""
+        if isinstance(documents, DocumentBatch):
+            return documents
+        ids: List[str] = []
+        texts: List[str] = []
+        metadata: List[Dict[str, Any]] = []
+        for doc in documents:
+            if not isinstance(doc, Document):
+                doc = Document.from_dict(doc)
+            ids.append(doc.id)
+            texts.append(doc.text)
+            metadata.append(doc.metadata)
+        return cls(ids, texts, metadata)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __getitem__(self, position: int) -> Document:
+        return Document(self.ids[position], self.texts[position], self.metadata[position])
+
+    def __iter__(self) -> Iterator[Document]:
+        for position in range(len(self.ids)):
+            yield self[position]
+
+    def slice(self, start: int, stop: int) -> "DocumentBatch":
+        return DocumentBatch(
+            self.ids[start:stop], self.texts[start:stop], self.metadata[start:stop],
+            None if self.embeddings is None else self.embeddings[start:stop]
+        )
+
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        return [doc.to_dict() for doc in self]
@@ -3,6 +3,10 @@ import json
 import pandas as pd
 from typing import List, Dict, Any, Optional
 from app.services.retrieval_service import RetrievalService
+from app.data.preprocessing import dataframe_to_documents, sanitize_metadata
+from app.data.documents import DocumentBatch
+from app.core.config import settings
+from app.core.metrics import span
 import uuid
 
 class DataIndexer:
@@ -38,19 +42,47 @@ class DataIndexer:
         document = {
             "id": doc_id,
             "text": text,
-            "metadata": {
-                "text": text,  # Include text in metadata for retrieval
+            "metadata": sanitize_metadata({
                 "source": source,
                 "type": doc_type,
                 "date": date,
                 **metadata
-            }
+            }, settings.METADATA_MAX_VALUE_CHARS)
         }
         
         # Index document
-        await self.retrieval_service.index_document(document)
+        with span("indexing.text_document"):
+            await self.retrieval_service.index_document(document)
         return doc_id
     
+    async def index_documents(self, documents: List[Dict[str, Any]], doc_type: str = "financial_data") -> List[str]:
+        """
+        Index fetched documents in one pipelined batch
+
+        Args:
+            documents: Documents with 'text' and 'metadata' (as returned by the data fetcher)
+            doc_type: Type for documents whose metadata has none
+
+        Returns:
+            List of document IDs
+        """
+        # Columns are built directly; the fetched dicts (and their raw payloads) are not copied
+        batch = DocumentBatch(
+            [str(uuid.uuid4()) for _ in documents],
+            [doc["text"] for doc in documents],
+            [
+                sanitize_metadata({
+                    "source": doc["metadata"].get("source", "Unknown"),
+                    "type": doc_type,
+                    "date": doc["metadata"].get("date") or doc["metadata"].get("published_at"),
+                    **{key: value for key, value in doc["metadata"].items() if key != "text"}
+                }, settings.METADATA_MAX_VALUE_CHARS)
+                for doc in documents
+            ]
+        )
+        with span("indexing.documents"):
+            return await self.retrieval_service.index_documents(batch)
+
     async def index_csv_file(self, 
                             file_path: str, 
                             text_column: str,
@@ -71,28 +103,23 @@ class DataIndexer:
             List of document IDs
         """
         # Read CSV
-        df = pd.read_csv(file_path)
-        
-        doc_ids = []
-        for _, row in df.iterrows():
-            text = row[text_column]
-            source = row[source_column] if source_column and source_column in row else os.path.basename(file_path)
-            date = row[date_column] if date_column and date_column in row else None
+        with span("indexing.csv_parse"):
+            df = pd.read_csv(file_path)
             
-            # Create metadata from row
-            metadata = {col: row[col] for col in df.columns if col not in [text_column]}
-            
-            # Index document
-            doc_id = await self.index_text_document(
-                text=text,
-                source=source,
+            # Convert rows to documents column-wise and index them in bulk
+            documents = dataframe_to_documents(
+                df,
+                text_column=text_column,
                 doc_type=doc_type,
-                date=date,
-                metadata=metadata
+                default_source=os.path.basename(file_path),
+                source_column=source_column,
+                date_column=date_column,
+                max_chars=settings.METADATA_MAX_VALUE_CHARS,
+                allowed_keys=settings.METADATA_ALLOWED_KEYS or None
             )
-            doc_ids.append(doc_id)
-            
-        return doc_ids
+        
+        with span("indexing.bulk_index"):
+            return await self.retrieval_service.index_documents(documents)
     
     async def index_json_file(self, 
                              file_path: str,
@@ -0,0 +1,168 @@
+import json
+import uuid
+import numpy as np
+import pandas as pd
+from typing import List, Dict, Any, Optional
+from app.data.documents import DocumentBatch
+
+# Keys that are always kept in vector metadata, regardless of the allowed-keys list
+RESERVED_METADATA_KEYS = ("text", "source", "type", "date")
+
+
+def _trim(value: str, max_chars: int) -> str:
+    return value if len(value) <= max_chars else value[:max_chars]
+
+
+def sanitize_metadata_value(value: Any, max_chars: int) -> Any:
+    """
+    Convert a single metadata value into a type the vector store accepts
+
+    Args:
+        value: Raw value (numpy scalar, nested structure, NaN, ...)
+        max_chars: Maximum length for string values
+
+    Returns:
+        A str, int, float, bool or list of str, or None if the value should be dropped
+    """
+    if value is None:
+        return None
+    if isinstance(value, (bool, np.bool_)):
+        return bool(value)
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    if isinstance(value, (float, np.floating)):
+        return None if np.isnan(value) else float(value)
+    if isinstance(value, str):
+        return _trim(value, max_chars)
+    if isinstance(value, (list, tuple)):
+        return [_trim(str(item), max_chars) for item in value if item is not None]
+    if isinstance(value, dict):
+        return _trim(json.dumps(value, default=str), max_chars)
+    if value is pd.NaT:
+        return None
+    return _trim(str(value), max_chars)
+
+
+def sanitize_metadata(metadata: Dict[str, Any],
+                      max_chars: int,
+                      allowed_keys: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    Clean a metadata dictionary for the vector store
+
+    Args:
+        metadata: Raw metadata
+        max_chars: Maximum length for string values (the "text" key is never trimmed)
+        allowed_keys: Keys to keep in addition to the reserved ones (None keeps all keys)
+
+    Returns:
+        Metadata with null values dropped and every value converted to a supported type
+    """
+    clean = {}
+    for key, value in metadata.items():
+        if allowed_keys and key not in allowed_keys and key not in RESERVED_METADATA_KEYS:
+            continue
+        if key == "text" and isinstance(value, str):
+            clean[key] = value
+            continue
+        value = sanitize_metadata_value(value, max_chars)
+        if value is not None:
+            clean[key] = value
+    return clean
+
+
+def filterable_metadata(metadata: Dict[str, Any], keys: List[str]) -> Dict[str, Any]:
+    """
+    Select the metadata fields that are stored in the vector index
+
+    Text and other large fields live in the document store; the index only
+    needs what queries filter on.
+    """
+    return {key: metadata[key] for key in keys if metadata.get(key) is not None}
+
+
+def _column_to_list(series: pd.Series, max_chars: int) -> List[Any]:
+    """Convert a column into a list of plain Python values, with missing values as None"""
+    mask = series.isna().to_numpy()
+
+    if pd.api.types.is_bool_dtype(series) or pd.api.types.is_numeric_dtype(series):
+        values = series.to_numpy().tolist()
+    elif pd.api.types.is_datetime64_any_dtype(series):
+        values = series.dt.strftime("%Y-%m-%d").tolist()
+    else:
+        values = series.astype(str).tolist()
+        for i in np.flatnonzero((series.str.len() > max_chars).to_numpy(dtype=bool, na_value=False)):
+            values[i] = values[i][:max_chars]
+
+    if mask.any():
+        for i in np.flatnonzero(mask):
+            values[i] = None
+    return values
+
+
+def dataframe_to_documents(df: pd.DataFrame,
+                           text_column: str,
+                           doc_type: str,
+                           default_source: str,
+                           source_column: Optional[str] = None,
+                           date_column: Optional[str] = None,
+                           max_chars: int = 1000,
+                           allowed_keys: Optional[List[str]] = None) -> DocumentBatch:
+    """
+    Convert a DataFrame into indexable documents column by column
+
+    Every column is cast to plain Python values once, instead of boxing each
+    row into a Series, and missing values are dropped from the metadata. The
+    result keeps texts and metadata as columns, with no object per row.
+
+    Args:
+        df: Source DataFrame
+        text_column: Column containing text to index
+        doc_type: Type of document
+        default_source: Source used when no source column is given
+        source_column: Column containing source information (optional)
+        date_column: Column containing date information (optional)
+        max_chars: Maximum length for string metadata values
+        allowed_keys: Metadata columns to keep (None keeps all columns)
+
+    Returns:
+        DocumentBatch of the rows
+    """
+    n_rows = len(df)
+    texts = df[text_column].fillna("").astype(str).tolist()
+
+    if source_column and source_column in df.columns:
+        sources = [s if s is not None else default_source for s in _column_to_list(df[source_column], max_chars)]
+    else:
+        sources = [default_source] * n_rows
+
+    if date_column and date_column in df.columns:
+        dates = _column_to_list(df[date_column], max_chars)
+    else:
+        dates = [None] * n_rows
+
+    meta_columns = [
+        col for col in df.columns
+        if col != text_column and (not allowed_keys or col in allowed_keys or col in RESERVED_METADATA_KEYS)
+    ]
+    meta_values = [_column_to_list(df[col], max_chars) for col in meta_columns]
+    keys = [str(col) for col in meta_columns]
+    # Only rows that actually contain missing values need per-cell filtering
+    has_missing = df[meta_columns].isna().any(axis=1).to_numpy() if meta_columns else np.zeros(n_rows, dtype=bool)
+
+    # One random prefix per batch keeps IDs unique without a uuid4() call per row
+    batch_id = uuid.uuid4().hex
+
+    rows_metadata = []
+    for i, row_values in enumerate(zip(*meta_values) if meta_values else ([()] * n_rows)):
+        if has_missing[i]:
+            metadata = {key: value for key, value in zip(keys, row_values) if value is not None}
+        else:
+            metadata = dict(zip(keys, row_values))
+        metadata["source"] = sources[i]
+        metadata["type"] = doc_type
+        if dates[i] is not None:
+            metadata["date"] = dates[i]
+
+        rows_metadata.append(metadata)
+
+    return DocumentBatch([f"{batch_id}_{i}" for i in range(n_rows)], texts, rows_metadata)
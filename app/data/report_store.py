@@ -0,0 +1,147 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+from app.core.config import settings
+
+
+class ReportStore:
+    """
+    Embedded SQLite store for generated reports, versioned per report ID
+
+    Each generation or refresh of a report adds a version holding the report
+    and the parameters it was generated with, so a refresh can compare its
+    retrieval against the last version and a diff can compare any two.
+    Only the newest `max_versions` versions of a report are kept, and prune()
+    drops whole reports not stored within `ttl` seconds or beyond the
+    `max_reports` most recently stored.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_versions: Optional[int] = None,
+                 max_reports: Optional[int] = None, ttl: Optional[float] = None):
+        self.path = path or settings.REPORT_STORE_PATH
+        self.max_versions = max_versions or settings.REPORT_STORE_MAX_VERSIONS
+        self.max_reports = max_reports or settings.REPORT_STORE_MAX_REPORTS
+        self.ttl = settings.REPORT_STORE_TTL_SECONDS if ttl is None else ttl
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        # Latest version handed out per report ID, so a version can be reserved before it is written
+        self._reserved: Dict[str, int] = {}
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS reports (
+                report_id TEXT NOT NULL,
+                version INTEGER NOT NULL,
+                params TEXT NOT NULL,
+                report TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                PRIMARY KEY (report_id, version)
+            )
+        """)
+        self._conn.commit()
+
+    def reserve_version(self, report_id: str) -> int:
+        """The next version number of a report, reserved for a later put()"""
+        with self._lock:
+            latest = self._reserved.get(report_id)
+            if latest is None:
+                row = self._conn.execute(
+                    "SELECT COALESCE(MAX(version), 0) FROM reports WHERE report_id = ?", (report_id,)
+                ).fetchone()
+                latest = row[0]
+            self._reserved[report_id] = latest + 1
+            return latest + 1
+
+    def put(self, report_id: str, params: Dict[str, Any], report: Dict[str, Any],
+            version: Optional[int] = None) -> int:
+        """
+        Store a new version of a report
+
+        The report's "version" field is set to the version it was stored as.
+
+        Args:
+            report_id: Report ID
+            params: Parameters the report was generated with
+            report: The report
+            version: A version from reserve_version() (a new one is reserved by default)
+
+        Returns:
+            The new version number
+        """
+        if version is None:
+            version = self.reserve_version(report_id)
+        report["version"] = version
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO reports (report_id, version, params, report, created_at) VALUES (?, ?, ?, ?, ?)",
+                (report_id, version, json.dumps(params), json.dumps(report, default=str), time.time())
+            )
+            self._conn.execute(
+                "DELETE FROM reports WHERE report_id = ? AND version <= ?", (report_id, version - self.max_versions)
+            )
+        return version
+
+    def prune(self) -> List[str]:
+        """
+        Remove reports last stored more than `ttl` seconds ago (with a ttl) and
+        all but the `max_reports` most recently stored
+
+        Returns:
+            IDs of the removed reports
+        """
+        with self._lock, self._conn:
+            expired = []
+            if self.ttl > 0:
+                expired = [row[0] for row in self._conn.execute(
+                    "SELECT report_id FROM reports GROUP BY report_id HAVING MAX(created_at) < ?",
+                    (time.time() - self.ttl,)
+                )]
+            overflow = [row[0] for row in self._conn.execute(
+                "SELECT report_id FROM reports GROUP BY report_id "
+                "ORDER BY MAX(created_at) DESC LIMIT -1 OFFSET ?",
+                (self.max_reports,)
+            )]
+            removed = list(dict.fromkeys(expired + overflow))
+            self._conn.executemany("DELETE FROM reports WHERE report_id = ?", [(report_id,) for report_id in removed])
+            for report_id in removed:
+                self._reserved.pop(report_id, None)
+        return removed
+
+    def get(self, report_id: str, version: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """
+        Read one version of a report (the latest by default)
+
+        Returns:
+            {'report_id', 'version', 'params', 'report', 'created_at'}, or None if it is not stored
+        """
+        query = "SELECT report_id, version, params, report, created_at FROM reports WHERE report_id = ?"
+        args: tuple = (report_id,)
+        if version is None:
+            query += " ORDER BY version DESC LIMIT 1"
+        else:
+            query += " AND version = ?"
+            args += (version,)
+        with self._lock:
+            row = self._conn.execute(query, args).fetchone()
+        if row is None:
+            return None
+        return {
+            "report_id": row[0],
+            "version": row[1],
+            "params": json.loads(row[2]),
+            "report": json.loads(row[3]),
+            "created_at": row[4],
+        }
+
+    def versions(self, report_id: str) -> List[int]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT version FROM reports WHERE report_id = ? ORDER BY version", (report_id,)
+            ).fetchall()
+        return [row[0] for row in rows]
@@ -0,0 +1,398 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import numpy as np
+from typing import Any, Dict, Iterable, List, Optional
+from app.core.config import settings
+from app.data.timeseries_store import to_bound, to_period, to_number
+
+
+def _url_hash(url: str) -> np.uint64:
+    return np.frombuffer(hashlib.blake2b(url.strip().encode("utf-8"), digest_size=8).digest(), dtype="<u8")[0]
+
+
+class SentimentStore:
+    """
+    Daily sentiment aggregates per entity
+
+    Scores are accumulated into (entity x day) sum and count matrices as news
+    is ingested, so rolling means, counts and momentum for any set of
+    entities are a few vectorized operations over cumulative sums. Articles
+    are de-duplicated by URL, and articles dated more than max_age_days ago or
+    in the future are skipped, so one odd date cannot widen every row.
+
+    Each ingest appends one line per batch to a journal next to the .npz
+    snapshot, so a write costs O(batch), not O(store). Once the journal
+    outgrows journal_max_bytes it is folded into a new snapshot generation.
+    Other instances pick up journal lines and new snapshots on their next
+    read; replay is idempotent because articles are keyed by URL. Writes are
+    expected from one process at a time.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_age_days: Optional[int] = None,
+                 journal_max_bytes: Optional[int] = None):
+        self.path = path or settings.SENTIMENT_STORE_PATH
+        self.max_age_days = max_age_days or settings.SENTIMENT_MAX_AGE_DAYS
+        self.journal_max_bytes = journal_max_bytes or settings.SENTIMENT_JOURNAL_MAX_BYTES
+        self._lock = threading.Lock()
+        self.entities: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self.aliases: Dict[str, str] = {}
+        self.origin = 0  # day number (days since epoch) of column 0
+        self.sums = np.zeros((0, 0))
+        self.counts = np.zeros((0, 0), dtype=np.int32)
+        self._seen = np.zeros(0, dtype=np.uint64)
+        self._mtime = None
+        # Snapshot generation; its journal holds everything written since
+        self.generation = 0
+        self._journal_offset = 0
+        self._load()
+
+    # -- persistence ----------------------------------------------------------
+
+    def _file_mtime(self) -> Optional[int]:
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except OSError:
+            return None
+
+    def _journal_path(self, generation: Optional[int] = None) -> str:
+        return f"{self.path}.{self.generation if generation is None else generation}.journal"
+
+    def _load(self):
+        """Pick up a newer snapshot, then any journal lines written since the last read"""
+        mtime = self._file_mtime()
+        if mtime is not None and mtime != self._mtime:
+            try:
+                with np.load(self.path, allow_pickle=False) as data:
+                    self.entities = [str(e) for e in data["entities"]]
+                    self._rows = {entity: row for row, entity in enumerate(self.entities)}
+                    self.aliases = dict(zip((str(a) for a in data["alias_names"]), (str(s) for s in data["alias_symbols"])))
+                    self.origin = int(data["origin"])
+                    self.sums = data["sums"]
+                    self.counts = data["counts"]
+                    self._seen = data["seen"]
+                    self.generation = int(data["generation"]) if "generation" in data.files else 0
+                self._mtime = mtime
+                self._journal_offset = 0
+            except Exception as e:
+                logging.error(f"Error loading sentiment store {self.path}: {str(e)}")
+        self._replay()
+
+    def _replay(self):
+        try:
+            with open(self._journal_path(), "rb") as f:
+                f.seek(self._journal_offset)
+                tail = f.read()
+        except FileNotFoundError:
+            return
+        # A line still being appended by another writer is read next time
+        complete = tail[:tail.rfind(b"\n") + 1]
+        for line in complete.splitlines():
+            try:
+                self._apply(json.loads(line))
+            except Exception as e:
+                logging.error(f"Skipping bad sentiment journal line: {str(e)}")
+        self._journal_offset += len(complete)
+
+    def _append(self, entry: Dict[str, Any]):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self._journal_path(), "ab") as f:
+            f.write(json.dumps(entry, separators=(",", ":")).encode("utf-8") + b"\n")
+            size = f.tell()
+        if size > self.journal_max_bytes:
+            self._checkpoint()
+
+    def _checkpoint(self):
+        """Write everything to a new snapshot generation and drop the old journal"""
+        self._replay()
+        old_journal = self._journal_path()
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp.npz"
+        np.savez(
+            tmp_path,
+            entities=np.array(self.entities, dtype=str),
+            alias_names=np.array(list(self.aliases), dtype=str),
+            alias_symbols=np.array(list(self.aliases.values()), dtype=str),
+            origin=np.int64(self.origin),
+            sums=self.sums,
+            counts=self.counts,
+            seen=self._seen,
+            generation=np.int64(self.generation + 1)
+        )
+        os.replace(tmp_path, self.path)
+        self.generation += 1
+        self._journal_offset = 0
+        self._mtime = self._file_mtime()
+        try:
+            os.unlink(old_journal)
+        except FileNotFoundError:
+            pass
+
+    # -- layout ---------------------------------------------------------------
+
+    @staticmethod
+    def normalize_symbol(symbol: str) -> str:
+        return str(symbol).strip().upper()
+
+    def _row(self, symbol: str) -> int:
+        row = self._rows.get(symbol)
+        if row is None:
+            row = self._rows[symbol] = len(self.entities)
+            self.entities.append(symbol)
+            # The symbol without exchange suffix is a natural alias (RELIANCE.NS -> reliance)
+            self.aliases.setdefault(symbol.split(".")[0].lower(), symbol)
+        return row
+
+    def _grow(self, rows: int, first_day: int, last_day: int):
+        """Resize the matrices to cover `rows` entities and the day range"""
+        if self.sums.shape[1] == 0:
+            self.origin = first_day
+        start = min(self.origin, first_day)
+        end = max(self.origin + self.sums.shape[1] - 1, last_day)
+        width = end - start + 1
+        if rows == self.sums.shape[0] and start == self.origin and width == self.sums.shape[1]:
+            return
+        sums = np.zeros((rows, width))
+        counts = np.zeros((rows, width), dtype=np.int32)
+        offset = self.origin - start
+        sums[:self.sums.shape[0], offset:offset + self.sums.shape[1]] = self.sums
+        counts[:self.counts.shape[0], offset:offset + self.counts.shape[1]] = self.counts
+        self.sums, self.counts, self.origin = sums, counts, start
+
+    # -- writes ---------------------------------------------------------------
+
+    def _apply(self, entry: Dict[str, Any]) -> int:
+        """
+        Add one journal entry to the aggregates, skipping articles already seen
+
+        Returns:
+            Number of (entity, article) observations added
+        """
+        rows, days, scores = [], [], []
+        fresh = []
+        for url_hash, observations in entry.get("articles", []):
+            url_hash = np.uint64(url_hash)
+            position = np.searchsorted(self._seen, url_hash)
+            if position < self._seen.size and self._seen[position] == url_hash:
+                continue
+            fresh.append(url_hash)
+            for symbol, day, score in observations:
+                rows.append(self._row(symbol))
+                days.append(day)
+                scores.append(score)
+        for name, symbol in entry.get("aliases", {}).items():
+            self.aliases.setdefault(name, symbol)
+        if fresh:
+            self._seen = np.union1d(self._seen, np.array(fresh, dtype=np.uint64))
+        if rows:
+            days_arr = np.asarray(days, dtype=np.int64)
+            self._grow(len(self.entities), int(days_arr.min()), int(days_arr.max()))
+            np.add.at(self.sums, (rows, days_arr - self.origin), scores)
+            np.add.at(self.counts, (rows, days_arr - self.origin), 1)
+        return len(rows)
+
+    def ingest_articles(self, articles: Iterable[Dict[str, Any]]) -> int:
+        """
+        Add Marketaux articles to the aggregates
+
+        Each entity of an article contributes its own sentiment_score when
+        present, otherwise the article's sentiment score. Articles whose URL
+        has been seen before, or dated outside the kept day range, are skipped.
+        Does file I/O: call it off the event loop.
+
+        Returns:
+            Number of (entity, article) observations added
+        """
+        today = int(np.datetime64(int(time.time()), "s").astype("datetime64[D]").astype(np.int64))
+        with self._lock:
+            # Another instance (or process) may have written since we last read
+            self._load()
+            entry: Dict[str, Any] = {"articles": [], "aliases": {}}
+            seen_now = set()
+            for article in articles:
+                url = article.get("url")
+                day = to_period(article.get("published_at"))
+                if not url or day is None:
+                    continue
+                day = int(day.astype(np.int64))
+                if not today - self.max_age_days <= day <= today + 1:
+                    continue
+                url_hash = _url_hash(url)
+                position = np.searchsorted(self._seen, url_hash)
+                if url_hash in seen_now or (position < self._seen.size and self._seen[position] == url_hash):
+                    continue
+                seen_now.add(url_hash)
+
+                observations = []
+                article_score = to_number((article.get("sentiment") or {}).get("score"))
+                for entity in article.get("entities") or []:
+                    symbol = entity.get("symbol")
+                    score = to_number(entity.get("sentiment_score"))
+                    score = article_score if score is None else score
+                    if not symbol or score is None:
+                        continue
+                    symbol = self.normalize_symbol(symbol)
+                    name = str(entity.get("name") or "").strip().lower()
+                    if name and name not in self.aliases:
+                        entry["aliases"].setdefault(name, symbol)
+                    observations.append([symbol, day, score])
+                entry["articles"].append([int(url_hash), observations])
+
+            if not entry["articles"]:
+                return 0
+            added = self._apply(entry)
+            self._append(entry)
+            return added
+
+    def safe_ingest(self, articles: Iterable[Dict[str, Any]]) -> int:
+        """Ingest articles, logging instead of raising so fetches never fail on storage errors"""
+        try:
+            return self.ingest_articles(articles)
+        except Exception as e:
+            logging.error(f"Error storing sentiment aggregates: {str(e)}")
+            return 0
+
+    # -- reads ----------------------------------------------------------------
+
+    def resolve(self, name: Optional[str]) -> Optional[str]:
+        """Map a symbol or company name to a stored entity symbol"""
+        if not name:
+            return None
+        symbol = self.normalize_symbol(name)
+        if symbol in self._rows:
+            return symbol
+        return self.aliases.get(" ".join(str(name).lower().split()))
+
+    def latest_day(self) -> Optional[np.datetime64]:
+        """Most recent day with any sentiment observation"""
+        if not self.counts.size:
+            return None
+        active = np.flatnonzero(self.counts.any(axis=0))
+        return np.datetime64(int(self.origin + active[-1]), "D") if active.size else None
+
+    def summarize(self, symbols: List[str], window: int = 7, as_of: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Rolling sentiment for several entities
+
+        Args:
+            symbols: Entity symbols (or names, resolved through aliases)
+            window: Rolling window in days
+            as_of: Last day of the window (defaults to the latest day with data)
+
+        Returns:
+            Dictionary mapping each resolved symbol to mean, count, previous-window
+            mean and momentum (mean minus previous mean); means are None without articles
+
+        Raises:
+            ValueError: If as_of cannot be parsed
+        """
+        last = to_bound(as_of)
+        with self._lock:
+            self._load()
+            resolved = [s for s in dict.fromkeys(self.resolve(s) for s in symbols) if s]
+            end_day = np.datetime64(last, "D") if last is not None else self.latest_day()
+            if not resolved or end_day is None:
+                return {}
+
+            rows = np.array([self._rows[s] for s in resolved])
+            # Cumulative sums with a leading zero column make any window sum two lookups
+            sums = np.concatenate([np.zeros((rows.size, 1)), np.cumsum(self.sums[rows], axis=1)], axis=1)
+            counts = np.concatenate([np.zeros((rows.size, 1)), np.cumsum(self.counts[rows], axis=1)], axis=1)
+            origin = self.origin
+
+        def window_totals(last_day: int):
+            hi = int(np.clip(last_day - origin + 1, 0, sums.shape[1] - 1))
+            lo = int(np.clip(last_day - window - origin + 1, 0, sums.shape[1] - 1))
+            return sums[:, hi] - sums[:, lo], counts[:, hi] - counts[:, lo]
+
+        end = int(end_day.astype(np.int64))
+        current_sum, current_count = window_totals(end)
+        previous_sum, previous_count = window_totals(end - window)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            mean = np.where(current_count > 0, current_sum / current_count, np.nan)
+            previous_mean = np.where(previous_count > 0, previous_sum / previous_count, np.nan)
+        momentum = mean - previous_mean
+
+        def clean(value: float) -> Optional[float]:
+            return None if np.isnan(value) else round(float(value), 4)
+
+        return {
+            symbol: {
+                "as_of": str(end_day),
+                "window_days": window,
+                "mean": clean(mean[i]),
+                "count": int(current_count[i]),
+                "previous_mean": clean(previous_mean[i]),
+                "previous_count": int(previous_count[i]),
+                "momentum": clean(momentum[i]),
+            }
+            for i, symbol in enumerate(resolved)
+        }
+
+    def daily(self, symbol: str, start: Optional[str] = None, end: Optional[str] = None) -> Dict[str, List[Any]]:
+        """
+        Daily mean score and article count for one entity over the days with articles
+
+        Raises:
+            ValueError: If start or end cannot be parsed
+        """
+        first, last = to_bound(start), to_bound(end)
+        with self._lock:
+            self._load()
+            resolved = self.resolve(symbol)
+            if resolved is None or not self.counts.size:
+                return {"dates": [], "mean": [], "count": []}
+            counts = self.counts[self._rows[resolved]]
+            sums = self.sums[self._rows[resolved]]
+            days = np.arange(counts.size) + self.origin
+        mask = counts > 0
+        if first is not None:
+            mask &= days >= first
+        if last is not None:
+            mask &= days <= last
+        means = sums[mask] / counts[mask]
+        return {
+            "dates": [str(d) for d in days[mask].astype("datetime64[D]")],
+            "mean": [round(float(m), 4) for m in means],
+            "count": [int(c) for c in counts[mask]],
+        }
+
+    def top_entities(self, limit: int = 20) -> List[str]:
+        """Entities with the most articles overall"""
+        with self._lock:
+            self._load()
+            if not self.counts.size:
+                return []
+            totals = self.counts.sum(axis=1)
+            order = np.argsort(-totals, kind="stable")[:limit]
+            return [self.entities[i] for i in order if totals[i] > 0]
+
+    @staticmethod
+    def format_table(summary: Dict[str, Dict[str, Any]]) -> str:
+        """Render a summarize() result as a compact pipe table for prompts"""
+        if not summary:
+            return ""
+
+        def cell(value) -> str:
+            return "n/a" if value is None else f"{value:+.2f}"
+
+        first = next(iter(summary.values()))
+        lines = [
+            f"News sentiment by entity, {first['window_days']}-day window ending {first['as_of']} (scores -1 to +1)",
+            "| Entity | Articles | Mean | Prior articles | Prior mean | Momentum |",
+            "|---|---|---|---|---|---|",
+        ]
+        for symbol, row in summary.items():
+            lines.append(
+                f"| {symbol} | {row['count']} | {cell(row['mean'])} | {row['previous_count']} | "
+                f"{cell(row['previous_mean'])} | {cell(row['momentum'])} |"
+            )
+        return "\n".join(lines)
@@ -0,0 +1,280 @@
+"""
+Export and restore snapshots of the vector index
+
+A snapshot is a directory with:
+
+    vectors.npy     float32 matrix, one row per vector
+    records.jsonl   one line per row, in the same order: id, index metadata
+                    and (optionally) the document store entry
+    manifest.json   format, embedding model, dimension, count and checksums
+
+Restoring upserts the stored vectors in parallel batches (no re-embedding)
+and writes the document store entries back, so the target must use the same
+embedding model.
+
+Usage:
+    python -m app.data.snapshot export snapshots/2025-04-12
+    python -m app.data.snapshot restore snapshots/2025-04-12
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+import numpy as np
+from app.core.config import settings
+from app.core.metrics import span
+
+SNAPSHOT_FORMAT = 1
+VECTORS_FILE = "vectors.npy"
+RECORDS_FILE = "records.jsonl"
+MANIFEST_FILE = "manifest.json"
+# Vectors per fetch call when exporting
+EXPORT_BATCH_SIZE = 100
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def read_manifest(path: str) -> Dict[str, Any]:
+    with open(os.path.join(path, MANIFEST_FILE), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def verify(path: str) -> Dict[str, Any]:
+    """
+    Check a snapshot's files against its manifest
+
+    Returns:
+        The manifest
+
+    Raises:
+        ValueError: If a file is missing, corrupt or inconsistent with the manifest
+    """
+    manifest = read_manifest(path)
+    if manifest.get("format") != SNAPSHOT_FORMAT:
+        raise ValueError(f"Unsupported snapshot format {manifest.get('format')}")
+    for name, checksum in manifest["files"].items():
+        file_path = os.path.join(path, name)
+        if not os.path.exists(file_path) or file_sha256(file_path) != checksum:
+            raise ValueError(f"Snapshot file {name} is missing or does not match its checksum")
+    vectors = np.load(os.path.join(path, VECTORS_FILE), mmap_mode="r")
+    if vectors.shape != (manifest["count"], manifest["dimension"]):
+        raise ValueError(f"Snapshot vectors have shape {vectors.shape}, manifest says "
+                         f"({manifest['count']}, {manifest['dimension']})")
+    return manifest
+
+
+class SnapshotManager:
+    """Exports the vector index (and document store) to a snapshot directory and restores it"""
+
+    def __init__(self, retrieval_service, concurrency: Optional[int] = None):
+        self.retrieval_service = retrieval_service
+        self.document_store = retrieval_service.document_store
+        self.concurrency = concurrency or settings.VECTOR_UPSERT_CONCURRENCY
+
+    async def export(self, path: str, include_documents: bool = True) -> Dict[str, Any]:
+        """
+        Write every vector in the index to a snapshot directory
+
+        IDs are listed first so the vector file can be preallocated; vectors
+        are then fetched in concurrent batches and written to their rows.
+        Vectors deleted while the export runs are left out.
+
+        Args:
+            path: Directory to create (must not contain a snapshot already)
+            include_documents: Also store each vector's document store entry
+
+        Returns:
+            The manifest
+        """
+        if os.path.exists(os.path.join(path, MANIFEST_FILE)):
+            raise FileExistsError(f"A snapshot already exists in {path}")
+        os.makedirs(path, exist_ok=True)
+        started = time.perf_counter()
+        dimension = self.retrieval_service.dimension
+
+        with span("snapshot.export"):
+            ids = await self.retrieval_service.list_vector_ids()
+            vectors_path = os.path.join(path, VECTORS_FILE)
+            if ids:
+                vectors = np.lib.format.open_memmap(vectors_path, mode="w+", dtype=np.float32,
+                                                    shape=(len(ids), dimension))
+            else:
+                # Zero-length files cannot be memory-mapped
+                vectors = np.zeros((0, dimension), dtype=np.float32)
+            found = np.zeros(len(ids), dtype=bool)
+            batches = [ids[start:start + EXPORT_BATCH_SIZE] for start in range(0, len(ids), EXPORT_BATCH_SIZE)]
+            records: List[Optional[List[str]]] = [None] * len(batches)
+            slots = asyncio.Semaphore(self.concurrency)
+
+            async def export_batch(number: int):
+                async with slots:
+                    batch = batches[number]
+                    fetched = await self.retrieval_service.fetch_vectors(batch)
+                    documents = (await asyncio.to_thread(self.document_store.get_many, batch)
+                                 if include_documents else {})
+                lines = []
+                for offset, vec_id in enumerate(batch):
+                    vector = fetched.get(vec_id)
+                    if vector is None:
+                        continue
+                    row = number * EXPORT_BATCH_SIZE + offset
+                    vectors[row] = np.asarray(vector["values"], dtype=np.float32)
+                    found[row] = True
+                    record = {"id": vec_id, "metadata": dict(vector["metadata"] or {})}
+                    if include_documents:
+                        record["document"] = documents.get(vec_id)
+                    lines.append(json.dumps(record, default=str) + "\n")
+                records[number] = lines
+
+            await asyncio.gather(*(export_batch(number) for number in range(len(batches))))
+            if ids:
+                vectors.flush()
+            else:
+                np.save(vectors_path, vectors)
+            del vectors
+
+            with open(os.path.join(path, RECORDS_FILE), "w", encoding="utf-8") as f:
+                for lines in records:
+                    f.writelines(lines)
+
+            count = int(found.sum())
+            if count < len(ids):
+                # Some vectors disappeared between listing and fetching; drop their rows
+                logging.warning(f"{len(ids) - count} vectors were deleted during the export")
+                kept = np.load(vectors_path, mmap_mode="r")[found]
+                np.save(vectors_path, kept)
+
+            manifest = {
+                "format": SNAPSHOT_FORMAT,
+                "created_at": datetime.now(timezone.utc).isoformat(),
+                "index_name": settings.PINECONE_INDEX_NAME,
+                "embedding_model": settings.EMBEDDING_MODEL,
+                "dimension": dimension,
+                "metric": "cosine",
+                "count": count,
+                "includes_documents": include_documents,
+                "files": {name: file_sha256(os.path.join(path, name)) for name in (VECTORS_FILE, RECORDS_FILE)},
+            }
+            with open(os.path.join(path, MANIFEST_FILE), "w", encoding="utf-8") as f:
+                json.dump(manifest, f, indent=2)
+
+        logging.info(f"Exported {count} vectors to {path} in {time.perf_counter() - started:.1f}s")
+        return manifest
+
+    async def restore(self, path: str, documents: bool = True, force: bool = False) -> Dict[str, Any]:
+        """
+        Load a snapshot into the index with parallel batched upserts
+
+        Args:
+            path: Snapshot directory
+            documents: Also write the stored document entries back to the document store
+            force: Restore even if the snapshot was made with a different embedding model
+
+        Returns:
+            Counts of restored vectors and documents and the time taken
+
+        Raises:
+            ValueError: If the snapshot is corrupt or does not fit this index
+        """
+        started = time.perf_counter()
+        manifest = await asyncio.to_thread(verify, path)
+        if manifest["dimension"] != self.retrieval_service.dimension:
+            raise ValueError(f"Snapshot dimension {manifest['dimension']} does not match the index "
+                             f"dimension {self.retrieval_service.dimension}")
+        if manifest["embedding_model"] != settings.EMBEDDING_MODEL and not force:
+            raise ValueError(f"Snapshot was made with {manifest['embedding_model']}, this app uses "
+                             f"{settings.EMBEDDING_MODEL}; pass force to restore anyway")
+
+        vectors = np.load(os.path.join(path, VECTORS_FILE), mmap_mode="r")
+        batch_size = settings.UPSERT_BATCH_SIZE
+        slots = asyncio.Semaphore(self.concurrency)
+        restored_documents = 0
+
+        async def restore_batch(start: int, records: List[Dict[str, Any]]):
+            nonlocal restored_documents
+            try:
+                rows = np.asarray(vectors[start:start + len(records)])
+                await self.retrieval_service.upsert_vectors([
+                    (record["id"], row.tolist(), record["metadata"]) for record, row in zip(records, rows)
+                ])
+                entries = [
+                    {"id": record["id"], **record["document"]} for record in records if record.get("document")
+                ] if documents else []
+                if entries:
+                    written = await asyncio.to_thread(self.document_store.put_many, entries)
+                    restored_documents += written
+            finally:
+                slots.release()
+
+        tasks = []
+        with span("snapshot.restore"):
+            try:
+                with open(os.path.join(path, RECORDS_FILE), encoding="utf-8") as f:
+                    batch: List[Dict[str, Any]] = []
+                    start = 0
+                    for line in f:
+                        batch.append(json.loads(line))
+                        if len(batch) == batch_size:
+                            # At most `concurrency` batches are read ahead of the upserts
+                            await slots.acquire()
+                            tasks.append(asyncio.create_task(restore_batch(start, batch)))
+                            start += len(batch)
+                            batch = []
+                    if batch:
+                        await slots.acquire()
+                        tasks.append(asyncio.create_task(restore_batch(start, batch)))
+                await asyncio.gather(*tasks)
+            finally:
+                for task in tasks:
+                    task.cancel()
+
+        result = {
+            "vectors": manifest["count"],
+            "documents": restored_documents,
+            "duration_seconds": round(time.perf_counter() - started, 3),
+        }
+        logging.info(f"Restored {result['vectors']} vectors and {restored_documents} documents from {path} "
+                     f"in {result['duration_seconds']}s")
+        return result
+
+
+async def main_async(args) -> int:
+    from app.services.retrieval_service import RetrievalService
+
+    manager = SnapshotManager(RetrievalService(), concurrency=args.concurrency)
+    if args.command == "export":
+        manifest = await manager.export(args.path, include_documents=not args.no_documents)
+        print(json.dumps(manifest, indent=2))
+    else:
+        result = await manager.restore(args.path, documents=not args.no_documents, force=args.force)
+        print(json.dumps(result, indent=2))
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["export", "restore"])
+    parser.add_argument("path", help="Snapshot directory")
+    parser.add_argument("--no-documents", action="store_true",
+                        help="Leave out (export) or skip (restore) the document store entries")
+    parser.add_argument("--force", action="store_true", help="Restore a snapshot made with another embedding model")
+    parser.add_argument("--concurrency", type=int, help="Parallel fetch/upsert batches (default VECTOR_UPSERT_CONCURRENCY)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    sys.exit(asyncio.run(main_async(args)))
+
+
+if __name__ == "__main__":
+    main()
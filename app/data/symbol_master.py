@@ -0,0 +1,338 @@
+import bisect
+import csv
+import json
+import logging
+import os
+import re
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from app.core.config import settings
+
+# Trailing words that don't distinguish companies ("Reliance Industries Ltd" == "Reliance Industries")
+NAME_SUFFIXES = {"ltd", "limited", "inc", "corp", "corporation", "plc", "co", "company", "pvt", "private", "ns", "bo"}
+# Identifier fields of an entry; an exact match on any of them resolves the entry
+CODE_FIELDS = ("stock_id", "nse", "bse", "isin", "ticker_id")
+FIELDS = ("name", "query") + CODE_FIELDS
+# Most rejected names remembered at once (the oldest are forgotten first)
+MAX_FAILURES = 10000
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+def normalize(text: Optional[str]) -> str:
+    """Lowercase words of a name or code without punctuation and corporate suffixes"""
+    tokens = _TOKEN.findall(str(text or "").lower())
+    while len(tokens) > 1 and tokens[-1] in NAME_SUFFIXES:
+        tokens.pop()
+    return " ".join(tokens)
+
+
+def trigrams(text: str) -> set:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class SymbolMaster:
+    """
+    Local index of companies: names, aliases, NSE/BSE codes, ISINs and stock IDs
+
+    Resolves free-text names and codes to the name and stock ID the Indian
+    Stock API accepted before, so the same company is always requested (and
+    cached) under one key, and remembers names the API rejected so they are
+    not sent again for a while. Entries are learned from stock payloads
+    (including their peer lists) and successful forecast calls, and can be
+    seeded from a CSV file.
+
+    Autocomplete uses a sorted key array searched with bisect for prefixes of
+    the full name or any of its words, falling back to trigram similarity for
+    misspellings. Entries are persisted to a JSON file, which other instances
+    pick up on their next lookup.
+    """
+
+    def __init__(self, path: Optional[str] = None, seed_path: Optional[str] = None):
+        self.path = path or settings.SYMBOL_MASTER_PATH
+        self._lock = threading.Lock()
+        self.entries: List[Dict[str, Any]] = []
+        self._exact: Dict[str, int] = {}
+        self._prefix_keys: List[Tuple[str, int, float]] = []
+        self._trigrams: Dict[str, List[int]] = {}
+        self._stale = True
+        self._unsaved = False
+        self._failures: Dict[str, float] = {}
+        self._mtime = None
+        self._load()
+        seed_path = settings.SYMBOL_MASTER_SEED_PATH if seed_path is None else seed_path
+        if seed_path and os.path.exists(seed_path):
+            self.import_csv(seed_path)
+
+    # -- persistence ----------------------------------------------------------
+
+    def _file_mtime(self) -> Optional[int]:
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except OSError:
+            return None
+
+    def _load(self):
+        mtime = self._file_mtime()
+        if mtime is None or mtime == self._mtime:
+            return
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                entries = json.load(f)["symbols"]
+            self.entries = [{**{field: None for field in FIELDS}, "aliases": [], **entry} for entry in entries]
+            self._mtime = mtime
+            self._reindex()
+        except Exception as e:
+            logging.error(f"Error loading symbol master {self.path}: {str(e)}")
+
+    def _save(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"symbols": self.entries}, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+        self._mtime = self._file_mtime()
+
+    # -- indexing -------------------------------------------------------------
+
+    def _keys(self, entry: Dict[str, Any]) -> List[Tuple[str, bool]]:
+        """(normalized key, is_code) pairs an entry can be found by"""
+        keys = [(normalize(entry.get(field)), True) for field in CODE_FIELDS]
+        keys += [(normalize(text), False) for text in [entry.get("name"), entry.get("query")] + entry["aliases"]]
+        return [(key, is_code) for key, is_code in keys if key]
+
+    def _register(self, position: int):
+        for key, _ in self._keys(self.entries[position]):
+            self._exact.setdefault(key, position)
+        self._stale = True
+
+    def _reindex(self):
+        exact: Dict[str, int] = {}
+        # Codes win over names when a key is claimed by more than one entry
+        for want_code in (True, False):
+            for position, entry in enumerate(self.entries):
+                for key, is_code in self._keys(entry):
+                    if is_code == want_code:
+                        exact.setdefault(key, position)
+        self._exact = exact
+        self._stale = True
+
+    def _reindex_search(self):
+        prefix_keys = set()
+        grams: Dict[str, List[int]] = {}
+        for position, entry in enumerate(self.entries):
+            for key, is_code in self._keys(entry):
+                prefix_keys.add((key, position, 1.0))
+                if not is_code:
+                    words = key.split(" ")
+                    # Later words of a name match with a lower score ("industries" -> Reliance Industries)
+                    prefix_keys.update((" ".join(words[i:]), position, 0.8) for i in range(1, len(words)))
+            for gram in trigrams(normalize(entry.get("name"))):
+                grams.setdefault(gram, []).append(position)
+        self._prefix_keys = sorted(prefix_keys)
+        self._trigrams = grams
+        self._stale = False
+
+    def _find(self, entry: Dict[str, Any]) -> Optional[int]:
+        """Position of the stored entry sharing a code (or, failing that, a name) with entry"""
+        for want_code in (True, False):
+            for key, is_code in self._keys(entry):
+                if is_code == want_code and key in self._exact:
+                    return self._exact[key]
+        return None
+
+    def add(self, name: str, query: Optional[str] = None, aliases: Iterable[str] = (), **codes) -> Dict[str, Any]:
+        """
+        Add a company or fill in missing fields of the entry it matches
+
+        Args:
+            name: Display name
+            query: Name the stock API accepts (defaults to name)
+            aliases: Other names the company is known by
+            **codes: Any of stock_id, nse, bse, isin, ticker_id
+
+        Returns:
+            The stored entry
+        """
+        with self._lock:
+            self._load()
+            entry = self._merge(name, query, aliases, codes)
+            self._save_if_changed()
+            return dict(entry)
+
+    def _save_if_changed(self):
+        if self._unsaved:
+            self._save()
+            self._unsaved = False
+
+    def _merge(self, name: str, query: Optional[str], aliases: Iterable[str],
+               codes: Dict[str, Any]) -> Dict[str, Any]:
+        candidate = {"name": name, "query": query or name, "aliases": [a for a in aliases if a]}
+        candidate.update({field: str(codes[field]) for field in CODE_FIELDS if codes.get(field)})
+        position = self._find({**{field: None for field in FIELDS}, **candidate})
+        if position is None:
+            self.entries.append({**{field: None for field in FIELDS}, **candidate})
+            self._register(len(self.entries) - 1)
+            self._unsaved = True
+            return self.entries[-1]
+        entry = self.entries[position]
+        for field in FIELDS:
+            if not entry.get(field) and candidate.get(field):
+                entry[field] = candidate[field]
+                self._unsaved = True
+        known = {normalize(text) for text in [entry["name"], entry["query"]] + entry["aliases"]}
+        for alias in [name] + candidate["aliases"]:
+            if normalize(alias) and normalize(alias) not in known:
+                entry["aliases"].append(alias)
+                known.add(normalize(alias))
+                self._unsaved = True
+        if self._unsaved:
+            self._register(position)
+        return entry
+
+    def import_csv(self, path: str) -> int:
+        """
+        Merge companies from a CSV file
+
+        Columns: name, and optionally query, stock_id, nse, bse, isin,
+        ticker_id and aliases ("|"-separated). Returns the number of rows read.
+        """
+        rows = 0
+        with open(path, newline="", encoding="utf-8") as f, self._lock:
+            self._load()
+            for row in csv.DictReader(f):
+                if not (row.get("name") or "").strip():
+                    continue
+                codes = {field: (row.get(field) or "").strip() for field in CODE_FIELDS}
+                aliases = [alias.strip() for alias in (row.get("aliases") or "").split("|")]
+                self._merge(row["name"].strip(), (row.get("query") or "").strip() or None, aliases, codes)
+                rows += 1
+            self._save_if_changed()
+        logging.info(f"Imported {rows} symbols from {path}")
+        return rows
+
+    def learn_stock(self, query: str, payload: Dict[str, Any]):
+        """Record the company (and its peers) from a successful stock lookup made with `query`"""
+        profile = payload.get("companyProfile") or {}
+        with self._lock:
+            self._load()
+            self._merge(
+                payload.get("companyName") or query, query, [query],
+                {"nse": profile.get("exchangeCodeNse"), "bse": profile.get("exchangeCodeBse"),
+                 "isin": profile.get("isInId")}
+            )
+            for peer in profile.get("peerCompanyList") or []:
+                if peer.get("companyName"):
+                    self._merge(peer["companyName"], None, (), {"ticker_id": peer.get("tickerId")})
+            self._save_if_changed()
+
+    def learn_stock_id(self, text: str, stock_id: str):
+        """Record that forecasts for the company `text` resolves to were served under stock_id"""
+        with self._lock:
+            self._load()
+            position = self._exact.get(normalize(text))
+            if position is not None and not self.entries[position].get("stock_id"):
+                self.entries[position]["stock_id"] = stock_id
+                self._register(position)
+                self._save()
+
+    # -- lookups --------------------------------------------------------------
+
+    def resolve(self, text: str) -> Optional[Dict[str, Any]]:
+        """Entry whose name, alias or code matches text exactly (after normalization)"""
+        self._load()
+        position = self._exact.get(normalize(text))
+        return dict(self.entries[position]) if position is not None else None
+
+    def stock_key(self, text: str) -> str:
+        """
+        Key a company's local series are stored under: the name the stock API
+        accepts for a known company (so stock data and forecasts asked for by
+        name, code or stock ID land together), else the text itself
+        """
+        entry = self.resolve(text)
+        return (entry.get("query") or entry.get("name")) if entry else text
+
+    def search(self, text: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """
+        Autocomplete companies for a partial name or code
+
+        Exact matches score 1.0, prefixes of a name or code score up to 0.9
+        and prefixes of a later word up to 0.7; when that finds fewer than
+        `limit` companies, names sharing enough trigrams with the text are
+        added with their (lower) trigram similarity.
+        """
+        self._load()
+        if self._stale:
+            self._reindex_search()
+        query = normalize(text)
+        if not query or limit <= 0:
+            return []
+        scores: Dict[int, float] = {}
+        start = bisect.bisect_left(self._prefix_keys, (query,))
+        for key, position, weight in self._prefix_keys[start:]:
+            if not key.startswith(query):
+                break
+            # Shorter completions rank first
+            score = 1.0 if key == query and weight == 1.0 else weight * (0.9 - 0.4 * (1 - len(query) / len(key)))
+            scores[position] = max(scores.get(position, 0.0), score)
+
+        if len(scores) < limit and len(query) >= 3:
+            grams = trigrams(query)
+            shared: Dict[int, int] = {}
+            for gram in grams:
+                for position in self._trigrams.get(gram, ()):
+                    shared[position] = shared.get(position, 0) + 1
+            for position, count in shared.items():
+                if position in scores:
+                    continue
+                similarity = self._similarity(query, grams, self.entries[position]["name"])
+                if similarity >= settings.SYMBOL_FUZZY_MIN_SIMILARITY:
+                    scores[position] = round(0.5 * similarity, 4)
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], self.entries[item[0]]["name"]))[:limit]
+        return [{**self.entries[position], "score": round(score, 4)} for position, score in ranked]
+
+    @staticmethod
+    def _similarity(query: str, grams: set, name: str) -> float:
+        """Best trigram Jaccard similarity of the query to a run of as many words of the name"""
+        words = normalize(name).split(" ")
+        width = len(query.split(" "))
+        best = 0.0
+        for i in range(max(1, len(words) - width + 1)):
+            window = trigrams(" ".join(words[i:i + width]))
+            best = max(best, len(grams & window) / len(grams | window))
+        return best
+
+    # -- rejected names -------------------------------------------------------
+
+    def note_failure(self, text: str):
+        """Remember that the stock API rejected text, forgetting expired and (past MAX_FAILURES) the oldest names"""
+        now = time.monotonic()
+        key = normalize(text)
+        # Kept in the order they were noted, so expired names are at the front
+        self._failures.pop(key, None)
+        self._failures[key] = now
+        while self._failures:
+            name, failed_at = next(iter(self._failures.items()))
+            if now - failed_at <= settings.SYMBOL_FAILURE_TTL_SECONDS and len(self._failures) <= MAX_FAILURES:
+                break
+            del self._failures[name]
+
+    def recently_failed(self, text: str) -> bool:
+        """Whether the stock API rejected text within SYMBOL_FAILURE_TTL_SECONDS"""
+        failed_at = self._failures.get(normalize(text))
+        if failed_at is None:
+            return False
+        if time.monotonic() - failed_at > settings.SYMBOL_FAILURE_TTL_SECONDS:
+            del self._failures[normalize(text)]
+            return False
+        return True
+
+    def __len__(self) -> int:
+        self._load()
+        return len(self.entries)
@@ -0,0 +1,307 @@
+import logging
+import os
+import re
+import threading
+import time
+import numpy as np
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import quote, unquote
+from app.core.config import settings
+
+# One fixed-width record per observation; files are append-only
+RECORD_DTYPE = np.dtype([("period", "<i8"), ("value", "<f8"), ("ingested_at", "<i8")])
+
+Series = Tuple[np.ndarray, np.ndarray]
+
+_YEAR = re.compile(r"^\d{4}$")
+
+
+def to_period(value: Any) -> Optional[np.datetime64]:
+    """
+    Parse a period label into a day
+
+    Accepts ISO dates, "11 Apr 2025" style dates and bare years (mapped to the
+    31 March fiscal year end used by Indian companies). Returns None if the value
+    cannot be parsed.
+    """
+    if value is None:
+        return None
+    text = str(value).strip()
+    if _YEAR.match(text):
+        return np.datetime64(f"{text}-03-31", "D")
+    try:
+        return np.datetime64(text[:10], "D")
+    except ValueError:
+        pass
+    for fmt in ("%d %b %Y", "%b %Y", "%d-%m-%Y", "%m/%d/%Y"):
+        try:
+            return np.datetime64(datetime.strptime(text, fmt).date(), "D")
+        except ValueError:
+            continue
+    return None
+
+
+def to_bound(value: Optional[str]) -> Optional[int]:
+    """
+    Parse an optional start or end date of a query into a day number
+
+    Raises:
+        ValueError: If a date is given but cannot be parsed
+    """
+    if value is None or not str(value).strip():
+        return None
+    day = to_period(value)
+    if day is None:
+        raise ValueError(f"Unrecognised date: {value!r}")
+    return int(day.astype(np.int64))
+
+
+def to_number(value: Any) -> Optional[float]:
+    if isinstance(value, bool) or value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return float(str(value).replace(",", ""))
+    except ValueError:
+        return None
+
+
+class TimeSeriesStore:
+    """
+    Local columnar store for numeric series keyed by (stock_id, measure_code, period)
+
+    Each (stock_id, measure_code) pair is an append-only file of fixed-width
+    records that is memory-mapped on read. Re-ingesting an unchanged value is a
+    no-op; a changed value is appended and wins over older records for the
+    same period.
+    """
+
+    def __init__(self, root: Optional[str] = None):
+        self.root = root or settings.TIMESERIES_DIR
+        self._lock = threading.Lock()
+
+    # -- layout ---------------------------------------------------------------
+
+    @staticmethod
+    def normalize_stock_id(stock_id: str) -> str:
+        return " ".join(str(stock_id).lower().split())
+
+    def _stock_dir(self, stock_id: str) -> str:
+        return os.path.join(self.root, quote(self.normalize_stock_id(stock_id), safe=""))
+
+    def _path(self, stock_id: str, measure_code: str) -> str:
+        return os.path.join(self._stock_dir(stock_id), quote(measure_code, safe="") + ".bin")
+
+    def _read(self, path: str) -> np.ndarray:
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            return np.zeros(0, dtype=RECORD_DTYPE)
+        return np.memmap(path, dtype=RECORD_DTYPE, mode="r")
+
+    @staticmethod
+    def _latest(records: np.ndarray) -> np.ndarray:
+        """Sort by period and keep the last written record for each period"""
+        if records.size == 0:
+            return np.zeros(0, dtype=RECORD_DTYPE)
+        order = np.argsort(records["period"], kind="stable")
+        ordered = records[order]
+        last = np.ones(ordered.size, dtype=bool)
+        last[:-1] = ordered["period"][1:] != ordered["period"][:-1]
+        return np.ascontiguousarray(ordered[last])
+
+    # -- writes ---------------------------------------------------------------
+
+    def append(self, stock_id: str, measure_code: str, periods: Iterable, values: Iterable) -> int:
+        """
+        Append observations for one series, skipping values that are already stored
+
+        Args:
+            stock_id: Stock identifier
+            measure_code: Measure code, e.g. "annual.INC.Revenue" or "price.NSE"
+            periods: Period labels or datetime64 values
+            values: Numeric values
+
+        Returns:
+            Number of records written
+        """
+        parsed = [(to_period(p), to_number(v)) for p, v in zip(periods, values)]
+        parsed = [(p, v) for p, v in parsed if p is not None and v is not None and np.isfinite(v)]
+        if not parsed:
+            return 0
+
+        incoming = np.zeros(len(parsed), dtype=RECORD_DTYPE)
+        incoming["period"] = np.array([p for p, _ in parsed], dtype="datetime64[D]").astype(np.int64)
+        incoming["value"] = [v for _, v in parsed]
+        incoming["ingested_at"] = int(time.time())
+        incoming = self._latest(incoming)
+
+        path = self._path(stock_id, measure_code)
+        with self._lock:
+            existing = self._latest(self._read(path))
+            if existing.size:
+                # Drop observations identical to what is already stored
+                pos = np.searchsorted(existing["period"], incoming["period"])
+                pos_clipped = np.minimum(pos, existing.size - 1)
+                same = (existing["period"][pos_clipped] == incoming["period"]) & \
+                       (existing["value"][pos_clipped] == incoming["value"])
+                incoming = incoming[~same]
+            if incoming.size == 0:
+                return 0
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "ab") as f:
+                f.write(incoming.tobytes())
+        return int(incoming.size)
+
+    def compact(self, stock_id: str, measure_code: str, dry_run: bool = False) -> int:
+        """Rewrite a series file without superseded records; returns records removed (or removable)"""
+        path = self._path(stock_id, measure_code)
+        with self._lock:
+            records = np.array(self._read(path))
+            latest = self._latest(records)
+            removed = records.size - latest.size
+            if removed and not dry_run:
+                tmp_path = f"{path}.tmp"
+                with open(tmp_path, "wb") as f:
+                    f.write(latest.tobytes())
+                os.replace(tmp_path, path)
+        return int(removed)
+
+    # -- reads ----------------------------------------------------------------
+
+    def stocks(self) -> List[str]:
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(unquote(name) for name in os.listdir(self.root))
+
+    def measures(self, stock_id: str) -> List[str]:
+        directory = self._stock_dir(stock_id)
+        if not os.path.isdir(directory):
+            return []
+        return sorted(unquote(name[:-4]) for name in os.listdir(directory) if name.endswith(".bin"))
+
+    def get_series(self, stock_id: str, measure_code: str,
+                   start: Optional[str] = None, end: Optional[str] = None) -> Series:
+        """
+        Read one series as contiguous arrays
+
+        Args:
+            stock_id: Stock identifier
+            measure_code: Measure code
+            start: First period to include (optional)
+            end: Last period to include (optional)
+
+        Returns:
+            Tuple of (periods as datetime64[D], values as float64), sorted by period
+
+        Raises:
+            ValueError: If start or end cannot be parsed
+        """
+        first, last = to_bound(start), to_bound(end)
+        records = self._latest(self._read(self._path(stock_id, measure_code)))
+        periods = records["period"]
+        mask = np.ones(periods.size, dtype=bool)
+        if first is not None:
+            mask &= periods >= first
+        if last is not None:
+            mask &= periods <= last
+        return periods[mask].astype("datetime64[D]"), np.ascontiguousarray(records["value"][mask])
+
+    def get_company(self, stock_id: str, start: Optional[str] = None,
+                    end: Optional[str] = None, prefix: str = "") -> Dict[str, Series]:
+        """Read every series of a company, optionally limited to measure codes with a prefix"""
+        # Reject bad bounds even for a company without stored series
+        to_bound(start), to_bound(end)
+        return {
+            measure: self.get_series(stock_id, measure, start, end)
+            for measure in self.measures(stock_id) if measure.startswith(prefix)
+        }
+
+    def get_panel(self, stock_ids: List[str], measure_code: str,
+                  start: Optional[str] = None, end: Optional[str] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Align one measure across companies
+
+        Returns:
+            Tuple of (union of periods as datetime64[D], matrix of shape
+            (len(stock_ids), len(periods)) with NaN where a company has no value)
+        """
+        series = [self.get_series(stock_id, measure_code, start, end) for stock_id in stock_ids]
+        periods = np.unique(np.concatenate([p for p, _ in series])) if series else np.zeros(0, "datetime64[D]")
+        matrix = np.full((len(stock_ids), periods.size), np.nan)
+        for row, (p, v) in enumerate(series):
+            matrix[row, np.searchsorted(periods, p)] = v
+        return periods, matrix
+
+    # -- ingestion ------------------------------------------------------------
+
+    def ingest_stock_data(self, stock_id: str, stock_data: Dict[str, Any], as_of: Optional[str] = None) -> int:
+        """
+        Store the numeric series contained in an Indian Stock API /stock payload
+
+        Statement line items become "<annual|interim>.<INC|BAL|CAS>.<key>" series by
+        period end date; the current exchange prices become "price.<exchange>" series
+        dated as_of (today by default).
+
+        Returns:
+            Number of records written
+        """
+        written = 0
+        by_measure: Dict[str, Tuple[List, List]] = {}
+        for statement in stock_data.get("financials") or []:
+            period = statement.get("EndDate")
+            period_type = str(statement.get("Type", "")).lower() or "unknown"
+            for section, items in (statement.get("stockFinancialMap") or {}).items():
+                for item in items or []:
+                    if to_number(item.get("value")) is None or not item.get("key"):
+                        continue
+                    periods, values = by_measure.setdefault(f"{period_type}.{section}.{item['key']}", ([], []))
+                    periods.append(period)
+                    values.append(item["value"])
+
+        as_of = as_of or datetime.now().strftime("%Y-%m-%d")
+        for exchange, price in (stock_data.get("currentPrice") or {}).items():
+            by_measure[f"price.{exchange}"] = ([as_of], [price])
+
+        for measure_code, (periods, values) in by_measure.items():
+            written += self.append(stock_id, measure_code, periods, values)
+        return written
+
+    def ingest_forecast_data(self, stock_id: str, measure_code: str, forecast_data: Any) -> int:
+        """
+        Store a /stock_forecasts payload
+
+        The payload is searched for objects that carry both a period-like field and a
+        numeric value field, so the different response layouts are handled uniformly.
+
+        Returns:
+            Number of records written
+        """
+        period_keys = ("period", "Period", "date", "Date", "EndDate", "fiscalYear", "FiscalYear", "year", "Year")
+        value_keys = ("value", "Value", "mean", "Mean", "estimate", "actual", "Actual")
+        periods, values = [], []
+
+        def walk(node):
+            if isinstance(node, dict):
+                period = next((node[k] for k in period_keys if k in node), None)
+                value = next((node[k] for k in value_keys if k in node), None)
+                if period is not None and to_number(value) is not None:
+                    periods.append(period)
+                    values.append(value)
+                for child in node.values():
+                    if isinstance(child, (dict, list)):
+                        walk(child)
+            elif isinstance(node, list):
+                for child in node:
+                    walk(child)
+
+        walk(forecast_data)
+        return self.append(stock_id, measure_code, periods, values)
+
+    def safe_ingest(self, method: str, *args, **kwargs) -> int:
+        """Run an ingest method, logging instead of raising so fetches never fail on storage errors"""
+        try:
+            return getattr(self, method)(*args, **kwargs)
+        except Exception as e:
+            logging.error(f"Error storing time series via {method}: {str(e)}")
+            return 0
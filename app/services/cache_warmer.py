@@ -0,0 +1,255 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Dict, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+from app.core.config import settings
+from app.core.metrics import span, WARMER_STEPS
+from app.data.access_stats import access_recording
+from app.data.symbol_master import normalize
+from app.services.llm_dispatcher import llm_priority, BATCH
+from app.services.report_generator import report_id_for
+from app.utils.deadline import deadline, remaining, within_deadline, DeadlineExceeded
+
+# Fetched document types recognised as already indexed by their article URL
+URL_KEYED_TYPES = ("news", "sentiment_news", "indian_stock_news")
+
+
+def next_run(now: datetime, schedule: str, weekdays_only: bool = True) -> datetime:
+    """First HH:MM `schedule` time after `now`, in now's timezone, optionally skipping weekends"""
+    hour, minute = (int(part) for part in schedule.split(":"))
+    at = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    if at <= now:
+        at += timedelta(days=1)
+    while weekdays_only and at.weekday() >= 5:
+        at += timedelta(days=1)
+    return at
+
+
+class CacheWarmer:
+    """
+    Warms caches for popular symbols before the market opens
+
+    One run, bounded by a time budget, takes the watchlist plus the symbols
+    requested most recently (by decayed count) and:
+
+    1. fetches their stock data and news through the data fetcher, filling
+       its upstream, time series and sentiment caches;
+    2. indexes only what is not stored yet (news by URL, stock data by
+       company and day);
+    3. embeds the default report queries into the query embedding cache;
+    4. with REPORT_CACHE_TTL_SECONDS set, generates the default report for
+       the first WARMER_MAX_REPORTS symbols at batch priority (refreshing a
+       stored one, so only sections whose support changed are regenerated).
+
+    Steps still running when the budget runs out are cut short and later
+    steps skipped; the run report says how far each step got. Lookups made
+    while warming are not counted as demand.
+    """
+
+    def __init__(self, report_generator, data_indexer, data_fetcher,
+                 watchlist: Optional[List[str]] = None,
+                 top_symbols: Optional[int] = None,
+                 budget_seconds: Optional[float] = None,
+                 concurrency: Optional[int] = None):
+        self.report_generator = report_generator
+        self.data_indexer = data_indexer
+        self.data_fetcher = data_fetcher
+        self.document_store = data_indexer.retrieval_service.document_store
+        self.watchlist = settings.WARMER_WATCHLIST if watchlist is None else watchlist
+        self.top_symbols = settings.WARMER_TOP_SYMBOLS if top_symbols is None else top_symbols
+        self.budget_seconds = budget_seconds or settings.WARMER_BUDGET_SECONDS
+        self.concurrency = concurrency or settings.WARMER_CONCURRENCY
+        self.last_report: Optional[Dict[str, Any]] = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._lock.locked()
+
+    def symbols(self) -> List[str]:
+        """Watchlist symbols followed by the most-requested others"""
+        chosen = {normalize(symbol): symbol for symbol in self.watchlist if normalize(symbol)}
+        popular = 0
+        for symbol, _ in self.data_fetcher.access_stats.top(self.top_symbols + len(chosen)):
+            if popular >= self.top_symbols:
+                break
+            if normalize(symbol) not in chosen:
+                chosen[normalize(symbol)] = symbol
+                popular += 1
+        return list(chosen.values())
+
+    @staticmethod
+    def report_query(symbol: str) -> str:
+        return settings.WARMER_REPORT_QUERY.format(symbol=symbol)
+
+    async def _step(self, name: str, steps: Dict[str, str], work: Awaitable[Any]) -> Any:
+        """Run one step within the budget, recording whether it completed"""
+        left = remaining()
+        if left is not None and left <= 0:
+            if asyncio.iscoroutine(work):
+                work.close()
+            steps[name] = "skipped"
+            WARMER_STEPS.inc(step=name, result="skipped")
+            return None
+        try:
+            with span(f"warmer.{name}"):
+                result = await within_deadline(work, f"warming step {name}")
+            steps[name] = "completed"
+            return result
+        except DeadlineExceeded:
+            steps[name] = "timed_out"
+            logging.warning(f"Cache warming step {name} ran out of budget")
+        except Exception as e:
+            steps[name] = "failed"
+            logging.error(f"Error in cache warming step {name}: {str(e)}")
+        finally:
+            WARMER_STEPS.inc(step=name, result=steps.get(name, "failed"))
+        return None
+
+    def _new_documents(self, documents: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Fetched documents that are not in the document store yet"""
+        by_url: Dict[str, List[str]] = {}
+        by_stock: Dict[str, List[str]] = {}
+        for doc in documents:
+            metadata = doc["metadata"]
+            if metadata.get("type") in URL_KEYED_TYPES and metadata.get("url"):
+                by_url.setdefault(metadata["type"], []).append(metadata["url"])
+            elif metadata.get("type") == "indian_stock_data" and metadata.get("stock_name"):
+                by_stock.setdefault(metadata.get("date"), []).append(metadata["stock_name"])
+        known: Dict[Tuple[str, Optional[str]], set] = {}
+        for doc_type, urls in by_url.items():
+            known[(doc_type, None)] = self.document_store.existing_values("url", urls, doc_type=doc_type)
+        for date, names in by_stock.items():
+            known[("indian_stock_data", date)] = self.document_store.existing_values(
+                "stock_name", names, doc_type="indian_stock_data", date=date
+            )
+        new = []
+        for doc in documents:
+            metadata = doc["metadata"]
+            if metadata.get("type") in URL_KEYED_TYPES:
+                if metadata.get("url") in known.get((metadata["type"], None), ()):
+                    continue
+            elif metadata.get("type") == "indian_stock_data":
+                if metadata.get("stock_name") in known.get(("indian_stock_data", metadata.get("date")), ()):
+                    continue
+            new.append(doc)
+        return new
+
+    async def _warm_report(self, symbol: str, slots: asyncio.Semaphore) -> Dict[str, Any]:
+        query = self.report_query(symbol)
+        report_id = report_id_for(query, "general", None, None)
+        result: Dict[str, Any] = {"symbol": symbol, "report_id": report_id}
+        async with slots:
+            try:
+                if await self.report_generator.get_report(report_id) is not None:
+                    report = await self.report_generator.refresh_report(report_id)
+                    result["status"] = "refreshed"
+                    result["regenerated_sections"] = len(report["refresh"]["regenerated"])
+                else:
+                    report = await self.report_generator.generate_report(query)
+                    result["status"] = "generated"
+                if report.get("partial"):
+                    result["status"] = "partial"
+            except DeadlineExceeded:
+                result["status"] = "timed_out"
+            except Exception as e:
+                logging.error(f"Error warming report for {symbol}: {str(e)}")
+                result["status"] = "failed"
+        return result
+
+    async def run(self, symbols: Optional[List[str]] = None,
+                  budget_seconds: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Warm caches once
+
+        Args:
+            symbols: Symbols to warm (defaults to the watchlist plus the most-requested symbols)
+            budget_seconds: Time budget for the whole run (defaults to WARMER_BUDGET_SECONDS)
+
+        Returns:
+            Report of each step's outcome and what it warmed
+        """
+        async with self._lock:
+            started = time.perf_counter()
+            budget = budget_seconds or self.budget_seconds
+            # Warming is not demand, and its LLM calls yield to interactive requests
+            recording_token = access_recording.set(False)
+            priority_token = llm_priority.set(BATCH)
+            steps: Dict[str, str] = {}
+            fetched: List[Dict[str, Any]] = []
+            counts = {"already_indexed": 0, "indexed": 0, "embeddings": 0}
+            reports: List[Dict[str, Any]] = []
+            try:
+                symbols = symbols or self.symbols()
+                with deadline(budget), span("warmer.run", symbols=len(symbols)):
+                    if symbols:
+                        async def fetch():
+                            async for doc in self.data_fetcher.iter_comprehensive_data(symbols):
+                                fetched.append(doc)
+                        await self._step("fetch", steps, fetch())
+
+                        async def index():
+                            new_documents = await asyncio.to_thread(self._new_documents, fetched)
+                            counts["already_indexed"] = len(fetched) - len(new_documents)
+                            counts["indexed"] = len(await self.data_indexer.index_documents(new_documents))
+                        await self._step("index", steps, index())
+
+                        async def embed():
+                            queries = [self.report_query(symbol) for symbol in symbols]
+                            if settings.REPORT_SECTION_RETRIEVAL:
+                                queries += [f"{query} {section}" for query in queries[:]
+                                            for section in settings.DEFAULT_REPORT_SECTIONS]
+                            await self.report_generator.retrieval_service.embed_queries(queries)
+                            counts["embeddings"] = len(queries)
+                        await self._step("embeddings", steps, embed())
+
+                        if settings.REPORT_CACHE_TTL_SECONDS > 0 and settings.WARMER_MAX_REPORTS > 0:
+                            async def generate():
+                                slots = asyncio.Semaphore(self.concurrency)
+                                tasks = [asyncio.ensure_future(self._warm_report(symbol, slots))
+                                         for symbol in symbols[:settings.WARMER_MAX_REPORTS]]
+                                try:
+                                    for finished in asyncio.as_completed(tasks):
+                                        reports.append(await finished)
+                                finally:
+                                    for task in tasks:
+                                        task.cancel()
+                            await self._step("reports", steps, generate())
+                        else:
+                            steps["reports"] = "skipped"
+                await asyncio.to_thread(self.data_fetcher.access_stats.save)
+            finally:
+                access_recording.reset(recording_token)
+                llm_priority.reset(priority_token)
+
+            report = {
+                "finished_at": datetime.now(timezone.utc).isoformat(),
+                "duration_seconds": round(time.perf_counter() - started, 3),
+                "budget_seconds": budget,
+                "symbols": symbols,
+                "steps": steps,
+                "fetched_documents": len(fetched),
+                "already_indexed_documents": counts["already_indexed"],
+                "indexed_documents": counts["indexed"],
+                "warmed_embeddings": counts["embeddings"],
+                "reports": reports,
+            }
+            self.last_report = report
+            logging.info(f"Cache warming finished in {report['duration_seconds']}s: {len(symbols)} symbols, "
+                         f"{counts['indexed']}/{len(fetched)} documents indexed, steps {steps}")
+            return report
+
+    async def run_forever(self):
+        """Warm caches at WARMER_SCHEDULE (WARMER_TIMEZONE) on every run day until cancelled"""
+        tz = ZoneInfo(settings.WARMER_TIMEZONE)
+        while True:
+            now = datetime.now(tz)
+            at = next_run(now, settings.WARMER_SCHEDULE, settings.WARMER_WEEKDAYS_ONLY)
+            logging.info(f"Next cache warming at {at.isoformat()}")
+            await asyncio.sleep((at - now).total_seconds())
+            try:
+                await self.run()
+            except Exception as e:
+                logging.error(f"Error during cache warming: {str(e)}")
@@ -0,0 +1,186 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+from app.core.config import settings
+from app.core.metrics import span, COMPACTION_DOCUMENTS_REMOVED, COMPACTION_RECLAIMED_BYTES
+from app.data.timeseries_store import TimeSeriesStore, RECORD_DTYPE
+from app.services.retrieval_service import RetrievalService
+
+# Bytes per vector component in the index (float32)
+VECTOR_COMPONENT_BYTES = 4
+
+
+class CompactionService:
+    """
+    Applies retention policies to the vector index, document store and time series
+
+    Documents of a type with a retention period are removed once their date is
+    older than that many days; documents of a type with supersede keys are
+    removed once a newer document with the same key has been indexed. Deletion
+    runs in batches, vectors first, so a failed run never leaves vectors whose
+    text is gone. Time series files are rewritten without superseded records.
+
+    Policies are applied through the document store, so vectors indexed
+    before it existed (with their text in the index metadata) are only
+    covered once a run with adopt_legacy has copied them into it.
+    """
+
+    def __init__(self,
+                 retrieval_service: RetrievalService,
+                 timeseries_store: Optional[TimeSeriesStore] = None,
+                 retention_days: Optional[Dict[str, int]] = None,
+                 supersede_keys: Optional[Dict[str, List[str]]] = None,
+                 batch_size: Optional[int] = None):
+        self.retrieval_service = retrieval_service
+        self.document_store = retrieval_service.document_store
+        self.timeseries_store = timeseries_store or TimeSeriesStore()
+        self.retention_days = settings.RETENTION_DAYS if retention_days is None else retention_days
+        self.supersede_keys = settings.RETENTION_SUPERSEDE_KEYS if supersede_keys is None else supersede_keys
+        self.batch_size = batch_size or settings.COMPACTION_BATCH_SIZE
+        self.last_report: Optional[Dict[str, Any]] = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._lock.locked()
+
+    async def _remove(self, select, doc_type: str, reason: str, dry_run: bool) -> Dict[str, int]:
+        """Delete the documents returned by select(limit) batch by batch"""
+        removed = reclaimed = 0
+        while True:
+            ids = await asyncio.to_thread(select, None if dry_run else self.batch_size)
+            if not ids:
+                break
+            reclaimed += await asyncio.to_thread(self.document_store.payload_bytes, ids)
+            removed += len(ids)
+            if dry_run:
+                break
+            await self.retrieval_service.delete_vectors(ids)
+            await asyncio.to_thread(self.document_store.delete_many, ids)
+            COMPACTION_DOCUMENTS_REMOVED.inc(len(ids), type=doc_type, reason=reason)
+            if len(ids) < self.batch_size:
+                break
+        return {"documents": removed, "document_bytes": reclaimed}
+
+    async def _adopt_legacy_vectors(self, dry_run: bool) -> int:
+        """
+        Copy vectors that have no document store row into the store, batch by batch
+
+        Their text and metadata are taken from the index metadata, where the
+        text was kept before the document store existed, so the retention
+        passes that follow can find them. Returns the number of such vectors.
+        """
+        ids = await self.retrieval_service.list_vector_ids()
+        adopted = 0
+        for start in range(0, len(ids), self.batch_size):
+            batch = ids[start:start + self.batch_size]
+            known = await asyncio.to_thread(self.document_store.existing_ids, batch)
+            missing = [vec_id for vec_id in batch if vec_id not in known]
+            if not missing:
+                continue
+            adopted += len(missing)
+            if dry_run:
+                continue
+            documents = []
+            for vec_id, vector in (await self.retrieval_service.fetch_vectors(missing)).items():
+                metadata = dict(vector["metadata"] or {})
+                documents.append({"id": vec_id, "text": metadata.pop("text", ""), "metadata": metadata})
+            await asyncio.to_thread(self.document_store.put_many, documents)
+        return adopted
+
+    def _compact_timeseries(self, dry_run: bool) -> Dict[str, int]:
+        records = 0
+        for stock_id in self.timeseries_store.stocks():
+            for measure in self.timeseries_store.measures(stock_id):
+                records += self.timeseries_store.compact(stock_id, measure, dry_run=dry_run)
+        return {"records": records, "bytes": records * RECORD_DTYPE.itemsize}
+
+    async def run(self, dry_run: bool = False, vacuum: bool = False, adopt_legacy: bool = False) -> Dict[str, Any]:
+        """
+        Run one compaction pass
+
+        Args:
+            dry_run: Only count what would be removed
+            vacuum: Rewrite the document store file afterwards to return freed pages to the OS
+            adopt_legacy: First copy vectors without a document store row into the store (a
+                one-time backfill that lists the whole index; a dry run only counts them)
+
+        Returns:
+            Report of removed documents per type and reason, and bytes reclaimed per store
+        """
+        async with self._lock:
+            started = time.perf_counter()
+            today = datetime.now(timezone.utc).date()
+            vector_bytes = self.retrieval_service.dimension * VECTOR_COMPONENT_BYTES
+            file_size_before = await asyncio.to_thread(self.document_store.file_size)
+            removed: Dict[str, Dict[str, int]] = {}
+            document_bytes = documents = 0
+
+            with span("compaction.run"):
+                legacy = 0
+                if adopt_legacy:
+                    with span("compaction.adopt_legacy"):
+                        legacy = await self._adopt_legacy_vectors(dry_run)
+
+                passes = [
+                    (doc_type, "expired", lambda limit, t=doc_type, d=days: self.document_store.expired_ids(
+                        t, (today - timedelta(days=d)).isoformat(), limit))
+                    for doc_type, days in self.retention_days.items()
+                ] + [
+                    (doc_type, "superseded", lambda limit, t=doc_type, k=keys: self.document_store.superseded_ids(
+                        t, k, limit))
+                    for doc_type, keys in self.supersede_keys.items() if keys
+                ]
+                for doc_type, reason, select in passes:
+                    result = await self._remove(select, doc_type, reason, dry_run)
+                    if result["documents"]:
+                        removed.setdefault(doc_type, {})[reason] = result["documents"]
+                    documents += result["documents"]
+                    document_bytes += result["document_bytes"]
+
+                with span("compaction.timeseries"):
+                    timeseries = await asyncio.to_thread(self._compact_timeseries, dry_run)
+
+                if vacuum and not dry_run:
+                    with span("compaction.vacuum"):
+                        await asyncio.to_thread(self.document_store.vacuum)
+
+            reclaimed = {
+                "documents": document_bytes,
+                "vectors_estimated": documents * vector_bytes,
+                "timeseries": timeseries["bytes"],
+            }
+            if not dry_run:
+                COMPACTION_RECLAIMED_BYTES.inc(reclaimed["documents"], store="documents")
+                COMPACTION_RECLAIMED_BYTES.inc(reclaimed["vectors_estimated"], store="vectors")
+                COMPACTION_RECLAIMED_BYTES.inc(reclaimed["timeseries"], store="timeseries")
+
+            file_size_after = await asyncio.to_thread(self.document_store.file_size)
+            remaining = await asyncio.to_thread(self.document_store.count)
+            report = {
+                "dry_run": dry_run,
+                "finished_at": datetime.now(timezone.utc).isoformat(),
+                "duration_seconds": round(time.perf_counter() - started, 3),
+                "removed_documents": removed,
+                "removed_timeseries_records": timeseries["records"],
+                "legacy_vectors_adopted": legacy,
+                "reclaimed_bytes": reclaimed,
+                "document_store_file_bytes": {"before": file_size_before, "after": file_size_after},
+                "remaining_documents": remaining,
+            }
+            if not dry_run:
+                self.last_report = report
+            logging.info(f"Compaction {'dry run ' if dry_run else ''}finished: {documents} documents, "
+                         f"{timeseries['records']} time series records, {sum(reclaimed.values())} bytes")
+            return report
+
+    async def run_forever(self, interval: float):
+        """Run compaction every `interval` seconds until cancelled"""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.run()
+            except Exception as e:
+                logging.error(f"Error during compaction: {str(e)}")
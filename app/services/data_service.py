@@ -4,6 +4,7 @@ from typing import Dict, List, Any, Optional
 from datetime import datetime, timedelta
 import time
 from typing import Dict, Any
+from app.core.metrics import span, UPSTREAM_RESPONSES
 
 class IndianStockService:
     """Service for fetching stock data from Indian Stock API"""
@@ -37,34 +38,37 @@ class IndianStockService:
         logging.info(f"Using headers: {self.headers}")
         
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(f"{self.BASE_URL}/stock", params=params, headers=self.headers) as response:
-                    status = response.status
-                    logging.info(f"Response status: {status}")
+            with span("upstream.indian_stock.stock"):
+                async with aiohttp.ClientSession() as session:
+                    async with session.get(f"{self.BASE_URL}/stock", params=params, headers=self.headers) as response:
+                        status = response.status
+                        UPSTREAM_RESPONSES.inc(service="indian_stock.stock", status=status)
+                        logging.info(f"Response status: {status}")
                     
-                    if status != 200:
-                        error_text = await response.text()
-                        logging.error(f"API error: {error_text}")
-                        return {"error": f"API returned status {status}: {error_text}"}
+                        if status != 200:
+                            error_text = await response.text()
+                            logging.error(f"API error: {error_text}")
+                            return {"error": f"API returned status {status}: {error_text}", "status": status}
                     
-                    # Try to parse as JSON first
-                    try:
-                        data = await response.json()
-                        logging.info(f"API response (JSON): {data}")
-                        return data
-                    except Exception as json_error:
-                        # If JSON parsing fails, get the text and create a structured response
-                        text_data = await response.text()
-                        logging.info(f"API response (Text): {text_data}")
+                        # Try to parse as JSON first
+                        try:
+                            data = await response.json()
+                            logging.info(f"API response (JSON): {data}")
+                            return data
+                        except Exception as json_error:
+                            # If JSON parsing fails, get the text and create a structured response
+                            text_data = await response.text()
+                            logging.info(f"API response (Text): {text_data}")
                         
-                        # Create a structured response from the text
-                        return {
-                            "stock_name": stock_name,
-                            "data": text_data,
-                            "response_type": "text",
-                            "timestamp": datetime.now().isoformat()
-                        }
+                            # Create a structured response from the text
+                            return {
+                                "stock_name": stock_name,
+                                "data": text_data,
+                                "response_type": "text",
+                                "timestamp": datetime.now().isoformat()
+                            }
         except Exception as e:
+            UPSTREAM_RESPONSES.inc(service="indian_stock.stock", status="error")
             logging.error(f"Error fetching stock data: {str(e)}")
             return {"error": str(e)}
             
@@ -96,38 +100,41 @@ class IndianStockService:
         }
         
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(f"{self.BASE_URL}/stock_forecasts", params=params, headers=self.headers) as response:
-                    status = response.status
-                    logging.info(f"Response status: {status}")
+            with span("upstream.indian_stock.forecasts"):
+                async with aiohttp.ClientSession() as session:
+                    async with session.get(f"{self.BASE_URL}/stock_forecasts", params=params, headers=self.headers) as response:
+                        status = response.status
+                        UPSTREAM_RESPONSES.inc(service="indian_stock.forecasts", status=status)
+                        logging.info(f"Response status: {status}")
                     
-                    if status != 200:
-                        error_text = await response.text()
-                        logging.error(f"API error: {error_text}")
-                        return {"error": f"API returned status {status}: {error_text}"}
+                        if status != 200:
+                            error_text = await response.text()
+                            logging.error(f"API error: {error_text}")
+                            return {"error": f"API returned status {status}: {error_text}", "status": status}
                     
-                    # Try to parse as JSON first
-                    try:
-                        data = await response.json()
-                        logging.info(f"API response (JSON): {data}")
-                        return data
-                    except Exception as json_error:
-                        # If JSON parsing fails, get the text and create a structured response
-                        text_data = await response.text()
-                        logging.info(f"API response (Text): {text_data}")
+                        # Try to parse as JSON first
+                        try:
+                            data = await response.json()
+                            logging.info(f"API response (JSON): {data}")
+                            return data
+                        except Exception as json_error:
+                            # If JSON parsing fails, get the text and create a structured response
+                            text_data = await response.text()
+                            logging.info(f"API response (Text): {text_data}")
                         
-                        # Create a structured response from the text
-                        return {
-                            "stock_id": stock_id,
-                            "measure_code": measure_code,
-                            "period_type": period_type,
-                            "data_type": data_type,
-                            "age": age,
-                            "data": text_data,
-                            "response_type": "text",
-                            "timestamp": datetime.now().isoformat()
-                        }
+                            # Create a structured response from the text
+                            return {
+                                "stock_id": stock_id,
+                                "measure_code": measure_code,
+                                "period_type": period_type,
+                                "data_type": data_type,
+                                "age": age,
+                                "data": text_data,
+                                "response_type": "text",
+                                "timestamp": datetime.now().isoformat()
+                            }
         except Exception as e:
+            UPSTREAM_RESPONSES.inc(service="indian_stock.forecasts", status="error")
             logging.error(f"Error fetching stock forecasts: {str(e)}")
             return {"error": str(e)}
     
@@ -154,29 +161,32 @@ class IndianStockService:
         logging.info(f"Making request to {self.BASE_URL}/news")
         
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(f"{self.BASE_URL}/news", headers=self.headers) as response:
-                    status = response.status
-                    logging.info(f"Response status: {status}")
+            with span("upstream.indian_stock.news"):
+                async with aiohttp.ClientSession() as session:
+                    async with session.get(f"{self.BASE_URL}/news", headers=self.headers) as response:
+                        status = response.status
+                        UPSTREAM_RESPONSES.inc(service="indian_stock.news", status=status)
+                        logging.info(f"Response status: {status}")
                     
-                    if status != 200:
-                        error_text = await response.text()
-                        logging.error(f"API error: {error_text}")
-                        return {"error": f"API returned status {status}: {error_text}"}
+                        if status != 200:
+                            error_text = await response.text()
+                            logging.error(f"API error: {error_text}")
+                            return {"error": f"API returned status {status}: {error_text}", "status": status}
                     
-                    try:
-                        data = await response.json()
-                        logging.info(f"API response (JSON): {data}")
-                        return data
-                    except Exception as json_error:
-                        text_data = await response.text()
-                        logging.info(f"API response (Text): {text_data}")
+                        try:
+                            data = await response.json()
+                            logging.info(f"API response (JSON): {data}")
+                            return data
+                        except Exception as json_error:
+                            text_data = await response.text()
+                            logging.info(f"API response (Text): {text_data}")
                         
-                        return {
-                            "error": "Failed to parse JSON response",
-                            "text_data": text_data
-                        }
+                            return {
+                                "error": "Failed to parse JSON response",
+                                "text_data": text_data
+                            }
         except Exception as e:
+            UPSTREAM_RESPONSES.inc(service="indian_stock.news", status="error")
             logging.error(f"Error fetching stock news: {str(e)}")
             return {"error": str(e)}
 
@@ -234,11 +244,15 @@ class NewsAPIService:
             
         try:
             endpoint = f"{self.BASE_URL}/everything" if query or sources else f"{self.BASE_URL}/top-headlines"
-            async with aiohttp.ClientSession() as session:
-                async with session.get(endpoint, params=params) as response:
-                    response.raise_for_status()
-                    return await response.json()
+            with span("upstream.newsapi"):
+                async with aiohttp.ClientSession() as session:
+                    async with session.get(endpoint, params=params) as response:
+                        UPSTREAM_RESPONSES.inc(service="newsapi", status=response.status)
+                        response.raise_for_status()
+                        return await response.json()
         except Exception as e:
+            if not isinstance(e, aiohttp.ClientResponseError):
+                UPSTREAM_RESPONSES.inc(service="newsapi", status="error")
             logging.error(f"Error fetching news: {str(e)}")
             return {"error": str(e)}
 
@@ -287,11 +301,15 @@ class MarketauxService:
             params["published_after"] = published_after
             
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(f"{self.BASE_URL}/news/all", params=params) as response:
-                    response.raise_for_status()
-                    return await response.json()
+            with span("upstream.marketaux"):
+                async with aiohttp.ClientSession() as session:
+                    async with session.get(f"{self.BASE_URL}/news/all", params=params) as response:
+                        UPSTREAM_RESPONSES.inc(service="marketaux", status=response.status)
+                        response.raise_for_status()
+                        return await response.json()
         except Exception as e:
+            if not isinstance(e, aiohttp.ClientResponseError):
+                UPSTREAM_RESPONSES.inc(service="marketaux", status="error")
             logging.error(f"Error fetching news with sentiment: {str(e)}")
             return {"error": str(e)}
 
@@ -0,0 +1,256 @@
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+from app.core.metrics import span
+from app.data.timeseries_store import TimeSeriesStore
+
+# Measure codes read from the time-series store (see TimeSeriesStore.ingest_stock_data)
+REVENUE = ("annual.INC.TotalRevenue", "annual.INC.Revenue")
+GROSS_PROFIT = ("annual.INC.GrossProfit",)
+OPERATING_INCOME = ("annual.INC.OperatingIncome",)
+NET_INCOME = ("annual.INC.NetIncome",)
+EPS = ("annual.INC.DilutedEPSExcludingExtraOrdItems",)
+SHARES = ("annual.BAL.TotalCommonSharesOutstanding", "annual.INC.DilutedWeightedAverageShares")
+EQUITY = ("annual.BAL.TotalEquity",)
+DEBT = ("annual.BAL.TotalDebt",)
+PRICE = ("price.NSE", "price.BSE")
+
+# Rolling return windows in calendar days
+RETURN_WINDOWS = {"return_1m": 30, "return_3m": 91, "return_1y": 365}
+
+# (metric, column header, kind) in table order; kind selects the number format
+TABLE_COLUMNS = [
+    ("revenue", "Revenue", "amount"),
+    ("revenue_growth_yoy", "Rev YoY", "percent"),
+    ("revenue_cagr_3y", "Rev CAGR 3y", "percent"),
+    ("net_income_growth_yoy", "NI YoY", "percent"),
+    ("gross_margin", "Gross mgn", "percent"),
+    ("operating_margin", "Op mgn", "percent"),
+    ("net_margin", "Net mgn", "percent"),
+    ("roe", "ROE", "percent"),
+    ("debt_to_equity", "D/E", "ratio"),
+    ("price", "Price", "ratio"),
+    ("market_cap", "Mkt cap", "amount"),
+    ("pe", "P/E", "ratio"),
+    ("pb", "P/B", "ratio"),
+    ("ps", "P/S", "ratio"),
+    ("return_1m", "1m ret", "percent"),
+    ("return_3m", "3m ret", "percent"),
+    ("return_1y", "1y ret", "percent"),
+    ("volatility_1y", "Vol 1y", "percent"),
+]
+
+
+def _divide(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+    """Element-wise division that yields NaN instead of inf or a warning for zero denominators"""
+    out = np.full(np.broadcast(numerator, denominator).shape, np.nan)
+    np.divide(numerator, denominator, out=out, where=np.isfinite(denominator) & (denominator != 0))
+    return out
+
+
+def _nth_last(matrix: np.ndarray, n: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Locate the n-th most recent non-NaN value of every row (n=0 is the latest)
+
+    Returns:
+        Tuple of (column index per row, -1 where the row has fewer values; values, NaN there)
+    """
+    valid = ~np.isnan(matrix)
+    rank_from_end = np.cumsum(valid[:, ::-1], axis=1)[:, ::-1]
+    hit = valid & (rank_from_end == n + 1)
+    found = hit.any(axis=1)
+    columns = np.where(found, hit.argmax(axis=1), -1)
+    values = np.where(found, matrix[np.arange(matrix.shape[0]), np.maximum(columns, 0)], np.nan)
+    return columns, values
+
+
+def _take(matrix: np.ndarray, columns: np.ndarray) -> np.ndarray:
+    """Gather one column per row, NaN where the column index is -1"""
+    values = matrix[np.arange(matrix.shape[0]), np.maximum(columns, 0)]
+    return np.where(columns >= 0, values, np.nan)
+
+
+def _take_columns(matrix: np.ndarray, columns: np.ndarray) -> np.ndarray:
+    """Gather matrix[row, columns[row, j]] for a column index matrix, NaN where the index is -1"""
+    rows = np.arange(matrix.shape[0])[:, None]
+    return np.where(columns >= 0, matrix[rows, np.maximum(columns, 0)], np.nan)
+
+
+def _forward_fill(matrix: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Forward-fill NaNs along rows; also returns the source column of every cell (-1 before the first value)"""
+    columns = np.where(~np.isnan(matrix), np.arange(matrix.shape[1]), -1)
+    columns = np.maximum.accumulate(columns, axis=1)
+    return _take_columns(matrix, columns), columns
+
+
+class FinancialMetricsEngine:
+    """
+    Computes growth, margin, valuation and price statistics for many companies at once
+
+    Every metric is evaluated on (companies x periods) matrices read from the
+    time-series store, so the cost is a handful of array operations per measure
+    regardless of how many companies are requested.
+    """
+
+    # Price observations required inside the window before volatility is reported
+    MIN_VOLATILITY_OBSERVATIONS = 5
+
+    def __init__(self, store: Optional[TimeSeriesStore] = None):
+        self.store = store or TimeSeriesStore()
+
+    def _panels(self, stock_ids: List[str], groups: Dict[str, Tuple[str, ...]]) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+        """
+        Read measure groups as matrices aligned on one period axis
+
+        Each group lists measure codes in order of preference; a later code only
+        fills cells the earlier ones leave empty.
+        """
+        raw = {
+            (name, code): self.store.get_panel(stock_ids, code)
+            for name, codes in groups.items() for code in codes
+        }
+        non_empty = [periods for periods, _ in raw.values() if periods.size]
+        periods = np.unique(np.concatenate(non_empty)) if non_empty else np.zeros(0, "datetime64[D]")
+
+        matrices = {}
+        for name, codes in groups.items():
+            combined = np.full((len(stock_ids), periods.size), np.nan)
+            for code in codes:
+                code_periods, matrix = raw[(name, code)]
+                aligned = np.full_like(combined, np.nan)
+                aligned[:, np.searchsorted(periods, code_periods)] = matrix
+                combined = np.where(np.isnan(combined), aligned, combined)
+            matrices[name] = combined
+        return periods, matrices
+
+    def _fundamentals(self, stock_ids: List[str]) -> Dict[str, np.ndarray]:
+        periods, m = self._panels(stock_ids, {
+            "revenue": REVENUE, "gross_profit": GROSS_PROFIT, "operating_income": OPERATING_INCOME,
+            "net_income": NET_INCOME, "eps": EPS, "shares": SHARES, "equity": EQUITY, "debt": DEBT,
+        })
+        days = periods.astype(np.int64)
+
+        # Anchor every company on its latest fiscal year with reported revenue
+        latest, revenue = _nth_last(m["revenue"], 0)
+        _, previous_revenue = _nth_last(m["revenue"], 1)
+        base_col, base_revenue = _nth_last(m["revenue"], 3)
+        years = np.where(base_col >= 0, (days[np.maximum(latest, 0)] - days[np.maximum(base_col, 0)]) / 365.25, np.nan)
+        growth_ratio = _divide(revenue, base_revenue)
+        cagr = np.full(revenue.shape, np.nan)
+        positive = (growth_ratio > 0) & (years > 0)
+        cagr[positive] = growth_ratio[positive] ** (1.0 / years[positive]) - 1.0
+
+        _, net_income_latest = _nth_last(m["net_income"], 0)
+        _, net_income_previous = _nth_last(m["net_income"], 1)
+
+        at_latest = {name: _take(matrix, latest) for name, matrix in m.items()}
+        return {
+            "revenue": revenue,
+            "revenue_growth_yoy": _divide(revenue, previous_revenue) - 1.0,
+            "revenue_cagr_3y": cagr,
+            "net_income_growth_yoy": _divide(net_income_latest - net_income_previous, np.abs(net_income_previous)),
+            "gross_margin": _divide(at_latest["gross_profit"], revenue),
+            "operating_margin": _divide(at_latest["operating_income"], revenue),
+            "net_margin": _divide(at_latest["net_income"], revenue),
+            "roe": _divide(at_latest["net_income"], at_latest["equity"]),
+            "debt_to_equity": _divide(at_latest["debt"], at_latest["equity"]),
+            "eps": at_latest["eps"],
+            "shares": at_latest["shares"],
+            "equity": at_latest["equity"],
+        }
+
+    def _prices(self, stock_ids: List[str]) -> Dict[str, np.ndarray]:
+        periods, m = self._panels(stock_ids, {"price": PRICE})
+        prices = m["price"]
+        result = {name: np.full(len(stock_ids), np.nan) for name in ("price", "volatility_1y", *RETURN_WINDOWS)}
+        if periods.size == 0:
+            return result
+
+        days = periods.astype(np.int64)
+        filled, source = _forward_fill(prices)
+        latest = filled[:, -1]
+        result["price"] = latest
+
+        for name, window in RETURN_WINDOWS.items():
+            # Last observation on or before the start of the window, and it must not be the latest one
+            column = np.searchsorted(days, days[-1] - window, side="right") - 1
+            if column < 0:
+                continue
+            start = filled[:, column]
+            stale = source[:, column] == source[:, -1]
+            result[name] = np.where(stale, np.nan, _divide(latest, start) - 1.0)
+
+        # Annualized volatility from log returns between consecutive observations,
+        # each scaled by its gap in days so irregular sampling is not penalized
+        previous_source = np.concatenate([np.full((len(stock_ids), 1), -1), source[:, :-1]], axis=1)
+        observed = ~np.isnan(prices) & (previous_source >= 0) & (days >= days[-1] - 365)
+        previous_price = _take_columns(filled, previous_source)
+        gaps = days[None, :] - days[np.maximum(previous_source, 0)]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            daily_variance = np.where(observed, np.log(prices / previous_price) ** 2 / gaps, np.nan)
+        counts = observed.sum(axis=1)
+        enough = counts >= self.MIN_VOLATILITY_OBSERVATIONS
+        mean_variance = _divide(np.nansum(daily_variance, axis=1), counts.astype(float))
+        result["volatility_1y"] = np.where(enough, np.sqrt(mean_variance * 365.0), np.nan)
+        return result
+
+    def compute(self, stock_ids: List[str]) -> Dict[str, Dict[str, float]]:
+        """
+        Compute metrics for a set of companies
+
+        Args:
+            stock_ids: Stock identifiers as used by the time-series store
+
+        Returns:
+            Dictionary mapping stock ID to metric name to value (NaN when the inputs are missing)
+        """
+        if not stock_ids:
+            return {}
+        with span("metrics.compute", companies=len(stock_ids)):
+            fundamentals = self._fundamentals(stock_ids)
+            prices = self._prices(stock_ids)
+            market_cap = prices["price"] * fundamentals["shares"]
+            columns = {
+                **{name: fundamentals[name] for name in fundamentals if name not in ("eps", "shares", "equity")},
+                **prices,
+                "market_cap": market_cap,
+                "pe": np.where(fundamentals["eps"] > 0, _divide(prices["price"], fundamentals["eps"]), np.nan),
+                "pb": np.where(fundamentals["equity"] > 0, _divide(market_cap, fundamentals["equity"]), np.nan),
+                "ps": _divide(market_cap, fundamentals["revenue"]),
+            }
+        return {
+            stock_id: {name: float(values[row]) for name, values in columns.items()}
+            for row, stock_id in enumerate(stock_ids)
+        }
+
+    @staticmethod
+    def format_table(metrics: Dict[str, Dict[str, float]]) -> str:
+        """
+        Render computed metrics as a compact pipe table for prompts
+
+        Columns that are empty for every company are left out; single missing
+        values are shown as "n/a".
+        """
+        if not metrics:
+            return ""
+        columns = [
+            (name, header, kind) for name, header, kind in TABLE_COLUMNS
+            if any(np.isfinite(values.get(name, np.nan)) for values in metrics.values())
+        ]
+        if not columns:
+            return ""
+
+        def cell(value: float, kind: str) -> str:
+            if not np.isfinite(value):
+                return "n/a"
+            if kind == "percent":
+                return f"{value * 100:.1f}%"
+            if kind == "amount":
+                return f"{value:,.0f}"
+            return f"{value:.2f}"
+
+        lines = ["| Company | " + " | ".join(header for _, header, _ in columns) + " |",
+                 "|" + "---|" * (len(columns) + 1)]
+        for stock_id, values in metrics.items():
+            lines.append(f"| {stock_id} | " + " | ".join(cell(values.get(name, np.nan), kind) for name, _, kind in columns) + " |")
+        return "\n".join(lines)
+
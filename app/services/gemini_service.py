@@ -1,5 +1,9 @@
+import asyncio
 import google.generativeai as genai
 from app.core.config import settings
+from app.core.metrics import span, LLM_TOKENS
+from app.services.llm_dispatcher import llm_dispatcher
+from app.utils.deadline import remaining
 from typing import List, Dict, Any, Optional
 
 class GeminiService:
@@ -7,6 +11,28 @@ class GeminiService:
         self.api_key = settings.GEMINI_API_KEY
         genai.configure(api_key=self.api_key)
         self.model = genai.GenerativeModel('gemini-2.0-flash')
+        # Every call goes through the process-wide dispatcher (priority, concurrency, retries)
+        self.dispatcher = llm_dispatcher
+    
+    async def _generate_content(self, prompt: str, stage: str) -> str:
+        """Call the model for a single prompt through the dispatcher, recording latency and token usage"""
+        async def call():
+            with span(stage):
+                return await self.model.generate_content_async(prompt)
+        
+        # Reserve the estimated prompt size up front; actual usage is settled afterwards
+        estimated_tokens = len(prompt) // 4
+        response = await self.dispatcher.submit(call, estimated_tokens=estimated_tokens)
+            
+        usage = getattr(response, "usage_metadata", None)
+        if usage is not None:
+            prompt_tokens = getattr(usage, "prompt_token_count", 0) or 0
+            completion_tokens = getattr(usage, "candidates_token_count", 0) or 0
+            LLM_TOKENS.inc(prompt_tokens, kind="prompt")
+            LLM_TOKENS.inc(completion_tokens, kind="completion")
+            self.dispatcher.settle_tokens(prompt_tokens + completion_tokens - estimated_tokens)
+            
+        return response.text
     
     async def generate_response(self, query: str, context: List[str], 
                                report_type: str = "general") -> str:
@@ -38,45 +64,83 @@ class GeminiService:
         """
         
         # Generate response
-        response = self.model.generate_content(prompt)
-        return response.text
+        return await self._generate_content(prompt, "llm.generate_response")
     
     async def generate_structured_report(self, 
                                         query: str, 
                                         context: List[str],
                                         report_type: str,
-                                        sections: Optional[List[str]] = None) -> Dict[str, str]:
+                                        sections: Optional[List[str]] = None,
+                                        section_context: Optional[Dict[str, str]] = None,
+                                        section_documents: Optional[Dict[str, List[str]]] = None) -> Dict[str, str]:
         """
         Generate a structured report with predefined sections
         
+        Sections are generated concurrently. When a request deadline is set,
+        sections still running when it expires are cancelled and left out.
+        
         Args:
             query: The user's query
             context: List of retrieved document excerpts
             report_type: Type of report
             sections: Custom sections for the report (optional)
+            section_context: Extra context for individual sections, keyed by section name (optional)
+            section_documents: Document excerpts replacing `context` for individual sections (optional)
             
         Returns:
-            Dictionary with section names as keys and content as values
+            Dictionary with section names as keys and content as values, in
+            section order, containing only the sections that completed
         """
         if sections is None:
             sections = settings.DEFAULT_REPORT_SECTIONS
             
-        report = {}
+        
+        # Combine context once, it is shared by every section
+        context_text = "\n\n".join([f"Document {i+1}: {doc}" for i, doc in enumerate(context)])
         
         # Generate content for each section
+        tasks = {}
         for section in sections:
+            section_text = context_text
+            if section_documents and section in section_documents:
+                section_text = "\n\n".join(
+                    [f"Document {i+1}: {doc}" for i, doc in enumerate(section_documents[section])]
+                )
+            extra_context = ""
+            if section_context and section_context.get(section):
+                extra_context = f"""
+            Precomputed Data (use these figures instead of deriving them from the documents):
+            {section_context[section]}
+            """
+            
             section_prompt = f"""
             User Query: {query}
             
             Context Information:
-            {"\n\n".join([f"Document {i+1}: {doc}" for i, doc in enumerate(context)])}
-            
+            {section_text}
+            {extra_context}
             Task: Generate the "{section}" section of a financial research report for {report_type} analysis.
             Focus specifically on information relevant to this section.
             Ensure all information is factually accurate and grounded in the provided context.
             """
             
-            response = self.model.generate_content(section_prompt)
-            report[section] = response.text
+            tasks[section] = asyncio.ensure_future(self._generate_content(section_prompt, "llm.generate_section"))
+        
+        timeout = remaining()
+        try:
+            done, pending = await asyncio.wait(
+                tasks.values(),
+                timeout=max(timeout, 0) if timeout is not None else None,
+                return_when=asyncio.FIRST_EXCEPTION
+            )
+        finally:
+            # Cancels sections that missed the deadline, or all of them if the caller was cancelled
+            for task in tasks.values():
+                if not task.done():
+                    task.cancel()
+        
+        errors = [task.exception() for task in done if task.exception() is not None]
+        if errors:
+            raise errors[0]
             
-        return report
\ No newline at end of file
+        return {section: task.result() for section, task in tasks.items() if task in done}
\ No newline at end of file
@@ -0,0 +1,212 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import random
+import time
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, List, Optional
+from app.core.config import settings
+from app.core.metrics import LLM_QUEUE_DEPTH, LLM_QUEUE_WAIT, LLM_IN_FLIGHT, LLM_CONCURRENCY_LIMIT, LLM_RETRIES
+from app.utils.rate_limit import TokenBucket
+from app.utils.deadline import remaining
+
+INTERACTIVE = "interactive"
+BATCH = "batch"
+# Lower rank is served first
+PRIORITIES = {INTERACTIVE: 0, BATCH: 1}
+
+# Priority of LLM calls made from the current task (batch jobs set BATCH)
+llm_priority: ContextVar[str] = ContextVar("llm_priority", default=INTERACTIVE)
+
+# HTTP status codes worth retrying, mapped to the retry reason
+RETRYABLE_STATUS = {429: "rate_limited", 500: "unavailable", 503: "unavailable", 504: "unavailable"}
+
+
+class LLMRateLimitError(Exception):
+    """The LLM provider kept rejecting calls with 429 after all retries"""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def _retry_reason(error: Exception) -> Optional[str]:
+    # google.api_core exceptions carry the HTTP status as an int in .code
+    code = getattr(error, "code", None)
+    if not isinstance(code, int):
+        code = getattr(error, "status_code", None)
+    return RETRYABLE_STATUS.get(code) if isinstance(code, int) else None
+
+
+class LLMDispatcher:
+    """
+    Process-wide gate for LLM calls
+
+    Calls wait in a priority queue (interactive before batch, FIFO within a
+    class) for one of `limit` slots and, with a token budget, for their
+    estimated tokens; the call at the head of the queue is the next to take
+    either, so a batch call never holds up an interactive one. The limit adapts AIMD-style: it grows by
+    about one slot per round of successful calls and shrinks multiplicatively
+    on 429s or when latency exceeds the target. Rate-limited and unavailable
+    responses are retried with jittered exponential backoff.
+    """
+
+    def __init__(self,
+                 max_concurrency: Optional[int] = None,
+                 min_concurrency: Optional[int] = None,
+                 target_latency: Optional[float] = None,
+                 max_retries: Optional[int] = None,
+                 retry_base_delay: Optional[float] = None,
+                 tokens_per_minute: Optional[int] = None):
+        self.max_concurrency = max_concurrency or settings.LLM_MAX_CONCURRENCY
+        self.min_concurrency = max(1, min(min_concurrency or settings.LLM_MIN_CONCURRENCY, self.max_concurrency))
+        self.target_latency = target_latency if target_latency is not None else settings.LLM_TARGET_LATENCY_SECONDS
+        self.max_retries = max_retries if max_retries is not None else settings.LLM_MAX_RETRIES
+        self.retry_base_delay = retry_base_delay if retry_base_delay is not None else settings.LLM_RETRY_BASE_DELAY
+        tokens_per_minute = tokens_per_minute if tokens_per_minute is not None else settings.LLM_TOKENS_PER_MINUTE
+        self.token_bucket = TokenBucket(tokens_per_minute / 60.0, tokens_per_minute) if tokens_per_minute > 0 else None
+
+        self.limit = float(self.max_concurrency)
+        self.active = 0
+        self._waiters: List = []
+        self._sequence = itertools.count()
+        self._last_decrease = 0.0
+        # Wakes the queue once the head call's tokens have refilled
+        self._token_timer: Optional[asyncio.TimerHandle] = None
+        LLM_CONCURRENCY_LIMIT.set(self.limit)
+
+    # -- slots ----------------------------------------------------------------
+
+    def _update_queue_depth(self):
+        for priority in PRIORITIES:
+            rank = PRIORITIES[priority]
+            depth = sum(1 for r, _, future, _ in self._waiters if r == rank and not future.done())
+            LLM_QUEUE_DEPTH.set(depth, priority=priority)
+
+    def _take_tokens(self, tokens: int) -> bool:
+        return self.token_bucket is None or not tokens or self.token_bucket.try_acquire(tokens)
+
+    def _wake(self):
+        while self._waiters and self.active < int(self.limit):
+            _, _, future, tokens = self._waiters[0]
+            if future.done():
+                heapq.heappop(self._waiters)
+                continue
+            if not self._take_tokens(tokens):
+                # The head call waits for its tokens; calls behind it wait too
+                if self._token_timer is None:
+                    self._token_timer = asyncio.get_running_loop().call_later(
+                        self.token_bucket.delay(tokens), self._on_tokens
+                    )
+                break
+            heapq.heappop(self._waiters)
+            self.active += 1
+            future.set_result(None)
+        self._update_queue_depth()
+
+    def _on_tokens(self):
+        self._token_timer = None
+        self._wake()
+
+    async def _acquire(self, priority: str, tokens: int = 0):
+        """Wait for a slot, and for `tokens` from the rate budget"""
+        if self.active < int(self.limit) and not self._waiters and self._take_tokens(tokens):
+            self.active += 1
+            return
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (PRIORITIES[priority], next(self._sequence), future, tokens))
+        # Serves the call at once if it only missed the fast path, else waits for a slot or tokens
+        self._wake()
+        try:
+            await future
+        except asyncio.CancelledError:
+            # A slot granted just before cancellation has to be handed on
+            if future.done() and not future.cancelled():
+                self._release()
+            else:
+                self._update_queue_depth()
+            raise
+
+    def _release(self):
+        self.active -= 1
+        self._wake()
+
+    # -- adaptation -----------------------------------------------------------
+
+    def _decrease(self, factor: float):
+        # Several calls usually fail together; shrink once per burst
+        now = time.monotonic()
+        if now - self._last_decrease < self.retry_base_delay:
+            return
+        self._last_decrease = now
+        self.limit = max(float(self.min_concurrency), self.limit * factor)
+        LLM_CONCURRENCY_LIMIT.set(self.limit)
+        logging.info(f"LLM concurrency limit lowered to {self.limit:.2f}")
+
+    def _on_success(self, latency: float):
+        if self.target_latency and latency > self.target_latency:
+            self._decrease(0.9)
+        else:
+            self.limit = min(float(self.max_concurrency), self.limit + 1.0 / self.limit)
+            LLM_CONCURRENCY_LIMIT.set(self.limit)
+
+    # -- calls ----------------------------------------------------------------
+
+    async def submit(self, call: Callable[[], Awaitable[Any]], priority: Optional[str] = None,
+                     estimated_tokens: int = 0) -> Any:
+        """
+        Run an LLM call when a slot is free, retrying transient failures
+
+        Args:
+            call: Zero-argument coroutine function performing one attempt
+            priority: INTERACTIVE or BATCH (defaults to the llm_priority context variable)
+            estimated_tokens: Tokens to reserve from the rate budget before the first attempt
+
+        Returns:
+            The result of call()
+
+        Raises:
+            LLMRateLimitError: The provider returned 429 on every attempt
+        """
+        priority = priority or llm_priority.get()
+
+        for attempt in range(self.max_retries + 1):
+            queued_at = time.perf_counter()
+            # Retries reuse the tokens reserved for the first attempt
+            await self._acquire(priority, estimated_tokens if attempt == 0 else 0)
+            LLM_QUEUE_WAIT.observe(time.perf_counter() - queued_at, priority=priority)
+            LLM_IN_FLIGHT.inc()
+            started = time.perf_counter()
+            try:
+                result = await call()
+            except Exception as e:
+                reason = _retry_reason(e)
+                if reason is None:
+                    raise
+                if reason == "rate_limited":
+                    self._decrease(0.5)
+                delay = self.retry_base_delay * (2 ** attempt) * (0.5 + random.random() / 2)
+                time_left = remaining()
+                # Give up early when the backoff would outlast the request deadline
+                if attempt == self.max_retries or (time_left is not None and delay >= time_left):
+                    if reason == "rate_limited":
+                        raise LLMRateLimitError(f"LLM rate limit exceeded: {str(e)}", retry_after=delay) from e
+                    raise
+                LLM_RETRIES.inc(reason=reason)
+                logging.warning(f"LLM call failed ({reason}), retrying in {delay:.2f}s: {str(e)}")
+            else:
+                self._on_success(time.perf_counter() - started)
+                return result
+            finally:
+                LLM_IN_FLIGHT.dec()
+                self._release()
+            await asyncio.sleep(delay)
+
+    def settle_tokens(self, amount: int):
+        """Charge the difference between actual and estimated token usage"""
+        if self.token_bucket is not None and amount:
+            self.token_bucket.debit(amount)
+
+
+llm_dispatcher = LLMDispatcher()
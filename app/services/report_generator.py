@@ -1,65 +1,582 @@
 from app.services.gemini_service import GeminiService
 from app.services.retrieval_service import RetrievalService
-from typing import List, Dict, Any, Optional
+from app.services.financial_metrics import FinancialMetricsEngine
+from app.data.sentiment_store import SentimentStore
+from app.data.symbol_master import SymbolMaster
+from app.data.report_store import ReportStore
+from app.data.artifact_store import ArtifactStore
+from app.data.documents import RetrievedDocument
+from app.services.llm_dispatcher import llm_priority, BATCH, INTERACTIVE
+from app.services.report_renderer import render_artifacts, rendered_artifact
+from app.core.config import settings
+from app.core.metrics import span, REPORT_SECTIONS, CACHE_REQUESTS
+from app.utils.deadline import current_deadline, deadline, within_deadline
+from app.utils.singleflight import SingleFlight, normalize_key_part
+from typing import List, Dict, Any, Optional, AsyncIterator
+import asyncio
+import difflib
+import hashlib
+import json
+import logging
+import time
+
+METRICS_SECTION = "Financial Metrics"
+SENTIMENT_SECTIONS = ("Market Overview", "Risk Analysis")
+# Keep the precomputed tables small enough to stay cheap in the prompt
+MAX_METRICS_COMPANIES = 10
+MAX_SENTIMENT_ENTITIES = 10
+SENTIMENT_WINDOW_DAYS = 7
+# Expired and surplus reports are pruned at most this often
+REPORT_PRUNE_INTERVAL_SECONDS = 60
+
+
+def report_id_for(query: str, report_type: str, sections: Optional[List[str]], top_k: Optional[int]) -> str:
+    """Stable ID of a structured report, shared by every generation with the same parameters"""
+    key = json.dumps([
+        normalize_key_part(query), report_type, normalize_key_part(sections) if sections else None, top_k
+    ])
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+
+
+def support_overlap(old: Dict[str, float], new: Dict[str, float]) -> float:
+    """
+    Relevance-weighted Jaccard overlap of two supporting document sets
+    
+    Documents are weighted by their retrieval score (the new one where a
+    document is in both), so a low-ranked document coming or going matters
+    less than a top hit.
+    """
+    ids = set(old) | set(new)
+    if not ids:
+        return 1.0
+    weights = {doc_id: max(new.get(doc_id, old.get(doc_id, 0.0)), 1e-6) for doc_id in ids}
+    return sum(weights[doc_id] for doc_id in set(old) & set(new)) / sum(weights.values())
+
 
 class ReportGenerator:
     def __init__(self):
         self.gemini_service = GeminiService()
         self.retrieval_service = RetrievalService()
+        self.metrics_engine = FinancialMetricsEngine()
+        self.sentiment_store = SentimentStore()
+        # Resolves company names and codes to the keys their series are stored under
+        self.symbol_master = SymbolMaster()
+        # Identical concurrent report requests share one generation
+        self.report_calls = SingleFlight("report")
+        # Structured reports, versioned, for refreshes and diffs
+        self.report_store = ReportStore()
+        # Their HTML/JSON renderings, so repeat views need no rendering
+        self.artifact_store = ArtifactStore()
+        # Reports are stored and rendered after they are returned; reads of a report wait for its writes
+        self._persisting: Dict[str, asyncio.Future] = {}
+        self._pruned_at = 0.0
     
     async def generate_report(self, 
                              query: str, 
                              report_type: str = "general",
                              structured: bool = True,
                              sections: Optional[List[str]] = None,
-                             top_k: Optional[int] = None) -> Dict[str, Any]:
+                             top_k: Optional[int] = None,
+                             deadline_ms: Optional[int] = None) -> Dict[str, Any]:
         """
         Generate a comprehensive research report based on a query
         
+        With a deadline, retrieval that overruns raises DeadlineExceeded and
+        structured sections that overrun are cancelled; the report then contains
+        the completed sections and is marked partial. With REPORT_CACHE_TTL_SECONDS
+        set, a complete structured report stored recently with the same parameters
+        (e.g. by the pre-market warmer) is returned instead of generating one.
+        
         Args:
             query: The user's query
             report_type: Type of report (e.g., "equity", "venture_capital", "investment_banking")
             structured: Whether to generate a structured report with sections
             sections: Custom sections for structured reports
             top_k: Number of documents to retrieve
+            deadline_ms: Time budget for the whole report in milliseconds (optional; an enclosing
+                deadline, e.g. one started before admission, is never extended)
             
         Returns:
             Dictionary containing the generated report
         """
+        if structured and settings.REPORT_CACHE_TTL_SECONDS > 0:
+            cached = await self.cached_report(report_id_for(query, report_type, sections, top_k))
+            if cached is not None:
+                return cached
+        with deadline(deadline_ms / 1000.0 if deadline_ms else None):
+            return await self.report_calls.do(
+                self._report_key(query, report_type, structured, sections, top_k, deadline_ms, llm_priority.get()),
+                lambda: self._generate_report(query, report_type, structured, sections, top_k),
+                deadline_at=current_deadline.get()
+            )
+    
+    async def cached_report(self, report_id: str) -> Optional[Dict[str, Any]]:
+        """The latest stored version of a report if it is complete and younger than REPORT_CACHE_TTL_SECONDS"""
+        await self._persisted(report_id)
+        try:
+            stored = await asyncio.to_thread(self.report_store.get, report_id)
+        except Exception as e:
+            logging.error(f"Error reading cached report {report_id}: {str(e)}")
+            stored = None
+        if (stored is None or stored["report"].get("partial")
+                or time.time() - stored["created_at"] > settings.REPORT_CACHE_TTL_SECONDS):
+            CACHE_REQUESTS.inc(cache="report", result="miss")
+            return None
+        CACHE_REQUESTS.inc(cache="report", result="hit")
+        return stored["report"]
+    
+    async def generate_reports(self, jobs: List[Dict[str, Any]]) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Generate many reports, yielding each one as soon as it is finished
+        
+        Retrieval for all jobs is done up front (one embedding batch and
+        concurrent vector lookups per top_k); generation then runs for all jobs
+        concurrently at batch priority, so interactive requests are served first
+        by the LLM dispatcher.
+        
+        Args:
+            jobs: Report parameters as accepted by generate_report
+            
+        Yields:
+            {"index", "status": "success", "report"} or {"index", "status": "error", "error"}
+            in completion order
+        """
+        jobs = [
+            {"report_type": "general", "structured": True, "sections": None, "top_k": None, "deadline_ms": None, **job}
+            for job in jobs
+        ]
+        
+        # Shared retrieval, grouped by top_k since it is a per-query parameter
+        documents: Dict[int, List[RetrievedDocument]] = {}
+        with span("report.batch_retrieval", jobs=len(jobs)):
+            by_top_k: Dict[Optional[int], List[int]] = {}
+            for index, job in enumerate(jobs):
+                by_top_k.setdefault(job["top_k"], []).append(index)
+            for top_k, indexes in by_top_k.items():
+                results = await self.retrieval_service.retrieve_many([jobs[i]["query"] for i in indexes], top_k)
+                documents.update(zip(indexes, results))
+        
+        async def run(index: int) -> Dict[str, Any]:
+            # Runs in its own task, so this only affects this job's LLM calls
+            llm_priority.set(BATCH)
+            job = jobs[index]
+            args = (job["query"], job["report_type"], job["structured"], job["sections"], job["top_k"])
+            try:
+                with deadline(job["deadline_ms"] / 1000.0 if job["deadline_ms"] else None):
+                    report = await self.report_calls.do(
+                        self._report_key(*args, job["deadline_ms"], BATCH),
+                        lambda: self._generate_report(*args, documents=documents[index]),
+                        deadline_at=current_deadline.get()
+                    )
+                return {"index": index, "status": "success", "report": report}
+            except Exception as e:
+                logging.error(f"Error generating batch report {index}: {str(e)}")
+                return {"index": index, "status": "error", "error": str(e)}
+        
+        tasks = [asyncio.ensure_future(run(index)) for index in range(len(jobs))]
+        try:
+            for finished in asyncio.as_completed(tasks):
+                yield await finished
+        finally:
+            # The consumer went away (e.g. the client disconnected); stop the remaining work
+            for task in tasks:
+                task.cancel()
+    
+    @staticmethod
+    def _report_key(query: str, report_type: str, structured: bool,
+                    sections: Optional[List[str]], top_k: Optional[int],
+                    deadline_ms: Optional[int] = None, priority: str = INTERACTIVE) -> tuple:
+        # Calls at different LLM priorities never share a generation, so an
+        # interactive request is not left waiting behind a batch-priority leader
+        return (
+            normalize_key_part(query),
+            report_type,
+            structured,
+            normalize_key_part(sections) if sections else None,
+            top_k,
+            deadline_ms,
+            priority
+        )
+    
+    async def refresh_report(self, report_id: str, deadline_ms: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Regenerate a stored structured report where its supporting data changed
+        
+        Retrieval is run again; a section is regenerated only if it did not
+        complete last time, its precomputed table changed, or the relevance-
+        weighted overlap of its supporting documents with the last version
+        fell below REPORT_REFRESH_MIN_OVERLAP. Other sections are reused.
+        
+        Args:
+            report_id: ID returned with the report
+            deadline_ms: Time budget for the refresh in milliseconds (optional)
+            
+        Returns:
+            The new version of the report, with a "refresh" summary
+            
+        Raises:
+            KeyError: If no report with this ID is stored
+        """
+        await self._persisted(report_id)
+        stored = await asyncio.to_thread(self.report_store.get, report_id)
+        if stored is None:
+            raise KeyError(report_id)
+        params = stored["params"]
+        with deadline(deadline_ms / 1000.0 if deadline_ms else None):
+            return await self.report_calls.do(
+                ("refresh", report_id, deadline_ms, llm_priority.get()),
+                lambda: self._generate_report(
+                    params["query"], params["report_type"], True, params["sections"], params["top_k"],
+                    previous=stored["report"]
+                ),
+                deadline_at=current_deadline.get()
+            )
+    
+    async def get_report(self, report_id: str, version: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """A stored version of a report (the latest by default), or None"""
+        await self._persisted(report_id)
+        stored = await asyncio.to_thread(self.report_store.get, report_id, version)
+        return stored["report"] if stored else None
+    
+    async def rendered_report(self, report_id: str, fmt: str = "html",
+                              version: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """
+        The stored rendering of a report version (the latest by default), or None
+        
+        Versions stored before rendering existed are rendered on first view.
+        """
+        await self._persisted(report_id)
+        return await asyncio.to_thread(
+            rendered_artifact, self.report_store, self.artifact_store, report_id, fmt, version
+        )
+    
+    async def diff_report(self, report_id: str, from_version: Optional[int] = None,
+                          to_version: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Compare two versions of a report section by section
+        
+        Defaults to the latest version against the one before it.
+        
+        Raises:
+            KeyError: If either version is not stored
+        """
+        await self._persisted(report_id)
+        new = await asyncio.to_thread(self.report_store.get, report_id, to_version)
+        if new is None:
+            raise KeyError(report_id)
+        old = await asyncio.to_thread(
+            self.report_store.get, report_id, from_version if from_version is not None else new["version"] - 1
+        )
+        if old is None:
+            raise KeyError(report_id)
+        return {
+            "report_id": report_id,
+            "from_version": old["version"],
+            "to_version": new["version"],
+            "sections": self._diff_sections(old["report"], new["report"]),
+        }
+    
+    @staticmethod
+    def _diff_sections(old: Dict[str, Any], new: Dict[str, Any]) -> Dict[str, Any]:
+        old_content, new_content = old.get("content") or {}, new.get("content") or {}
+        old_support, new_support = old.get("section_support") or {}, new.get("section_support") or {}
+        sections = {}
+        for section in list(new_content) + [s for s in old_content if s not in new_content]:
+            if section not in old_content:
+                sections[section] = {"status": "added"}
+                continue
+            if section not in new_content:
+                sections[section] = {"status": "removed"}
+                continue
+            old_ids = set((old_support.get(section) or {}).get("documents") or {})
+            new_ids = set((new_support.get(section) or {}).get("documents") or {})
+            entry = {
+                "status": "unchanged" if old_content[section] == new_content[section] else "changed",
+                "documents_added": sorted(new_ids - old_ids),
+                "documents_removed": sorted(old_ids - new_ids),
+            }
+            if entry["status"] == "changed":
+                entry["diff"] = list(difflib.unified_diff(
+                    old_content[section].splitlines(), new_content[section].splitlines(),
+                    f"v{old.get('version')}", f"v{new.get('version')}", lineterm="", n=1
+                ))
+            sections[section] = entry
+        return sections
+    
+    async def _generate_report(self,
+                               query: str,
+                               report_type: str,
+                               structured: bool,
+                               sections: Optional[List[str]],
+                               top_k: Optional[int],
+                               documents: Optional[List[RetrievedDocument]] = None,
+                               previous: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Generate a report without request coalescing, retrieving documents unless they are given
+        
+        Structured reports get a new version under their report ID and are
+        stored in the background (see _persist_later); with `previous`,
+        sections whose support did not change are reused from it.
+        """
         # Retrieve relevant documents
-        documents = await self.retrieval_service.retrieve_relevant_documents(query, top_k)
+        if documents is None:
+            with span("report.retrieval"):
+                documents = await within_deadline(
+                    self.retrieval_service.retrieve_relevant_documents(query, top_k), "retrieval"
+                )
         
         # Extract text from documents for context
-        context = [doc['text'] for doc in documents]
+        context = [doc.text for doc in documents]
         
         # Generate report
-        if structured:
-            report_content = await self.gemini_service.generate_structured_report(
-                query=query,
-                context=context,
-                report_type=report_type,
-                sections=sections
-            )
-        else:
-            report_content = await self.gemini_service.generate_response(
-                query=query,
-                context=context,
-                report_type=report_type
-            )
+        with span("report.generation"):
+            if structured:
+                requested = sections or settings.DEFAULT_REPORT_SECTIONS
+                section_documents = await self._section_documents(query, requested, top_k)
+                # Metrics and sentiment tables read the local stores, so they are built off the event loop
+                section_context = await asyncio.to_thread(self._section_context, query, documents, sections)
+                support = {
+                    section: self._section_support(section_documents.get(section, documents), section_context.get(section))
+                    for section in requested
+                }
+                reasons = {
+                    section: reason for section in requested
+                    if (reason := self._regeneration_reason(previous, section, support[section]))
+                }
+                generated = {}
+                if reasons:
+                    generated = await self.gemini_service.generate_structured_report(
+                        query=query,
+                        context=context,
+                        report_type=report_type,
+                        sections=[section for section in requested if section in reasons],
+                        section_context=section_context,
+                        section_documents={
+                            section: [doc.text for doc in docs] for section, docs in section_documents.items()
+                        } or None
+                    )
+                report_content = {
+                    section: generated[section] if section in reasons else previous["content"][section]
+                    for section in requested if section in generated or section not in reasons
+                }
+            else:
+                report_content = await within_deadline(
+                    self.gemini_service.generate_response(
+                        query=query,
+                        context=context,
+                        report_type=report_type
+                    ),
+                    "generation"
+                )
         
         # Prepare response
+        if structured:
+            # Every document that fed a section, in first-seen order
+            sourced = {doc.id: doc for docs in [documents, *section_documents.values()] for doc in docs}
+            documents = list(sourced.values())
         report = {
             "query": query,
             "report_type": report_type,
             "content": report_content,
             "sources": [
                 {
-                    "id": doc["id"],
-                    "source": doc["source"],
-                    "date": doc["date"],
-                    "relevance_score": doc["score"]
+                    "id": doc.id,
+                    "source": doc.source,
+                    "date": doc.date,
+                    "relevance_score": doc.score
                 } for doc in documents
             ]
         }
         
-        return report
\ No newline at end of file
+        if structured:
+            # Sections cut off by the deadline are reported rather than silently dropped
+            report["section_status"] = {
+                section: "completed" if section in report_content else "cancelled"
+                for section in requested
+            }
+            for section, status in report["section_status"].items():
+                REPORT_SECTIONS.inc(status="reused" if status == "completed" and section not in reasons else status)
+            report["partial"] = "cancelled" in report["section_status"].values()
+            report["section_support"] = support
+            if previous is not None:
+                report["refresh"] = {
+                    "previous_version": previous.get("version"),
+                    "regenerated": {section: reasons[section] for section in requested if section in generated},
+                    "reused": [section for section in requested if section not in reasons],
+                }
+            report["report_id"] = report_id_for(query, report_type, sections, top_k)
+            try:
+                report["version"] = await asyncio.to_thread(self.report_store.reserve_version, report["report_id"])
+            except Exception as e:
+                logging.error(f"Error storing report {report['report_id']}: {str(e)}")
+            else:
+                self._persist_later(
+                    report, {"query": query, "report_type": report_type, "sections": sections, "top_k": top_k}
+                )
+        else:
+            report["partial"] = False
+        
+        return report
+    
+    def _persist_later(self, report: Dict[str, Any], params: Dict[str, Any]):
+        """
+        Store and render a report version in the background
+
+        Writes of one report ID run in version order. Every
+        REPORT_PRUNE_INTERVAL_SECONDS, reports past the store's cap or TTL are
+        pruned along with their renderings.
+        """
+        report_id = report["report_id"]
+        previous = self._persisting.get(report_id)
+
+        async def persist():
+            if previous is not None:
+                await asyncio.wait([previous])
+            try:
+                await asyncio.to_thread(self.report_store.put, report_id, params, report, report["version"])
+            except Exception as e:
+                logging.error(f"Error storing report {report_id}: {str(e)}")
+                return
+            try:
+                await asyncio.to_thread(
+                    lambda: self.artifact_store.publish(report_id, report["version"], render_artifacts(report, time.time()))
+                )
+            except Exception as e:
+                logging.error(f"Error rendering report {report_id}: {str(e)}")
+            if time.time() - self._pruned_at >= REPORT_PRUNE_INTERVAL_SECONDS:
+                self._pruned_at = time.time()
+                try:
+                    removed = await asyncio.to_thread(self.report_store.prune)
+                    await asyncio.to_thread(self.artifact_store.delete_reports, removed)
+                except Exception as e:
+                    logging.error(f"Error pruning reports: {str(e)}")
+
+        task = asyncio.ensure_future(persist())
+        self._persisting[report_id] = task
+
+        def done(_):
+            if self._persisting.get(report_id) is task:
+                del self._persisting[report_id]
+
+        task.add_done_callback(done)
+
+    async def _persisted(self, report_id: str):
+        """Wait until pending writes of a report are stored (without cancelling them if the caller is)"""
+        pending = self._persisting.get(report_id)
+        if pending is not None:
+            await asyncio.wait([pending])
+
+    async def flush(self):
+        """Wait for every pending report write, e.g. before shutting down"""
+        if self._persisting:
+            await asyncio.wait(list(self._persisting.values()))
+
+    async def _section_documents(self, query: str, sections: List[str],
+                                 top_k: Optional[int]) -> Dict[str, List[RetrievedDocument]]:
+        """Documents retrieved for each section on its own (only with REPORT_SECTION_RETRIEVAL)"""
+        if not settings.REPORT_SECTION_RETRIEVAL:
+            return {}
+        with span("report.section_retrieval"):
+            results = await within_deadline(
+                self.retrieval_service.retrieve_many([f"{query} {section}" for section in sections], top_k),
+                "section retrieval"
+            )
+        return dict(zip(sections, results))
+    
+    @staticmethod
+    def _section_support(documents: List[RetrievedDocument], table: Optional[str]) -> Dict[str, Any]:
+        """What a section was generated from: document IDs with scores, and a digest of its precomputed table"""
+        return {
+            "documents": {doc.id: round(float(doc.score), 4) for doc in documents},
+            "precomputed": hashlib.sha1(table.encode("utf-8")).hexdigest()[:16] if table else None,
+        }
+    
+    @staticmethod
+    def _regeneration_reason(previous: Optional[Dict[str, Any]], section: str,
+                             support: Dict[str, Any]) -> Optional[str]:
+        """Why a section has to be generated, or None if the previous version can be reused"""
+        if previous is None:
+            return "new"
+        if section not in (previous.get("content") or {}):
+            return "not_completed"
+        old = (previous.get("section_support") or {}).get(section)
+        if old is None:
+            return "no_support_recorded"
+        if old.get("precomputed") != support["precomputed"]:
+            return "precomputed_changed"
+        if support_overlap(old.get("documents") or {}, support["documents"]) < settings.REPORT_REFRESH_MIN_OVERLAP:
+            return "documents_changed"
+        return None
+    
+    def _section_context(self, query: str, documents: List[RetrievedDocument],
+                         sections: Optional[List[str]]) -> Dict[str, str]:
+        """Precomputed tables for the sections that have them, keyed by section name"""
+        requested = sections or settings.DEFAULT_REPORT_SECTIONS
+        context = {}
+        if METRICS_SECTION in requested:
+            table = self._metrics_context(query, documents)
+            if table:
+                context[METRICS_SECTION] = table
+        if any(section in requested for section in SENTIMENT_SECTIONS):
+            table = self._sentiment_context(query, documents)
+            if table:
+                context.update({section: table for section in SENTIMENT_SECTIONS if section in requested})
+        return context
+    
+    def _metrics_context(self, query: str, documents: List[RetrievedDocument]) -> str:
+        """
+        Build the precomputed metrics table for the "Financial Metrics" section
+        
+        Companies are taken from the retrieved documents' metadata (resolved to
+        their stored keys through the symbol master) and from stored stock IDs
+        mentioned in the query.
+        """
+        store = self.metrics_engine.store
+        known = set(store.stocks())
+        if not known:
+            return ""
+        
+        candidates = []
+        for doc in documents:
+            metadata = doc.metadata or {}
+            candidates.extend(metadata.get(key) for key in ("stock_name", "stock_id"))
+        normalized_query = f" {store.normalize_stock_id(query)} "
+        candidates.extend(stock_id for stock_id in sorted(known) if f" {stock_id} " in normalized_query)
+        
+        stock_ids = []
+        for candidate in candidates:
+            stock_id = store.normalize_stock_id(self.symbol_master.stock_key(candidate)) if candidate else None
+            if stock_id in known and stock_id not in stock_ids:
+                stock_ids.append(stock_id)
+        stock_ids = stock_ids[:MAX_METRICS_COMPANIES]
+        if not stock_ids:
+            return ""
+        
+        try:
+            return self.metrics_engine.format_table(self.metrics_engine.compute(stock_ids))
+        except Exception as e:
+            logging.error(f"Error computing financial metrics: {str(e)}")
+            return ""
+    
+    def _sentiment_context(self, query: str, documents: List[RetrievedDocument]) -> str:
+        """
+        Build the news sentiment table for the "Market Overview" and "Risk Analysis" sections
+        
+        Entities are taken from the retrieved documents' metadata and from
+        words of the query that name a known entity.
+        """
+        candidates = []
+        for doc in documents:
+            metadata = doc.metadata or {}
+            entities = metadata.get("entities") or []
+            candidates.extend(entities if isinstance(entities, list) else [entities])
+            candidates.extend(metadata.get(key) for key in ("stock_name", "stock_id"))
+        candidates.extend(query.split())
+        
+        try:
+            summary = self.sentiment_store.summarize([c for c in candidates if c], window=SENTIMENT_WINDOW_DAYS)
+            summary = dict(list(summary.items())[:MAX_SENTIMENT_ENTITIES])
+            return self.sentiment_store.format_table(summary)
+        except Exception as e:
+            logging.error(f"Error computing sentiment aggregates: {str(e)}")
+            return ""
\ No newline at end of file
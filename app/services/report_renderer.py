@@ -0,0 +1,217 @@
+"""
+Render stored reports as static HTML and JSON artifacts
+
+Usage (e.g. to publish a report to the frontend's static files):
+    python -m app.services.report_renderer REPORT_ID frontend/public/report.html
+    python -m app.services.report_renderer REPORT_ID report.json --format json --version 3
+"""
+import argparse
+import json
+import re
+import sys
+from datetime import datetime, timezone
+from html import escape
+from typing import Any, Callable, Dict, List, Optional
+from app.core.metrics import CACHE_REQUESTS
+from app.data.artifact_store import ArtifactStore
+from app.data.report_store import ReportStore
+
+MEDIA_TYPES = {
+    "html": "text/html; charset=utf-8",
+    "json": "application/json",
+}
+
+# Same look as the hand-written sector reports
+STYLE = """
+        body { font-family: Arial, sans-serif; line-height: 1.6; margin: 2em; }
+        h1, h2, h3 { color: #004080; }
+        table { width: 100%; border-collapse: collapse; margin: 1em 0; }
+        th, td { border: 1px solid #ccc; padding: 8px; text-align: center; }
+        th { background-color: #f4f4f4; }
+        .section { margin-bottom: 2em; }
+        .notice { color: #a05000; }"""
+
+_BULLET = re.compile(r"^\s*[-*•]\s+(.*)")
+_NUMBERED = re.compile(r"^\s*\d+[.)]\s+(.*)")
+_HEADING = re.compile(r"^\s*#{1,6}\s+(.*)")
+_TABLE_SEPARATOR = re.compile(r"^\s*\|?[\s:|-]+\|?\s*$")
+
+
+def _inline(text: str) -> str:
+    """Escape text, keeping **bold** from the model's markdown"""
+    return re.sub(r"\*\*(.+?)\*\*", r"<strong>\1</strong>", escape(text.strip()))
+
+
+def _cells(line: str) -> List[str]:
+    return [cell.strip() for cell in line.strip().strip("|").split("|")]
+
+
+def markdown_to_html(text: str) -> str:
+    """
+    Convert the subset of markdown the model writes (headings, bullet and
+    numbered lists, pipe tables, bold, paragraphs) to HTML; everything is escaped
+    """
+    blocks: List[str] = []
+    paragraph: List[str] = []
+    items: List[str] = []
+    list_tag = ""
+    rows: List[str] = []
+
+    def flush():
+        nonlocal list_tag
+        if paragraph:
+            blocks.append(f"<p>{' '.join(_inline(line) for line in paragraph)}</p>")
+            paragraph.clear()
+        if items:
+            blocks.append(f"<{list_tag}>" + "".join(f"<li>{item}</li>" for item in items) + f"</{list_tag}>")
+            items.clear()
+        if rows:
+            header, *body = rows
+            blocks.append(
+                "<table><tr>" + "".join(f"<th>{_inline(cell)}</th>" for cell in _cells(header)) + "</tr>"
+                + "".join("<tr>" + "".join(f"<td>{_inline(cell)}</td>" for cell in _cells(row)) + "</tr>" for row in body)
+                + "</table>"
+            )
+            rows.clear()
+
+    for line in text.splitlines():
+        if line.strip().startswith("|"):
+            if not rows:
+                flush()
+            if not _TABLE_SEPARATOR.match(line):
+                rows.append(line)
+            continue
+        if rows:
+            flush()
+        heading, bullet, numbered = _HEADING.match(line), _BULLET.match(line), _NUMBERED.match(line)
+        if not line.strip():
+            flush()
+        elif heading:
+            flush()
+            blocks.append(f"<h3>{_inline(heading.group(1))}</h3>")
+        elif bullet or numbered:
+            tag = "ul" if bullet else "ol"
+            if paragraph or (items and list_tag != tag):
+                flush()
+            list_tag = tag
+            items.append(_inline((bullet or numbered).group(1)))
+        elif items:
+            # Continuation of the previous list item
+            items[-1] += " " + _inline(line)
+        else:
+            paragraph.append(line)
+    flush()
+    return "\n".join(blocks)
+
+
+def render_html(report: Dict[str, Any], created_at: Optional[float] = None) -> bytes:
+    """A standalone HTML page for a report"""
+    content = report.get("content")
+    sections = content.items() if isinstance(content, dict) else [("Report", content or "")]
+    date = datetime.fromtimestamp(created_at, timezone.utc).strftime("%d %B %Y") if created_at else None
+    parts = [
+        "<!DOCTYPE html>",
+        "<html>",
+        "<head>",
+        '    <meta charset="UTF-8">',
+        f"    <title>{escape(report.get('query', 'Report'))} - Research Report</title>",
+        f"    <style>{STYLE}\n    </style>",
+        "</head>",
+        "<body>",
+        f"    <h1>{escape(report.get('query', 'Report'))}</h1>",
+        f"    <p><strong>Report type:</strong> {escape(str(report.get('report_type', 'general')))}</p>",
+    ]
+    if date:
+        parts.append(f"    <p><strong>Date:</strong> {date}</p>")
+    if report.get("version") is not None:
+        parts.append(f"    <p><strong>Version:</strong> {report['version']}</p>")
+    if report.get("partial"):
+        cancelled = [section for section, status in report.get("section_status", {}).items() if status != "completed"]
+        parts.append(f'    <p class="notice">Partial report; not completed: {escape(", ".join(cancelled))}</p>')
+    for number, (section, text) in enumerate(sections, 1):
+        parts += [
+            '    <div class="section">',
+            f"        <h2>{number}. {escape(section)}</h2>",
+            markdown_to_html(str(text)),
+            "    </div>",
+        ]
+    sources = report.get("sources") or []
+    if sources:
+        parts += [
+            '    <div class="section">',
+            "        <h2>Sources</h2>",
+            "        <table>",
+            "            <tr><th>Source</th><th>Date</th><th>Relevance</th></tr>",
+        ]
+        for source in sources:
+            score = source.get("relevance_score")
+            parts.append(
+                f"            <tr><td>{escape(str(source.get('source') or ''))}</td>"
+                f"<td>{escape(str(source.get('date') or ''))}</td>"
+                f"<td>{'' if score is None else f'{score:.3f}'}</td></tr>"
+            )
+        parts += ["        </table>", "    </div>"]
+    parts += ["</body>", "</html>", ""]
+    return "\n".join(parts).encode("utf-8")
+
+
+def render_json(report: Dict[str, Any], created_at: Optional[float] = None) -> bytes:
+    """The report as canonical JSON (sorted keys), so equal reports have equal bytes"""
+    return json.dumps(report, sort_keys=True, separators=(",", ":"), default=str).encode("utf-8")
+
+
+RENDERERS: Dict[str, Callable[..., bytes]] = {
+    "html": render_html,
+    "json": render_json,
+}
+
+
+def render_artifacts(report: Dict[str, Any], created_at: Optional[float] = None) -> Dict[str, bytes]:
+    return {fmt: render(report, created_at) for fmt, render in RENDERERS.items()}
+
+
+def rendered_artifact(report_store: ReportStore, artifact_store: ArtifactStore, report_id: str,
+                      fmt: str, version: Optional[int] = None) -> Optional[Dict[str, Any]]:
+    """
+    The stored rendering of a report version, rendering and storing it first if needed
+
+    Returns:
+        The artifact record (see ArtifactStore.get), or None if the report version is not stored
+    """
+    artifact = artifact_store.get(report_id, fmt, version)
+    if artifact is not None and version is None:
+        # A version stored after the last rendering (e.g. if rendering failed) is served once rendered
+        versions = report_store.versions(report_id)
+        if versions and versions[-1] != artifact["version"]:
+            artifact = None
+    if artifact is not None and artifact_store.has(artifact["digest"]):
+        CACHE_REQUESTS.inc(cache="report_artifact", result="hit")
+        return artifact
+    CACHE_REQUESTS.inc(cache="report_artifact", result="miss")
+    stored = report_store.get(report_id, version)
+    if stored is None:
+        return None
+    artifact_store.publish(report_id, stored["version"], render_artifacts(stored["report"], stored["created_at"]))
+    return artifact_store.get(report_id, fmt, stored["version"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("report_id")
+    parser.add_argument("output", help="File to write")
+    parser.add_argument("--format", choices=sorted(RENDERERS), default="html")
+    parser.add_argument("--version", type=int, help="Report version (default: latest)")
+    args = parser.parse_args()
+
+    artifact_store = ArtifactStore()
+    artifact = rendered_artifact(ReportStore(), artifact_store, args.report_id, args.format, args.version)
+    if artifact is None:
+        print(f"Report {args.report_id} not found", file=sys.stderr)
+        sys.exit(1)
+    with open(args.output, "wb") as f:
+        f.write(artifact_store.read(artifact["digest"]))
+    print(f"Wrote version {artifact['version']} ({artifact['size']} bytes, sha256 {artifact['digest']}) to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+from sentence_transformers import CrossEncoder
+from app.core.config import settings
+from app.core.metrics import RERANK_CANDIDATES, RERANK_BUDGET_EXHAUSTED, RERANK_PROMPT_TOKENS
+from app.data.documents import RetrievedDocument
+from typing import List, Optional
+import logging
+import time
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough prompt token count of a text (about four characters per token)"""
+    return len(text or "") // 4
+
+
+class Reranker:
+    """
+    Second retrieval stage: rescore vector candidates with a cross-encoder
+
+    The vector index is queried for a wide candidate set for recall; the
+    cross-encoder reads each (query, document) pair and only the best few
+    documents go into the prompt. Pairs are scored on the CPU in batches in
+    vector-rank order, and scoring stops once the latency budget is spent:
+    candidates scored so far are ranked by the cross-encoder, and unscored
+    ones are only used, in vector order, to fill up to top_k.
+    """
+
+    def __init__(self, model_name: Optional[str] = None, batch_size: Optional[int] = None,
+                 budget_ms: Optional[float] = None):
+        self.model_name = model_name or settings.RERANK_MODEL
+        self.batch_size = batch_size or settings.RERANK_BATCH_SIZE
+        self.budget_ms = settings.RERANK_BUDGET_MS if budget_ms is None else budget_ms
+        self.model = CrossEncoder(self.model_name, max_length=settings.RERANK_MAX_LENGTH)
+
+    def _score(self, pairs: List[List[str]]) -> List[float]:
+        """Scores for a prefix of pairs: all of them, or as many as fit in the budget (at least one batch)"""
+        started = time.perf_counter()
+        scores: List[float] = []
+        for start in range(0, len(pairs), self.batch_size):
+            if scores and (time.perf_counter() - started) * 1000.0 >= self.budget_ms:
+                RERANK_BUDGET_EXHAUSTED.inc()
+                logging.warning(f"Rerank budget of {self.budget_ms}ms spent after {len(scores)}/{len(pairs)} pairs")
+                break
+            batch = pairs[start:start + self.batch_size]
+            scores.extend(float(score) for score in self.model.predict(batch, batch_size=len(batch),
+                                                                       show_progress_bar=False))
+        return scores
+
+    def rerank(self, queries: List[str], candidates: List[List[RetrievedDocument]], top_k: int,
+               baseline_k: int) -> List[List[RetrievedDocument]]:
+        """
+        Keep the top_k documents of each query's candidates by cross-encoder score
+
+        Pairs of all queries are scored together, round-robin by rank, so a
+        spent budget cuts off the weakest candidates of every query rather
+        than all candidates of the last queries.
+
+        Args:
+            queries: The queries
+            candidates: Vector hits per query, best first
+            top_k: Documents to keep per query
+            baseline_k: Documents that would have been kept without reranking (for the token metric)
+
+        Returns:
+            Kept documents per query with their rerank_score set (None if not scored), best first
+        """
+        order = [
+            (query_index, rank)
+            for rank in range(max((len(docs) for docs in candidates), default=0))
+            for query_index, docs in enumerate(candidates) if rank < len(docs)
+        ]
+        pairs = [[queries[q], candidates[q][rank].text] for q, rank in order]
+        RERANK_CANDIDATES.inc(len(pairs))
+        scores = self._score(pairs)
+        scored = {position: score for position, score in zip(order, scores)}
+
+        results = []
+        for query_index, docs in enumerate(candidates):
+            ranked = sorted(
+                (rank for rank in range(len(docs)) if (query_index, rank) in scored),
+                key=lambda rank: -scored[(query_index, rank)]
+            )
+            ranked += [rank for rank in range(len(docs)) if (query_index, rank) not in scored]
+            kept = []
+            for rank in ranked[:top_k]:
+                docs[rank].rerank_score = scored.get((query_index, rank))
+                kept.append(docs[rank])
+            RERANK_PROMPT_TOKENS.inc(sum(estimate_tokens(doc.text) for doc in docs[:baseline_k]), stage="before")
+            RERANK_PROMPT_TOKENS.inc(sum(estimate_tokens(doc.text) for doc in kept), stage="after")
+            results.append(kept)
+        return results
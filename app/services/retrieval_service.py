@@ -1,8 +1,18 @@
 from pinecone import Pinecone, ServerlessSpec
 from sentence_transformers import SentenceTransformer
 from app.core.config import settings
-from typing import List, Dict, Any
+from app.core.metrics import span, DOCUMENTS_RETRIEVED, CACHE_REQUESTS
+from app.data.document_store import DocumentStore
+from app.data.documents import DocumentBatch, RetrievedDocument
+from app.data.preprocessing import filterable_metadata
+from app.services.reranker import Reranker
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import List, Dict, Any, Callable, Optional, Union
+import asyncio
 import logging
+import numpy as np
 
 class RetrievalService:
     def __init__(self):
@@ -54,10 +64,77 @@ class RetrievalService:
             
         # Connect to index
         self.index = self.pc.Index(settings.PINECONE_INDEX_NAME)
+        
+        # Text and full metadata are kept locally; the index only holds filterable fields
+        self.document_store = DocumentStore()
+        
+        # The Pinecone and embedding clients are blocking: vector calls run on a
+        # bounded pool and embeddings on a single worker, keeping the event loop free
+        self._vector_pool = ThreadPoolExecutor(max_workers=settings.VECTOR_MAX_WORKERS, thread_name_prefix="vector")
+        self._embedding_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="embedding")
+        
+        # Recent query embeddings (least recently used evicted first); the cache warmer fills it before peak
+        self._query_embeddings: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        
+        # Cross-encoder second stage; shares the embedding worker since both are CPU-bound models
+        self.reranker = Reranker() if settings.RERANK_ENABLED else None
     
     def get_embedding(self, text: str) -> List[float]:
         """Generate embedding for a text string"""
-        return self.embedding_model.encode(text).tolist()
+        with span("retrieval.embedding"):
+            return self.embedding_model.encode(text).tolist()
+    
+    def get_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """Generate embeddings for a list of text strings in batches"""
+        return self.get_embedding_matrix(texts).tolist()
+    
+    def get_embedding_matrix(self, texts: List[str]) -> np.ndarray:
+        """Embeddings of texts as one float32 matrix, a row per text"""
+        with span("retrieval.embedding_batch"):
+            return np.asarray(
+                self.embedding_model.encode(texts, batch_size=settings.EMBEDDING_BATCH_SIZE), dtype=np.float32
+            )
+    
+    async def _in_pool(self, pool: ThreadPoolExecutor, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        return await asyncio.get_running_loop().run_in_executor(pool, partial(fn, *args, **kwargs))
+    
+    async def embed(self, texts: List[str]) -> np.ndarray:
+        """Embed texts off the event loop into a float32 matrix"""
+        return await self._in_pool(self._embedding_pool, self.get_embedding_matrix, texts)
+    
+    async def embed_queries(self, queries: List[str]) -> List[np.ndarray]:
+        """Embed queries, reusing cached embeddings and embedding only the misses in one batch"""
+        keys = [" ".join(query.split()) for query in queries]
+        missing = []
+        for key in keys:
+            if key in self._query_embeddings:
+                self._query_embeddings.move_to_end(key)
+                CACHE_REQUESTS.inc(cache="query_embedding", result="hit")
+            elif key not in missing:
+                CACHE_REQUESTS.inc(cache="query_embedding", result="miss")
+                missing.append(key)
+        embeddings = {key: self._query_embeddings[key] for key in keys if key in self._query_embeddings}
+        if missing:
+            # Rows are copied so a cached query does not keep its whole batch alive
+            embeddings.update((key, row.copy()) for key, row in zip(missing, await self.embed(missing)))
+            if settings.EMBEDDING_CACHE_SIZE > 0:
+                for key in missing:
+                    self._query_embeddings[key] = embeddings[key]
+                while len(self._query_embeddings) > settings.EMBEDDING_CACHE_SIZE:
+                    self._query_embeddings.popitem(last=False)
+        return [embeddings[key] for key in keys]
+    
+    async def _vector_call(self, stage: str, fn: Callable[..., Any], **kwargs) -> Any:
+        """Run a blocking vector index call on the bounded vector pool"""
+        with span(stage):
+            return await self._in_pool(self._vector_pool, fn, **kwargs)
+    
+    async def _store(self, fn: Callable[..., Any], *args) -> Any:
+        return await self._in_pool(self._vector_pool, fn, *args)
+    
+    def _vector(self, doc_id: str, embedding: np.ndarray, metadata: Dict[str, Any]):
+        # The index client takes lists; only one batch is converted at a time
+        return (doc_id, embedding.tolist(), filterable_metadata(metadata or {}, settings.VECTOR_METADATA_KEYS))
     
     async def index_document(self, document: Dict[str, Any]) -> str:
         """
@@ -69,21 +146,108 @@ class RetrievalService:
         Returns:
             Document ID
         """
-        doc_id = document['id']
-        text = document['text']
-        metadata = document.get('metadata', {})
-        
         # Generate embedding
-        embedding = self.get_embedding(text)
+        embedding = (await self.embed([document['text']]))[0]
         
-        # Upsert to Pinecone
-        self.index.upsert(
-            vectors=[(doc_id, embedding, metadata)]
+        # Upsert to Pinecone, then store the text the vector points at
+        await self._vector_call(
+            "retrieval.vector_upsert",
+            self.index.upsert,
+            vectors=[self._vector(document['id'], embedding, document.get('metadata'))]
         )
+        await self._store_upserted([document['id']], [document])
         
-        return doc_id
+        return document['id']
     
-    async def retrieve_relevant_documents(self, query: str, top_k: int = None) -> List[Dict[str, Any]]:
+    async def _store_upserted(self, ids: List[str], documents: Union[DocumentBatch, List[Dict[str, Any]]]):
+        """
+        Write upserted documents to the document store
+        
+        The store is only written once the vectors are in the index, so a failed
+        upsert never leaves the store ahead of the index; if the store write fails,
+        the new vectors are deleted again rather than left without their text.
+        """
+        try:
+            with span("retrieval.document_store_write"):
+                await self._store(self.document_store.put_many, documents)
+        except BaseException:
+            try:
+                await self.delete_vectors(ids)
+            except Exception as e:
+                logging.error(f"Error deleting vectors after a failed document store write: {str(e)}")
+            raise
+    
+    async def index_documents(self, documents: Union[DocumentBatch, List[Dict[str, Any]]]) -> List[str]:
+        """
+        Index many documents with batched embedding and pipelined upserts
+        
+        Documents are embedded one upsert batch at a time; while a batch is
+        being upserted the next one is already being embedded, and up to
+        VECTOR_UPSERT_CONCURRENCY upserts are in flight at once. Each batch is
+        written to the document store after its upsert succeeds.
+        
+        Args:
+            documents: A DocumentBatch, or dictionaries with at least 'id', 'text', and 'metadata'
+            
+        Returns:
+            List of document IDs
+        """
+        batch = DocumentBatch.from_documents(documents)
+        if not len(batch):
+            return []
+        
+        batch_size = settings.UPSERT_BATCH_SIZE
+        upsert_slots = asyncio.Semaphore(settings.VECTOR_UPSERT_CONCURRENCY)
+        
+        async def upsert(part: DocumentBatch):
+            try:
+                await self._vector_call(
+                    "retrieval.vector_upsert",
+                    self.index.upsert,
+                    vectors=[
+                        self._vector(doc_id, embedding, metadata)
+                        for doc_id, embedding, metadata in zip(part.ids, part.embeddings, part.metadata)
+                    ]
+                )
+                await self._store_upserted(list(part.ids), part)
+            finally:
+                upsert_slots.release()
+        
+        upserts = []
+        try:
+            for start in range(0, len(batch), batch_size):
+                part = batch.slice(start, start + batch_size)
+                part.embeddings = await self.embed(part.texts)
+                # Wait for a free slot so at most VECTOR_UPSERT_CONCURRENCY batches are held in memory
+                await upsert_slots.acquire()
+                upserts.append(asyncio.create_task(upsert(part)))
+            await asyncio.gather(*upserts)
+        finally:
+            for task in upserts:
+                task.cancel()
+            
+        return list(batch.ids)
+    
+    async def delete_vectors(self, ids: List[str]):
+        """Delete vectors by ID"""
+        await self._vector_call("retrieval.vector_delete", self.index.delete, ids=ids)
+    
+    async def upsert_vectors(self, vectors: List[tuple]):
+        """Upsert precomputed (id, values, metadata) vectors"""
+        await self._vector_call("retrieval.vector_upsert", self.index.upsert, vectors=vectors)
+    
+    async def fetch_vectors(self, ids: List[str]) -> Dict[str, Any]:
+        """Vectors (with "values" and "metadata") by ID; missing IDs are left out"""
+        response = await self._vector_call("retrieval.vector_fetch", self.index.fetch, ids=ids)
+        return dict(response["vectors"])
+    
+    async def list_vector_ids(self) -> List[str]:
+        """IDs of every vector in the index"""
+        return await self._vector_call(
+            "retrieval.vector_list", lambda: [vec_id for page in self.index.list() for vec_id in page]
+        )
+    
+    async def retrieve_relevant_documents(self, query: str, top_k: int = None) -> List[RetrievedDocument]:
         """
         Retrieve relevant documents for a query
         
@@ -94,29 +258,74 @@ class RetrievalService:
         Returns:
             List of relevant documents with their metadata and text
         """
-        if top_k is None:
-            top_k = settings.MAX_DOCUMENTS_RETRIEVED
+        return (await self.retrieve_many([query], top_k))[0]
+    
+    async def retrieve_many(self, queries: List[str], top_k: Optional[int] = None) -> List[List[RetrievedDocument]]:
+        """
+        Retrieve relevant documents for many queries at once
+        
+        Queries missing from the embedding cache are embedded in one batch and
+        the vector lookups run concurrently on the bounded vector pool. With reranking enabled,
+        RERANK_CANDIDATES hits per query are fetched and the cross-encoder
+        keeps the best top_k.
+        
+        Args:
+            queries: The queries
+            top_k: Number of documents to retrieve per query (defaults to MAX_DOCUMENTS_RETRIEVED,
+                or RERANK_TOP_K with reranking)
             
-        # Generate query embedding
-        query_embedding = self.get_embedding(query)
-        
-        # Query Pinecone
-        results = self.index.query(
-            vector=query_embedding,
-            top_k=top_k,
-            include_metadata=True
-        )
+        Returns:
+            One list of documents per query, in the same order
+        """
+        if not queries:
+            return []
+        baseline_k = top_k or settings.MAX_DOCUMENTS_RETRIEVED
+        if self.reranker is not None:
+            top_k = top_k or settings.RERANK_TOP_K
+            fetch_k = max(settings.RERANK_CANDIDATES, baseline_k, top_k)
+        else:
+            top_k = fetch_k = baseline_k
+            
+        embeddings = await self.embed_queries(queries)
+        
+        results = await asyncio.gather(*(
+            self._vector_call(
+                "retrieval.vector_query", self.index.query, vector=embedding.tolist(), top_k=fetch_k, include_metadata=True
+            )
+            for embedding in embeddings
+        ))
+        # One bulk read hydrates the hits of every query
+        with span("retrieval.document_store_read"):
+            stored = await self._store(self.document_store.get_many, list({
+                match['id'] for result in results for match in result['matches']
+            }))
+        documents = [self._format_matches(result, stored) for result in results]
+        if self.reranker is None:
+            return documents
+        with span("retrieval.rerank"):
+            return await self._in_pool(self._embedding_pool, self.reranker.rerank, queries, documents, top_k, baseline_k)
+    
+    def _format_matches(self, results, stored: Dict[str, Dict[str, Any]]) -> List[RetrievedDocument]:
+        """
+        Convert a vector query response into retrieved documents
         
-        # Format results
+        Text and metadata come from the document store; vectors indexed before
+        it existed still carry their text in the index metadata.
+        """
         documents = []
         for match in results['matches']:
-            documents.append({
-                'id': match['id'],
-                'score': match['score'],
-                'text': match['metadata'].get('text', ''),
-                'source': match['metadata'].get('source', ''),
-                'date': match['metadata'].get('date', ''),
-                'metadata': match['metadata']
-            })
+            index_metadata = match.get('metadata') or {}
+            doc = stored.get(match['id'])
+            metadata = {**index_metadata, **doc['metadata']} if doc else index_metadata
+            documents.append(RetrievedDocument(
+                id=match['id'],
+                score=match['score'],
+                text=doc['text'] if doc else index_metadata.get('text', ''),
+                source=metadata.get('source', ''),
+                date=metadata.get('date', ''),
+                metadata=metadata,
+                rerank_score=None
+            ))
             
+        DOCUMENTS_RETRIEVED.inc(len(documents))
         return documents
\ No newline at end of file
@@ -0,0 +1,60 @@
+import asyncio
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Optional
+
+# Absolute time.monotonic() by which the current request must be answered
+current_deadline: ContextVar[Optional[float]] = ContextVar("current_deadline", default=None)
+
+
+class DeadlineExceeded(Exception):
+    """The request's time budget ran out before the operation finished"""
+
+
+@contextmanager
+def deadline(timeout: Optional[float]):
+    """
+    Set a time budget for the enclosed code and the tasks it starts
+
+    A nested deadline can only shorten an enclosing one. None leaves the
+    current deadline unchanged.
+    """
+    if timeout is None:
+        yield
+        return
+    at = time.monotonic() + timeout
+    enclosing = current_deadline.get()
+    if enclosing is not None:
+        at = min(at, enclosing)
+    token = current_deadline.set(at)
+    try:
+        yield
+    finally:
+        current_deadline.reset(token)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left before the current deadline, or None when there is none"""
+    at = current_deadline.get()
+    return None if at is None else at - time.monotonic()
+
+
+async def within_deadline(awaitable: Awaitable[Any], operation: str = "operation") -> Any:
+    """
+    Await with the current deadline as timeout
+
+    Raises:
+        DeadlineExceeded: The deadline passed first (the awaitable is cancelled)
+    """
+    left = remaining()
+    if left is None:
+        return await awaitable
+    if left <= 0:
+        if asyncio.iscoroutine(awaitable):
+            awaitable.close()
+        raise DeadlineExceeded(f"Deadline exceeded before {operation}")
+    try:
+        return await asyncio.wait_for(awaitable, left)
+    except asyncio.TimeoutError:
+        raise DeadlineExceeded(f"Deadline exceeded during {operation}") from None
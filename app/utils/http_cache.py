@@ -0,0 +1,41 @@
+from typing import Optional
+
+
+def etag_matches(if_none_match: Optional[str], *tags: str) -> bool:
+    """
+    Whether an If-None-Match header matches any of the given entity tags
+
+    Uses the weak comparison conditional GETs call for: W/ prefixes are ignored.
+    """
+    if not if_none_match:
+        return False
+    candidates = set()
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*":
+            return True
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        candidates.add(tag.strip('"'))
+    return any(tag.strip('"') in candidates for tag in tags)
+
+
+def accepts_encoding(accept_encoding: Optional[str], coding: str) -> bool:
+    """Whether an Accept-Encoding header allows a content coding (e.g. "gzip")"""
+    wildcard = None
+    for part in (accept_encoding or "").split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        name = name.strip().lower()
+        if name == coding:
+            return quality > 0
+        if name == "*":
+            wildcard = quality > 0
+    return bool(wildcard)
@@ -0,0 +1,82 @@
+import base64
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+from app.core.metrics import CACHE_REQUESTS
+
+
+def encode_cursor(result_id: str, offset: int) -> str:
+    return base64.urlsafe_b64encode(f"{result_id}:{offset}".encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[str, int]:
+    """Split a cursor into (result_id, offset); raises ValueError if it is malformed"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        result_id, offset = raw.rsplit(":", 1)
+        offset = int(offset)
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+    if offset < 0:
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return result_id, offset
+
+
+class PageCache:
+    """
+    Holds fetched result sets so later pages can be served from a cursor
+
+    A result set is kept for `ttl` seconds after it was last read, and at most
+    `max_results` sets holding at most `max_items` items in total are kept
+    (least recently read evicted first; the newest set is always kept), so
+    paging through a large fetch never repeats the upstream calls while the
+    memory held stays bounded. Fetches too large to hold should be streamed.
+    """
+
+    def __init__(self, name: str, ttl: float, max_results: int, max_items: Optional[int] = None):
+        self.name = name
+        self.ttl = ttl
+        self.max_results = max(1, max_results)
+        self.max_items = max_items
+        self._results: "OrderedDict[str, Tuple[float, List[Any], Dict[str, Any]]]" = OrderedDict()
+        self._items = 0
+
+    def _expire(self):
+        now = time.monotonic()
+        while self._results:
+            result_id, (touched, items, _) = next(iter(self._results.items()))
+            over_items = self.max_items is not None and self._items > self.max_items and len(self._results) > 1
+            if now - touched < self.ttl and len(self._results) <= self.max_results and not over_items:
+                break
+            del self._results[result_id]
+            self._items -= len(items)
+
+    def put(self, items: List[Any], extra: Optional[Dict[str, Any]] = None) -> str:
+        """Store a result set with fields repeated on every page; returns its ID"""
+        result_id = uuid.uuid4().hex
+        self._results[result_id] = (time.monotonic(), items, extra or {})
+        self._items += len(items)
+        self._expire()
+        return result_id
+
+    def get(self, result_id: str) -> Optional[Tuple[List[Any], Dict[str, Any]]]:
+        self._expire()
+        entry = self._results.get(result_id)
+        if entry is None:
+            CACHE_REQUESTS.inc(cache=self.name, result="miss")
+            return None
+        CACHE_REQUESTS.inc(cache=self.name, result="hit")
+        self._results[result_id] = (time.monotonic(), entry[1], entry[2])
+        self._results.move_to_end(result_id)
+        return entry[1], entry[2]
+
+    def page(self, items: List[Any], offset: int, size: int,
+             result_id: Optional[str] = None) -> Dict[str, Any]:
+        """Slice one page and the cursor of the next one (None on the last page)"""
+        end = offset + size
+        return {
+            "data": items[offset:end],
+            "total": len(items),
+            "next_cursor": encode_cursor(result_id, end) if result_id and end < len(items) else None,
+        }
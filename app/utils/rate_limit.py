@@ -0,0 +1,67 @@
+import asyncio
+import time
+from typing import Optional
+
+
+class TokenBucket:
+    """
+    Asynchronous token bucket
+
+    Tokens refill continuously at `rate` per second up to `capacity`. acquire()
+    waits until the requested amount is available; debit() charges usage that
+    is only known afterwards and may push the balance below zero, which makes
+    later callers wait until the debt has been refilled.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    @property
+    def available(self) -> float:
+        self._refill()
+        return self._tokens
+
+    async def acquire(self, amount: float = 1.0):
+        """Wait until `amount` tokens are available and take them (amounts above capacity are capped)"""
+        amount = min(float(amount), self.capacity)
+        # The lock keeps waiters first-come first-served
+        async with self._lock:
+            self._refill()
+            while self._tokens < amount:
+                await asyncio.sleep((amount - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= amount
+
+    def try_acquire(self, amount: float = 1.0) -> bool:
+        """
+        Take `amount` tokens if they are available now, without waiting
+
+        Callers that order their own waiters (e.g. by priority) use this with
+        delay() instead of acquire(); it does not queue behind acquire().
+        """
+        amount = min(float(amount), self.capacity)
+        self._refill()
+        if self._tokens < amount:
+            return False
+        self._tokens -= amount
+        return True
+
+    def delay(self, amount: float = 1.0) -> float:
+        """Seconds until `amount` tokens will be available"""
+        amount = min(float(amount), self.capacity)
+        self._refill()
+        return max(0.0, (amount - self._tokens) / self.rate)
+
+    def debit(self, amount: float):
+        """Charge tokens without waiting"""
+        self._refill()
+        self._tokens -= float(amount)
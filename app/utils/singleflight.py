@@ -0,0 +1,82 @@
+import asyncio
+import copy
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+from app.core.metrics import SINGLEFLIGHT_CALLS
+from app.utils.deadline import current_deadline, within_deadline
+
+
+def normalize_key_part(value: Any) -> Any:
+    """Normalize free text so trivially different spellings share a key"""
+    if isinstance(value, str):
+        return " ".join(value.lower().split())
+    if isinstance(value, (list, tuple)):
+        return tuple(normalize_key_part(item) for item in value)
+    return value
+
+
+class SingleFlight:
+    """
+    Coalesce identical concurrent calls into one in-flight execution
+
+    The first caller for a key starts the work in its own task; callers that
+    arrive while it is still running await the same task instead of starting
+    their own. Cancelling one caller does not cancel the shared work, and
+    neither does a caller's deadline: the work runs without the callers'
+    deadlines (or with one given explicitly), and each caller stops waiting
+    at its own. Every caller gets its own copy of the result.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._inflight: Dict[Hashable, Tuple[asyncio.Task, Optional[float]]] = {}
+
+    def _forget(self, key: Hashable, task: asyncio.Task):
+        if key in self._inflight and self._inflight[key][0] is task:
+            del self._inflight[key]
+        # Mark the exception as retrieved in case every caller went away
+        if not task.cancelled():
+            task.exception()
+
+    @staticmethod
+    async def _run(fn: Callable[[], Awaitable[Any]], deadline_at: Optional[float]) -> Any:
+        # The task has its own copy of the context, so no caller's deadline changes
+        current_deadline.set(deadline_at)
+        return await fn()
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]], deadline_at: Optional[float] = None) -> Any:
+        """
+        Run fn() once per key among concurrent callers
+
+        Args:
+            key: Hashable key identifying identical requests
+            fn: Zero-argument coroutine function doing the actual work
+            deadline_at: Deadline (time.monotonic()) of the work itself, for work that
+                handles its own deadline (e.g. by returning a partial result); set by
+                the caller that starts it and part of the key's meaning. None runs it
+                without a deadline.
+
+        Returns:
+            A copy of the shared result of fn()
+
+        Raises:
+            DeadlineExceeded: The caller's deadline passed first (the shared work goes on)
+        """
+        flight = self._inflight.get(key)
+        if flight is None:
+            SINGLEFLIGHT_CALLS.inc(group=self.name, result="leader")
+            flight = (asyncio.ensure_future(self._run(fn, deadline_at)), deadline_at)
+            self._inflight[key] = flight
+            flight[0].add_done_callback(lambda t: self._forget(key, t))
+        else:
+            SINGLEFLIGHT_CALLS.inc(group=self.name, result="collapsed")
+        task, flight_deadline = flight
+        caller_deadline = current_deadline.get()
+        if caller_deadline is None or (flight_deadline is not None and flight_deadline <= caller_deadline):
+            # The work ends by this caller's deadline on its own
+            result = await asyncio.shield(task)
+        else:
+            result = await within_deadline(asyncio.shield(task), f"{self.name} call")
+        return copy.deepcopy(result)
+
+    def in_flight(self) -> int:
+        return len(self._inflight)
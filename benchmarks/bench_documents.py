@@ -0,0 +1,133 @@
+"""
+Memory benchmark for document records on a large ingest
+
+Compares holding N fetched documents with their embeddings as nested dicts
+(text repeated in the metadata, embeddings as lists of Python floats) with a
+DocumentBatch (parallel columns and one float32 embedding matrix), and with
+--ingest also measures the peak traced memory of
+RetrievalService.index_documents for both inputs against the local fakes.
+
+Usage:
+    python -m benchmarks.bench_documents --documents 100000
+    python -m benchmarks.bench_documents --documents 100000 --ingest
+"""
+import argparse
+import asyncio
+import gc
+import sys
+import time
+import tracemalloc
+import numpy as np
+from app.data.documents import DocumentBatch
+
+DIMENSION = 384
+
+
+def make_documents(count: int):
+    """Columns of synthetic news documents, shaped like the data fetcher's output"""
+    texts = [f"Headline {i} about company {i % 500}. Quarterly results and outlook for the sector." for i in range(count)]
+    metadata = [
+        {
+            "type": "news",
+            "title": f"Headline {i} about company {i % 500}",
+            "source": "Newswire",
+            "published_at": f"2025-04-{1 + i % 28:02d}T09:00:00Z",
+            "url": f"https://news.example.com/{i}",
+        }
+        for i in range(count)
+    ]
+    return [f"news_{i}" for i in range(count)], texts, metadata
+
+
+def build_dicts(ids, texts, metadata, embeddings: np.ndarray):
+    return [
+        {"id": doc_id, "text": text, "metadata": {**meta, "text": text}, "embedding": embedding}
+        for doc_id, text, meta, embedding in zip(ids, texts, metadata, embeddings.tolist())
+    ]
+
+
+def build_batch(ids, texts, metadata, embeddings: np.ndarray):
+    return DocumentBatch(ids, texts, [dict(meta) for meta in metadata], embeddings.copy())
+
+
+def deep_size(obj, seen=None) -> int:
+    """Bytes held by obj and everything it references (shared objects counted once)"""
+    seen = set() if seen is None else seen
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    if isinstance(obj, np.ndarray):
+        # Includes the data buffer unless obj is a view
+        return sys.getsizeof(obj)
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_size(key, seen) + deep_size(value, seen) for key, value in obj.items())
+    elif isinstance(obj, (list, tuple)):
+        if obj and all(type(item) is float for item in obj):
+            # Floats from tolist() are never shared; skip tracking millions of IDs
+            return size + len(obj) * sys.getsizeof(0.0)
+        size += sum(deep_size(item, seen) for item in obj)
+    elif isinstance(obj, DocumentBatch):
+        size += sum(deep_size(getattr(obj, name), seen) for name in DocumentBatch.__slots__)
+    return size
+
+
+def measure(build, *args):
+    """Bytes held by the result of build(*args), and the time it took"""
+    started = time.perf_counter()
+    result = build(*args)
+    elapsed = time.perf_counter() - started
+    return deep_size(result), elapsed
+
+
+async def ingest_peaks(ids, texts, metadata):
+    """Peak traced memory of indexing the same documents as dicts and as a batch"""
+    from benchmarks.fakes import Record, install_fakes
+    install_fakes(llm_latency=0.0)
+    from app.services.retrieval_service import RetrievalService
+
+    service = RetrievalService()
+    # The vector database is remote in production: discard upserts so only the app's own allocations count
+    service.index.upsert = lambda vectors, **kwargs: Record(upserted_count=len(vectors))
+    peaks = {}
+    for label in ("dicts", "batch"):
+        if label == "dicts":
+            documents = [{"id": f"{label}_{doc_id}", "text": text, "metadata": {**meta, "text": text}}
+                         for doc_id, text, meta in zip(ids, texts, metadata)]
+        else:
+            documents = DocumentBatch([f"{label}_{doc_id}" for doc_id in ids], texts, metadata)
+        gc.collect()
+        tracemalloc.start()
+        await service.index_documents(documents)
+        _, peaks[label] = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del documents
+    return peaks
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--documents", type=int, default=100000)
+    parser.add_argument("--ingest", action="store_true", help="Also measure RetrievalService.index_documents")
+    args = parser.parse_args()
+
+    ids, texts, metadata = make_documents(args.documents)
+    embeddings = np.random.default_rng(42).standard_normal((args.documents, DIMENSION)).astype(np.float32)
+
+    dicts_bytes, dicts_time = measure(build_dicts, ids, texts, metadata, embeddings)
+    batch_bytes, batch_time = measure(build_batch, ids, texts, metadata, embeddings)
+
+    mb = 1024 * 1024
+    print(f"documents={args.documents} dimension={DIMENSION}")
+    print(f"nested dicts      : {dicts_bytes / mb:9.1f} MB  {dicts_bytes / args.documents:8.0f} B/doc  {dicts_time * 1e3:8.1f} ms")
+    print(f"document batch    : {batch_bytes / mb:9.1f} MB  {batch_bytes / args.documents:8.0f} B/doc  {batch_time * 1e3:8.1f} ms")
+    print(f"reduction         : {dicts_bytes / batch_bytes:9.1f}x")
+
+    if args.ingest:
+        peaks = asyncio.run(ingest_peaks(ids, texts, metadata))
+        print(f"ingest peak dicts : {peaks['dicts'] / mb:9.1f} MB")
+        print(f"ingest peak batch : {peaks['batch'] / mb:9.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,546 @@
+"""
+Deterministic local stand-ins for Gemini, Pinecone, the embedding model and
+the upstream market-data APIs, used by the offline benchmarks.
+
+install_fakes() must run before anything imports app.api.routes (or main),
+because the routes module builds its services at import time.
+"""
+import asyncio
+import atexit
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import numpy as np
+from aiohttp import web
+from typing import List, Dict, Any, Optional
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_STOCK_RESPONSE = os.path.join(REPO_ROOT, "response_1744492143393.json")
+
+# Settings the app reads from the environment at import time
+FAKE_ENVIRONMENT = {
+    "GEMINI_API_KEY": "stub",
+    "PINECONE_API_KEY": "stub",
+    "PINECONE_ENVIRONMENT": "local",
+    "PINECONE_INDEX_NAME": "benchmark",
+    "EMBEDDING_MODEL": "stub-embedding",
+    "MAX_DOCUMENTS_RETRIEVED": "5",
+    "NEWS_API_KEY": "stub",
+    "MARKETAUX_API_KEY": "stub",
+}
+
+# Local stores the app writes to, relative to a fresh scratch directory per run,
+# so benchmark runs never share state with each other or the working tree
+SCRATCH_PATHS = {
+    "TIMESERIES_DIR": "timeseries",
+    "DOCUMENT_STORE_PATH": "documents.db",
+    "SENTIMENT_STORE_PATH": "sentiment.npz",
+    "REPORT_STORE_PATH": "reports.db",
+    "REPORT_ARTIFACT_DIR": "report_artifacts",
+    "SYMBOL_MASTER_PATH": "symbols.json",
+    "ACCESS_STATS_PATH": "access_stats.json",
+    "TRAFFIC_RECORD_PATH": "traffic.jsonl",
+    "PROFILING_DIR": "profiles",
+}
+
+
+def _seed(text: str) -> int:
+    return int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+class Record(dict):
+    """Dictionary that also allows attribute access, like the Pinecone response objects"""
+
+    def __getattr__(self, name):
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name)
+
+
+# ---------------------------------------------------------------------------
+# Gemini
+# ---------------------------------------------------------------------------
+
+class StubGenerativeModel:
+    """Stand-in for genai.GenerativeModel with configurable latency"""
+
+    def __init__(self, model_name: str = "stub", latency: float = 0.05, jitter: float = 0.0,
+                 output_tokens: int = 200):
+        self.model_name = model_name
+        self.latency = latency
+        self.jitter = jitter
+        self.output_tokens = output_tokens
+        self.calls = 0
+
+    def _delay(self, prompt: str) -> float:
+        if not self.jitter:
+            return self.latency
+        # Deterministic jitter derived from the prompt
+        return self.latency + (_seed(prompt) % 1000) / 1000.0 * self.jitter
+
+    def _response(self, prompt: str) -> Record:
+        self.calls += 1
+        words = ["stub"] * self.output_tokens
+        return Record(
+            text=f"Generated content ({_seed(prompt) % 10000}): " + " ".join(words),
+            usage_metadata=Record(
+                prompt_token_count=len(prompt) // 4,
+                candidates_token_count=self.output_tokens,
+                total_token_count=len(prompt) // 4 + self.output_tokens
+            )
+        )
+
+    def generate_content(self, prompt: str, **kwargs) -> Record:
+        time.sleep(self._delay(prompt))
+        return self._response(prompt)
+
+    async def generate_content_async(self, prompt: str, **kwargs) -> Record:
+        await asyncio.sleep(self._delay(prompt))
+        return self._response(prompt)
+
+
+class StubGenAI:
+    """Replacement for the google.generativeai module"""
+
+    def __init__(self, **model_options):
+        self.model_options = model_options
+        self.models: List[StubGenerativeModel] = []
+
+    def configure(self, **kwargs):
+        pass
+
+    def GenerativeModel(self, model_name: str, **kwargs) -> StubGenerativeModel:
+        model = StubGenerativeModel(model_name, **self.model_options)
+        self.models.append(model)
+        return model
+
+
+# ---------------------------------------------------------------------------
+# Embeddings and vector store
+# ---------------------------------------------------------------------------
+
+class StubSentenceTransformer:
+    """Deterministic hash-based replacement for SentenceTransformer"""
+
+    def __init__(self, model_name: str = "stub", dimension: int = 384, latency_per_text: float = 0.0):
+        self.model_name = model_name
+        self.dimension = dimension
+        self.latency_per_text = latency_per_text
+
+    def _encode_one(self, text: str) -> np.ndarray:
+        vector = np.random.default_rng(_seed(text)).standard_normal(self.dimension).astype(np.float32)
+        return vector / np.linalg.norm(vector)
+
+    def encode(self, sentences, batch_size: int = 32, **kwargs) -> np.ndarray:
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        if self.latency_per_text:
+            time.sleep(self.latency_per_text * len(texts))
+        if not texts:
+            return np.zeros((0, self.dimension), dtype=np.float32)
+        vectors = np.stack([self._encode_one(text) for text in texts])
+        return vectors[0] if single else vectors
+
+
+class StubCrossEncoder:
+    """Word-overlap replacement for sentence_transformers.CrossEncoder"""
+
+    def __init__(self, model_name: str = "stub", latency_per_pair: float = 0.0, **kwargs):
+        self.model_name = model_name
+        self.latency_per_pair = latency_per_pair
+
+    def predict(self, pairs, batch_size: int = 32, **kwargs) -> np.ndarray:
+        if self.latency_per_pair:
+            time.sleep(self.latency_per_pair * len(pairs))
+        scores = []
+        for query, text in pairs:
+            query_words = set(query.lower().split())
+            text_words = set(text.lower().split())
+            scores.append(len(query_words & text_words) / (len(query_words) or 1))
+        return np.array(scores, dtype=np.float32)
+
+
+def _matches_filter(metadata: Dict[str, Any], flt: Optional[Dict[str, Any]]) -> bool:
+    """Evaluate the subset of the Pinecone metadata filter language used by the app"""
+    if not flt:
+        return True
+    for key, condition in flt.items():
+        if key == "$and":
+            if not all(_matches_filter(metadata, sub) for sub in condition):
+                return False
+            continue
+        if key == "$or":
+            if not any(_matches_filter(metadata, sub) for sub in condition):
+                return False
+            continue
+        value = metadata.get(key)
+        if not isinstance(condition, dict):
+            condition = {"$eq": condition}
+        for op, operand in condition.items():
+            if op == "$eq" and value != operand:
+                return False
+            if op == "$ne" and value == operand:
+                return False
+            if op == "$in" and value not in operand:
+                return False
+            if op == "$nin" and value in operand:
+                return False
+            if op in ("$gt", "$gte", "$lt", "$lte"):
+                if value is None:
+                    return False
+                if op == "$gt" and not value > operand:
+                    return False
+                if op == "$gte" and not value >= operand:
+                    return False
+                if op == "$lt" and not value < operand:
+                    return False
+                if op == "$lte" and not value <= operand:
+                    return False
+    return True
+
+
+class InMemoryIndex:
+    """In-memory vector index with the parts of the Pinecone Index API the app uses"""
+
+    def __init__(self, dimension: int, latency: float = 0.0):
+        self.dimension = dimension
+        self.latency = latency
+        self._ids: List[str] = []
+        self._positions: Dict[str, int] = {}
+        self._vectors = np.zeros((0, dimension), dtype=np.float32)
+        self._metadata: List[Dict[str, Any]] = []
+        self._alive = np.zeros(0, dtype=bool)
+        # Calls arrive from the app's vector thread pool; the real service serializes writes itself
+        self._lock = threading.Lock()
+
+    def _sleep(self):
+        if self.latency:
+            time.sleep(self.latency)
+
+    def upsert(self, vectors, namespace: Optional[str] = None, **kwargs) -> Record:
+        self._sleep()
+        with self._lock:
+            return self._upsert(vectors)
+
+    def _upsert(self, vectors) -> Record:
+        new_rows = []
+        for item in vectors:
+            if isinstance(item, dict):
+                vec_id, values, metadata = item["id"], item["values"], item.get("metadata", {})
+            else:
+                vec_id, values = item[0], item[1]
+                metadata = item[2] if len(item) > 2 else {}
+            values = np.asarray(values, dtype=np.float32)
+            norm = np.linalg.norm(values)
+            values = values / norm if norm else values
+            if vec_id in self._positions:
+                pos = self._positions[vec_id]
+                self._vectors[pos] = values
+                self._metadata[pos] = dict(metadata or {})
+                self._alive[pos] = True
+            else:
+                self._positions[vec_id] = len(self._ids) + len(new_rows)
+                new_rows.append((vec_id, values, dict(metadata or {})))
+        if new_rows:
+            self._ids.extend(row[0] for row in new_rows)
+            self._metadata.extend(row[2] for row in new_rows)
+            self._vectors = np.vstack([self._vectors, np.stack([row[1] for row in new_rows])])
+            self._alive = np.concatenate([self._alive, np.ones(len(new_rows), dtype=bool)])
+        return Record(upserted_count=len(vectors))
+
+    def query(self, vector=None, top_k: int = 10, include_metadata: bool = False,
+              include_values: bool = False, filter: Optional[Dict[str, Any]] = None, **kwargs) -> Record:
+        self._sleep()
+        with self._lock:
+            return self._query(vector, top_k, include_metadata, include_values, filter)
+
+    def _query(self, vector, top_k: int, include_metadata: bool, include_values: bool,
+               filter: Optional[Dict[str, Any]]) -> Record:
+        if not len(self._ids):
+            return Record(matches=[], namespace="")
+        query = np.asarray(vector, dtype=np.float32)
+        query = query / (np.linalg.norm(query) or 1.0)
+        scores = self._vectors @ query
+        candidates = self._alive.copy()
+        if filter:
+            candidates &= np.array([_matches_filter(meta, filter) for meta in self._metadata], dtype=bool)
+        scores = np.where(candidates, scores, -np.inf)
+        k = min(top_k, int(candidates.sum()))
+        if k <= 0:
+            return Record(matches=[], namespace="")
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        matches = []
+        for pos in top:
+            match = Record(id=self._ids[pos], score=float(scores[pos]))
+            if include_metadata:
+                match["metadata"] = dict(self._metadata[pos])
+            if include_values:
+                match["values"] = self._vectors[pos].tolist()
+            matches.append(match)
+        return Record(matches=matches, namespace="")
+
+    def fetch(self, ids: List[str], **kwargs) -> Record:
+        self._sleep()
+        with self._lock:
+            return Record(vectors=self._fetch(ids), namespace="")
+
+    def _fetch(self, ids: List[str]) -> Dict[str, Record]:
+        vectors = {}
+        for vec_id in ids:
+            pos = self._positions.get(vec_id)
+            if pos is not None and self._alive[pos]:
+                vectors[vec_id] = Record(
+                    id=vec_id,
+                    values=self._vectors[pos].tolist(),
+                    metadata=dict(self._metadata[pos])
+                )
+        return vectors
+
+    def delete(self, ids: Optional[List[str]] = None, delete_all: bool = False, **kwargs) -> Record:
+        self._sleep()
+        with self._lock:
+            if delete_all:
+                self._alive[:] = False
+            for vec_id in ids or []:
+                pos = self._positions.get(vec_id)
+                if pos is not None:
+                    self._alive[pos] = False
+        return Record()
+
+    def list(self, prefix: Optional[str] = None, limit: int = 100, **kwargs):
+        """Yield pages of live IDs, like Index.list() on serverless indexes"""
+        page = []
+        for pos, vec_id in enumerate(self._ids):
+            if not self._alive[pos] or (prefix and not vec_id.startswith(prefix)):
+                continue
+            page.append(vec_id)
+            if len(page) == limit:
+                yield page
+                page = []
+        if page:
+            yield page
+
+    def describe_index_stats(self, **kwargs) -> Record:
+        return Record(dimension=self.dimension, total_vector_count=int(self._alive.sum()),
+                      namespaces={"": Record(vector_count=int(self._alive.sum()))})
+
+
+class _IndexList(list):
+    def names(self) -> List[str]:
+        return [index["name"] for index in self]
+
+
+class FakePinecone:
+    """Replacement for the Pinecone client that keeps indexes in memory"""
+
+    indexes: Dict[str, InMemoryIndex] = {}
+    query_latency: float = 0.0
+
+    def __init__(self, api_key: Optional[str] = None, **kwargs):
+        self.api_key = api_key
+
+    def list_indexes(self) -> _IndexList:
+        return _IndexList(Record(name=name, dimension=index.dimension) for name, index in self.indexes.items())
+
+    def describe_index(self, name: str) -> Record:
+        return Record(name=name, dimension=self.indexes[name].dimension)
+
+    def create_index(self, name: str, dimension: int, metric: str = "cosine", spec=None, **kwargs):
+        self.indexes[name] = InMemoryIndex(dimension, latency=self.query_latency)
+
+    def delete_index(self, name: str, **kwargs):
+        self.indexes.pop(name, None)
+
+    def Index(self, name: str, **kwargs) -> InMemoryIndex:
+        return self.indexes[name]
+
+
+# ---------------------------------------------------------------------------
+# Upstream market-data APIs
+# ---------------------------------------------------------------------------
+
+def _default_cassette() -> Dict[str, Any]:
+    """Build payloads from the recorded Reliance response and synthetic news"""
+    with open(DEFAULT_STOCK_RESPONSE) as f:
+        recorded = json.load(f)
+    stock = recorded["data"][0]["raw_data"]
+
+    articles = [
+        {
+            "title": f"Market update {i}: Indian equities in focus",
+            "description": f"Analysts discuss sector rotation and earnings outlook, item {i}.",
+            "content": "Benchmark indices moved as investors weighed earnings and global cues. " * 4,
+            "source": {"name": ["Mint", "Reuters", "Economic Times"][i % 3]},
+            "author": "Desk",
+            "publishedAt": f"2025-04-{1 + i % 28:02d}T09:15:00Z",
+            "url": f"https://news.example.com/markets/{i}",
+            "urlToImage": None
+        } for i in range(50)
+    ]
+    sentiment = [
+        {
+            "title": f"Reliance sentiment story {i}",
+            "description": "Company-specific coverage with entity sentiment.",
+            "source": "marketaux.example.com",
+            "published_at": f"2025-04-{1 + i % 28:02d}T10:00:00.000000Z",
+            "url": f"https://sentiment.example.com/story/{i}",
+            "sentiment": {"polarity": ["positive", "neutral", "negative"][i % 3], "score": ((i % 7) - 3) / 3},
+            "entities": [{"name": "Reliance Industries", "symbol": "RELIANCE.NS", "sentiment_score": ((i % 5) - 2) / 2}]
+        } for i in range(50)
+    ]
+    indian_news = [
+        {
+            "title": f"Indian markets brief {i}",
+            "summary": "Sensex and Nifty closed mixed after a volatile session.",
+            "url": f"https://in-news.example.com/{i}",
+            "image_url": "",
+            "source": "Indian Stock API",
+            "pub_date": f"2025-04-{1 + i % 28:02d}T08:00:00",
+            "topics": ["markets"]
+        } for i in range(20)
+    ]
+    forecasts = {
+        "stock_id": "reliance",
+        "periods": [
+            {"period": f"{year}-03-31", "value": round(40.0 + (year - 2018) * 2.5, 2)} for year in range(2018, 2026)
+        ]
+    }
+    return {
+        "stock": stock,
+        "stock_forecasts": forecasts,
+        "news": indian_news,
+        "everything": {"status": "ok", "totalResults": len(articles), "articles": articles},
+        "top-headlines": {"status": "ok", "totalResults": len(articles), "articles": articles},
+        "news_all": {"meta": {"found": len(sentiment)}, "data": sentiment},
+    }
+
+
+class CassetteServer:
+    """
+    Local HTTP server replaying recorded payloads for the upstream APIs
+
+    Payloads come from the built-in cassette (based on response_1744492143393.json)
+    and can be overridden per route with <route>.json files in cassette_dir,
+    e.g. stock.json, news.json, everything.json, news_all.json.
+    """
+
+    ROUTES = {
+        "/stock": "stock",
+        "/stock_forecasts": "stock_forecasts",
+        "/news": "news",
+        "/v2/everything": "everything",
+        "/v2/top-headlines": "top-headlines",
+        "/v1/news/all": "news_all",
+    }
+
+    def __init__(self, cassette_dir: Optional[str] = None, latency: float = 0.0, host: str = "127.0.0.1"):
+        self.payloads = _default_cassette()
+        if cassette_dir:
+            for name in set(self.ROUTES.values()):
+                path = os.path.join(cassette_dir, f"{name}.json")
+                if os.path.exists(path):
+                    with open(path) as f:
+                        self.payloads[name] = json.load(f)
+        self.latency = latency
+        self.host = host
+        self.port = None
+        self.hits: Dict[str, int] = {}
+        self._runner = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        name = self.ROUTES[request.path]
+        self.hits[name] = self.hits.get(name, 0) + 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return web.json_response(self.payloads[name])
+
+    async def start(self) -> "CassetteServer":
+        app = web.Application()
+        for path in self.ROUTES:
+            app.router.add_get(path, self._handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, 0)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        if self._runner:
+            await self._runner.cleanup()
+
+
+# ---------------------------------------------------------------------------
+# Wiring
+# ---------------------------------------------------------------------------
+
+class FakeBackends:
+    """Handles to the installed fakes, for inspection by benchmark scenarios"""
+
+    def __init__(self, genai: StubGenAI, server: Optional[CassetteServer]):
+        self.genai = genai
+        self.server = server
+
+    @property
+    def index(self) -> InMemoryIndex:
+        return FakePinecone.indexes[os.environ["PINECONE_INDEX_NAME"]]
+
+
+def install_fakes(llm_latency: float = 0.05,
+                  llm_jitter: float = 0.0,
+                  vector_latency: float = 0.0,
+                  embedding_latency: float = 0.0,
+                  rerank_latency: float = 0.0,
+                  server: Optional[CassetteServer] = None) -> FakeBackends:
+    """
+    Point the app at the local stand-ins, with its local stores in a fresh temporary directory
+
+    Args:
+        llm_latency: Seconds per generate_content call
+        llm_jitter: Extra deterministic per-prompt latency, up to this many seconds
+        vector_latency: Seconds per vector index round trip
+        embedding_latency: Seconds per embedded text
+        rerank_latency: Seconds per reranked (query, document) pair
+        server: Started CassetteServer to use for upstream APIs (optional)
+
+    Returns:
+        FakeBackends with the stub LLM and cassette server
+    """
+    for key, value in FAKE_ENVIRONMENT.items():
+        os.environ.setdefault(key, value)
+    scratch = tempfile.mkdtemp(prefix="vittsaar_bench_")
+    atexit.register(shutil.rmtree, scratch, ignore_errors=True)
+    for key, name in SCRATCH_PATHS.items():
+        os.environ[key] = os.path.join(scratch, name)
+
+    from app.services import retrieval_service, reranker, gemini_service, data_service
+
+    genai = StubGenAI(latency=llm_latency, jitter=llm_jitter)
+    gemini_service.genai = genai
+
+    FakePinecone.indexes = {}
+    FakePinecone.query_latency = vector_latency
+    retrieval_service.Pinecone = FakePinecone
+    retrieval_service.SentenceTransformer = (
+        lambda model_name, **kwargs: StubSentenceTransformer(model_name, latency_per_text=embedding_latency)
+    )
+    reranker.CrossEncoder = (
+        lambda model_name, **kwargs: StubCrossEncoder(model_name, latency_per_pair=rerank_latency)
+    )
+
+    if server is not None:
+        data_service.IndianStockService.BASE_URL = server.url
+        data_service.NewsAPIService.BASE_URL = f"{server.url}/v2"
+        data_service.MarketauxService.BASE_URL = f"{server.url}/v1"
+
+    return FakeBackends(genai, server)
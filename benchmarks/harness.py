@@ -0,0 +1,142 @@
+"""
+Load generation, latency statistics and baseline comparison for the benchmarks
+"""
+import asyncio
+import json
+import os
+import platform
+import time
+import numpy as np
+from typing import Awaitable, Callable, Dict, List, Any, Optional
+
+
+def summarize(latencies: List[float], wall_time: float, errors: int = 0) -> Dict[str, float]:
+    """
+    Summarize a list of request latencies
+
+    Args:
+        latencies: Per-request latencies in seconds
+        wall_time: Total elapsed time of the run in seconds
+        errors: Number of failed requests
+
+    Returns:
+        Dictionary with count, errors, p50/p95/p99/mean/max in milliseconds and throughput in requests/second
+    """
+    samples = np.asarray(latencies, dtype=np.float64) * 1000.0
+    if samples.size == 0:
+        return {"count": 0, "errors": errors, "p50_ms": 0.0, "p95_ms": 0.0, "p99_ms": 0.0,
+                "mean_ms": 0.0, "max_ms": 0.0, "throughput_rps": 0.0}
+    p50, p95, p99 = np.percentile(samples, [50, 95, 99])
+    return {
+        "count": int(samples.size),
+        "errors": errors,
+        "p50_ms": round(float(p50), 3),
+        "p95_ms": round(float(p95), 3),
+        "p99_ms": round(float(p99), 3),
+        "mean_ms": round(float(samples.mean()), 3),
+        "max_ms": round(float(samples.max()), 3),
+        "throughput_rps": round(samples.size / wall_time, 3) if wall_time > 0 else 0.0,
+    }
+
+
+async def run_load(call: Callable[[int], Awaitable[Any]],
+                   requests: int,
+                   concurrency: int,
+                   warmup: int = 1) -> Dict[str, float]:
+    """
+    Run a closed-loop load test against an async callable
+
+    Args:
+        call: Coroutine function taking the request number; raising counts as an error
+        requests: Number of measured requests
+        concurrency: Number of requests in flight at once
+        warmup: Unmeasured requests issued first
+
+    Returns:
+        Latency summary from summarize()
+    """
+    for i in range(warmup):
+        await call(-1 - i)
+
+    latencies: List[float] = []
+    errors = 0
+    counter = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for i in counter:
+            start = time.perf_counter()
+            try:
+                await call(i)
+            except Exception:
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(max(1, concurrency))))
+    return summarize(latencies, time.perf_counter() - start, errors)
+
+
+def environment_info() -> Dict[str, str]:
+    """Describe the machine a baseline was recorded on"""
+    return {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpu_count": str(os.cpu_count()),
+    }
+
+
+def load_baseline(path: str) -> Optional[Dict[str, Any]]:
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_baseline(path: str, results: Dict[str, Dict[str, float]], config: Dict[str, Any]):
+    with open(path, "w") as f:
+        json.dump({"environment": environment_info(), "config": config, "results": results}, f, indent=2)
+
+
+def compare(results: Dict[str, Dict[str, float]],
+            baseline: Dict[str, Any],
+            tolerance: float = 0.25) -> List[str]:
+    """
+    Compare results with a stored baseline
+
+    Args:
+        results: Scenario name -> summary
+        baseline: Baseline document written by save_baseline()
+        tolerance: Allowed relative slowdown of p95 and drop in throughput
+
+    Returns:
+        List of human-readable regression messages (empty if none)
+    """
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get("results", {}).get(name)
+        if not previous:
+            continue
+        if previous["p95_ms"] and current["p95_ms"] > previous["p95_ms"] * (1 + tolerance):
+            regressions.append(
+                f"{name}: p95 {current['p95_ms']:.1f} ms vs baseline {previous['p95_ms']:.1f} ms"
+            )
+        if previous["throughput_rps"] and current["throughput_rps"] < previous["throughput_rps"] * (1 - tolerance):
+            regressions.append(
+                f"{name}: throughput {current['throughput_rps']:.1f} rps vs baseline {previous['throughput_rps']:.1f} rps"
+            )
+        if current["errors"] > previous.get("errors", 0):
+            regressions.append(f"{name}: {current['errors']} errors vs baseline {previous.get('errors', 0)}")
+    return regressions
+
+
+def format_table(results: Dict[str, Dict[str, float]]) -> str:
+    header = f"{'scenario':<28}{'n':>6}{'err':>5}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'rps':>10}"
+    lines = [header, "-" * len(header)]
+    for name, r in results.items():
+        lines.append(
+            f"{name:<28}{r['count']:>6}{r['errors']:>5}{r['p50_ms']:>10.1f}{r['p95_ms']:>10.1f}"
+            f"{r['p99_ms']:>10.1f}{r['throughput_rps']:>10.1f}"
+        )
+    return "\n".join(lines)
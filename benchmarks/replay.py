@@ -0,0 +1,242 @@
+"""
+Replay recorded API traffic against the app with local stand-in backends
+
+Traffic is recorded by the app when TRAFFIC_RECORD_ENABLED=true (see
+app.core.traffic). Requests are replayed open-loop: each one is sent at its
+recorded offset divided by the speed factor, whether or not earlier requests
+have finished, so queueing shows up as latency and errors instead of a slower
+send rate. Running several speeds finds the point where the app saturates.
+
+JSON bodies are replayed as recorded (redacted fields stay redacted); uploads
+were only recorded by size, so multipart requests send a synthetic CSV file.
+
+Usage:
+    python -m benchmarks.replay data/traffic.jsonl
+    python -m benchmarks.replay data/traffic.jsonl --speeds 1 2 4 8 16 --output replay.json
+    python -m benchmarks.replay data/traffic.jsonl --paths /api/v1/generate-report --limit 500
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import sys
+import time
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+
+from benchmarks.fakes import CassetteServer, install_fakes
+from benchmarks.harness import summarize
+from benchmarks.run import SEED_DOCUMENTS, build_csv, seed_index
+
+
+def load_trace(path: str, paths: Optional[List[str]] = None, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Read recorded requests sorted by start time, with "offset" seconds from the first one
+
+    Args:
+        path: JSONL file written by the traffic recorder
+        paths: Only keep requests whose path starts with one of these (optional)
+        limit: Keep at most this many requests (optional)
+    """
+    entries = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            entry = json.loads(line)
+            if paths and not entry["path"].startswith(tuple(paths)):
+                continue
+            entries.append(entry)
+    entries.sort(key=lambda entry: entry["t"])
+    entries = entries[:limit] if limit else entries
+    if entries:
+        first = entries[0]["t"]
+        for entry in entries:
+            entry["offset"] = entry["t"] - first
+    return entries
+
+
+def build_request(entry: Dict[str, Any]) -> Dict[str, Any]:
+    """httpx request arguments for a recorded entry"""
+    request = {"method": entry["method"], "url": entry["path"], "params": entry.get("query") or None}
+    content_type = entry.get("content_type", "")
+    if "body" in entry:
+        request["json"] = entry["body"]
+    elif content_type.startswith("multipart/form-data"):
+        request["files"] = {"file": ("replay.csv", io.BytesIO(build_csv()), "text/csv")}
+        request["data"] = {"text_column": "text", "source_column": "source", "date_column": "date"}
+    elif entry.get("body_bytes"):
+        request["content"] = b"x" * entry["body_bytes"]
+        request["headers"] = {"content-type": content_type}
+    return request
+
+
+async def replay(client, entries: List[Dict[str, Any]], speed: float) -> Dict[str, Any]:
+    """
+    Send the entries at their recorded offsets divided by speed
+
+    Returns:
+        Summary with overall and per-path latency statistics, error and shed
+        (429/503) rates, offered vs achieved throughput, peak concurrency and
+        how late the client managed to send requests
+    """
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    failures: Dict[str, int] = defaultdict(int)
+    statuses: Dict[int, int] = defaultdict(int)
+    shed = 0
+    in_flight = peak_in_flight = 0
+    send_lag: List[float] = []
+
+    async def send(entry: Dict[str, Any]):
+        nonlocal shed, in_flight, peak_in_flight
+        in_flight += 1
+        peak_in_flight = max(peak_in_flight, in_flight)
+        start = time.perf_counter()
+        try:
+            response = await client.request(**build_request(entry))
+            statuses[response.status_code] += 1
+            if response.status_code in (429, 503):
+                shed += 1
+            if response.status_code >= 400:
+                failures[entry["path"]] += 1
+            else:
+                latencies[entry["path"]].append(time.perf_counter() - start)
+        except Exception:
+            statuses[0] += 1
+            failures[entry["path"]] += 1
+        finally:
+            in_flight -= 1
+
+    tasks = []
+    started = time.perf_counter()
+    for entry in entries:
+        delay = started + entry["offset"] / speed - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        send_lag.append(max(0.0, -delay))
+        tasks.append(asyncio.create_task(send(entry)))
+    await asyncio.gather(*tasks)
+    wall_time = time.perf_counter() - started
+
+    duration = entries[-1]["offset"] / speed if entries else 0.0
+    all_latencies = [value for values in latencies.values() for value in values]
+    errors = sum(failures.values())
+    overall = summarize(all_latencies, wall_time, errors)
+    return {
+        "speed": speed,
+        "requests": len(entries),
+        "offered_rps": round(len(entries) / duration, 3) if duration > 0 else None,
+        "achieved_rps": round(len(all_latencies) / wall_time, 3) if wall_time > 0 else 0.0,
+        "error_rate": round(errors / len(entries), 4) if entries else 0.0,
+        "shed_rate": round(shed / len(entries), 4) if entries else 0.0,
+        "peak_in_flight": peak_in_flight,
+        "max_send_lag_ms": round(max(send_lag, default=0.0) * 1000.0, 3),
+        "statuses": {str(status): count for status, count in sorted(statuses.items())},
+        "overall": overall,
+        "paths": {
+            path: summarize(latencies.get(path, []), wall_time, failures.get(path, 0))
+            for path in sorted(set(latencies) | set(failures))
+        },
+    }
+
+
+def saturation_point(steps: List[Dict[str, Any]], max_error_rate: float, p95_factor: float) -> Optional[float]:
+    """
+    First speed at which the app stops keeping up
+
+    That is the first step whose error rate exceeds max_error_rate, whose
+    throughput falls below 90% of the offered rate, or whose p95 latency grows
+    beyond p95_factor times the p95 of the first step.
+    """
+    reference = steps[0]["overall"]["p95_ms"] if steps else 0.0
+    for step in steps:
+        offered = step["offered_rps"]
+        if (step["error_rate"] > max_error_rate
+                or (offered and step["achieved_rps"] < 0.9 * offered)
+                or (reference and step["overall"]["p95_ms"] > p95_factor * reference)):
+            return step["speed"]
+    return None
+
+
+def format_steps(steps: List[Dict[str, Any]]) -> str:
+    header = (f"{'speed':>7}{'n':>7}{'offered':>10}{'achieved':>10}{'err %':>8}{'shed %':>8}"
+              f"{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'peak':>7}")
+    lines = [header, "-" * len(header)]
+    for step in steps:
+        overall = step["overall"]
+        offered = f"{step['offered_rps']:.1f}" if step["offered_rps"] is not None else "-"
+        lines.append(
+            f"{step['speed']:>7g}{step['requests']:>7}{offered:>10}{step['achieved_rps']:>10.1f}"
+            f"{step['error_rate'] * 100:>8.1f}{step['shed_rate'] * 100:>8.1f}{overall['p50_ms']:>10.1f}"
+            f"{overall['p95_ms']:>10.1f}{overall['p99_ms']:>10.1f}{step['peak_in_flight']:>7}"
+        )
+    return "\n".join(lines)
+
+
+async def main_async(args) -> int:
+    entries = load_trace(args.trace, args.paths, args.limit)
+    if not entries:
+        print(f"no recorded requests in {args.trace}", file=sys.stderr)
+        return 1
+
+    # Never record the replay itself (it could append to the trace being read)
+    os.environ["TRAFFIC_RECORD_ENABLED"] = "false"
+    server = await CassetteServer(cassette_dir=args.cassette_dir, latency=args.upstream_latency).start()
+    try:
+        install_fakes(
+            llm_latency=args.llm_latency,
+            llm_jitter=args.llm_jitter,
+            vector_latency=args.vector_latency,
+            embedding_latency=args.embedding_latency,
+            server=server
+        )
+        import httpx
+        import main
+
+        await seed_index(args.seed_documents)
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://replay",
+                                   timeout=args.timeout)
+        steps = []
+        for speed in args.speeds:
+            print(f"replaying {len(entries)} requests at {speed:g}x ...", file=sys.stderr)
+            steps.append(await replay(client, entries, speed))
+        await client.aclose()
+    finally:
+        await server.stop()
+
+    print(format_steps(steps))
+    saturated = saturation_point(steps, args.max_error_rate, args.p95_factor)
+    print(f"saturation at {saturated:g}x" if saturated is not None else "no saturation within the tested speeds")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"trace": os.path.abspath(args.trace), "saturation_speed": saturated, "steps": steps}, f, indent=2)
+        print(f"report written to {args.output}")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("trace", help="JSONL file written by the traffic recorder")
+    parser.add_argument("--speeds", type=float, nargs="+", default=[1.0], help="Replay rate multipliers")
+    parser.add_argument("--paths", nargs="*", help="Only replay requests under these path prefixes")
+    parser.add_argument("--limit", type=int, help="Replay at most this many requests")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Per-request timeout in seconds")
+    parser.add_argument("--max-error-rate", type=float, default=0.01, help="Error rate that counts as saturated")
+    parser.add_argument("--p95-factor", type=float, default=3.0,
+                        help="p95 growth over the first speed that counts as saturated")
+    parser.add_argument("--seed-documents", type=int, default=SEED_DOCUMENTS)
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="Seconds per stub LLM call")
+    parser.add_argument("--llm-jitter", type=float, default=0.0)
+    parser.add_argument("--vector-latency", type=float, default=0.0, help="Seconds per vector index call")
+    parser.add_argument("--embedding-latency", type=float, default=0.0, help="Seconds per embedded text")
+    parser.add_argument("--upstream-latency", type=float, default=0.0, help="Seconds per upstream API call")
+    parser.add_argument("--cassette-dir", help="Directory with <route>.json payload overrides")
+    parser.add_argument("--output", help="Write the full report as JSON")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main_async(args)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""
+Offline end-to-end benchmarks for report generation, data fetching and indexing
+
+Every external dependency is replaced by a local stand-in (see benchmarks.fakes),
+so the numbers measure our own code plus the configured fake latencies.
+
+Usage:
+    python -m benchmarks.run                       # run and compare with the baseline
+    python -m benchmarks.run --update-baseline     # record a new baseline
+    python -m benchmarks.run --scenarios generate_report api_generate_report
+"""
+import argparse
+import asyncio
+import io
+import os
+import sys
+from typing import Awaitable, Callable, Dict, Any
+
+from benchmarks.fakes import CassetteServer, install_fakes
+from benchmarks.harness import compare, format_table, load_baseline, run_load, save_baseline
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines.json")
+SEED_DOCUMENTS = 500
+
+
+def build_csv(rows: int = 50) -> bytes:
+    lines = ["text,source,date,sector,pe_ratio"]
+    for i in range(rows):
+        lines.append(f"\"Filing note {i} on quarterly results\",filings,2025-04-{1 + i % 28:02d},Energy,{10 + i % 30}")
+    return "\n".join(lines).encode("utf-8")
+
+
+def build_scenarios(backends, args) -> Dict[str, Callable[[int], Awaitable[Any]]]:
+    """Create one async callable per scenario; imports happen after the fakes are installed"""
+    import httpx
+    import main
+    from app.api import routes
+
+    client = httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://bench")
+    prefix = main.settings.API_V1_STR
+    csv_payload = build_csv()
+
+    async def expect_ok(response):
+        if response.status_code != 200:
+            raise RuntimeError(f"{response.request.url} returned {response.status_code}: {response.text[:200]}")
+        return response
+
+    async def generate_report(i: int):
+        return await routes.report_generator.generate_report(query=f"Outlook for Reliance {i % 10}")
+
+    async def fetch_comprehensive_data(i: int):
+        return await routes.financial_data_fetcher.fetch_comprehensive_data(["Reliance"])
+
+    async def api_generate_report(i: int):
+        return await expect_ok(await client.post(f"{prefix}/generate-report", json={
+            "query": f"Outlook for Reliance {i % 10}", "report_type": "equity"
+        }))
+
+    async def api_index_text(i: int):
+        return await expect_ok(await client.post(f"{prefix}/index-text", json={
+            "text": f"Benchmark note {i}", "source": "bench", "doc_type": "note", "date": "2025-04-13"
+        }))
+
+    async def api_index_csv(i: int):
+        return await expect_ok(await client.post(
+            f"{prefix}/index-csv",
+            files={"file": (f"bench_{i}.csv", io.BytesIO(csv_payload), "text/csv")},
+            data={"text_column": "text", "source_column": "source", "date_column": "date"}
+        ))
+
+    async def api_fetch_and_index(i: int):
+        return await expect_ok(await client.post(f"{prefix}/fetch-and-index-data", json=["Reliance"]))
+
+    async def api_fetch_indian_stock(i: int):
+        return await expect_ok(await client.get(f"{prefix}/fetch-indian-stock", params={"stock_name": "Reliance"}))
+
+    return {
+        "generate_report": generate_report,
+        "fetch_comprehensive_data": fetch_comprehensive_data,
+        "api_generate_report": api_generate_report,
+        "api_index_text": api_index_text,
+        "api_index_csv": api_index_csv,
+        "api_fetch_and_index": api_fetch_and_index,
+        "api_fetch_indian_stock": api_fetch_indian_stock,
+    }
+
+
+async def seed_index(count: int):
+    """Fill the in-memory index so retrieval has realistic work to do"""
+    from app.api import routes
+    documents = [
+        {
+            "id": f"seed_{i}",
+            "text": f"Seed document {i} about Indian equities, earnings and sector {i % 12}",
+            "metadata": {
+                "text": f"Seed document {i} about Indian equities, earnings and sector {i % 12}",
+                "source": "seed", "type": "news", "date": f"2025-04-{1 + i % 28:02d}"
+            }
+        } for i in range(count)
+    ]
+    await routes.data_indexer.retrieval_service.index_documents(documents)
+
+
+async def main_async(args) -> int:
+    server = await CassetteServer(cassette_dir=args.cassette_dir, latency=args.upstream_latency).start()
+    try:
+        backends = install_fakes(
+            llm_latency=args.llm_latency,
+            llm_jitter=args.llm_jitter,
+            vector_latency=args.vector_latency,
+            embedding_latency=args.embedding_latency,
+            server=server
+        )
+        scenarios = build_scenarios(backends, args)
+        await seed_index(SEED_DOCUMENTS)
+
+        selected = args.scenarios or list(scenarios)
+        results = {}
+        for name in selected:
+            print(f"running {name} ...", file=sys.stderr)
+            results[name] = await run_load(scenarios[name], args.requests, args.concurrency)
+    finally:
+        await server.stop()
+
+    print(format_table(results))
+
+    config = {key: value for key, value in vars(args).items() if key not in ("update_baseline", "baseline")}
+    if args.update_baseline:
+        save_baseline(args.baseline, results, config)
+        print(f"baseline written to {args.baseline}")
+        return 0
+
+    baseline = load_baseline(args.baseline)
+    if baseline is None:
+        print(f"no baseline at {args.baseline}; run with --update-baseline to record one")
+        return 0
+    if baseline.get("config") != config:
+        print("warning: baseline was recorded with a different configuration", file=sys.stderr)
+    regressions = compare(results, baseline, args.tolerance)
+    for message in regressions:
+        print(f"REGRESSION {message}")
+    return 1 if regressions else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", nargs="*", help="Scenarios to run (default: all)")
+    parser.add_argument("--requests", type=int, default=50, help="Measured requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="Seconds per stub LLM call")
+    parser.add_argument("--llm-jitter", type=float, default=0.0)
+    parser.add_argument("--vector-latency", type=float, default=0.0, help="Seconds per vector index call")
+    parser.add_argument("--embedding-latency", type=float, default=0.0, help="Seconds per embedded text")
+    parser.add_argument("--upstream-latency", type=float, default=0.0, help="Seconds per upstream API call")
+    parser.add_argument("--cassette-dir", help="Directory with <route>.json payload overrides")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative regression")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main_async(args)))
+
+
+if __name__ == "__main__":
+    main()
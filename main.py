@@ -1,8 +1,17 @@
+import asyncio
 import uvicorn
-from fastapi import FastAPI
+import time
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from app.api.routes import router as api_router
+from fastapi.responses import PlainTextResponse
+from app.api.routes import router as api_router, compaction_service, cache_warmer, report_generator
 from app.core.config import settings
+from app.core.metrics import (
+    registry, request_id_var, new_request_id, HTTP_REQUEST_DURATION, HTTP_REQUESTS_IN_FLIGHT
+)
+from app.core.profiling import ProfilingMiddleware
+from app.core.traffic import TrafficRecordingMiddleware
 import logging
 
 # Configure logging
@@ -14,9 +23,30 @@ logging.basicConfig(
     ]
 )
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Periodic retention and compaction of indexed data
+    compaction_task = None
+    if settings.COMPACTION_INTERVAL_SECONDS > 0:
+        compaction_task = asyncio.create_task(compaction_service.run_forever(settings.COMPACTION_INTERVAL_SECONDS))
+    # Pre-market cache warming for popular symbols
+    warmer_task = None
+    if settings.WARMER_ENABLED:
+        warmer_task = asyncio.create_task(cache_warmer.run_forever())
+    try:
+        yield
+    finally:
+        if compaction_task is not None:
+            compaction_task.cancel()
+        if warmer_task is not None:
+            warmer_task.cancel()
+        # Reports already returned are stored before exiting
+        await report_generator.flush()
+
 app = FastAPI(
     title=settings.PROJECT_NAME,
     description=settings.PROJECT_DESCRIPTION,
+    lifespan=lifespan,
 )
 
 # Set up CORS
@@ -28,9 +58,52 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# On-demand profiling; registered first so it runs inside the request task
+app.add_middleware(ProfilingMiddleware)
+
+def route_label(request: Request) -> str:
+    """Route template for metric labels, e.g. /api/v1/profiles/{profile_id}"""
+    if "endpoint" not in request.scope:
+        return "unmatched"
+    path = request.url.path
+    for name, value in request.path_params.items():
+        path = path.replace(f"/{value}", f"/{{{name}}}")
+    return path
+
+# Tag every request with an ID and record its latency
+@app.middleware("http")
+async def request_metrics(request: Request, call_next):
+    request_id = request.headers.get("X-Request-ID") or new_request_id()
+    token = request_id_var.set(request_id)
+    HTTP_REQUESTS_IN_FLIGHT.inc()
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        response.headers["X-Request-ID"] = request_id
+        return response
+    finally:
+        HTTP_REQUEST_DURATION.observe(
+            time.perf_counter() - start,
+            method=request.method,
+            route=route_label(request),
+            status=status
+        )
+        HTTP_REQUESTS_IN_FLIGHT.dec()
+        request_id_var.reset(token)
+
+# Optional traffic recording; registered last so it sees the full request latency
+app.add_middleware(TrafficRecordingMiddleware)
+
 # Include API routes
 app.include_router(api_router, prefix=settings.API_V1_STR)
 
+# Prometheus metrics endpoint
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
 # Root endpoint
 @app.get("/")
 def root():
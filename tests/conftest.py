@@ -0,0 +1,56 @@
+"""
+Shared test setup
+
+The app reads its settings from the environment when app.core.config is first
+imported, so the stand-ins' environment and a scratch directory for every
+local store are set here, before any test module imports the app. Tests that
+need the whole app use the `client` fixture, which points it at the local
+stand-ins (benchmarks/fakes.py) once per session; async tests run on one
+event loop per session through the anyio plugin.
+"""
+import os
+import shutil
+import tempfile
+import pytest
+from benchmarks.fakes import FAKE_ENVIRONMENT, SCRATCH_PATHS, CassetteServer, install_fakes
+
+SCRATCH_DIR = tempfile.mkdtemp(prefix="vittsaar_tests_")
+for _key, _value in FAKE_ENVIRONMENT.items():
+    os.environ.setdefault(_key, _value)
+for _key, _name in SCRATCH_PATHS.items():
+    os.environ[_key] = os.path.join(SCRATCH_DIR, _name)
+
+
+def pytest_sessionfinish(session, exitstatus):
+    shutil.rmtree(SCRATCH_DIR, ignore_errors=True)
+
+
+@pytest.fixture(scope="session")
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture(scope="session")
+async def backends():
+    """The app's external services replaced by the local stand-ins"""
+    server = await CassetteServer().start()
+    yield install_fakes(llm_latency=0.0, server=server)
+    await server.stop()
+
+
+@pytest.fixture(scope="session")
+async def client(backends):
+    """HTTP client for the app, running against the stand-ins"""
+    import httpx
+    import main
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=60) as client:
+        yield client
+
+
+@pytest.fixture(scope="session")
+async def seeded(client):
+    """The app with a few hundred documents in its vector index"""
+    from benchmarks.run import seed_index
+    await seed_index(200)
+    return client
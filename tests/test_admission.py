@@ -0,0 +1,112 @@
+import asyncio
+import pytest
+from app.core.admission import AdmissionController, AdmissionRejected
+
+
+async def hold(controller, release, admitted=None):
+    async with controller.admit():
+        if admitted is not None:
+            admitted.append(controller.active)
+        await release.wait()
+
+
+@pytest.mark.anyio
+async def test_waiters_are_admitted_in_order_when_slots_free():
+    controller = AdmissionController("test", max_concurrent=1, max_queue=2, queue_timeout=5)
+    release = asyncio.Event()
+    order = []
+
+    async def run(name):
+        async with controller.admit():
+            order.append(name)
+            await release.wait()
+
+    tasks = [asyncio.ensure_future(run(name)) for name in ("a", "b", "c")]
+    await asyncio.sleep(0.01)
+    assert order == ["a"] and len(controller._waiters) == 2
+    release.set()
+    await asyncio.gather(*tasks)
+    assert order == ["a", "b", "c"]
+    assert controller.active == 0 and controller.service_time is not None
+
+
+@pytest.mark.anyio
+async def test_full_queue_is_rejected_immediately():
+    controller = AdmissionController("test", max_concurrent=1, max_queue=0, queue_timeout=5)
+    release = asyncio.Event()
+    holder = asyncio.ensure_future(hold(controller, release))
+    await asyncio.sleep(0)
+    with pytest.raises(AdmissionRejected) as error:
+        async with controller.admit():
+            pass
+    assert error.value.reason == "queue_full" and error.value.retry_after >= 1
+    release.set()
+    await holder
+
+
+@pytest.mark.anyio
+async def test_queue_timeout_and_deadline_rejections():
+    controller = AdmissionController("test", max_concurrent=1, max_queue=5, queue_timeout=0.02)
+    release = asyncio.Event()
+    holder = asyncio.ensure_future(hold(controller, release))
+    await asyncio.sleep(0)
+
+    with pytest.raises(AdmissionRejected) as error:
+        async with controller.admit():
+            pass
+    assert error.value.reason == "queue_timeout"
+    with pytest.raises(AdmissionRejected) as error:
+        async with controller.admit(deadline=0.01):
+            pass
+    assert error.value.reason == "deadline"
+    # A deadline shorter than the expected wait is rejected without queueing
+    controller.service_time = 1.0
+    with pytest.raises(AdmissionRejected) as error:
+        async with controller.admit(deadline=0.5):
+            pass
+    assert error.value.reason == "deadline" and not controller._waiters
+
+    release.set()
+    await holder
+    assert controller.active == 0
+
+
+@pytest.mark.anyio
+async def test_cancelled_waiters_leave_the_queue():
+    controller = AdmissionController("test", max_concurrent=1, max_queue=5, queue_timeout=5)
+    release = asyncio.Event()
+    holder = asyncio.ensure_future(hold(controller, release))
+    await asyncio.sleep(0)
+    waiter = asyncio.ensure_future(hold(controller, release))
+    await asyncio.sleep(0)
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+    assert not controller._waiters
+    release.set()
+    await holder
+    assert controller.active == 0
+
+
+def test_expected_wait_uses_the_service_time():
+    controller = AdmissionController("test", max_concurrent=2, max_queue=5, queue_timeout=5)
+    assert controller.expected_wait() == 0.0 and controller.retry_after() == 1
+    controller.service_time = 3.0
+    assert controller.expected_wait(position=3) == pytest.approx(6.0)
+    assert controller.retry_after() == 2
+
+
+@pytest.mark.anyio
+async def test_shed_report_requests_get_429(client, monkeypatch):
+    from app.api import routes
+    controller = AdmissionController("test", max_concurrent=1, max_queue=0, queue_timeout=5)
+    monkeypatch.setattr(routes, "report_admission", controller)
+    release = asyncio.Event()
+    holder = asyncio.ensure_future(hold(controller, release))
+    await asyncio.sleep(0)
+
+    response = await client.post("/api/v1/generate-report", json={"query": "Shed me"})
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "1"
+    release.set()
+    await holder
@@ -0,0 +1,61 @@
+import gzip
+import hashlib
+import os
+import pytest
+from app.data.artifact_store import ArtifactStore
+from app.utils.http_cache import accepts_encoding, etag_matches
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ArtifactStore(str(tmp_path / "artifacts"), max_versions=2)
+
+
+def test_objects_are_stored_once_under_their_digest(store):
+    stored = store.put_object(b"<html>report</html>")
+    digest = hashlib.sha256(b"<html>report</html>").hexdigest()
+    assert stored["digest"] == digest and stored["size"] == 19
+    assert store.has(digest) and store.read(digest) == b"<html>report</html>"
+    assert gzip.decompress(store.read(digest, compressed=True)) == b"<html>report</html>"
+    assert store.put_object(b"<html>report</html>") == stored
+    assert store.read("0" * 64) is None
+
+
+def test_publish_keeps_the_newest_versions(store):
+    for version in (1, 2):
+        store.publish("r", version, {"html": f"v{version}".encode(), "json": b"{}"})
+    assert store.get("r", "html")["version"] == 2
+    assert store.get("r", "json", version=1)["digest"] == hashlib.sha256(b"{}").hexdigest()
+
+    v1 = store.get("r", "html", version=1)["digest"]
+    store.publish("r", 3, {"html": b"v3", "json": b"{}"})
+    assert store.get("r", "html", version=1) is None and not store.has(v1)
+    # Still referenced by the retained versions
+    assert store.has(hashlib.sha256(b"{}").hexdigest())
+
+
+def test_deleting_reports_removes_only_unshared_objects(store):
+    store.publish("a", 1, {"html": b"shared", "json": b"only a"})
+    store.publish("b", 1, {"html": b"shared"})
+    assert store.delete_reports(["a"]) == 1
+    assert store.get("a", "html") is None and store.get("b", "html") is not None
+    assert store.has(hashlib.sha256(b"shared").hexdigest())
+    assert not os.path.exists(store.object_path(hashlib.sha256(b"only a").hexdigest(), compressed=True))
+    assert store.delete_reports([]) == 0
+
+
+def test_etag_matches_uses_weak_comparison():
+    assert etag_matches('"abc"', "abc")
+    assert etag_matches('W/"abc", "def"', "xyz", "def")
+    assert etag_matches('W/"abc"', "abc")
+    assert etag_matches("*", "anything")
+    assert not etag_matches('"abc"', "abcd")
+    assert not etag_matches(None, "abc")
+
+
+def test_accepts_encoding_honours_quality_values():
+    assert accepts_encoding("gzip, deflate", "gzip")
+    assert accepts_encoding("br;q=1.0, GZIP;q=0.5", "gzip")
+    assert not accepts_encoding("gzip;q=0", "gzip")
+    assert accepts_encoding("*", "gzip") and not accepts_encoding("*;q=0", "gzip")
+    assert not accepts_encoding("identity", "gzip") and not accepts_encoding(None, "gzip")
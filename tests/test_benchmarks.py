@@ -0,0 +1,79 @@
+import os
+import numpy as np
+import pytest
+from benchmarks.fakes import InMemoryIndex, StubSentenceTransformer, _matches_filter
+from benchmarks.harness import compare, load_baseline, run_load, summarize
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_summarize_percentiles_and_throughput():
+    summary = summarize([0.01, 0.02, 0.03, 0.04], wall_time=0.5, errors=1)
+    assert summary["count"] == 4 and summary["errors"] == 1
+    assert summary["p50_ms"] == pytest.approx(25.0)
+    assert summary["max_ms"] == pytest.approx(40.0)
+    assert summary["throughput_rps"] == pytest.approx(8.0)
+    assert summarize([], 1.0)["count"] == 0
+
+
+def test_compare_flags_regressions_beyond_tolerance():
+    baseline = {"results": {"a": {"p95_ms": 100.0, "throughput_rps": 10.0, "errors": 0}}}
+    assert compare({"a": {"p95_ms": 120.0, "throughput_rps": 9.0, "errors": 0}}, baseline) == []
+    regressions = compare({"a": {"p95_ms": 200.0, "throughput_rps": 5.0, "errors": 2}}, baseline)
+    assert len(regressions) == 3
+    # Scenarios without a baseline are not compared
+    assert compare({"b": {"p95_ms": 1e6, "throughput_rps": 0.0, "errors": 9}}, baseline) == []
+
+
+def test_committed_baseline_is_readable():
+    baseline = load_baseline(os.path.join(REPO_ROOT, "benchmarks", "baselines.json"))
+    assert baseline is not None
+    assert {"environment", "config", "results"} <= set(baseline)
+    for summary in baseline["results"].values():
+        assert summary["throughput_rps"] > 0
+
+
+@pytest.mark.anyio
+async def test_run_load_counts_errors():
+    async def call(i):
+        if i == 3:
+            raise RuntimeError("boom")
+
+    summary = await run_load(call, requests=10, concurrency=3, warmup=0)
+    assert summary["count"] == 9 and summary["errors"] == 1
+
+
+def test_in_memory_index_upsert_query_delete():
+    index = InMemoryIndex(dimension=3)
+    index.upsert([("a", [1, 0, 0], {"type": "news"}), ("b", [0, 1, 0], {"type": "stock"})])
+    result = index.query(vector=[1, 0.1, 0], top_k=2, include_metadata=True)
+    assert [match["id"] for match in result["matches"]] == ["a", "b"]
+    assert result["matches"][0]["metadata"] == {"type": "news"}
+
+    filtered = index.query(vector=[1, 0, 0], top_k=2, filter={"type": {"$eq": "stock"}})
+    assert [match["id"] for match in filtered["matches"]] == ["b"]
+
+    index.delete(ids=["a"])
+    assert [vec_id for page in index.list() for vec_id in page] == ["b"]
+    assert index.fetch(["a", "b"])["vectors"].keys() == {"b"}
+
+
+def test_filter_language_subset():
+    metadata = {"type": "news", "date": "2025-02-01"}
+    assert _matches_filter(metadata, {"$and": [{"type": "news"}, {"date": {"$gte": "2025-01-01"}}]})
+    assert not _matches_filter(metadata, {"$or": [{"type": "stock"}, {"date": {"$lt": "2025-01-01"}}]})
+    assert _matches_filter(metadata, {"type": {"$in": ["news", "blog"]}})
+
+
+def test_stub_embeddings_are_deterministic_and_normalized():
+    model = StubSentenceTransformer(dimension=16)
+    first, second = model.encode(["alpha", "beta"]), model.encode(["alpha"])
+    assert first.shape == (2, 16)
+    np.testing.assert_allclose(first[0], second[0])
+    np.testing.assert_allclose(np.linalg.norm(first, axis=1), 1.0, rtol=1e-5)
+
+
+def test_stores_live_in_the_scratch_directory():
+    from benchmarks.fakes import SCRATCH_PATHS
+    for key in SCRATCH_PATHS:
+        assert not os.path.abspath(os.environ[key]).startswith(REPO_ROOT)
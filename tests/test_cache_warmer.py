@@ -0,0 +1,117 @@
+import asyncio
+import time
+from datetime import datetime
+from zoneinfo import ZoneInfo
+import pytest
+from app.core.config import settings
+from app.data.access_stats import AccessStats, access_recording
+from app.services.cache_warmer import CacheWarmer, next_run
+
+
+class StandIns:
+    """Just enough of the fetcher and indexer for a warmer built outside the app"""
+
+    def __init__(self, access_stats: AccessStats, fetch_delay: float = 0.0):
+        self.access_stats = access_stats
+        self.fetch_delay = fetch_delay
+        self.retrieval_service = self
+        self.document_store = None
+
+    async def iter_comprehensive_data(self, symbols):
+        for symbol in symbols:
+            await asyncio.sleep(self.fetch_delay)
+            yield {"text": symbol, "metadata": {"type": "test"}}
+
+
+def test_next_run_skips_past_times_and_weekends():
+    tz = ZoneInfo("Asia/Kolkata")
+    friday = datetime(2026, 10, 16, 9, 0, tzinfo=tz)
+    assert next_run(friday, "08:30") == datetime(2026, 10, 19, 8, 30, tzinfo=tz)
+    assert next_run(friday, "08:30", weekdays_only=False) == datetime(2026, 10, 17, 8, 30, tzinfo=tz)
+    assert next_run(friday, "17:45") == datetime(2026, 10, 16, 17, 45, tzinfo=tz)
+
+
+def test_access_stats_rank_recent_requests_and_persist(tmp_path):
+    path = str(tmp_path / "access_stats.json")
+    stats = AccessStats(path)
+    for symbol in ("TCS", "Reliance", "Reliance"):
+        stats.record(symbol)
+    token = access_recording.set(False)
+    stats.record("Infy")
+    access_recording.reset(token)
+    assert [symbol for symbol, _ in stats.top(5)] == ["Reliance", "TCS"]
+    stats.save()
+    assert AccessStats(path).top(1)[0] == ("Reliance", pytest.approx(2.0, abs=0.01))
+
+
+def test_access_stats_forget_negligible_counts(tmp_path, monkeypatch):
+    from app.data import access_stats
+    stats = AccessStats(str(tmp_path / "access_stats.json"), half_life_days=1e-9)
+    stats.record("Stale")
+    assert not stats.save_due()
+    monkeypatch.setattr(access_stats, "_SAVE_INTERVAL_SECONDS", 0.0)
+    assert stats.save_due()
+    time.sleep(0.01)
+    stats.save()
+    assert stats.top(5) == [] and not stats.save_due()
+    assert AccessStats(stats.path).top(5) == []
+
+
+@pytest.mark.anyio
+async def test_only_names_the_api_accepts_count_as_demand(client, monkeypatch):
+    from app.api import routes
+    fetcher = routes.financial_data_fetcher
+    fetch = fetcher.indian_stock_service.get_stock_data
+
+    async def get_stock_data(name):
+        if name == "Typo Co":
+            return {"error": "Stock not found", "status": 404}
+        return await fetch(name)
+    monkeypatch.setattr(fetcher.indian_stock_service, "get_stock_data", get_stock_data)
+    assert len(await fetcher.fetch_indian_stock_data(["Typo Co", "Reliance"])) == 1
+    requested = [symbol for symbol, _ in fetcher.access_stats.top(100)]
+    assert "Reliance" in requested and "Typo Co" not in requested
+
+
+def test_symbols_are_the_watchlist_then_the_most_requested(tmp_path):
+    stats = AccessStats(str(tmp_path / "access_stats.json"))
+    for symbol, count in (("tcs", 3), ("Wipro", 2), ("Infy", 1)):
+        for _ in range(count):
+            stats.record(symbol)
+    warmer = CacheWarmer(None, StandIns(stats), StandIns(stats), watchlist=["TCS", "Reliance"], top_symbols=1)
+    # A requested symbol on the watchlist is not counted among the popular ones
+    assert warmer.symbols() == ["TCS", "Reliance", "Wipro"]
+
+
+@pytest.mark.anyio
+async def test_steps_past_the_budget_are_cut_short(tmp_path):
+    stand_ins = StandIns(AccessStats(str(tmp_path / "access_stats.json")), fetch_delay=0.1)
+    warmer = CacheWarmer(None, stand_ins, stand_ins)
+    report = await warmer.run(symbols=["TCS", "Infy"], budget_seconds=0.05)
+    assert report["steps"] == {"fetch": "timed_out", "index": "skipped", "embeddings": "skipped", "reports": "skipped"}
+    assert report["fetched_documents"] == 0 and warmer.last_report is report
+
+
+@pytest.mark.anyio
+async def test_warming_indexes_only_new_documents_and_refreshes_reports(seeded, monkeypatch):
+    from app.api import routes
+    monkeypatch.setattr(settings, "REPORT_CACHE_TTL_SECONDS", 3600)
+    monkeypatch.setattr(settings, "WARMER_MAX_REPORTS", 1)
+    access_stats = routes.financial_data_fetcher.access_stats
+    before = [symbol for symbol, _ in access_stats.top(100)]
+    symbols = {"symbols": ["Reliance", "TCS"]}
+
+    first = (await seeded.post("/api/v1/warm", params=symbols)).json()
+    assert set(first["steps"].values()) == {"completed"}
+    assert first["fetched_documents"] > 0 and first["warmed_embeddings"] == 2
+    assert [(report["symbol"], report["status"]) for report in first["reports"]] == [("Reliance", "generated")]
+
+    second = (await seeded.post("/api/v1/warm", params=symbols)).json()
+    assert second["indexed_documents"] == 0
+    assert second["already_indexed_documents"] == second["fetched_documents"]
+    assert second["reports"][0]["status"] == "refreshed"
+    assert second["reports"][0]["report_id"] == first["reports"][0]["report_id"]
+
+    assert (await seeded.get("/api/v1/warm")).json() == second
+    # Warming is not demand
+    assert [symbol for symbol, _ in access_stats.top(100)] == before
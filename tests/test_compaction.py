@@ -0,0 +1,131 @@
+import pytest
+from datetime import date, timedelta
+from app.data.document_store import DocumentStore
+from app.data.timeseries_store import TimeSeriesStore
+from app.services.compaction import CompactionService
+
+
+class IndexedDocuments:
+    """The parts of RetrievalService compaction uses, with the vector IDs kept in a set"""
+
+    dimension = 4
+
+    def __init__(self, document_store: DocumentStore):
+        self.document_store = document_store
+        self.vectors = set()
+        # Index metadata of vectors indexed before the document store existed
+        self.legacy = {}
+
+    def add(self, documents):
+        self.document_store.put_many(documents)
+        self.vectors.update(doc["id"] for doc in documents)
+
+    def add_legacy(self, doc_id, metadata):
+        self.legacy[doc_id] = metadata
+        self.vectors.add(doc_id)
+
+    async def delete_vectors(self, ids):
+        self.vectors.difference_update(ids)
+
+    async def list_vector_ids(self):
+        return sorted(self.vectors)
+
+    async def fetch_vectors(self, ids):
+        return {doc_id: {"values": [0.0] * self.dimension, "metadata": self.legacy[doc_id]}
+                for doc_id in ids if doc_id in self.legacy}
+
+
+def days_ago(n: int) -> str:
+    return (date.today() - timedelta(days=n)).isoformat()
+
+
+@pytest.fixture
+def store(tmp_path):
+    return DocumentStore(str(tmp_path / "documents.db"))
+
+
+def test_expired_ids(store):
+    store.put_many([
+        {"id": "old", "text": "", "metadata": {"type": "news", "date": "2020-01-01T10:00:00"}},
+        {"id": "new", "text": "", "metadata": {"type": "news", "date": days_ago(0)}},
+        {"id": "undated", "text": "", "metadata": {"type": "news", "date": "last week"}},
+        {"id": "other", "text": "", "metadata": {"type": "stock", "date": "2020-01-01"}},
+    ])
+    assert store.expired_ids("news", "2021-01-01") == ["old"]
+    # Undated documents are aged by the day they were indexed
+    assert set(store.expired_ids("news", days_ago(-1))) == {"old", "new", "undated"}
+    assert len(store.expired_ids("news", days_ago(-1), limit=1)) == 1
+
+
+def test_superseded_ids_skip_documents_without_a_key(store):
+    for doc_id, name in [("a1", "Reliance"), ("b1", "TCS"), ("a2", "reliance"), ("x1", None), ("x2", None)]:
+        metadata = {"type": "stock"}
+        if name is not None:
+            metadata["stock_name"] = name
+        store.put_many([{"id": doc_id, "text": "", "metadata": metadata}])
+    assert store.superseded_ids("stock", ["stock_name"]) == ["a1"]
+    assert store.superseded_ids("news", ["stock_name"]) == []
+
+
+def test_timeseries_compact(tmp_path):
+    series = TimeSeriesStore(str(tmp_path))
+    series.append("A", "price.NSE", ["2025-01-01"], [1])
+    series.append("A", "price.NSE", ["2025-01-01"], [2])
+    series.append("A", "price.NSE", ["2025-01-02"], [3])
+    assert series.compact("A", "price.NSE", dry_run=True) == 1
+    assert series.compact("A", "price.NSE") == 1
+    assert series.compact("A", "price.NSE") == 0
+    assert series.get_series("A", "price.NSE")[1].tolist() == [2.0, 3.0]
+
+
+@pytest.mark.anyio
+async def test_run_removes_vectors_and_documents(store, tmp_path):
+    indexed = IndexedDocuments(store)
+    indexed.add([
+        {"id": "old_news", "text": "x" * 100, "metadata": {"type": "news", "date": "2020-01-01"}},
+        {"id": "fresh_news", "text": "", "metadata": {"type": "news", "date": days_ago(1)}},
+        {"id": "stock_v1", "text": "", "metadata": {"type": "stock", "stock_name": "TCS"}},
+    ])
+    indexed.add([{"id": "stock_v2", "text": "", "metadata": {"type": "stock", "stock_name": "TCS"}}])
+    series = TimeSeriesStore(str(tmp_path / "timeseries"))
+    series.append("A", "m", ["2025-01-01"], [1])
+    series.append("A", "m", ["2025-01-01"], [2])
+    service = CompactionService(indexed, series, retention_days={"news": 30}, supersede_keys={"stock": ["stock_name"]},
+                                batch_size=1)
+
+    preview = await service.run(dry_run=True)
+    assert preview["removed_documents"] == {"news": {"expired": 1}, "stock": {"superseded": 1}}
+    assert preview["removed_timeseries_records"] == 1
+    assert store.count() == 4 and service.last_report is None
+
+    report = await service.run(vacuum=True)
+    assert report["removed_documents"] == preview["removed_documents"]
+    assert report["reclaimed_bytes"]["vectors_estimated"] == 2 * 4 * 4
+    assert report["reclaimed_bytes"]["documents"] > 100
+    assert report["remaining_documents"] == 2
+    assert indexed.vectors == {"fresh_news", "stock_v2"}
+    assert set(store.get_many(["old_news", "fresh_news", "stock_v1", "stock_v2"])) == {"fresh_news", "stock_v2"}
+    assert service.last_report is report
+    assert (await service.run())["removed_documents"] == {}
+
+
+@pytest.mark.anyio
+async def test_legacy_vectors_are_adopted_before_retention(store, tmp_path):
+    indexed = IndexedDocuments(store)
+    indexed.add([{"id": "stored", "text": "", "metadata": {"type": "news", "date": days_ago(1)}}])
+    indexed.add_legacy("legacy_old", {"type": "news", "date": "2020-01-01", "text": "Old story"})
+    indexed.add_legacy("legacy_fresh", {"type": "news", "date": days_ago(1), "text": "New story"})
+    service = CompactionService(indexed, TimeSeriesStore(str(tmp_path / "timeseries")), retention_days={"news": 30},
+                                supersede_keys={}, batch_size=2)
+
+    assert (await service.run())["removed_documents"] == {}
+    preview = await service.run(dry_run=True, adopt_legacy=True)
+    assert preview["legacy_vectors_adopted"] == 2 and store.count() == 1
+
+    report = await service.run(adopt_legacy=True)
+    assert report["legacy_vectors_adopted"] == 2
+    assert report["removed_documents"] == {"news": {"expired": 1}}
+    assert indexed.vectors == {"stored", "legacy_fresh"}
+    adopted = store.get_many(["legacy_fresh"])["legacy_fresh"]
+    assert adopted["text"] == "New story" and "text" not in adopted["metadata"]
+    assert (await service.run(adopt_legacy=True))["legacy_vectors_adopted"] == 0
@@ -0,0 +1,65 @@
+import asyncio
+import pytest
+from app.utils.deadline import DeadlineExceeded, current_deadline, deadline, remaining, within_deadline
+
+
+def test_nested_deadlines_only_shorten():
+    assert remaining() is None
+    with deadline(10):
+        outer = current_deadline.get()
+        with deadline(60):
+            assert current_deadline.get() == outer
+        with deadline(1):
+            assert remaining() <= 1
+        with deadline(None):
+            assert current_deadline.get() == outer
+    assert current_deadline.get() is None
+
+
+@pytest.mark.anyio
+async def test_within_deadline():
+    assert await within_deadline(asyncio.sleep(0, "no deadline")) == "no deadline"
+    with deadline(1):
+        assert await within_deadline(asyncio.sleep(0, "in time")) == "in time"
+    with deadline(0.01):
+        with pytest.raises(DeadlineExceeded, match="during slow step"):
+            await within_deadline(asyncio.sleep(1), "slow step")
+        with pytest.raises(DeadlineExceeded, match="before late step"):
+            await within_deadline(asyncio.sleep(0), "late step")
+
+
+@pytest.mark.anyio
+async def test_tasks_inherit_the_deadline():
+    async def child():
+        return remaining()
+
+    with deadline(5):
+        left = await asyncio.ensure_future(child())
+    assert 0 < left <= 5
+
+
+@pytest.fixture
+def slow_llm(backends):
+    models = backends.genai.models
+    latencies = [model.latency for model in models]
+    for model in models:
+        model.latency = 0.5
+    yield
+    for model, latency in zip(models, latencies):
+        model.latency = latency
+
+
+@pytest.mark.anyio
+async def test_reports_past_their_deadline_are_partial(seeded, slow_llm):
+    response = await seeded.post("/api/v1/generate-report", json={
+        "query": "Deadline test for Wipro", "sections": ["Executive Summary", "Risk Analysis"], "deadline_ms": 200
+    })
+    assert response.status_code == 200
+    report = response.json()
+    assert report["partial"] is True
+    assert set(report["section_status"].values()) == {"cancelled"}
+
+    response = await seeded.post("/api/v1/generate-report", json={
+        "query": "Deadline test for Wipro", "structured": False, "deadline_ms": 200
+    })
+    assert response.status_code == 504
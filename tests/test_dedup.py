@@ -0,0 +1,44 @@
+import numpy as np
+from app.data.dedup import NewsDeduplicator, canonical_url, fingerprint_text, minhash, shingles
+
+
+def test_canonical_url():
+    assert canonical_url("http://WWW.Example.com:80/markets/story/?utm_source=x&b=2&a=1#top") == \
+        "https://example.com/markets/story?a=1&b=2"
+    assert canonical_url("https://example.com:8443/") == "https://example.com:8443/"
+    assert canonical_url(None) is None
+
+
+def test_minhash_estimates_similarity():
+    assert shingles("Sensex rises") == {"sensex", "rises", "sensex rises"}
+    assert minhash("!!!") is None
+    base = "Reliance shares rise after strong quarterly results beat estimates on retail growth"
+    same = minhash(base)
+    np.testing.assert_array_equal(same, minhash(base.upper()))
+    unrelated = minhash("Monsoon rainfall forecast improves outlook for rural demand this year")
+    assert np.mean(same == unrelated) < 0.2
+
+
+def test_fingerprint_prefers_title_and_description():
+    assert fingerprint_text({"metadata": {"title": "T", "description": "D"}, "text": "full"}) == "T D"
+    assert fingerprint_text({"metadata": {}, "text": "full"}) == "full"
+
+
+def test_deduplicator_by_url_and_near_duplicate_text():
+    dedup = NewsDeduplicator(threshold=0.8)
+    title = "Infosys raises full year revenue guidance as deal wins hit a record high in the quarter"
+    assert not dedup.is_duplicate("https://a.com/story?utm_medium=rss", title)
+    assert dedup.is_duplicate("http://www.a.com/story/", "different text entirely")
+    # Syndicated copy with the wire service appended, on another site
+    assert dedup.is_duplicate("https://b.com/copy", f"{title} - Reuters")
+    assert not dedup.is_duplicate("https://c.com/other", "TCS wins large banking contract in Europe")
+
+
+def test_filter_keeps_the_first_of_each_group():
+    documents = [
+        {"id": "1", "metadata": {"url": "https://a.com/x", "title": "Markets close higher on bank rally"}},
+        {"id": "2", "metadata": {"url": "https://a.com/x?fbclid=1", "title": "Unrelated"}},
+        {"id": "3", "metadata": {"url": "https://b.com/y", "title": "Markets close higher on bank rally"}},
+        {"id": "4", "metadata": {"url": "https://b.com/z", "title": "Rupee weakens against the dollar"}},
+    ]
+    assert [doc["id"] for doc in NewsDeduplicator().filter(documents)] == ["1", "4"]
@@ -0,0 +1,50 @@
+import pytest
+from app.data.document_store import DocumentStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return DocumentStore(str(tmp_path / "documents.db"))
+
+
+def test_put_get_delete(store):
+    written = store.put_many([
+        {"id": "a", "text": "Alpha", "metadata": {"type": "news", "source": "x", "url": "u1", "tags": ["t"]}},
+        {"id": "b", "text": "Beta", "metadata": {"type": "news", "published_at": "2025-01-02"}},
+    ])
+    assert written == 2 and store.count() == 2
+
+    found = store.get_many(["a", "b", "missing"])
+    assert found["a"] == {"text": "Alpha", "metadata": {"type": "news", "source": "x", "url": "u1", "tags": ["t"]}}
+    assert set(found) == {"a", "b"}
+
+    store.put_many([{"id": "a", "text": "Alpha v2", "metadata": {"type": "news"}}])
+    assert store.get_many(["a"])["a"]["text"] == "Alpha v2" and store.count() == 2
+
+    assert store.delete_many(["a", "missing"]) == 1
+    assert store.count() == 1
+    assert store.put_many([]) == 0
+
+
+def test_large_id_lists_are_chunked(store):
+    ids = [f"doc{i}" for i in range(1200)]
+    store.put_many([{"id": doc_id, "text": "t", "metadata": {}} for doc_id in ids])
+    assert len(store.get_many(ids)) == 1200
+    assert store.payload_bytes(ids) == 1200 * (1 + len("{}"))
+    assert store.delete_many(ids) == 1200
+
+
+def test_existing_values(store):
+    store.put_many([
+        {"id": "a", "text": "", "metadata": {"type": "news", "url": "u1", "date": "2025-01-01"}},
+        {"id": "b", "text": "", "metadata": {"type": "stock", "url": "u2", "date": "2025-01-01"}},
+    ])
+    assert store.existing_values("url", ["u1", "u2", "u3"]) == {"u1", "u2"}
+    assert store.existing_values("url", ["u1", "u2"], doc_type="news") == {"u1"}
+    assert store.existing_values("url", ["u1"], date="2025-01-02") == set()
+
+
+def test_persists_across_instances(tmp_path):
+    path = str(tmp_path / "documents.db")
+    DocumentStore(path).put_many([{"id": "a", "text": "kept", "metadata": {}}])
+    assert DocumentStore(path).get_many(["a"])["a"]["text"] == "kept"
@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+from app.data.documents import Document, DocumentBatch, RetrievedDocument
+
+
+def test_document_from_dict_drops_text_from_metadata():
+    doc = Document.from_dict({"id": "d1", "text": None, "metadata": {"text": "copy", "source": "s"}})
+    assert doc == Document("d1", "", {"source": "s"})
+    assert Document.from_dict({"id": "d2", "text": "body"}).to_dict() == {"id": "d2", "text": "body", "metadata": {}}
+    assert not hasattr(doc, "__dict__")
+
+
+def test_batch_from_documents_keeps_columns():
+    batch = DocumentBatch.from_documents([
+        {"id": "a", "text": "first", "metadata": {"type": "news"}},
+        Document("b", "second", {"type": "csv"}),
+    ])
+    assert (batch.ids, batch.texts) == (["a", "b"], ["first", "second"])
+    assert batch.metadata == [{"type": "news"}, {"type": "csv"}]
+    assert batch.embeddings is None and len(batch) == 2
+    assert batch[1] == Document("b", "second", {"type": "csv"})
+    assert [doc.id for doc in batch] == ["a", "b"]
+    assert batch.to_dicts()[0] == {"id": "a", "text": "first", "metadata": {"type": "news"}}
+    assert DocumentBatch.from_documents(batch) is batch
+
+
+def test_batch_slices_share_the_embedding_matrix():
+    embeddings = np.arange(12, dtype=np.float32).reshape(3, 4)
+    batch = DocumentBatch(["a", "b", "c"], ["x", "y", "z"], [{}, {}, {}], embeddings)
+    part = batch.slice(1, 3)
+    assert part.ids == ["b", "c"] and part.texts == ["y", "z"]
+    assert np.shares_memory(part.embeddings, embeddings)
+    np.testing.assert_array_equal(part.embeddings[0], embeddings[1])
+    assert DocumentBatch(["a"], ["x"], [{}]).slice(0, 1).embeddings is None
+
+
+def test_batch_rejects_uneven_columns():
+    with pytest.raises(ValueError, match="Columns differ"):
+        DocumentBatch(["a", "b"], ["x"], [{}])
+    with pytest.raises(ValueError, match="embeddings"):
+        DocumentBatch(["a"], ["x"], [{}], np.zeros((2, 4), dtype=np.float32))
+
+
+def test_retrieved_document_dict_has_rerank_score_only_when_scored():
+    hit = RetrievedDocument("d1", 0.8, "text", "src", "2026-10-19", {"type": "news"}, None)
+    assert hit.to_dict() == {
+        "id": "d1", "score": 0.8, "text": "text", "source": "src", "date": "2026-10-19", "metadata": {"type": "news"}
+    }
+    hit.rerank_score = 0.25
+    assert hit.to_dict()["rerank_score"] == 0.25
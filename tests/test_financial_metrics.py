@@ -0,0 +1,81 @@
+import math
+import numpy as np
+import pytest
+from app.data.timeseries_store import TimeSeriesStore
+from app.services.financial_metrics import FinancialMetricsEngine, _divide, _forward_fill, _nth_last
+
+
+def test_divide_yields_nan_for_zero_denominators():
+    result = _divide(np.array([1.0, 1.0, 1.0]), np.array([2.0, 0.0, np.nan]))
+    assert result[0] == 0.5 and np.isnan(result[1:]).all()
+
+
+def test_nth_last_and_forward_fill():
+    matrix = np.array([[1.0, np.nan, 3.0], [np.nan, np.nan, np.nan]])
+    columns, values = _nth_last(matrix, 1)
+    assert columns.tolist() == [0, -1]
+    assert values[0] == 1.0 and np.isnan(values[1])
+
+    filled, source = _forward_fill(np.array([[np.nan, 2.0, np.nan, 4.0]]))
+    np.testing.assert_array_equal(filled, [[np.nan, 2.0, 2.0, 4.0]])
+    assert source.tolist() == [[-1, 1, 1, 3]]
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = TimeSeriesStore(str(tmp_path))
+    years = ["2021", "2022", "2023", "2024"]
+    store.append("A", "annual.INC.TotalRevenue", years, [100, 110, 121, 133.1])
+    store.append("A", "annual.INC.NetIncome", years, [10, 10, 12, 15])
+    store.append("A", "annual.INC.GrossProfit", years, [40, 44, 48, 53.24])
+    store.append("A", "annual.BAL.TotalEquity", years, [100, 100, 100, 150])
+    store.append("A", "annual.BAL.TotalDebt", years, [50, 50, 50, 75])
+    store.append("A", "annual.INC.DilutedEPSExcludingExtraOrdItems", years, [1, 1, 1.2, 1.5])
+    store.append("A", "annual.BAL.TotalCommonSharesOutstanding", years, [10, 10, 10, 10])
+    # "B" only reports revenue under the fallback code
+    store.append("B", "annual.INC.Revenue", ["2023", "2024"], [50, 40])
+    return store
+
+
+def test_fundamentals_across_companies(store):
+    metrics = FinancialMetricsEngine(store).compute(["A", "B", "missing"])
+    a, b, missing = metrics["A"], metrics["B"], metrics["missing"]
+
+    assert a["revenue"] == pytest.approx(133.1)
+    assert a["revenue_growth_yoy"] == pytest.approx(0.1)
+    assert a["revenue_cagr_3y"] == pytest.approx(0.1, rel=1e-3)
+    assert a["net_income_growth_yoy"] == pytest.approx(0.25)
+    assert a["gross_margin"] == pytest.approx(0.4)
+    assert a["roe"] == pytest.approx(0.1)
+    assert a["debt_to_equity"] == pytest.approx(0.5)
+    assert b["revenue_growth_yoy"] == pytest.approx(-0.2)
+    assert math.isnan(b["revenue_cagr_3y"])
+    assert all(math.isnan(value) for value in missing.values())
+
+
+def test_prices_returns_and_valuation(store):
+    days = np.arange(np.datetime64("2024-01-01"), np.datetime64("2025-01-01"), 7)
+    prices = 100.0 * 1.01 ** np.arange(days.size)
+    store.append("A", "price.NSE", days, prices)
+
+    a = FinancialMetricsEngine(store).compute(["A"])["A"]
+    assert a["price"] == pytest.approx(prices[-1])
+    assert a["market_cap"] == pytest.approx(prices[-1] * 10)
+    assert a["pe"] == pytest.approx(prices[-1] / 1.5)
+    # The window starts from the last price on or before 30 days back, five weeks earlier
+    assert a["return_1m"] == pytest.approx(1.01 ** 5 - 1)
+    # Constant weekly growth gives a volatility of log(1.01) per sqrt(7 days), annualized
+    assert a["volatility_1y"] == pytest.approx(math.log(1.01) * math.sqrt(365 / 7))
+    assert math.isnan(a["return_1y"])
+
+
+def test_format_table_skips_empty_columns():
+    table = FinancialMetricsEngine.format_table({
+        "A": {"revenue": 1234.0, "net_margin": 0.125, "pe": float("nan")},
+        "B": {"revenue": float("nan"), "net_margin": 0.1, "pe": float("nan")},
+    })
+    lines = table.splitlines()
+    assert lines[0] == "| Company | Revenue | Net mgn |"
+    assert lines[2] == "| A | 1,234 | 12.5% |"
+    assert lines[3] == "| B | n/a | 10.0% |"
+    assert FinancialMetricsEngine.format_table({}) == ""
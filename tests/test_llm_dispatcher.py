@@ -0,0 +1,113 @@
+import asyncio
+import pytest
+from app.services.llm_dispatcher import BATCH, INTERACTIVE, LLMDispatcher, LLMRateLimitError
+
+
+class ProviderError(Exception):
+    def __init__(self, code):
+        super().__init__(f"HTTP {code}")
+        self.code = code
+
+
+def dispatcher(**options):
+    defaults = {"max_concurrency": 1, "min_concurrency": 1, "target_latency": 0, "max_retries": 2,
+                "retry_base_delay": 0.001, "tokens_per_minute": 0}
+    return LLMDispatcher(**{**defaults, **options})
+
+
+async def record(dispatcher, order, name, priority, tokens=0):
+    async def call():
+        order.append(name)
+        await asyncio.sleep(0.01)
+    await dispatcher.submit(call, priority=priority, estimated_tokens=tokens)
+
+
+@pytest.mark.anyio
+async def test_interactive_calls_are_served_before_batch():
+    gate = dispatcher()
+    order = []
+    tasks = [asyncio.ensure_future(record(gate, order, "first", BATCH))]
+    await asyncio.sleep(0)
+    for name, priority in [("batch", BATCH), ("interactive", INTERACTIVE)]:
+        tasks.append(asyncio.ensure_future(record(gate, order, name, priority)))
+        await asyncio.sleep(0)
+    await asyncio.gather(*tasks)
+    assert order == ["first", "interactive", "batch"]
+
+
+@pytest.mark.anyio
+async def test_token_budget_is_taken_in_priority_order():
+    # 600 tokens per minute refill 10 per second
+    gate = dispatcher(max_concurrency=4, tokens_per_minute=600)
+    gate.token_bucket.debit(600)
+    order = []
+    tasks = []
+    for name, priority in [("batch", BATCH), ("interactive", INTERACTIVE)]:
+        tasks.append(asyncio.ensure_future(record(gate, order, name, priority, tokens=1)))
+        await asyncio.sleep(0)
+    await asyncio.gather(*tasks)
+    assert order == ["interactive", "batch"]
+    assert gate.active == 0
+
+
+@pytest.mark.anyio
+async def test_transient_errors_are_retried():
+    gate = dispatcher()
+    attempts = 0
+
+    async def flaky():
+        nonlocal attempts
+        attempts += 1
+        if attempts < 3:
+            raise ProviderError(503)
+        return "ok"
+
+    assert await gate.submit(flaky) == "ok"
+    assert attempts == 3 and gate.active == 0
+
+
+@pytest.mark.anyio
+async def test_persistent_rate_limiting_raises_and_shrinks_the_limit():
+    gate = dispatcher(max_concurrency=8, min_concurrency=1)
+
+    async def limited():
+        raise ProviderError(429)
+
+    with pytest.raises(LLMRateLimitError) as error:
+        await gate.submit(limited)
+    assert error.value.retry_after > 0
+    assert gate.limit < 8 and gate.active == 0
+
+
+@pytest.mark.anyio
+async def test_other_errors_are_not_retried():
+    gate = dispatcher()
+    attempts = 0
+
+    async def broken():
+        nonlocal attempts
+        attempts += 1
+        raise ValueError("bad prompt")
+
+    with pytest.raises(ValueError):
+        await gate.submit(broken)
+    assert attempts == 1 and gate.active == 0
+
+
+@pytest.mark.anyio
+async def test_cancelled_waiters_give_up_their_place():
+    gate = dispatcher()
+    release = asyncio.Event()
+
+    async def hold():
+        await release.wait()
+
+    holder = asyncio.ensure_future(gate.submit(hold))
+    await asyncio.sleep(0)
+    waiter = asyncio.ensure_future(gate.submit(hold))
+    await asyncio.sleep(0)
+    waiter.cancel()
+    release.set()
+    await holder
+    assert await gate.submit(hold) is None
+    assert gate.active == 0
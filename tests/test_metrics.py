@@ -0,0 +1,67 @@
+import pytest
+from app.core.metrics import MetricsRegistry, STAGE_DURATION, STAGE_ERRORS, STAGE_IN_FLIGHT, span
+
+
+def test_counter_and_gauge_render_in_prometheus_format():
+    registry = MetricsRegistry()
+    requests = registry.counter("test_requests_total", "Requests", ["path"])
+    in_flight = registry.gauge("test_in_flight", "In flight")
+    requests.inc(path="/a")
+    requests.inc(2, path='/b"')
+    in_flight.inc()
+    in_flight.inc()
+    in_flight.dec()
+
+    text = registry.render()
+    assert "# TYPE test_requests_total counter" in text
+    assert 'test_requests_total{path="/a"} 1' in text
+    assert 'test_requests_total{path="/b\\""} 2' in text
+    assert "test_in_flight 1" in text
+    assert requests.value(path="/a") == 1
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = MetricsRegistry()
+    latency = registry.histogram("test_latency_seconds", "Latency", buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 5.0):
+        latency.observe(value)
+
+    text = registry.render()
+    assert 'test_latency_seconds_bucket{le="0.1"} 1' in text
+    assert 'test_latency_seconds_bucket{le="1"} 2' in text
+    assert 'test_latency_seconds_bucket{le="+Inf"} 3' in text
+    assert "test_latency_seconds_count 3" in text
+    assert latency.sum() == pytest.approx(5.55)
+
+
+def test_labels_must_match_and_names_keep_their_type():
+    registry = MetricsRegistry()
+    counter = registry.counter("test_total", "Test", ["kind"])
+    with pytest.raises(ValueError):
+        counter.inc(other="x")
+    assert registry.counter("test_total", "Test", ["kind"]) is counter
+    with pytest.raises(ValueError):
+        registry.gauge("test_total", "Test")
+
+
+def test_span_records_duration_and_errors():
+    before = STAGE_DURATION.count(stage="test.stage")
+    with span("test.stage"):
+        assert STAGE_IN_FLIGHT.value(stage="test.stage") == 1
+    with pytest.raises(RuntimeError):
+        with span("test.stage"):
+            raise RuntimeError("boom")
+
+    assert STAGE_DURATION.count(stage="test.stage") == before + 2
+    assert STAGE_ERRORS.value(stage="test.stage") == 1
+    assert STAGE_IN_FLIGHT.value(stage="test.stage") == 0
+
+
+@pytest.mark.anyio
+async def test_metrics_endpoint_and_request_id(client):
+    response = await client.get("/", headers={"X-Request-ID": "abc123"})
+    assert response.headers["X-Request-ID"] == "abc123"
+
+    metrics = await client.get("/metrics")
+    assert metrics.status_code == 200
+    assert "vittsaar_http_request_duration_seconds_bucket" in metrics.text
@@ -0,0 +1,70 @@
+import json
+import pytest
+from app.utils.page_cache import PageCache, decode_cursor, encode_cursor
+
+
+def test_cursor_round_trip():
+    assert decode_cursor(encode_cursor("abc", 20)) == ("abc", 20)
+    for bad in ("!!!", encode_cursor("abc", -1), "bm90LWEtY3Vyc29y"):
+        with pytest.raises(ValueError):
+            decode_cursor(bad)
+
+
+def test_pages_and_cursors():
+    cache = PageCache("test", ttl=60, max_results=5)
+    items = list(range(25))
+    result_id = cache.put(items, {"status": "success"})
+    first = cache.page(items, 0, 10, result_id)
+    assert first["data"] == list(range(10)) and first["total"] == 25
+
+    cached, extra = cache.get(decode_cursor(first["next_cursor"])[0])
+    assert extra == {"status": "success"}
+    last = cache.page(cached, 20, 10, result_id)
+    assert last["data"] == list(range(20, 25)) and last["next_cursor"] is None
+    assert cache.get("unknown") is None
+
+
+def test_eviction_by_count_items_and_age():
+    cache = PageCache("test", ttl=60, max_results=2)
+    a, b = cache.put([1]), cache.put([2])
+    cache.get(a)
+    cache.put([3])
+    # The least recently read set goes first
+    assert cache.get(b) is None and cache.get(a) is not None
+
+    cache = PageCache("test", ttl=60, max_results=10, max_items=5)
+    small, large = cache.put([1, 2, 3]), cache.put(list(range(4)))
+    assert cache.get(small) is None
+    # The newest set is kept even when it alone exceeds max_items
+    huge = cache.put(list(range(10)))
+    assert cache.get(large) is None and cache.get(huge) is not None
+
+    cache = PageCache("test", ttl=0, max_results=10)
+    assert cache.get(cache.put([1])) is None
+
+
+@pytest.mark.anyio
+async def test_fetch_news_pages_through_a_cursor(client):
+    first = (await client.get("/api/v1/fetch-news", params={"query": "markets", "page_size": 20})).json()
+    assert len(first["data"]) == 20 and first["total"] > 20
+    seen = [doc["id"] for doc in first["data"]]
+    cursor = first["next_cursor"]
+    while cursor:
+        page = (await client.get("/api/v1/fetch-news", params={"cursor": cursor, "page_size": 20})).json()
+        seen += [doc["id"] for doc in page["data"]]
+        cursor = page["next_cursor"]
+    assert len(seen) == first["total"]
+
+    assert (await client.get("/api/v1/fetch-news", params={"cursor": "!!!"})).status_code == 400
+    expired = encode_cursor("0" * 32, 20)
+    assert (await client.get("/api/v1/fetch-news", params={"cursor": expired})).status_code == 410
+
+
+@pytest.mark.anyio
+async def test_fetch_news_streams_ndjson(client):
+    response = await client.get("/api/v1/fetch-news", params={"query": "markets", "format": "ndjson", "index_data": True})
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    summary = lines[-1]
+    assert summary["status"] == "success"
+    assert summary["documents"] == len(lines) - 1 == summary["indexed_documents"]
+    assert all("text" in doc for doc in lines[:-1])
@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+from app.data.preprocessing import (
+    dataframe_to_documents, filterable_metadata, sanitize_metadata, sanitize_metadata_value
+)
+
+
+def test_sanitize_metadata_value_converts_to_supported_types():
+    assert sanitize_metadata_value(np.int64(3), 10) == 3
+    assert sanitize_metadata_value(np.float32(1.5), 10) == 1.5
+    assert sanitize_metadata_value(np.bool_(True), 10) is True
+    assert sanitize_metadata_value(float("nan"), 10) is None
+    assert sanitize_metadata_value(pd.NaT, 10) is None
+    assert sanitize_metadata_value("abcdef", 3) == "abc"
+    assert sanitize_metadata_value(["a", None, 2], 10) == ["a", "2"]
+    assert sanitize_metadata_value({"k": 1}, 100) == '{"k": 1}'
+
+
+def test_sanitize_metadata_keeps_reserved_keys_and_full_text():
+    clean = sanitize_metadata(
+        {"text": "x" * 50, "source": "s", "sector": "IT", "noise": None, "other": 1},
+        max_chars=10,
+        allowed_keys=["sector"]
+    )
+    assert clean == {"text": "x" * 50, "source": "s", "sector": "IT"}
+
+
+def test_filterable_metadata_selects_present_keys():
+    assert filterable_metadata({"date": "2025-01-01", "source": None, "text": "t"}, ["date", "source"]) == {
+        "date": "2025-01-01"
+    }
+
+
+def test_dataframe_to_documents_converts_columns():
+    df = pd.DataFrame({
+        "headline": ["Up", None, "Down"],
+        "outlet": ["A", None, "C"],
+        "published": ["2025-01-01", "2025-01-02", None],
+        "score": [1.0, np.nan, 3.0],
+        "count": [1, 2, 3],
+    })
+    batch = dataframe_to_documents(
+        df, text_column="headline", doc_type="news", default_source="upload.csv",
+        source_column="outlet", date_column="published"
+    )
+
+    assert len(batch) == 3
+    assert batch.texts == ["Up", "", "Down"]
+    assert len(set(batch.ids)) == 3
+    first, second, third = batch.metadata
+    assert first == {
+        "outlet": "A", "published": "2025-01-01", "score": 1.0, "count": 1,
+        "source": "A", "type": "news", "date": "2025-01-01"
+    }
+    # Missing values are dropped, and the source falls back to the default
+    assert second == {"published": "2025-01-02", "count": 2, "source": "upload.csv", "type": "news", "date": "2025-01-02"}
+    assert "date" not in third
+    assert all(type(value) in (str, int, float) for value in first.values())
+
+
+def test_dataframe_to_documents_limits_columns_and_trims_values():
+    df = pd.DataFrame({"text": ["t"], "sector": ["x" * 20], "ignored": ["y"]})
+    batch = dataframe_to_documents(df, "text", "structured_data", "f.csv", max_chars=5, allowed_keys=["sector"])
+    assert batch.metadata[0] == {"sector": "xxxxx", "source": "f.csv", "type": "structured_data"}
+
+
+def test_dataframe_to_documents_formats_datetime_columns():
+    df = pd.DataFrame({"text": ["a", "b"], "when": pd.to_datetime(["2025-03-31", None])})
+    batch = dataframe_to_documents(df, "text", "news", "f.csv", date_column="when")
+    assert batch.metadata[0]["date"] == "2025-03-31"
+    assert "date" not in batch.metadata[1] and "when" not in batch.metadata[1]
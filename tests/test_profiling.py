@@ -0,0 +1,50 @@
+import json
+import pytest
+from app.core.config import settings
+from app.core.profiling import load_profile, token_matches
+
+
+@pytest.fixture
+def profiling(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "PROFILING_ENABLED", True)
+    monkeypatch.setattr(settings, "PROFILING_TOKEN", "s3cret")
+    monkeypatch.setattr(settings, "PROFILING_DIR", str(tmp_path))
+    return tmp_path
+
+
+def test_token_matches_requires_a_configured_token(monkeypatch):
+    monkeypatch.setattr(settings, "PROFILING_TOKEN", "")
+    assert not token_matches("")
+    assert not token_matches("anything")
+    monkeypatch.setattr(settings, "PROFILING_TOKEN", "s3cret")
+    assert token_matches("s3cret")
+    assert not token_matches("wrong")
+    assert not token_matches(None)
+
+
+def test_load_profile_rejects_path_like_ids(profiling):
+    (profiling / "abc.json").write_text("{}")
+    assert load_profile("abc") == "{}"
+    assert load_profile("../abc") is None
+    assert load_profile("missing") is None
+
+
+@pytest.mark.anyio
+async def test_requests_are_profiled_only_with_the_token(client, profiling):
+    response = await client.get("/", headers={"X-Profile": "1"})
+    assert "X-Profile-Id" not in response.headers
+
+    response = await client.get("/?profile=1", headers={"X-Profile-Token": "s3cret"})
+    profile_id = response.headers["X-Profile-Id"]
+
+    summary = await client.get(f"/api/v1/profiles/{profile_id}", headers={"X-Profile-Token": "s3cret"})
+    assert summary.status_code == 200
+    assert json.loads(summary.text)["path"] == "/"
+    folded = await client.get(
+        f"/api/v1/profiles/{profile_id}", params={"format": "folded"}, headers={"X-Profile-Token": "s3cret"}
+    )
+    assert folded.status_code == 200
+
+    assert (await client.get(f"/api/v1/profiles/{profile_id}")).status_code == 403
+    missing = await client.get("/api/v1/profiles/0000", headers={"X-Profile-Token": "s3cret"})
+    assert missing.status_code == 404
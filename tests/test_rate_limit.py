@@ -0,0 +1,43 @@
+import asyncio
+import time
+import pytest
+from app.utils.rate_limit import TokenBucket
+
+
+def test_try_acquire_and_delay():
+    bucket = TokenBucket(rate=10, capacity=5)
+    assert bucket.try_acquire(5)
+    assert not bucket.try_acquire(1)
+    assert bucket.delay(1) == pytest.approx(0.1, abs=0.01)
+    # Amounts above capacity are capped
+    assert bucket.delay(50) == pytest.approx(0.5, abs=0.01)
+
+
+def test_debit_can_go_into_debt():
+    bucket = TokenBucket(rate=100, capacity=10)
+    bucket.debit(30)
+    assert bucket.available < -19
+    assert bucket.delay(1) > 0.2
+
+
+@pytest.mark.anyio
+async def test_acquire_waits_for_refill():
+    bucket = TokenBucket(rate=100, capacity=10)
+    await bucket.acquire(10)
+    start = time.monotonic()
+    await bucket.acquire(5)
+    assert time.monotonic() - start >= 0.04
+
+
+@pytest.mark.anyio
+async def test_acquire_is_first_come_first_served():
+    bucket = TokenBucket(rate=100, capacity=10)
+    await bucket.acquire(10)
+    order = []
+
+    async def take(name, amount):
+        await bucket.acquire(amount)
+        order.append(name)
+
+    await asyncio.gather(take("large", 10), take("small", 1))
+    assert order == ["large", "small"]
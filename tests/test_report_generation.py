@@ -0,0 +1,129 @@
+import json
+import pytest
+from app.core.metrics import SINGLEFLIGHT_CALLS
+from app.services.report_generator import report_id_for, support_overlap
+
+
+def test_report_id_ignores_spelling_differences():
+    assert report_id_for("Outlook  for TCS", "equity", None, None) == report_id_for("outlook for tcs", "equity", None, None)
+    assert report_id_for("Outlook for TCS", "equity", None, None) != report_id_for("Outlook for TCS", "equity", None, 5)
+
+
+def test_support_overlap_is_relevance_weighted():
+    assert support_overlap({}, {}) == 1.0
+    assert support_overlap({"a": 0.9, "b": 0.1}, {"a": 0.9, "b": 0.1}) == 1.0
+    # Losing a low-ranked document matters less than losing the top hit
+    assert support_overlap({"a": 0.9, "b": 0.1}, {"a": 0.9}) == pytest.approx(0.9)
+    assert support_overlap({"a": 0.9, "b": 0.1}, {"b": 0.1}) == pytest.approx(0.1)
+
+
+@pytest.mark.anyio
+async def test_batch_reports_stream_one_line_per_job(seeded):
+    collapsed = SINGLEFLIGHT_CALLS.value(group="report", result="collapsed")
+    jobs = [
+        {"query": "Batch outlook for Infosys", "sections": ["Executive Summary"]},
+        {"query": "batch outlook for  infosys", "sections": ["Executive Summary"]},
+        {"query": "Batch outlook for banks", "structured": False, "top_k": 3},
+    ]
+    response = await seeded.post("/api/v1/generate-reports", json={"jobs": jobs})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+
+    results = [json.loads(line) for line in response.text.splitlines()]
+    assert sorted(result["index"] for result in results) == [0, 1, 2]
+    assert all(result["status"] == "success" for result in results)
+    reports = {result["index"]: result["report"] for result in results}
+    # The duplicate job shares the first one's generation
+    assert reports[0]["report_id"] == reports[1]["report_id"]
+    assert SINGLEFLIGHT_CALLS.value(group="report", result="collapsed") == collapsed + 1
+    assert set(reports[0]["content"]) == {"Executive Summary"}
+    assert len(reports[2]["sources"]) == 3
+
+
+@pytest.mark.anyio
+async def test_batch_reports_validate_the_job_count(client):
+    assert (await client.post("/api/v1/generate-reports", json={"jobs": []})).status_code == 400
+    too_many = [{"query": f"q{i}"} for i in range(1000)]
+    assert (await client.post("/api/v1/generate-reports", json={"jobs": too_many})).status_code == 400
+
+
+@pytest.mark.anyio
+async def test_refresh_reuses_unchanged_sections_and_diffs_versions(seeded):
+    from app.api import routes
+    sections = ["Executive Summary", "Risk Analysis"]
+    report = (await seeded.post("/api/v1/generate-report", json={
+        "query": "Refresh test for sector 5 earnings", "sections": sections
+    })).json()
+    report_id = report["report_id"]
+    # Stored in the background, but reads wait for the write
+    stored = (await seeded.get(f"/api/v1/reports/{report_id}")).json()
+    assert stored["version"] == report["version"] and stored["content"] == report["content"]
+
+    refreshed = (await seeded.post(f"/api/v1/reports/{report_id}/refresh")).json()
+    assert refreshed["version"] == report["version"] + 1
+    assert refreshed["refresh"]["previous_version"] == report["version"]
+    assert refreshed["refresh"]["reused"] == sections and refreshed["refresh"]["regenerated"] == {}
+    assert refreshed["content"] == report["content"]
+
+    diff = (await seeded.get(f"/api/v1/reports/{report_id}/diff")).json()
+    assert (diff["from_version"], diff["to_version"]) == (report["version"], refreshed["version"])
+    assert {entry["status"] for entry in diff["sections"].values()} == {"unchanged"}
+
+    await routes.report_generator.flush()
+    assert (await seeded.get(f"/api/v1/reports/{report_id}", params={"version": report["version"]})).status_code == 200
+    assert (await seeded.get("/api/v1/reports/0000000000000000")).status_code == 404
+    assert (await seeded.post("/api/v1/reports/0000000000000000/refresh")).status_code == 404
+    assert (await seeded.get(f"/api/v1/reports/{report_id}/diff", params={"from_version": 99})).status_code == 404
+
+
+def test_changed_sections_are_reported_in_the_diff():
+    from app.services.report_generator import ReportGenerator
+    old = {"version": 1, "content": {"A": "same", "B": "old line", "C": "gone"},
+           "section_support": {"B": {"documents": {"d1": 0.5}}}}
+    new = {"version": 2, "content": {"A": "same", "B": "new line", "D": "added"},
+           "section_support": {"B": {"documents": {"d2": 0.5}}}}
+    sections = ReportGenerator._diff_sections(old, new)
+    assert sections["A"]["status"] == "unchanged"
+    assert sections["B"]["status"] == "changed"
+    assert sections["B"]["documents_added"] == ["d2"] and sections["B"]["documents_removed"] == ["d1"]
+    assert "+new line" in sections["B"]["diff"]
+    assert sections["C"] == {"status": "removed"} and sections["D"] == {"status": "added"}
+
+
+@pytest.mark.anyio
+async def test_section_tables_are_built_off_the_event_loop(seeded, monkeypatch):
+    import threading
+    from app.api import routes
+    generator = routes.report_generator
+    build = generator._section_context
+    threads = []
+
+    def section_context(*args):
+        threads.append(threading.current_thread())
+        return build(*args)
+    monkeypatch.setattr(generator, "_section_context", section_context)
+    response = await seeded.post("/api/v1/generate-report", json={
+        "query": "Thread test for sector 2 metrics", "sections": ["Financial Metrics"]
+    })
+    assert response.status_code == 200
+    assert threads and threading.main_thread() not in threads
+
+
+@pytest.mark.anyio
+async def test_interactive_reports_do_not_join_batch_generations(seeded, backends):
+    import asyncio
+    models = backends.genai.models
+    latencies = [model.latency for model in models]
+    for model in models:
+        model.latency = 0.2
+    try:
+        collapsed = SINGLEFLIGHT_CALLS.value(group="report", result="collapsed")
+        job = {"query": "Priority test for Wipro", "sections": ["Executive Summary"]}
+        batch = asyncio.ensure_future(seeded.post("/api/v1/generate-reports", json={"jobs": [job]}))
+        await asyncio.sleep(0.1)
+        interactive = await seeded.post("/api/v1/generate-report", json=job)
+        assert interactive.status_code == 200 and (await batch).status_code == 200
+        assert SINGLEFLIGHT_CALLS.value(group="report", result="collapsed") == collapsed
+    finally:
+        for model, latency in zip(models, latencies):
+            model.latency = latency
@@ -0,0 +1,88 @@
+import json
+import pytest
+from app.data.artifact_store import ArtifactStore
+from app.data.report_store import ReportStore
+from app.services.report_renderer import markdown_to_html, render_artifacts, render_html, render_json, rendered_artifact
+
+REPORT = {
+    "query": "Outlook for <TCS>",
+    "report_type": "equity",
+    "content": {"Executive Summary": "Strong quarter.", "Risks": "- **Attrition** rising\n- Currency"},
+    "sources": [{"source": "news", "date": "2026-10-16", "relevance_score": 0.91234}],
+    "version": 1,
+}
+
+
+def test_markdown_to_html_converts_the_model_subset():
+    text = "### Key points\n- **Revenue** up\n- Margin <flat>\n  and steady\n\n1. First\n2) Second\n\nPlain line"
+    assert markdown_to_html(text) == "\n".join([
+        "<h3>Key points</h3>",
+        "<ul><li><strong>Revenue</strong> up</li><li>Margin &lt;flat&gt; and steady</li></ul>",
+        "<ol><li>First</li><li>Second</li></ol>",
+        "<p>Plain line</p>",
+    ])
+
+
+def test_markdown_tables_skip_the_separator_row():
+    html = markdown_to_html("| Metric | Value |\n|---|---:|\n| P/E | 28 |\nAfter")
+    assert html == ("<table><tr><th>Metric</th><th>Value</th></tr><tr><td>P/E</td><td>28</td></tr></table>\n"
+                    "<p>After</p>")
+
+
+def test_rendered_html_is_escaped_and_numbered():
+    html = render_html({**REPORT, "partial": True, "section_status": {"Risks": "cancelled"}}).decode()
+    assert "<h1>Outlook for &lt;TCS&gt;</h1>" in html
+    assert "<h2>1. Executive Summary</h2>" in html and "<h2>2. Risks</h2>" in html
+    assert "not completed: Risks" in html and "<td>0.912</td>" in html
+    assert "Version:</strong> 1" in html and "Date:" not in html
+
+
+def test_json_rendering_is_canonical():
+    reordered = dict(reversed(list(REPORT.items())))
+    assert render_json(REPORT) == render_json(reordered)
+    assert json.loads(render_json(REPORT)) == REPORT
+    assert set(render_artifacts(REPORT)) == {"html", "json"}
+
+
+def test_reports_are_rendered_once_and_rerendered_for_new_versions(tmp_path):
+    report_store = ReportStore(str(tmp_path / "reports.db"))
+    artifact_store = ArtifactStore(str(tmp_path / "artifacts"))
+    assert rendered_artifact(report_store, artifact_store, "r", "html") is None
+
+    report_store.put("r", {}, {"query": "q", "content": "first"})
+    first = rendered_artifact(report_store, artifact_store, "r", "json")
+    assert first["version"] == 1 and json.loads(artifact_store.read(first["digest"]))["content"] == "first"
+    assert rendered_artifact(report_store, artifact_store, "r", "json") == first
+
+    # A version stored without rendering is rendered on its first view
+    report_store.put("r", {}, {"query": "q", "content": "second"})
+    latest = rendered_artifact(report_store, artifact_store, "r", "json")
+    assert latest["version"] == 2 and latest["digest"] != first["digest"]
+    assert rendered_artifact(report_store, artifact_store, "r", "json", version=1) == first
+
+
+@pytest.mark.anyio
+async def test_rendered_report_route_serves_etags_and_gzip(seeded):
+    report = (await seeded.post("/api/v1/generate-report", json={
+        "query": "Rendered test for sector 7 margins", "sections": ["Executive Summary"]
+    })).json()
+    url = f"/api/v1/reports/{report['report_id']}/rendered"
+
+    plain = await seeded.get(url, headers={"Accept-Encoding": "identity"})
+    assert plain.status_code == 200 and plain.headers["content-type"].startswith("text/html")
+    assert "Content-Encoding" not in plain.headers and plain.headers["Cache-Control"] == "no-cache"
+    assert plain.headers["X-Report-Version"] == str(report["version"])
+    assert "Rendered test for sector 7 margins" in plain.text
+
+    compressed = await seeded.get(url, headers={"Accept-Encoding": "gzip"})
+    assert compressed.headers["Content-Encoding"] == "gzip" and compressed.content == plain.content
+    assert compressed.headers["ETag"] == plain.headers["ETag"][:-1] + '-gzip"'
+
+    for etag in (plain.headers["ETag"], compressed.headers["ETag"]):
+        assert (await seeded.get(url, headers={"If-None-Match": etag})).status_code == 304
+
+    pinned = await seeded.get(url, params={"version": report["version"], "format": "json"})
+    assert pinned.headers["Cache-Control"] == "public, max-age=31536000, immutable"
+    assert pinned.json()["report_id"] == report["report_id"]
+    assert (await seeded.get(url, params={"format": "pdf"})).status_code == 422
+    assert (await seeded.get("/api/v1/reports/0000000000000000/rendered")).status_code == 404
@@ -0,0 +1,48 @@
+import time
+import pytest
+from app.data.report_store import ReportStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ReportStore(str(tmp_path / "reports.db"), max_versions=2, max_reports=2, ttl=0)
+
+
+def test_versions_are_reserved_in_order_and_capped(store):
+    first, second = store.reserve_version("r"), store.reserve_version("r")
+    assert (first, second) == (1, 2)
+    # Versions can be written out of order once reserved
+    store.put("r", {"query": "q"}, {"content": "two"}, second)
+    store.put("r", {"query": "q"}, {"content": "one"}, first)
+    assert store.get("r")["report"] == {"content": "two", "version": 2}
+    assert store.get("r", 1)["params"] == {"query": "q"}
+
+    assert store.put("r", {}, {"content": "three"}) == 3
+    assert store.versions("r") == [2, 3]
+    assert store.get("r", 1) is None and store.get("missing") is None
+
+
+def test_reservations_continue_from_stored_versions(tmp_path):
+    path = str(tmp_path / "reports.db")
+    ReportStore(path).put("r", {}, {})
+    assert ReportStore(path).reserve_version("r") == 2
+
+
+def test_prune_keeps_the_most_recently_stored_reports(store):
+    for report_id in ("a", "b", "c"):
+        store.put(report_id, {}, {})
+        time.sleep(0.01)
+    store.put("a", {}, {})
+    assert store.prune() == ["b"]
+    assert store.get("b") is None and store.get("a") is not None
+    assert store.reserve_version("b") == 1
+    assert store.prune() == []
+
+
+def test_prune_drops_expired_reports(tmp_path):
+    store = ReportStore(str(tmp_path / "reports.db"), ttl=0.05)
+    store.put("old", {}, {})
+    time.sleep(0.1)
+    store.put("new", {}, {})
+    assert store.prune() == ["old"]
+    assert store.get("new") is not None
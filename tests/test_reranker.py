@@ -0,0 +1,57 @@
+import pytest
+from app.data.documents import RetrievedDocument
+from app.services import reranker
+from app.services.reranker import Reranker, estimate_tokens
+from benchmarks.fakes import StubCrossEncoder
+
+
+def hit(doc_id: str, text: str, score: float = 0.5) -> RetrievedDocument:
+    return RetrievedDocument(doc_id, score, text, "test", "", {}, None)
+
+
+@pytest.fixture
+def make_reranker(monkeypatch):
+    def make(latency_per_pair: float = 0.0, **options) -> Reranker:
+        monkeypatch.setattr(
+            reranker, "CrossEncoder", lambda name, **kwargs: StubCrossEncoder(name, latency_per_pair=latency_per_pair)
+        )
+        return Reranker("stub", **options)
+    return make
+
+
+def test_estimate_tokens():
+    assert estimate_tokens("x" * 40) == 10
+    assert estimate_tokens(None) == 0
+
+
+def test_rerank_keeps_the_best_scored_documents(make_reranker):
+    candidates = [[
+        hit("vector_best", "unrelated text"),
+        hit("partial", "reliance results"),
+        hit("exact", "reliance quarterly results beat"),
+    ]]
+    kept, = make_reranker(batch_size=2, budget_ms=1000).rerank(
+        ["reliance quarterly results"], candidates, top_k=2, baseline_k=3
+    )
+    assert [doc.id for doc in kept] == ["exact", "partial"]
+    assert kept[0].rerank_score == pytest.approx(1.0)
+
+
+def test_spent_budget_ranks_unscored_candidates_last_in_vector_order(make_reranker):
+    queries = ["alpha beta", "gamma delta"]
+    candidates = [
+        [hit("a0", "nothing"), hit("a1", "alpha beta"), hit("a2", "alpha")],
+        [hit("g0", "gamma"), hit("g1", "gamma delta"), hit("g2", "gamma delta")],
+    ]
+    # One batch of two pairs fits the budget: rank 0 of both queries, round-robin
+    first, second = make_reranker(latency_per_pair=0.01, batch_size=2, budget_ms=1).rerank(
+        queries, candidates, top_k=3, baseline_k=3
+    )
+    assert [doc.id for doc in first] == ["a0", "a1", "a2"]
+    assert first[0].rerank_score == 0.0 and first[1].rerank_score is None
+    assert [doc.id for doc in second] == ["g0", "g1", "g2"]
+    assert second[0].rerank_score == pytest.approx(0.5)
+
+
+def test_rerank_handles_queries_without_candidates(make_reranker):
+    assert make_reranker().rerank(["q1", "q2"], [[], [hit("d", "q2")]], top_k=5, baseline_k=5)[0] == []
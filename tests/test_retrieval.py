@@ -0,0 +1,76 @@
+import pytest
+
+
+@pytest.fixture
+def retrieval_service(seeded):
+    from app.api import routes
+    return routes.data_indexer.retrieval_service
+
+
+@pytest.mark.anyio
+async def test_retrieve_many_matches_single_retrieval(retrieval_service):
+    queries = ["Sector 3 earnings", "Indian equities outlook"]
+    many = await retrieval_service.retrieve_many(queries, top_k=4)
+    assert len(many) == 2
+    for query, documents in zip(queries, many):
+        single = await retrieval_service.retrieve_relevant_documents(query, top_k=4)
+        assert [doc.id for doc in documents] == [doc.id for doc in single]
+        assert all(doc.text for doc in documents)
+    assert await retrieval_service.retrieve_many([]) == []
+
+
+@pytest.mark.anyio
+async def test_failed_store_write_removes_the_new_vectors(retrieval_service, backends, monkeypatch):
+    def fail(documents):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(retrieval_service.document_store, "put_many", fail)
+    with pytest.raises(OSError):
+        await retrieval_service.index_document({"id": "orphan", "text": "Orphan", "metadata": {"type": "news"}})
+    with pytest.raises(OSError):
+        await retrieval_service.index_documents([
+            {"id": f"orphan_{i}", "text": f"Orphan {i}", "metadata": {"type": "news"}} for i in range(3)
+        ])
+    assert not backends.index.fetch(["orphan", "orphan_0", "orphan_1", "orphan_2"])["vectors"]
+
+
+@pytest.mark.anyio
+async def test_failed_upsert_leaves_the_store_untouched(retrieval_service, monkeypatch):
+    def fail(**kwargs):
+        raise ConnectionError("index unavailable")
+
+    monkeypatch.setattr(retrieval_service.index, "upsert", fail)
+    with pytest.raises(ConnectionError):
+        await retrieval_service.index_documents([{"id": "unindexed", "text": "Unindexed", "metadata": {}}])
+    assert retrieval_service.document_store.get_many(["unindexed"]) == {}
+
+
+@pytest.mark.anyio
+async def test_upserts_are_pipelined_with_bounded_concurrency(retrieval_service, monkeypatch):
+    import threading
+    import time
+    from app.core.config import settings
+    monkeypatch.setattr(settings, "UPSERT_BATCH_SIZE", 10)
+    monkeypatch.setattr(settings, "VECTOR_UPSERT_CONCURRENCY", 2)
+    lock = threading.Lock()
+    in_flight = peak = 0
+    upsert = retrieval_service.index.upsert
+
+    def slow_upsert(**kwargs):
+        nonlocal in_flight, peak
+        with lock:
+            in_flight += 1
+            peak = max(peak, in_flight)
+        time.sleep(0.02)
+        with lock:
+            in_flight -= 1
+        return upsert(**kwargs)
+
+    monkeypatch.setattr(retrieval_service.index, "upsert", slow_upsert)
+    documents = [{"id": f"pipelined_{i}", "text": f"Pipelined {i}", "metadata": {"type": "note"}} for i in range(55)]
+    ids = await retrieval_service.index_documents(documents)
+
+    assert ids == [doc["id"] for doc in documents]
+    assert peak == 2
+    assert len(retrieval_service.document_store.get_many(ids)) == 55
+    assert len(retrieval_service.index.fetch(ids)["vectors"]) == 55
@@ -0,0 +1,93 @@
+import os
+from datetime import date, timedelta
+import pytest
+from app.data.sentiment_store import SentimentStore
+
+
+def days_ago(n: int) -> str:
+    return (date.today() - timedelta(days=n)).isoformat()
+
+
+def article(url, published_at, *entities, score=None):
+    return {
+        "url": url,
+        "published_at": published_at,
+        "sentiment": {"score": score},
+        "entities": [{"symbol": symbol, "name": name, "sentiment_score": value} for symbol, name, value in entities],
+    }
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "sentiment.npz")
+
+
+def test_ingest_skips_duplicates_and_out_of_range_days(path):
+    store = SentimentStore(path)
+    articles = [
+        article("https://a/1", days_ago(1), ("RELIANCE.NS", "Reliance Industries", 0.5), ("TCS.NS", "TCS", None), score=-0.2),
+        article("https://a/1", days_ago(1), ("RELIANCE.NS", "Reliance Industries", 0.9)),
+        article("https://a/2", days_ago(5000), ("RELIANCE.NS", "", 0.9)),
+        article("https://a/3", (date.today() + timedelta(days=30)).isoformat(), ("RELIANCE.NS", "", 0.9)),
+        article("", days_ago(1), ("RELIANCE.NS", "", 0.9)),
+    ]
+    assert store.ingest_articles(articles) == 2
+    assert store.ingest_articles(articles) == 0
+    # Only the one kept day is covered, however far off the skipped dates were
+    assert store.sums.shape == (2, 1)
+
+    assert store.resolve("reliance industries") == "RELIANCE.NS"
+    assert store.resolve("reliance") == "RELIANCE.NS"
+    assert store.resolve("tcs.ns") == "TCS.NS"
+    assert store.resolve("unknown") is None
+    assert store.daily("TCS.NS") == {"dates": [days_ago(1)], "mean": [-0.2], "count": [1]}
+
+
+def test_summarize_windows_and_momentum(path):
+    store = SentimentStore(path)
+    store.ingest_articles([
+        article("https://b/1", days_ago(1), ("INFY", "Infosys", 0.6)),
+        article("https://b/2", days_ago(2), ("INFY", "Infosys", 0.2)),
+        article("https://b/3", days_ago(9), ("INFY", "Infosys", -0.4)),
+    ])
+    summary = store.summarize(["Infosys", "missing"], window=7)
+    assert list(summary) == ["INFY"]
+    row = summary["INFY"]
+    assert row["as_of"] == days_ago(1)
+    assert row["mean"] == pytest.approx(0.4) and row["count"] == 2
+    assert row["previous_mean"] == pytest.approx(-0.4) and row["previous_count"] == 1
+    assert row["momentum"] == pytest.approx(0.8)
+
+    earlier = store.summarize(["INFY"], window=7, as_of=days_ago(9))["INFY"]
+    assert earlier["count"] == 1 and earlier["previous_mean"] is None
+    with pytest.raises(ValueError):
+        store.summarize(["INFY"], as_of="whenever")
+    assert "| INFY | 2 | +0.40 | 1 | -0.40 | +0.80 |" in SentimentStore.format_table(summary)
+    assert store.top_entities() == ["INFY"]
+
+
+def test_other_instances_replay_the_journal(path):
+    writer, reader = SentimentStore(path), SentimentStore(path)
+    writer.ingest_articles([article("https://c/1", days_ago(3), ("HDFC", "HDFC Bank", 0.3))])
+    assert not os.path.exists(path)
+    assert reader.daily("HDFC")["count"] == [1]
+    assert SentimentStore(path).daily("hdfc bank")["mean"] == [0.3]
+
+
+def test_checkpoint_folds_the_journal_into_a_snapshot(path):
+    store = SentimentStore(path, journal_max_bytes=1)
+    store.ingest_articles([article("https://d/1", days_ago(2), ("SBIN", "SBI", -0.5))])
+    assert store.generation == 1 and os.path.exists(path)
+    assert not os.path.exists(f"{path}.0.journal")
+
+    store.ingest_articles([article("https://d/2", days_ago(1), ("SBIN", "SBI", 0.5))])
+    reopened = SentimentStore(path)
+    assert reopened.generation == 2
+    assert reopened.daily("SBIN")["count"] == [1, 1]
+    # Seen URLs survive the snapshot
+    assert reopened.ingest_articles([article("https://d/1", days_ago(2), ("SBIN", "SBI", -0.5))]) == 0
+
+
+@pytest.mark.anyio
+async def test_sentiment_routes_reject_bad_dates(client):
+    assert (await client.get("/api/v1/sentiment/INFY", params={"start": "someday"})).status_code == 400
@@ -0,0 +1,91 @@
+import asyncio
+import time
+import pytest
+from app.utils.deadline import DeadlineExceeded, current_deadline, deadline
+from app.utils.singleflight import SingleFlight, normalize_key_part
+
+
+def test_normalize_key_part():
+    assert normalize_key_part("  Reliance   Industries ") == "reliance industries"
+    assert normalize_key_part(["TCS", " Infy"]) == ("tcs", "infy")
+    assert normalize_key_part(5) == 5
+
+
+@pytest.mark.anyio
+async def test_concurrent_calls_share_one_execution_and_get_copies():
+    group = SingleFlight("test")
+    calls = 0
+
+    async def work():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return {"items": [1, 2]}
+
+    first, second = await asyncio.gather(group.do("k", work), group.do("k", work))
+    assert calls == 1
+    assert first == second == {"items": [1, 2]}
+    first["items"].append(3)
+    assert second == {"items": [1, 2]}
+    assert group.in_flight() == 0
+
+    # Once finished, the next call runs the work again
+    await group.do("k", work)
+    assert calls == 2
+
+
+@pytest.mark.anyio
+async def test_errors_reach_every_caller():
+    group = SingleFlight("test")
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise ValueError("upstream down")
+
+    results = await asyncio.gather(group.do("k", fail), group.do("k", fail), return_exceptions=True)
+    assert all(isinstance(result, ValueError) for result in results)
+    assert group.in_flight() == 0
+
+
+@pytest.mark.anyio
+async def test_a_callers_deadline_does_not_cancel_the_shared_work():
+    group = SingleFlight("test")
+    seen_deadlines = []
+
+    async def work():
+        seen_deadlines.append(current_deadline.get())
+        await asyncio.sleep(0.1)
+        return "done"
+
+    async def impatient():
+        with deadline(0.02):
+            return await group.do("k", work)
+
+    leader = asyncio.ensure_future(impatient())
+    await asyncio.sleep(0)
+    follower = asyncio.ensure_future(group.do("k", work))
+
+    with pytest.raises(DeadlineExceeded):
+        await leader
+    assert await follower == "done"
+    assert seen_deadlines == [None]
+
+
+@pytest.mark.anyio
+async def test_work_runs_with_an_explicit_deadline():
+    group = SingleFlight("test")
+    seen_deadlines = []
+
+    async def work():
+        seen_deadlines.append(current_deadline.get())
+        await asyncio.sleep(0.05)
+        return "partial"
+
+    with deadline(0.01):
+        at = current_deadline.get()
+        # The work ends by this deadline itself, so the caller waits for its result
+        assert await group.do("k", work, deadline_at=at) == "partial"
+    assert seen_deadlines == [at]
+
+    assert await group.do("k", work, deadline_at=time.monotonic() + 60) == "partial"
+    assert len(seen_deadlines) == 2
@@ -0,0 +1,71 @@
+import json
+import os
+import numpy as np
+import pytest
+from app.core.config import settings
+from app.data.snapshot import MANIFEST_FILE, RECORDS_FILE, VECTORS_FILE, SnapshotManager, verify
+
+
+@pytest.fixture
+def retrieval_service(seeded):
+    from app.api import routes
+    return routes.data_indexer.retrieval_service
+
+
+@pytest.mark.anyio
+async def test_export_and_restore_round_trip(retrieval_service, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "UPSERT_BATCH_SIZE", 64)
+    ids = sorted(await retrieval_service.list_vector_ids())
+    before = await retrieval_service.fetch_vectors(ids[:5])
+    manager = SnapshotManager(retrieval_service, concurrency=3)
+
+    path = str(tmp_path / "snapshot")
+    manifest = await manager.export(path)
+    assert manifest["count"] == len(ids) and manifest["dimension"] == retrieval_service.dimension
+    assert verify(path) == manifest
+    vectors = np.load(os.path.join(path, VECTORS_FILE))
+    with open(os.path.join(path, RECORDS_FILE)) as f:
+        records = [json.loads(line) for line in f]
+    assert sorted(record["id"] for record in records) == ids
+    row = next(i for i, record in enumerate(records) if record["id"] == ids[0])
+    np.testing.assert_allclose(vectors[row], before[ids[0]]["values"], rtol=1e-6)
+    with pytest.raises(FileExistsError):
+        await manager.export(path)
+
+    # Lose some vectors and documents, then bring them back
+    lost = ids[:5]
+    await retrieval_service.delete_vectors(lost)
+    retrieval_service.document_store.delete_many(lost)
+    result = await manager.restore(path)
+    assert result["vectors"] == len(ids) and result["documents"] > 0
+    after = await retrieval_service.fetch_vectors(lost)
+    assert set(after) == set(lost)
+    np.testing.assert_allclose(after[ids[0]]["values"], before[ids[0]]["values"], rtol=1e-6)
+    assert set(retrieval_service.document_store.get_many(lost)) == set(lost)
+
+
+@pytest.mark.anyio
+async def test_restore_rejects_snapshots_that_do_not_fit(retrieval_service, tmp_path, monkeypatch):
+    manager = SnapshotManager(retrieval_service)
+    path = str(tmp_path / "snapshot")
+    await manager.export(path, include_documents=False)
+
+    monkeypatch.setattr(settings, "EMBEDDING_MODEL", "another-model")
+    with pytest.raises(ValueError, match="another-model"):
+        await manager.restore(path)
+    monkeypatch.undo()
+
+    manifest_path = os.path.join(path, MANIFEST_FILE)
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    with open(manifest_path, "w") as f:
+        json.dump({**manifest, "dimension": manifest["dimension"] + 1}, f)
+    with pytest.raises(ValueError, match="shape"):
+        await manager.restore(path)
+
+    with open(manifest_path, "w") as f:
+        json.dump(manifest, f)
+    with open(os.path.join(path, RECORDS_FILE), "a") as f:
+        f.write("{}\n")
+    with pytest.raises(ValueError, match="checksum"):
+        await manager.restore(path)
@@ -0,0 +1,126 @@
+import os
+import tempfile
+import time
+import pytest
+from app.data.symbol_master import SymbolMaster, normalize, trigrams
+
+SYMBOLS_CSV = (
+    "name,query,nse,bse,isin,aliases\n"
+    "Reliance Industries Ltd,Reliance,RELIANCE,500325,INE002A01018,RIL|Reliance Jio\n"
+    "Tata Consultancy Services Limited,TCS,TCS,532540,INE467B01029,\n"
+    "Tata Motors Ltd,Tata Motors,TATAMOTORS,500570,,\n"
+    ",skipped,,,,\n"
+)
+
+
+def test_normalize_and_trigrams():
+    assert normalize("Reliance Industries Ltd.") == "reliance industries"
+    assert normalize("Ltd") == "ltd"
+    assert trigrams("ab") == {"  a", " ab", "ab "}
+
+
+@pytest.fixture
+def master(tmp_path):
+    csv_path = tmp_path / "symbols.csv"
+    csv_path.write_text(SYMBOLS_CSV)
+    master = SymbolMaster(str(tmp_path / "symbols.json"), seed_path="")
+    assert master.import_csv(str(csv_path)) == 3
+    return master
+
+
+def test_resolve_by_name_alias_or_code(master):
+    for text in ("reliance industries", "RIL", "INE002A01018", "500325", "Reliance Industries Limited"):
+        assert master.resolve(text)["query"] == "Reliance"
+    assert master.resolve("Infosys") is None
+
+
+def test_search_prefixes_words_and_misspellings(master):
+    assert [entry["name"] for entry in master.search("tata")][:2] == [
+        "Tata Motors Ltd", "Tata Consultancy Services Limited"
+    ]
+    assert master.search("consultancy")[0]["query"] == "TCS"
+    assert master.search("relaince")[0]["query"] == "Reliance"
+    assert master.search("reliance", limit=1)[0]["score"] == 1.0
+    assert master.search("") == []
+
+
+def test_learning_merges_entries_and_persists(master):
+    master.learn_stock("Infy", {
+        "companyName": "Infosys Ltd",
+        "companyProfile": {"exchangeCodeNse": "INFY", "peerCompanyList": [{"companyName": "Wipro", "tickerId": "W1"}]},
+    })
+    master.learn_stock_id("infy", "S123")
+    master.add("Tata Motors", nse="TATAMOTORS", aliases=["TaMo"])
+
+    reopened = SymbolMaster(master.path, seed_path="")
+    assert len(reopened) == 5
+    infosys = reopened.resolve("INFY")
+    assert infosys["query"] == "Infy" and infosys["stock_id"] == "S123"
+    assert reopened.resolve("w1")["name"] == "Wipro"
+    assert reopened.resolve("tamo")["name"] == "Tata Motors Ltd"
+
+
+def test_stock_keys_are_the_accepted_name_of_known_companies(master):
+    assert master.stock_key("RELIANCE") == master.stock_key("INE002A01018") == "Reliance"
+    assert master.stock_key("S999") == "S999"
+
+
+def test_recent_failures_expire(master, monkeypatch):
+    from app.core.config import settings
+    master.note_failure("Nonexistent Co")
+    assert master.recently_failed("nonexistent")
+    monkeypatch.setattr(settings, "SYMBOL_FAILURE_TTL_SECONDS", -1)
+    assert not master.recently_failed("nonexistent")
+
+
+def test_rejected_names_are_bounded(master, monkeypatch):
+    from app.data import symbol_master
+    monkeypatch.setattr(symbol_master, "MAX_FAILURES", 3)
+    for i in range(5):
+        master.note_failure(f"Typo {i}")
+    assert [master.recently_failed(f"typo {i}") for i in range(5)] == [False, False, True, True, True]
+
+    from app.core.config import settings
+    monkeypatch.setattr(settings, "SYMBOL_FAILURE_TTL_SECONDS", 0.05)
+    time.sleep(0.1)
+    master.note_failure("Fresh typo")
+    # Expired names are swept when a new one is noted, not only when looked up again
+    assert list(master._failures) == ["fresh typo"]
+
+
+@pytest.mark.anyio
+async def test_uploads_are_saved_to_private_temp_files(client, monkeypatch, tmp_path):
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
+    response = await client.post(
+        "/api/v1/symbols/import", files={"file": ("../../escape.csv", SYMBOLS_CSV.encode(), "text/csv")}
+    )
+    assert response.status_code == 200 and response.json()["imported_rows"] == 3
+    found = (await client.get("/api/v1/symbols/search", params={"q": "tata mo"})).json()["results"]
+    assert found[0]["nse"] == "TATAMOTORS"
+    assert (await client.get("/api/v1/symbols/resolve", params={"q": "nothing like it"})).status_code == 404
+
+    response = await client.post(
+        "/api/v1/index-csv",
+        files={"file": ("notes.csv", b"text,source\nFirst note,a\nSecond note,b\n", "text/csv")},
+        data={"text_column": "text", "source_column": "source"}
+    )
+    assert response.status_code == 200 and response.json()["indexed_documents"] == 2
+    # The temporary copies are gone, and nothing was written under the client's file name
+    assert os.listdir(tmp_path) == []
+    assert not os.path.exists(os.path.join(os.path.dirname(os.path.dirname(str(tmp_path))), "escape.csv"))
+
+
+@pytest.mark.anyio
+async def test_learning_does_not_block_the_event_loop(client):
+    import asyncio
+    from app.api import routes
+    fetcher = routes.financial_data_fetcher
+    # An import holding the symbol master lock must not stall other requests
+    fetcher.symbol_master._lock.acquire()
+    try:
+        fetch = asyncio.ensure_future(fetcher.fetch_indian_stock_data(["Reliance"]))
+        await asyncio.sleep(0.2)
+        assert not fetch.done()
+    finally:
+        fetcher.symbol_master._lock.release()
+    assert len(await fetch) == 1
@@ -0,0 +1,106 @@
+import numpy as np
+import pytest
+from app.data.timeseries_store import TimeSeriesStore, to_bound, to_number, to_period
+
+
+def test_to_period_formats():
+    assert to_period("2024") == np.datetime64("2024-03-31")
+    assert to_period("2024-06-30T00:00:00") == np.datetime64("2024-06-30")
+    assert to_period("11 Apr 2025") == np.datetime64("2025-04-11")
+    assert to_period("31-12-2023") == np.datetime64("2023-12-31")
+    assert to_period("not a date") is None
+    assert to_period(None) is None
+
+
+def test_to_bound_rejects_unparseable_dates():
+    assert to_bound(None) is None
+    assert to_bound("  ") is None
+    assert to_bound("1970-01-02") == 1
+    with pytest.raises(ValueError):
+        to_bound("yesterday")
+
+
+def test_to_number():
+    assert to_number("1,234.5") == 1234.5
+    assert to_number(3) == 3.0
+    assert to_number(True) is None
+    assert to_number("n/a") is None
+
+
+def test_append_skips_unchanged_values_and_newer_values_win(tmp_path):
+    store = TimeSeriesStore(str(tmp_path))
+    assert store.append("TCS", "annual.INC.Revenue", ["2023", "2024", "bad"], [10, "20", 5]) == 2
+    assert store.append("TCS", "annual.INC.Revenue", ["2023", "2024"], [10, 20]) == 0
+    assert store.append("tcs ", "annual.INC.Revenue", ["2024"], [25]) == 1
+
+    periods, values = store.get_series("TCS", "annual.INC.Revenue")
+    assert [str(p) for p in periods] == ["2023-03-31", "2024-03-31"]
+    assert values.tolist() == [10.0, 25.0]
+    assert store.stocks() == ["tcs"]
+    assert store.measures("TCS") == ["annual.INC.Revenue"]
+
+
+def test_get_series_range_and_panel(tmp_path):
+    store = TimeSeriesStore(str(tmp_path))
+    store.append("A", "price.NSE", ["2025-01-01", "2025-01-02", "2025-01-03"], [1, 2, 3])
+    store.append("B", "price.NSE", ["2025-01-02", "2025-01-04"], [20, 40])
+
+    periods, values = store.get_series("A", "price.NSE", start="2025-01-02", end="2025-01-02")
+    assert values.tolist() == [2.0]
+    with pytest.raises(ValueError):
+        store.get_series("A", "price.NSE", start="soon")
+
+    periods, matrix = store.get_panel(["A", "B"], "price.NSE")
+    assert [str(p) for p in periods] == ["2025-01-01", "2025-01-02", "2025-01-03", "2025-01-04"]
+    np.testing.assert_array_equal(matrix, [[1, 2, 3, np.nan], [np.nan, 20, np.nan, 40]])
+
+
+def test_ingest_stock_data(tmp_path):
+    store = TimeSeriesStore(str(tmp_path))
+    payload = {
+        "financials": [{
+            "EndDate": "2024-03-31",
+            "Type": "Annual",
+            "stockFinancialMap": {"INC": [{"key": "Revenue", "value": "100"}, {"key": "Note", "value": "-"}]},
+        }],
+        "currentPrice": {"NSE": "1,500.5"},
+    }
+    assert store.ingest_stock_data("X", payload, as_of="2025-01-01") == 2
+    assert store.measures("X") == ["annual.INC.Revenue", "price.NSE"]
+    assert store.get_series("X", "price.NSE")[1].tolist() == [1500.5]
+    # Storage errors are logged, not raised
+    assert store.safe_ingest("ingest_stock_data", "X", None) == 0
+
+
+@pytest.mark.anyio
+async def test_timeseries_routes_reject_bad_dates(client):
+    response = await client.get("/api/v1/timeseries/anything", params={"start": "someday"})
+    assert response.status_code == 400
+    response = await client.get("/api/v1/timeseries", params={"stock_ids": "a,b", "measure": "m", "end": "later"})
+    assert response.status_code == 400
+    assert (await client.get("/api/v1/timeseries/no-such-stock")).status_code == 404
+
+
+@pytest.mark.anyio
+async def test_timeseries_panels_are_capped(client, monkeypatch):
+    from app.core.config import settings
+    monkeypatch.setattr(settings, "TIMESERIES_PANEL_MAX_STOCKS", 2)
+    params = {"stock_ids": "a,b", "measure": "m"}
+    assert (await client.get("/api/v1/timeseries", params=params)).status_code == 200
+    response = await client.get("/api/v1/timeseries", params={**params, "stock_ids": "a,b,c"})
+    assert response.status_code == 400 and "At most 2" in response.json()["detail"]
+
+
+@pytest.mark.anyio
+async def test_stock_data_and_forecasts_share_one_key(client):
+    from app.api import routes
+    fetcher = routes.financial_data_fetcher
+    await fetcher.fetch_indian_stock_data(["Reliance"])
+    assert await fetcher.fetch_stock_forecasts(["RELIANCE"], "EPS")
+    # Asked for by name and by NSE code, read back by ISIN
+    response = await client.get("/api/v1/timeseries/INE002A01018")
+    assert response.status_code == 200
+    series = response.json()["series"]
+    assert "price.NSE" in series and "forecast.EPS.Annual.Actuals.Current" in series
+    panel = (await client.get("/api/v1/timeseries", params={"stock_ids": "Reliance,RELIANCE", "measure": "price.NSE"})).json()
+    assert panel["values"]["Reliance"] == panel["values"]["RELIANCE"]
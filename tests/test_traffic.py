@@ -0,0 +1,89 @@
+import json
+import threading
+import pytest
+from app.core import traffic
+from app.core.config import settings
+from app.core.traffic import REDACTED, TrafficRecorder, TrafficRecordingMiddleware, redact
+
+
+def read_lines(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+
+def test_redact_nested_values():
+    assert redact({"query": "q", "apiKey": "k", "nested": [{"Password": "p", "n": 1}]}) == {
+        "query": "q", "apiKey": REDACTED, "nested": [{"Password": REDACTED, "n": 1}]
+    }
+    assert redact("plain") == "plain"
+
+
+def test_recorder_writes_redacted_lines(tmp_path):
+    path = str(tmp_path / "sub" / "traffic.jsonl")
+    recorder = TrafficRecorder(path, sample_rate=1.0, max_body_bytes=100)
+    body = json.dumps({"query": "q", "token": "t"}).encode()
+    recorder.record({"path": "/a"}, "application/json", body, len(body))
+    recorder.record({"path": "/b"}, "text/csv", b"a,b", 3)
+    recorder.record({"path": "/c"}, "application/json", b"x" * 200, 200)
+    recorder.record({"path": "/d"})
+    recorder.flush()
+
+    assert read_lines(path) == [
+        {"path": "/a", "body": {"query": "q", "token": REDACTED}},
+        {"path": "/b", "body_bytes": 3, "content_type": "text/csv"},
+        {"path": "/c", "body_bytes": 200, "content_type": "application/json"},
+        {"path": "/d"},
+    ]
+    recorder.close()
+    recorder.close()
+
+
+def test_entries_beyond_the_queue_are_dropped(tmp_path, monkeypatch):
+    monkeypatch.setattr(traffic, "QUEUE_SIZE", 1)
+    recorder = TrafficRecorder(str(tmp_path / "traffic.jsonl"), sample_rate=1.0)
+    writing, proceed = threading.Event(), threading.Event()
+    write = recorder.write
+
+    def slow_write(entries):
+        writing.set()
+        proceed.wait()
+        write(entries)
+
+    monkeypatch.setattr(recorder, "write", slow_write)
+    recorder.record({"n": 1})
+    writing.wait()
+    recorder.record({"n": 2})
+    recorder.record({"n": 3})
+    assert recorder.dropped == 1
+    proceed.set()
+    recorder.close()
+    assert read_lines(recorder.path) == [{"n": 1}, {"n": 2}]
+
+
+def recording_middleware(app) -> TrafficRecordingMiddleware:
+    layer = app.middleware_stack
+    while not isinstance(layer, TrafficRecordingMiddleware):
+        layer = layer.app
+    return layer
+
+
+@pytest.mark.anyio
+async def test_middleware_records_requests(client, monkeypatch, tmp_path):
+    import main
+    # The middleware stack is built on the first request
+    await client.get("/metrics")
+    middleware = recording_middleware(main.app)
+    recorder = TrafficRecorder(str(tmp_path / "traffic.jsonl"), sample_rate=1.0)
+    monkeypatch.setattr(middleware, "recorder", recorder)
+    monkeypatch.setattr(settings, "TRAFFIC_RECORD_ENABLED", True)
+
+    await client.get("/metrics")
+    await client.get("/", params={"q": "x", "api_key": "secret"})
+    await client.post("/api/v1/generate-reports", json={"jobs": [], "token": "secret"})
+    recorder.close()
+
+    root, batch = read_lines(recorder.path)
+    assert root["method"] == "GET" and root["status"] == 200
+    assert root["query"] == [["q", "x"], ["api_key", REDACTED]]
+    assert batch["status"] == 400
+    assert batch["body"] == {"jobs": [], "token": REDACTED}